@@ -0,0 +1,84 @@
+"""Update Analysis from running aggregates vs table scans, and what writes pay.
+
+Usage: ``python benchmarks/bench_aggregates.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows, then ``POST /update_analysis`` is
+timed through Flask's test client with ``ANALYSIS_INCREMENTAL`` off
+("scan", see ``query_data.plan_scans``) and on ("aggregates"), best of
+``repeat``. "insert" is a refresh-sized ``insert_applicants_from_json_batch``
+of ``BATCH_ROWS`` new rows with and without the aggregate triggers, and
+"rebuild" is ``aggregates.rebuild``, the full recount used to verify them.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+from bench_analysis import update_analysis_ms
+from bench_insert import make_entries
+from synthetic import bench_connect_kwargs, best_of, connect, populate
+
+import aggregates
+import load_data
+import query_data
+import update_data
+from app import create_app
+
+TABLE_SIZES = (100_000, 1_000_000)
+BATCH_ROWS = 1000
+TRIGGER_EVENTS = ("insert", "update", "delete", "truncate")
+
+
+def insert_ms(conn, size, repeat):
+    """Best time to insert ``BATCH_ROWS`` new rows; they are deleted after each run."""
+    entries = make_entries(BATCH_ROWS, start=size + 1)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        update_data.insert_applicants_from_json_batch(entries)
+        timings.append((time.perf_counter() - started) * 1000)
+        conn.execute("DELETE FROM applicants WHERE p_id > %s;", (size,))
+    return min(timings)
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    kwargs = bench_connect_kwargs()
+    for module in (aggregates, query_data, update_data):
+        module.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    client = create_app().test_client()
+    conn = connect()
+
+    print(
+        f"{'rows':>9}{'scan ms':>10}{'aggregates ms':>15}"
+        f"{'insert ms':>11}{'+triggers ms':>14}{'rebuild ms':>12}"
+    )
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+
+        os.environ["ANALYSIS_INCREMENTAL"] = "0"
+        scan = update_analysis_ms(client, query_data.questions, repeat)
+        os.environ["ANALYSIS_INCREMENTAL"] = "1"
+        incremental = update_analysis_ms(client, query_data.questions, repeat)
+
+        with_triggers = insert_ms(conn, size, repeat)
+        for event in TRIGGER_EVENTS:
+            conn.execute(f"DROP TRIGGER applicants_aggregates_{event} ON applicants;")
+        without_triggers = insert_ms(conn, size, repeat)
+        with contextlib.redirect_stdout(io.StringIO()):
+            rebuild = best_of(aggregates.rebuild, repeat)
+        print(
+            f"{size:>9}{scan:>10.1f}{incremental:>15.1f}"
+            f"{without_triggers:>11.1f}{with_triggers:>14.1f}{rebuild:>12.1f}"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,105 @@
+"""End-to-end Update Analysis: one SELECT per question vs the planned scans.
+
+Usage: ``python benchmarks/bench_analysis.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows, then ``POST /update_analysis`` is
+timed through Flask's test client, best of ``repeat``. "per-question" swaps
+in the previous ``questions``: eleven SELECTs, one scan or index lookup
+each, and an ``executemany`` of the answers. "planned" is the current
+``query_data.questions`` (see ``query_data.plan_scans``).
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+from synthetic import bench_connect_kwargs, best_of, connect, populate
+
+import load_data
+import pages
+import query_data
+from app import create_app
+
+TABLE_SIZES = (100_000, 1_000_000)
+
+# The per-question SELECTs questions() ran before the planner.
+PER_QUESTION_QUERIES = [
+    "SELECT COUNT(*) FROM applicants WHERE term = 'Fall 2026';",
+    """SELECT ROUND(100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other'))
+       / COUNT(*), 2) FROM applicants;""",
+    """SELECT ROUND(AVG(gpa)::numeric, 2), ROUND(AVG(gre)::numeric, 2),
+       ROUND(AVG(gre_v)::numeric, 2), ROUND(AVG(gre_aw)::numeric, 2) FROM applicants;""",
+    """SELECT ROUND(AVG(gpa)::numeric, 2) FROM applicants
+       WHERE us_or_international = 'American' AND term = 'Fall 2026';""",
+    """SELECT ROUND(100.0 * COUNT(*) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted')
+       / COUNT(*), 2) FROM applicants;""",
+    "SELECT ROUND(AVG(gpa)::numeric, 2) FROM applicants WHERE status = 'Accepted' AND term = 'Fall 2026';",
+    """SELECT COUNT(*) FROM applicants WHERE degree = 'Masters'
+       AND program = 'Computer Science, Johns Hopkins University';""",
+    """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+       AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01' AND degree = 'PhD'
+       AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+       AND program_name = 'Computer Science';""",
+    """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+       AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01' AND degree = 'PhD'
+       AND llm_generated_program = 'Computer Science'
+       AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University');""",
+    "SELECT COUNT(DISTINCT program_id), COUNT(DISTINCT university_id) FROM applicants;",
+    "SELECT COUNT(DISTINCT llm_program_id), COUNT(DISTINCT llm_university_id) FROM applicants;",
+]
+
+
+def per_question(conn, write_connection=None):
+    """The previous ``questions``: a SELECT per question, then one executemany."""
+    write_connection = write_connection or conn
+    answers = []
+    with conn.cursor() as cur:
+        for question, query in zip(
+            query_data.QUESTIONS, PER_QUESTION_QUERIES
+        ):
+            cur.execute(query)
+            answers.append([question["question"], question["format"].format(*cur.fetchone())])
+    with write_connection.cursor() as cur:
+        # answers_table is now a view; the old writes get a table of their own.
+        cur.execute("DROP TABLE IF EXISTS legacy_answers_table;")
+        cur.execute("CREATE TABLE legacy_answers_table (question TEXT, answer TEXT);")
+        cur.executemany("INSERT INTO legacy_answers_table (question, answer) VALUES (%s, %s)", answers)
+        write_connection.commit()
+    return answers
+
+
+def update_analysis_ms(client, questions, repeat):
+    pages.questions = questions
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert client.post("/update_analysis", headers={"Accept": "application/json"}).status_code == 200
+
+    run()  # warm-up: pool, caches
+    return best_of(run, repeat)
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    client = create_app().test_client()
+    conn = connect()
+
+    print(f"{'rows':>9}{'per-question ms':>17}{'planned ms':>12}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+
+        before = update_analysis_ms(client, per_question, repeat)
+        after = update_analysis_ms(client, query_data.questions, repeat)
+        print(f"{size:>9}{before:>17.1f}{after:>12.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,99 @@
+"""Page reads of answers_table while analysis runs keep replacing it.
+
+Usage: ``python benchmarks/bench_answers.py [seconds]`` (default 5 per row).
+
+A writer thread stores a fresh set of eleven answers back to back, the way
+``questions`` ends, over a connection through ``latency_proxy.LatencyProxy``
+(the analysis often runs on another host than the database). Reader
+threads meanwhile do what ``/analysis`` does, ``SELECT * FROM
+answers_table`` on their own connections, and record how long each read
+took and whether it failed. "drop + create" is the previous write; "version"
+is ``query_data.store_answers``.
+"""
+
+import statistics
+import sys
+import threading
+import time
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict
+from latency_proxy import LatencyProxy
+from synthetic import bench_connect_kwargs, connect
+
+import query_data
+from bench_pipeline import proxied_kwargs
+
+ONE_WAY_DELAYS_MS = (1, 5)
+READERS = 4
+ANSWERS = [("Question {}".format(n), "Answer {}".format(n)) for n in range(1, 12)]
+
+
+def drop_and_create(conn, answers):
+    """The previous write: replace the answers table inside one transaction."""
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS answers_table;")
+        cur.execute("CREATE TABLE answers_table (question TEXT, answer TEXT);")
+        cur.executemany("INSERT INTO answers_table (question, answer) VALUES (%s, %s)", answers)
+    conn.commit()
+
+
+def reset(setup, versioned):
+    """Leave answers_table as the old table or as the versioned view."""
+    for query in query_data.ANSWERS_SCHEMA_QUERIES:
+        setup.execute(query)
+    setup.execute("DROP VIEW answers_table;")
+    setup.execute("DROP TABLE analysis_answers, analysis_versions;")
+    with psycopg.connect(**bench_connect_kwargs()) as conn:
+        (query_data.store_answers if versioned else drop_and_create)(conn, ANSWERS)
+
+
+def run(write, writer_kwargs, seconds):
+    stop = threading.Event()
+    timings, errors = [], []
+
+    def writer():
+        with psycopg.connect(**writer_kwargs) as conn:
+            while not stop.is_set():
+                write(conn, ANSWERS)
+
+    def reader():
+        with psycopg.connect(**bench_connect_kwargs(), autocommit=True) as conn:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute("SELECT * FROM answers_table").fetchall()
+                except psycopg.Error:
+                    errors.append(1)
+                timings.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return statistics.mean(timings), statistics.quantiles(timings, n=100)[-1], max(timings), len(errors)
+
+
+def main(seconds=5):
+    setup = connect()
+    target = conninfo_to_dict(bench_connect_kwargs()["conninfo"])
+    print(f"readers={READERS}, {seconds} s per row")
+    print(f"{'delay':>6}{'write':>15}{'read mean ms':>14}{'p99':>8}{'max':>9}{'errors':>8}")
+    for delay in ONE_WAY_DELAYS_MS:
+        with LatencyProxy(target.get("host", "127.0.0.1"), target.get("port", 5432), delay) as proxy:
+            writer_kwargs = proxied_kwargs(proxy.port)
+            for name, write, versioned in (
+                ("drop + create", drop_and_create, False),
+                ("version", query_data.store_answers, True),
+            ):
+                reset(setup, versioned)
+                mean, p99, worst, errors = run(write, writer_kwargs, seconds)
+                print(f"{delay:>6}{name:>15}{mean:>14.2f}{p99:>8.2f}{worst:>9.2f}{errors:>8}")
+    setup.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,100 @@
+"""Analysis page and Update Analysis latency on PostgreSQL vs embedded SQLite.
+
+Usage: ``python benchmarks/bench_backends.py [repeat]`` (default 5).
+
+Each size is generated in the PostgreSQL benchmark schema and copied row for
+row into a SQLite file (WAL mode, see ``sqlite_backend``), so both backends
+answer the same data. "page" is a full ``GET /analysis`` through Flask's
+test client, averaged over ``PAGE_REQUESTS`` requests; "analysis" is
+``query_data.questions``, which runs the eleven queries and rewrites
+``answers_table``, best of ``repeat``.
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from synthetic import bench_connect_kwargs, best_of, connect, populate
+
+import load_data
+import query_data
+import sqlite_backend
+from app import create_app
+
+TABLE_SIZES = (10_000, 100_000, 1_000_000)
+PAGE_REQUESTS = 200
+COPY_QUERY = "SELECT p_id, {} FROM applicants ORDER BY p_id;".format(", ".join(sqlite_backend.SCRAPED_COLUMNS))
+
+
+def use_backend(kwargs):
+    """Point load_data and query_data (and so the pages) at ``kwargs``."""
+    load_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+
+
+def copy_to_sqlite(conn, sqlite_kwargs):
+    """Recreate the SQLite applicants table with the benchmark rows."""
+    use_backend(sqlite_kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_data.create_table()
+    with query_data.connect() as target, conn.transaction(), conn.cursor(name="bench_copy") as source:
+        source.execute(COPY_QUERY)
+        with target.cursor() as cur:
+            while rows := source.fetchmany(50_000):
+                cur.executemany(load_data.INSERT_QUERY, [row + (None,) for row in rows])
+        target.execute("ANALYZE;")
+
+
+def analysis_ms(repeat):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), query_data.connect() as conn:
+            query_data.questions(conn, pipeline=False)
+
+    return best_of(run, repeat)
+
+
+def page_ms(client):
+    assert client.get("/analysis").status_code == 200  # warm-up: pool, templates
+    timings = []
+    for _ in range(PAGE_REQUESTS):
+        started = time.perf_counter()
+        client.get("/analysis")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(timings)
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    client = create_app().test_client()
+    conn = connect()
+    postgres_kwargs = bench_connect_kwargs()
+
+    print(f"{'rows':>9}{'pg page ms':>12}{'sqlite page ms':>16}{'pg analysis ms':>16}{'sqlite analysis ms':>20}")
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_kwargs = {"conninfo": "sqlite:///" + os.path.join(tmp, "applicants.db")}
+        for size in TABLE_SIZES:
+            conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+            for query in load_data.SCHEMA_QUERIES:
+                conn.execute(query)
+            populate(conn, size)
+            copy_to_sqlite(conn, sqlite_kwargs)
+
+            results = {}
+            for name, kwargs in (("postgres", postgres_kwargs), ("sqlite", sqlite_kwargs)):
+                use_backend(kwargs)
+                analysis = analysis_ms(repeat)  # also fills answers_table for the page
+                results[name] = (page_ms(client), analysis)
+            print(
+                f"{size:>9}{results['postgres'][0]:>12.2f}{results['sqlite'][0]:>16.2f}"
+                f"{results['postgres'][1]:>16.1f}{results['sqlite'][1]:>20.1f}"
+            )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,52 @@
+"""Update Analysis with and without the result cache.
+
+Usage: ``python benchmarks/bench_cache.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows, then ``POST /update_analysis`` is
+timed through Flask's test client with ``ANALYSIS_INCREMENTAL=0``, best of
+``repeat``. "uncached" sets ``ANALYSIS_CACHE=0``, so every run scans
+applicants; "cached" repeats the run on unchanged data, so only the
+data-version token is read (see ``result_cache``).
+"""
+
+import os
+import sys
+
+from bench_analysis import update_analysis_ms
+from synthetic import bench_connect_kwargs, connect, populate
+
+import load_data
+import query_data
+import result_cache
+from app import create_app
+
+TABLE_SIZES = (100_000, 1_000_000)
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    os.environ["ANALYSIS_INCREMENTAL"] = "0"
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    client = create_app().test_client()
+    conn = connect()
+
+    print(f"{'rows':>9}{'uncached ms':>13}{'cached ms':>11}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        result_cache.get_cache().clear()
+
+        os.environ["ANALYSIS_CACHE"] = "0"
+        uncached = update_analysis_ms(client, query_data.questions, repeat)
+        os.environ["ANALYSIS_CACHE"] = "1"
+        cached = update_analysis_ms(client, query_data.questions, repeat)
+        print(f"{size:>9}{uncached:>13.1f}{cached:>11.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,86 @@
+"""SQL vs the in-process columnar store, for the analysis questions and a stats filter.
+
+Usage: ``python benchmarks/bench_columnar.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows. "load" is the first
+``ColumnStore.refresh`` (the whole table); "refresh" merges one new ingest
+batch of ``BATCH_ROWS`` rows. The questions are answered with
+``ANALYSIS_INCREMENTAL=0`` and ``ANALYSIS_CACHE=0``, by the planned scans
+("sql") and with ``ANALYSIS_COLUMNAR=1`` ("columnar"); the stats filter is
+one university, program and degree through ``applicant_stats``. Query
+timings are best of ``repeat``.
+"""
+
+import os
+import sys
+import time
+
+from synthetic import best_of, bench_connect_kwargs, connect, populate
+
+import applicant_stats
+import columnar
+import load_data
+import query_data
+from ingest_ledger import begin_batch
+
+TABLE_SIZES = (100_000, 1_000_000)
+BATCH_ROWS = 1_000
+FILTERS = applicant_stats.normalize_filters(
+    {"university": ["MIT"], "program": ["Computer Science"], "degree": ["PhD"]}
+)
+
+
+def _ms(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def _answer(conn):
+    with conn.cursor() as cur:
+        query_data._fetch_rows(conn, cur, pipeline=False)
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    os.environ["ANALYSIS_INCREMENTAL"] = "0"
+    os.environ["ANALYSIS_CACHE"] = "0"
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    conn = connect()
+
+    print(
+        f"{'rows':>9}{'load ms':>10}{'refresh ms':>12}"
+        f"{'sql q ms':>10}{'columnar q ms':>15}{'sql stats ms':>14}{'columnar stats ms':>19}"
+    )
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        columnar.reset_store()
+        store = columnar.get_store()
+
+        with conn.cursor() as cur:
+            load = _ms(lambda: store.refresh(cur))
+            batch_id = begin_batch(cur, "benchmark")
+            populate(conn, BATCH_ROWS, start=size + 1)
+            cur.execute("UPDATE applicants SET ingest_batch_id = %s WHERE p_id > %s;", (batch_id, size))
+            refresh = _ms(lambda: store.refresh(cur))
+
+        os.environ["ANALYSIS_COLUMNAR"] = "0"
+        sql_questions = best_of(lambda: _answer(conn), repeat)
+        sql_stats = best_of(lambda: applicant_stats.applicant_stats(conn, FILTERS), repeat)
+        os.environ["ANALYSIS_COLUMNAR"] = "1"
+        columnar_questions = best_of(lambda: _answer(conn), repeat)
+        columnar_stats = best_of(lambda: applicant_stats.applicant_stats(conn, FILTERS), repeat)
+        print(
+            f"{size:>9}{load:>10.1f}{refresh:>12.1f}"
+            f"{sql_questions:>10.1f}{columnar_questions:>15.1f}{sql_stats:>14.1f}{columnar_stats:>19.1f}"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,86 @@
+"""Distinct counts on text vs dictionary-encoded ids, and what loads pay for the ids.
+
+Usage: ``python benchmarks/bench_dimensions.py [rows]`` (default 1,000,000).
+
+Three loads of the same synthetic rows: with the ids left NULL (trigger
+disabled), with the ids resolved per row by the trigger (one INSERT ...
+SELECT that sets no ids), and through ``load_data.insert_rows`` in
+``BATCH_ROWS`` batches, which resolves them set-wise like the loaders.
+"""
+
+import sys
+import time
+
+from synthetic import best_of, connect, populate
+
+import load_data
+
+# bulk_insert_json's default batch size.
+BATCH_ROWS = 1000
+LOADED_COLUMNS = (
+    "p_id, program, comments, date_added, url, status, term, us_or_international, "
+    "gpa, gre, gre_v, gre_aw, degree, llm_generated_program, llm_generated_university"
+)
+
+TEXT_DISTINCT = {
+    "Q10": "SELECT COUNT(DISTINCT program_name), COUNT(DISTINCT university_name) FROM applicants;",
+    "Q11": """SELECT COUNT(DISTINCT llm_generated_program),
+              COUNT(DISTINCT llm_generated_university) FROM applicants;""",
+    "group by program": "SELECT program_name, COUNT(*) FROM applicants GROUP BY program_name;",
+}
+ID_DISTINCT = {
+    "Q10": "SELECT COUNT(DISTINCT program_id), COUNT(DISTINCT university_id) FROM applicants;",
+    "Q11": "SELECT COUNT(DISTINCT llm_program_id), COUNT(DISTINCT llm_university_id) FROM applicants;",
+    "group by program": "SELECT program_id, COUNT(*) FROM applicants GROUP BY program_id;",
+}
+
+
+def rebuild(conn, with_trigger):
+    conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+    conn.execute("DROP TABLE IF EXISTS programs, universities;")
+    for query in load_data.SCHEMA_QUERIES:
+        conn.execute(query)
+    if not with_trigger:
+        conn.execute("ALTER TABLE applicants DISABLE TRIGGER applicants_resolve_dimensions;")
+
+
+def timed_load(conn, num_rows):
+    started = time.perf_counter()
+    populate(conn, num_rows)
+    return time.perf_counter() - started
+
+
+def timed_insert_rows(conn, rows):
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        for start in range(0, len(rows), BATCH_ROWS):
+            load_data.insert_rows(cur, rows[start:start + BATCH_ROWS])
+    conn.execute("VACUUM ANALYZE applicants;")
+    return time.perf_counter() - started
+
+
+def main(num_rows=1_000_000):
+    conn = connect()
+    rebuild(conn, with_trigger=False)
+    load_without = timed_load(conn, num_rows)
+    rows = conn.execute(f"SELECT {LOADED_COLUMNS}, NULL::bigint FROM applicants ORDER BY p_id;").fetchall()
+    rebuild(conn, with_trigger=True)
+    load_with = timed_load(conn, num_rows)
+    rebuild(conn, with_trigger=True)
+    load_set_wise = timed_insert_rows(conn, rows)
+
+    print(f"rows={num_rows}")
+    print(
+        f"load (incl. VACUUM ANALYZE): {load_without:.1f}s without ids, {load_with:.1f}s per-row trigger, "
+        f"{load_set_wise:.1f}s insert_rows"
+    )
+    print(f"{'query':<18}{'text ms':>10}{'ids ms':>10}")
+    for name in TEXT_DISTINCT:
+        text_ms = best_of(lambda q=TEXT_DISTINCT[name]: conn.execute(q).fetchall(), repeat=3)
+        id_ms = best_of(lambda q=ID_DISTINCT[name]: conn.execute(q).fetchall(), repeat=3)
+        print(f"{name:<18}{text_ms:>10.1f}{id_ms:>10.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,68 @@
+"""Streaming export vs a client-side ``SELECT *``: throughput and peak memory.
+
+Usage: ``python benchmarks/bench_export.py``.
+
+Peak memory is Python allocations measured with tracemalloc, which is where
+a ``fetchall`` pays for the whole table.
+"""
+
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+import psycopg
+from synthetic import bench_connect_kwargs, connect, populate
+
+import export_data
+import load_data
+
+TABLE_SIZES = (50_000, 200_000)
+
+
+def select_all_csv():
+    """The ad-hoc extract: fetch every row, then encode."""
+    with psycopg.connect(**bench_connect_kwargs()) as conn:
+        rows = conn.execute(export_data.EXPORT_QUERY).fetchall()
+    return sum(len(data) for data in export_data._encode_csv([rows]))
+
+
+def streamed(fmt):
+    return lambda: sum(len(data) for data in export_data.stream_export(fmt))
+
+
+def measure(func):
+    """Return (seconds, peak MiB); tracemalloc slows Python, so time separately."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - started
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def main():
+    export_data.get_db_read_connect_kwargs = bench_connect_kwargs
+    conn = connect()
+    cases = [("SELECT * csv", select_all_csv)] + [
+        ("stream " + fmt, streamed(fmt)) for fmt in export_data.EXPORT_FORMATS
+    ]
+
+    print(f"{'rows':>8}  {'method':<16}{'rows/s':>10}{'peak MiB':>10}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        for name, func in cases:
+            seconds, peak = measure(func)
+            print(f"{size:>8}  {name:<16}{size / seconds:>10.0f}{peak:>10.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
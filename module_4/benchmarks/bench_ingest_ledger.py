@@ -0,0 +1,52 @@
+"""Finding rows a refresh touched: ingest batch delta vs full-table scan.
+
+Usage: ``python benchmarks/bench_ingest_ledger.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows, then one refresh-sized batch of new
+and edited rows is upserted under its own ingest batch. Without the ledger,
+a consumer that wants to know what changed has to read every ``p_id`` and
+content hash and diff them against its own copy; with it, it asks
+``ingest_ledger.changed_since`` for the rows after the batch it last saw.
+"""
+
+import sys
+
+from bench_insert import make_entries
+from synthetic import best_of, connect, populate
+
+import ingest_ledger
+import load_data
+import update_data
+
+TABLE_SIZES = (100_000, 1_000_000)
+BATCH_ROWS = 1000
+FULL_SCAN_QUERY = "SELECT p_id, content_hash FROM applicants;"
+
+
+def main(repeat=5):
+    conn = connect()
+    print(f"{'rows':>9}{'full scan ms':>14}{'delta ms':>10}{'delta rows':>12}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+
+        with conn.cursor() as cur:
+            seen = ingest_ledger.latest_batch_id(cur)
+            # Half the batch is new, half re-scrapes rows with a new status.
+            entries = make_entries(BATCH_ROWS, start=size - BATCH_ROWS // 2 + 1)
+            entries = [{**entry, "status": "Interview"} for entry in entries]
+            batch_id = ingest_ledger.begin_batch(cur, "bench")
+            load_data.upsert_rows(cur, update_data._entries_to_rows(entries), batch_id)
+            conn.execute("ANALYZE applicants;")
+
+            full_ms = best_of(lambda: cur.execute(FULL_SCAN_QUERY).fetchall(), repeat)
+            delta_ms = best_of(lambda: ingest_ledger.changed_since(cur, seen or 0), repeat)
+            delta_rows = len(ingest_ledger.changed_since(cur, seen or 0))
+        print(f"{size:>9}{full_ms:>14.1f}{delta_ms:>10.1f}{delta_rows:>12}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
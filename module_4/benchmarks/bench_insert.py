@@ -0,0 +1,91 @@
+"""Per-row vs set-based inserts in update_data.insert_applicants_from_json_batch.
+
+Usage: ``python benchmarks/bench_insert.py [repeat]`` (default 5).
+"""
+
+import sys
+import time
+
+import psycopg
+from synthetic import bench_connect_kwargs, connect
+
+import load_data
+import update_data
+
+BATCH_SIZES = (100, 1_000, 10_000)
+
+# The pre-unnest statement: one execute + fetchone per entry.
+PER_ROW_QUERY = """
+INSERT INTO applicants (
+    p_id, program, comments, date_added, url, status, term,
+    us_or_international, gpa, gre, gre_v, gre_aw, degree,
+    llm_generated_program, llm_generated_university
+) VALUES (
+    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+)
+ON CONFLICT DO NOTHING
+RETURNING p_id;
+"""
+
+
+def make_entries(count, start=1):
+    return [
+        {
+            "url": f"https://www.thegradcafe.com/result/{p_id}",
+            "program": f"Program {p_id % 400}, University {p_id % 300}",
+            "comments": "",
+            "date_added": "January 24, 2026",
+            "status": "Accepted" if p_id % 4 == 0 else "Rejected",
+            "term": "Fall 2026",
+            "US/International": "American" if p_id % 3 else "International",
+            "GPA": "3.70",
+            "GRE Score": "325",
+            "GRE V Score": "160",
+            "GRE AW": "4.0",
+            "Degree": "PhD",
+            "llm-generated-program": f"Program {p_id % 400}",
+            "llm-generated-university": f"University {p_id % 300}",
+        }
+        for p_id in range(start, start + count)
+    ]
+
+
+def per_row_insert(entries):
+    """The previous implementation's round-trip pattern, for comparison."""
+    rows = [load_data._entry_to_row({**entry, "GRE AW Score": entry["GRE AW"]}) for entry in entries]
+    with psycopg.connect(**bench_connect_kwargs()) as conn:
+        with conn.cursor() as cur:
+            for row in rows:
+                cur.execute(PER_ROW_QUERY, row)
+                cur.fetchone()
+        conn.commit()
+
+
+def timed(conn, func, entries, repeat):
+    timings = []
+    for _ in range(repeat):
+        conn.execute("TRUNCATE applicants;")
+        started = time.perf_counter()
+        func(entries)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main(repeat=5):
+    update_data.get_db_connect_kwargs = bench_connect_kwargs
+    conn = connect()
+    conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+    for query in load_data.SCHEMA_QUERIES:
+        conn.execute(query)
+
+    print(f"{'rows':>7}{'per-row ms':>13}{'unnest ms':>12}{'speedup':>9}")
+    for size in BATCH_SIZES:
+        entries = make_entries(size)
+        per_row_ms = timed(conn, per_row_insert, entries, repeat)
+        batch_ms = timed(conn, update_data.insert_applicants_from_json_batch, entries, repeat)
+        print(f"{size:>7}{per_row_ms:>13.1f}{batch_ms:>12.1f}{per_row_ms / batch_ms:>8.1f}x")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
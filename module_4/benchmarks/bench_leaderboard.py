@@ -0,0 +1,68 @@
+"""Top-N programs by acceptance rate: SQL group-by vs the aggregate cube.
+
+Usage: ``python benchmarks/bench_leaderboard.py [repeat]`` (default 20).
+
+Each size is loaded with synthetic rows. "sql" ranks programs (split out of
+the raw ``program`` text) by acceptance rate, with at least 50 reports, in
+one GROUP BY query. "build" is the first ``leaderboard.get_cube``, after
+the columnar store is loaded. "lookup" is ``leaderboard.leaderboard`` for
+the same ranking, and for university and program pairs. Timings are best
+of ``repeat``.
+"""
+
+import sys
+import time
+
+from synthetic import best_of, bench_connect_kwargs, connect, populate
+
+import columnar
+import leaderboard
+import load_data
+import query_data
+
+TABLE_SIZES = (100_000, 1_000_000)
+SQL = """
+SELECT
+    TRIM(SPLIT_PART(program, ',', 1)) AS program_name,
+    COUNT(*),
+    ROUND(100.0 * COUNT(*) FILTER (WHERE status = 'Accepted') / COUNT(*), 2) AS acceptance_rate
+FROM applicants
+GROUP BY 1
+HAVING COUNT(*) >= 50
+ORDER BY acceptance_rate DESC, 2 DESC
+LIMIT 10;
+"""
+QUERIES = {
+    "program": leaderboard.normalize_query({}),
+    "pairs": leaderboard.normalize_query({"by": ["university", "program"]}),
+}
+
+
+def main(repeat=20):
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    conn = connect()
+
+    print(f"{'rows':>9}{'sql ms':>9}{'build ms':>10}{'program lookup ms':>19}{'pairs lookup ms':>17}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        columnar.reset_store()
+        store = columnar.get_store()
+        with conn.cursor() as cur:
+            store.refresh(cur)
+
+        sql = best_of(lambda: conn.execute(SQL).fetchall(), repeat)
+        started = time.perf_counter()
+        leaderboard.get_cube(store)
+        build = (time.perf_counter() - started) * 1000
+        lookups = [best_of(lambda: leaderboard.leaderboard(conn, query), repeat) for query in QUERIES.values()]
+        print(f"{size:>9}{sql:>9.1f}{build:>10.1f}{lookups[0]:>19.2f}{lookups[1]:>17.2f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
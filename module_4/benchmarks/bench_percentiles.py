@@ -0,0 +1,69 @@
+"""GPA percentile rank in a cohort: SQL aggregate vs the sorted score index.
+
+Usage: ``python benchmarks/bench_percentiles.py [repeat]`` (default 20).
+
+Each size is loaded with synthetic rows. "sql" ranks a GPA among accepted
+Computer Science applicants, and finds their median, with one aggregate
+query. "build" is the first ``percentiles.score_index`` for GPA, after the
+columnar store is loaded. "lookup" is ``percentiles.percentiles`` for the
+same cohort, and for every accepted applicant. Timings are best of
+``repeat``.
+"""
+
+import sys
+import time
+
+from synthetic import best_of, bench_connect_kwargs, connect, populate
+
+import columnar
+import load_data
+import percentiles
+import query_data
+
+TABLE_SIZES = (100_000, 1_000_000)
+GPA = 3.7
+SQL = """
+SELECT
+    COUNT(*) FILTER (WHERE gpa < %(gpa)s),
+    COUNT(*) FILTER (WHERE gpa = %(gpa)s),
+    COUNT(gpa),
+    percentile_disc(0.5) WITHIN GROUP (ORDER BY gpa)
+FROM applicants
+WHERE status = 'Accepted' AND program_name = 'Computer Science';
+"""
+COHORTS = {
+    "program": ({"program": ["Computer Science"], "status": ["Accepted"]}, {"gpa": GPA}),
+    "accepted": ({"status": ["Accepted"]}, {"gpa": GPA}),
+}
+
+
+def main(repeat=20):
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    conn = connect()
+
+    print(f"{'rows':>9}{'sql ms':>9}{'build ms':>10}{'program lookup ms':>19}{'accepted lookup ms':>20}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        columnar.reset_store()
+        store = columnar.get_store()
+        with conn.cursor() as cur:
+            store.refresh(cur)
+
+        sql = best_of(lambda: conn.execute(SQL, {"gpa": GPA}).fetchone(), repeat)
+        started = time.perf_counter()
+        percentiles.score_index(store, "gpa")
+        build = (time.perf_counter() - started) * 1000
+        lookups = [
+            best_of(lambda: percentiles.percentiles(conn, *cohort), repeat) for cohort in COHORTS.values()
+        ]
+        print(f"{size:>9}{sql:>9.1f}{build:>10.1f}{lookups[0]:>19.2f}{lookups[1]:>20.2f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,103 @@
+"""Analysis and refresh writes with and without pipeline mode, over added latency.
+
+Usage: ``python benchmarks/bench_pipeline.py [rows]`` (default 10,000).
+
+Connections go through ``latency_proxy.LatencyProxy``, which delays every
+packet by a fixed one-way time, so the numbers show how each write path
+scales with network round-trip time.
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+from latency_proxy import LatencyProxy
+from synthetic import bench_connect_kwargs, connect, populate
+
+import load_data
+import query_data
+import update_data
+from bench_analysis import PER_QUESTION_QUERIES
+from bench_insert import make_entries
+
+ONE_WAY_DELAYS_MS = (0, 1, 5)
+INSERT_ROWS = 100
+
+
+def per_question(conn):
+    """The original questions() round-trip pattern: SELECT, then INSERT, per question."""
+    with conn.cursor() as cur:
+        # answers_table is now a view; the old writes get a table of their own.
+        cur.execute("DROP TABLE IF EXISTS legacy_answers_table;")
+        cur.execute("CREATE TABLE legacy_answers_table (question TEXT, answer TEXT);")
+        conn.commit()
+        for question, query in zip(
+            query_data.QUESTIONS, PER_QUESTION_QUERIES
+        ):
+            cur.execute(query)
+            cur.execute(
+                "INSERT INTO legacy_answers_table (question, answer) VALUES (%s, %s)",
+                (question["question"], question["format"].format(*cur.fetchone())),
+            )
+        conn.commit()
+
+
+def proxied_kwargs(port):
+    params = conninfo_to_dict(bench_connect_kwargs()["conninfo"])
+    params.update(host="127.0.0.1", port=port)
+    return {"conninfo": make_conninfo(**params), "options": bench_connect_kwargs()["options"]}
+
+
+def best_ms(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main(num_rows=10_000):
+    setup = connect()
+    setup.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+    for query in load_data.SCHEMA_QUERIES:
+        setup.execute(query)
+    populate(setup, num_rows)
+    target = conninfo_to_dict(bench_connect_kwargs()["conninfo"])
+
+    print(f"rows={num_rows}, insert batch={INSERT_ROWS}")
+    print(f"{'':>6}{'questions() ms':^34}{'insert batch ms':^24}")
+    print(f"{'delay':>6}{'per-question':>14}{'plain':>10}{'pipeline':>10}{'plain':>14}{'pipeline':>10}")
+    for delay in ONE_WAY_DELAYS_MS:
+        with LatencyProxy(target.get("host", "127.0.0.1"), target.get("port", 5432), delay) as proxy:
+            kwargs = proxied_kwargs(proxy.port)
+            update_data.get_db_connect_kwargs = lambda: kwargs
+            with psycopg.connect(**kwargs) as conn:
+                legacy_ms = best_ms(lambda: per_question(conn))
+                plain_ms = best_ms(lambda: query_data.questions(conn, pipeline=False))
+                piped_ms = best_ms(lambda: query_data.questions(conn, pipeline=True))
+
+            entries = iter(range(num_rows + 1, 10**9, INSERT_ROWS))
+            insert_plain = best_ms(
+                lambda: update_data.insert_applicants_from_json_batch(
+                    make_entries(INSERT_ROWS, next(entries)), pipeline=False
+                )
+            )
+            insert_piped = best_ms(
+                lambda: update_data.insert_applicants_from_json_batch(
+                    make_entries(INSERT_ROWS, next(entries)), pipeline=True
+                )
+            )
+        print(
+            f"{delay:>6}{legacy_ms:>14.1f}{plain_ms:>10.1f}{piped_ms:>10.1f}"
+            f"{insert_plain:>14.1f}{insert_piped:>10.1f}"
+        )
+    setup.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
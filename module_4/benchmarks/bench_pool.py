@@ -0,0 +1,68 @@
+"""Analysis page reads with and without the shared connection pool.
+
+Usage: ``python benchmarks/bench_pool.py [requests]`` (default 200).
+
+Each request does what ``pages._render_analysis_page`` does against the
+database: borrow a connection via ``query_data.connect`` and read
+``answers_table``. Requests run from several threads at once, like a
+threaded Flask server, through ``latency_proxy.LatencyProxy``.
+"""
+
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg.conninfo import conninfo_to_dict
+from latency_proxy import LatencyProxy
+from synthetic import bench_connect_kwargs, connect
+
+import db_config
+import query_data
+from bench_answers import reset
+from bench_pipeline import proxied_kwargs
+
+ONE_WAY_DELAYS_MS = (0, 1, 5)
+THREADS = 8
+
+
+def render():
+    started = time.perf_counter()
+    with query_data.connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM answers_table")
+            cur.fetchall()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(num_requests, pooled):
+    os.environ["DATABASE_POOL"] = "1" if pooled else "0"
+    db_config.close_pools()
+    render()  # opens the pool outside the timed requests
+    with ThreadPoolExecutor(THREADS) as executor:
+        timings = list(executor.map(lambda _: render(), range(num_requests)))
+    return statistics.mean(timings), statistics.quantiles(timings, n=20)[-1]
+
+
+def main(num_requests=200):
+    os.environ["DATABASE_POOL_MAX_SIZE"] = str(THREADS)
+    setup = connect()
+    reset(setup, versioned=True)
+    target = conninfo_to_dict(bench_connect_kwargs()["conninfo"])
+
+    print(f"requests={num_requests}, threads={THREADS}")
+    print(f"{'delay':>6}{'direct mean':>13}{'p95':>8}{'pooled mean':>13}{'p95':>8}")
+    for delay in ONE_WAY_DELAYS_MS:
+        with LatencyProxy(target.get("host", "127.0.0.1"), target.get("port", 5432), delay) as proxy:
+            kwargs = proxied_kwargs(proxy.port)
+            query_data.get_db_connect_kwargs = lambda: kwargs
+            direct = run(num_requests, pooled=False)
+            pooled = run(num_requests, pooled=True)
+            db_config.close_pools()
+        print(f"{delay:>6}{direct[0]:>13.2f}{direct[1]:>8.2f}{pooled[0]:>13.2f}{pooled[1]:>8.2f}")
+    setup.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,52 @@
+"""Update Analysis with its table scans run one after another vs concurrently.
+
+Usage: ``python benchmarks/bench_registry.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows, then ``POST /update_analysis`` is
+timed through Flask's test client with ``ANALYSIS_INCREMENTAL=0``, so the
+questions are answered by the two planned scans of applicants, best of
+``repeat``. "sequential" runs them on one connection; "parallel" sets
+``ANALYSIS_PARALLEL=1`` (see ``query_data.run_scans``). "slowest scan" is
+the longest per-question time reported by ``query_data.last_timings``.
+"""
+
+import os
+import sys
+
+from bench_analysis import update_analysis_ms
+from synthetic import bench_connect_kwargs, connect, populate
+
+import load_data
+import query_data
+from app import create_app
+
+TABLE_SIZES = (100_000, 1_000_000)
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    os.environ["ANALYSIS_INCREMENTAL"] = "0"
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    client = create_app().test_client()
+    conn = connect()
+
+    print(f"{'rows':>9}{'sequential ms':>15}{'parallel ms':>13}{'slowest scan ms':>17}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+
+        os.environ["ANALYSIS_PARALLEL"] = "0"
+        sequential = update_analysis_ms(client, query_data.questions, repeat)
+        os.environ["ANALYSIS_PARALLEL"] = "1"
+        parallel = update_analysis_ms(client, query_data.questions, repeat)
+        slowest = max(query_data.last_timings().values())
+        print(f"{size:>9}{sequential:>15.1f}{parallel:>13.1f}{slowest:>17.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
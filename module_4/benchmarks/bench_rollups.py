@@ -0,0 +1,72 @@
+"""Trend queries from the daily rollups vs date_trunc over applicants, and what writes pay.
+
+Usage: ``python benchmarks/bench_rollups.py [repeat]`` (default 5).
+
+Each size is loaded with synthetic rows. "scan" and "rollups" are
+``rollups.trends`` for weekly and monthly series per program over the whole
+history, aggregated from ``applicants`` and read from
+``applicant_daily_rollups``, with ``ANALYSIS_CACHE=0``. "insert" is a
+refresh-sized batch of ``BATCH_ROWS`` new rows with and without the rollup
+triggers (see ``bench_aggregates.insert_ms``). Timings are best of
+``repeat``.
+"""
+
+import os
+import sys
+
+from bench_aggregates import TRIGGER_EVENTS, insert_ms
+from synthetic import bench_connect_kwargs, best_of, connect, populate
+
+import load_data
+import query_data
+import rollups
+import update_data
+
+TABLE_SIZES = (100_000, 1_000_000)
+QUERIES = [
+    rollups.normalize_query({"granularity": [granularity], "by": ["program"]}) for granularity in ("week", "month")
+]
+
+
+def main(repeat=5):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    os.environ["ANALYSIS_CACHE"] = "0"
+    kwargs = bench_connect_kwargs()
+    for module in (query_data, rollups, update_data):
+        module.get_db_connect_kwargs = lambda: kwargs
+    conn = connect()
+    has_rollups = rollups.has_rollups
+
+    print(
+        f"{'rows':>9}{'scan week ms':>14}{'rollups week ms':>17}{'scan month ms':>15}{'rollups month ms':>18}"
+        f"{'insert ms':>11}{'+triggers ms':>14}"
+    )
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        with conn.cursor() as cur:
+            for query in rollups.REBUILD_QUERIES:
+                cur.execute(query)
+
+        timings = []
+        for query in QUERIES:
+            rollups.has_rollups = lambda _cur: False
+            timings.append(best_of(lambda: rollups.trends(conn, query), repeat))
+            rollups.has_rollups = has_rollups
+            timings.append(best_of(lambda: rollups.trends(conn, query), repeat))
+
+        with_triggers = insert_ms(conn, size, repeat)
+        for event in TRIGGER_EVENTS:
+            conn.execute(f"DROP TRIGGER applicants_rollups_{event} ON applicants;")
+        without_triggers = insert_ms(conn, size, repeat)
+        print(
+            f"{size:>9}{timings[0]:>14.1f}{timings[1]:>17.1f}{timings[2]:>15.1f}{timings[3]:>18.1f}"
+            f"{without_triggers:>11.1f}{with_triggers:>14.1f}"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
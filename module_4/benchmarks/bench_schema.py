@@ -0,0 +1,89 @@
+"""Per-question timings before/after the generated-column + index schema.
+
+Usage: ``python benchmarks/bench_schema.py [rows]`` (default 1,000,000).
+Runs against ``DATABASE_URL`` inside the isolated ``bench`` schema.
+"""
+
+import sys
+
+from synthetic import best_of, connect, populate
+
+import load_data
+
+# Original analysis SQL (SPLIT_PART on every row, EXTRACT on date_added).
+BEFORE = {
+    "Q1": "SELECT COUNT(p_id) FROM applicants WHERE term = 'Fall 2026';",
+    "Q2": """SELECT ROUND(100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other'))
+             / COUNT(*), 2) FROM applicants;""",
+    "Q3": """SELECT ROUND(AVG(gpa)::numeric, 2), ROUND(AVG(gre)::numeric, 2),
+             ROUND(AVG(gre_v)::numeric, 2), ROUND(AVG(gre_aw)::numeric, 2) FROM applicants;""",
+    "Q4": """SELECT ROUND(AVG(gpa)::numeric, 2) FROM applicants
+             WHERE us_or_international = 'American' AND term = 'Fall 2026';""",
+    "Q5": """SELECT ROUND(100.0 * COUNT(*) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted')
+             / COUNT(*), 2) FROM applicants;""",
+    "Q6": """SELECT ROUND(AVG(gpa)::numeric, 2) FROM applicants
+             WHERE status = 'Accepted' AND term = 'Fall 2026';""",
+    "Q7": """SELECT COUNT(p_id) FROM applicants WHERE degree = 'Masters'
+             AND program = 'Computer Science, Johns Hopkins University';""",
+    "Q8": """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+             AND EXTRACT(YEAR FROM date_added) = 2026 AND degree = 'PhD'
+             AND TRIM(SPLIT_PART(program, ',', 2)) IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+             AND TRIM(SPLIT_PART(program, ',', 1)) = 'Computer Science';""",
+    "Q9": """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+             AND EXTRACT(YEAR FROM date_added) = 2026 AND degree = 'PhD'
+             AND llm_generated_program = 'Computer Science'
+             AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University');""",
+    "Q10": """SELECT COUNT(DISTINCT TRIM(SPLIT_PART(program, ',', 1))),
+              COUNT(DISTINCT TRIM(SPLIT_PART(program, ',', 2))) FROM applicants;""",
+    "Q11": """SELECT COUNT(DISTINCT llm_generated_program),
+              COUNT(DISTINCT llm_generated_university) FROM applicants;""",
+}
+
+# Same questions as query_data.questions now issues them.
+AFTER = dict(BEFORE)
+AFTER["Q1"] = "SELECT COUNT(*) FROM applicants WHERE term = 'Fall 2026';"
+AFTER["Q7"] = """SELECT COUNT(*) FROM applicants WHERE degree = 'Masters'
+    AND program = 'Computer Science, Johns Hopkins University';"""
+AFTER["Q8"] = """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+    AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01' AND degree = 'PhD'
+    AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+    AND program_name = 'Computer Science';"""
+AFTER["Q9"] = """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+    AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01' AND degree = 'PhD'
+    AND llm_generated_program = 'Computer Science'
+    AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University');"""
+AFTER["Q10"] = """SELECT COUNT(DISTINCT program_name), COUNT(DISTINCT university_name)
+    FROM applicants;"""
+
+
+def time_queries(conn, queries):
+    return {
+        name: best_of(lambda q=query: conn.execute(q).fetchall(), repeat=3)
+        for name, query in queries.items()
+    }
+
+
+def main(num_rows=1_000_000):
+    conn = connect()
+    conn.execute("DROP TABLE IF EXISTS applicants;")
+    # Legacy layout: original columns, primary key only.
+    conn.execute(load_data.CREATE_TABLE_QUERY)
+    conn.execute("ALTER TABLE applicants DROP COLUMN program_name, DROP COLUMN university_name;")
+    populate(conn, num_rows)
+    before = time_queries(conn, BEFORE)
+
+    for query in load_data.UPGRADE_COLUMN_QUERIES + load_data.INDEX_QUERIES:
+        conn.execute(query)
+    conn.execute("VACUUM ANALYZE applicants;")
+    after = time_queries(conn, AFTER)
+
+    print(f"rows={num_rows}")
+    print(f"{'question':<9}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in BEFORE:
+        print(f"{name:<9}{before[name]:>12.1f}{after[name]:>12.1f}{before[name] / after[name]:>9.1f}x")
+    print(f"{'total':<9}{sum(before.values()):>12.1f}{sum(after.values()):>12.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,94 @@
+"""Rebuilding applicants from a Parquet snapshot vs reloading the JSON file.
+
+Usage: ``python benchmarks/bench_snapshot.py``.
+
+The JSON baseline writes the synthetic rows in the scraper's JSON Lines
+format and loads them with ``load_data.upsert_json`` into an empty table,
+the quickest of the JSON loaders; it only runs at the smaller size.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from synthetic import bench_connect_kwargs, connect, populate
+
+import export_data
+import load_data
+import snapshot
+
+TABLE_SIZES = (100_000, 1_000_000)
+JSON_BASELINE_MAX_ROWS = 100_000
+
+
+def write_baseline_json(path):
+    """Write the current rows as scraper-format JSON Lines."""
+    with open(path, "w") as f:
+        for rows in export_data.iter_row_chunks():
+            for row in rows:
+                entry = dict(zip((name for name, _type in export_data.EXPORT_COLUMNS), row))
+                f.write(json.dumps({
+                    "program": entry["program"],
+                    "comments": entry["comments"],
+                    "date_added": entry["date_added"].strftime("%B %d, %Y") if entry["date_added"] else "",
+                    "url": entry["url"],
+                    "status": entry["status"],
+                    "term": entry["term"],
+                    "US/International": entry["us_or_international"],
+                    "GPA": entry["gpa"],
+                    "GRE Score": entry["gre"],
+                    "GRE V Score": entry["gre_v"],
+                    "GRE AW Score": entry["gre_aw"],
+                    "Degree": entry["degree"],
+                    "llm-generated-program": entry["llm_generated_program"],
+                    "llm-generated-university": entry["llm_generated_university"],
+                }) + "\n")
+
+
+def timed(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    for module in (export_data, load_data, snapshot):
+        if hasattr(module, "get_db_connect_kwargs"):
+            module.get_db_connect_kwargs = bench_connect_kwargs
+    export_data.get_db_read_connect_kwargs = bench_connect_kwargs
+    conn = connect()
+
+    print(f"{'rows':>9}{'json load s':>13}{'save s':>9}{'MiB':>7}{'restore s':>11}{'numpy s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_path = os.path.join(tmp, "applicants.parquet")
+        json_path = os.path.join(tmp, "applicants.json")
+        for size in TABLE_SIZES:
+            conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+            for query in load_data.SCHEMA_QUERIES:
+                conn.execute(query)
+            populate(conn, size)
+            expected = conn.execute("SELECT md5(string_agg((to_jsonb(a) - 'ingest_batch_id')::text, ',' ORDER BY p_id)) FROM applicants a;").fetchone()
+
+            json_seconds = float("nan")
+            if size <= JSON_BASELINE_MAX_ROWS:
+                write_baseline_json(json_path)
+                conn.execute("TRUNCATE applicants;")
+                json_seconds = timed(load_data.upsert_json, json_path, 5000)
+
+            save_seconds = timed(snapshot.save_snapshot, parquet_path)
+            mib = os.path.getsize(parquet_path) / 2**20
+            restore_seconds = timed(snapshot.restore_snapshot, parquet_path)
+            numpy_seconds = timed(snapshot.load_arrays, parquet_path)
+
+            restored = conn.execute("SELECT md5(string_agg((to_jsonb(a) - 'ingest_batch_id')::text, ',' ORDER BY p_id)) FROM applicants a;").fetchone()
+            assert restored == expected, "restore changed the table"
+            print(f"{size:>9}{json_seconds:>13.2f}{save_seconds:>9.2f}{mib:>7.1f}{restore_seconds:>11.2f}{numpy_seconds:>9.2f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""GET /api/stats for a selective and a broad filter, uncached and cached.
+
+Usage: ``python benchmarks/bench_stats.py [repeat]`` (default 20).
+
+Each size is loaded with synthetic rows, then each request is timed through
+Flask's test client, best of ``repeat``. "uncached" sets
+``ANALYSIS_CACHE=0``, so every call runs the prepared statement; "cached"
+repeats the call on unchanged data, so only the data-version token is read
+(see ``applicant_stats``). The selective filter (one university, program
+and degree) is answered from ``applicants_stats_idx``; the broad one (one
+term) aggregates about a quarter of the table.
+"""
+
+import os
+import sys
+
+from synthetic import best_of, bench_connect_kwargs, connect, populate
+
+import load_data
+import query_data
+import result_cache
+from app import create_app
+
+TABLE_SIZES = (100_000, 1_000_000)
+REQUESTS = {
+    "selective": "/api/stats?university=MIT&program=Computer+Science&degree=PhD",
+    "broad": "/api/stats?term=Fall+2026",
+}
+
+
+def main(repeat=20):
+    os.environ["SPOOL_REPLAY_INTERVAL"] = "0"
+    kwargs = bench_connect_kwargs()
+    query_data.get_db_connect_kwargs = lambda: kwargs
+    query_data.get_db_read_connect_kwargs = lambda: kwargs
+    client = create_app().test_client()
+    conn = connect()
+
+    print(f"{'rows':>9}{'request':>11}{'uncached ms':>13}{'cached ms':>11}")
+    for size in TABLE_SIZES:
+        conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+        for query in load_data.SCHEMA_QUERIES:
+            conn.execute(query)
+        populate(conn, size)
+        result_cache.get_cache().clear()
+
+        for name, url in REQUESTS.items():
+            os.environ["ANALYSIS_CACHE"] = "0"
+            uncached = best_of(lambda: client.get(url), repeat)
+            os.environ["ANALYSIS_CACHE"] = "1"
+            cached = best_of(lambda: client.get(url), repeat)
+            print(f"{size:>9}{name:>11}{uncached:>13.1f}{cached:>11.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,67 @@
+"""Refreshing stored rows: full reload vs change-detecting upsert.
+
+Usage: ``python benchmarks/bench_upsert.py [repeat]`` (default 5).
+"""
+
+import sys
+import time
+
+from bench_insert import make_entries
+from synthetic import bench_connect_kwargs, connect
+
+import load_data
+import update_data
+
+NUM_ROWS = 10_000
+# Share of re-scraped rows whose content changed on the site.
+CHANGED_SHARES = (0.0, 0.01, 0.1)
+
+
+def edited(entries, share):
+    """Return ``entries`` with the first ``share`` of them changed."""
+    count = int(len(entries) * share)
+    return [{**entry, "status": "Interview"} for entry in entries[:count]] + entries[count:]
+
+
+def reload(conn, entries):
+    """Truncate and insert everything again, the only way to pick up edits before."""
+    conn.execute("TRUNCATE applicants;")
+    update_data.insert_applicants_from_json_batch(entries)
+
+
+def upsert(_conn, entries):
+    return update_data.upsert_applicants_from_json_batch(entries)
+
+
+def timed(conn, func, base, entries, repeat):
+    """Best time of ``func`` over a table freshly loaded with ``base``."""
+    timings = []
+    for _ in range(repeat):
+        conn.execute("TRUNCATE applicants;")
+        update_data.insert_applicants_from_json_batch(base)
+        conn.execute("VACUUM ANALYZE applicants;")
+        started = time.perf_counter()
+        result = func(conn, entries)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def main(repeat=5):
+    update_data.get_db_connect_kwargs = bench_connect_kwargs
+    conn = connect()
+    conn.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+    for query in load_data.SCHEMA_QUERIES:
+        conn.execute(query)
+
+    base = make_entries(NUM_ROWS)
+    print(f"{'changed':>8}{'reload ms':>11}{'upsert ms':>11}{'rows written':>14}")
+    for share in CHANGED_SHARES:
+        entries = edited(base, share)
+        reload_ms, _ = timed(conn, reload, base, entries, repeat)
+        upsert_ms, counts = timed(conn, upsert, base, entries, repeat)
+        print(f"{share:>8.0%}{reload_ms:>11.1f}{upsert_ms:>11.1f}{counts['updated']:>14}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,84 @@
+"""TCP proxy that adds a fixed one-way delay, to imitate a remote database.
+
+Usage as a library::
+
+    with LatencyProxy("127.0.0.1", 5432, delay_ms=5) as proxy:
+        psycopg.connect(host="127.0.0.1", port=proxy.port, ...)
+
+Each chunk is forwarded ``delay_ms`` after it arrives, in both directions,
+so a round trip costs ``2 * delay_ms`` while pipelined traffic still flows
+back to back (latency is added, bandwidth is not limited).
+"""
+
+import queue
+import socket
+import threading
+import time
+
+
+class LatencyProxy:
+    """Forward a local port to ``target_host:target_port`` with added delay."""
+
+    def __init__(self, target_host, target_port, delay_ms):
+        self.target = (target_host, int(target_port))
+        self.delay = delay_ms / 1000.0
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen()
+        self.port = self._listener.getsockname()[1]
+        self._closed = False
+
+    def __enter__(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._closed = True
+        self._listener.close()
+        return False
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                client, _addr = self._listener.accept()
+            except OSError:
+                return
+            server = socket.create_connection(self.target)
+            for sock in (client, server):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._pipe(client, server)
+            self._pipe(server, client)
+
+    def _pipe(self, src, dst):
+        pending = queue.Queue()
+
+        def receive():
+            while True:
+                try:
+                    data = src.recv(65536)
+                except OSError:
+                    data = b""
+                pending.put((time.perf_counter() + self.delay, data))
+                if not data:
+                    return
+
+        def send():
+            while True:
+                due, data = pending.get()
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                if not data:
+                    try:
+                        dst.shutdown(socket.SHUT_WR)
+                    except OSError:
+                        pass
+                    return
+                try:
+                    dst.sendall(data)
+                except OSError:
+                    return
+
+        threading.Thread(target=receive, daemon=True).start()
+        threading.Thread(target=send, daemon=True).start()
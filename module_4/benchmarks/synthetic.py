@@ -0,0 +1,86 @@
+"""Shared helpers for benchmark scripts: isolated schema + synthetic rows."""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import psycopg
+from db_config import get_db_connect_kwargs
+
+# Benchmarks never touch the application's tables: everything lives here.
+BENCH_SCHEMA = os.getenv("BENCH_SCHEMA", "bench")
+
+# Deterministic GradCafe-shaped rows. About 20% of programs are Computer
+# Science and the universities used by questions 7-9 appear regularly, so
+# every analysis question has a non-trivial answer.
+POPULATE_QUERY = """
+INSERT INTO applicants (
+    p_id, program, comments, date_added, url, status, term,
+    us_or_international, gpa, gre, gre_v, gre_aw, degree,
+    llm_generated_program, llm_generated_university
+)
+SELECT
+    g,
+    prog || ', ' || uni,
+    NULL,
+    DATE '2023-01-01' + (g * 7919 %% 1460)::int,
+    'https://www.thegradcafe.com/result/' || g,
+    (ARRAY['Accepted', 'Rejected', 'Waitlisted', 'Interview'])[1 + g * 31 %% 4],
+    (ARRAY['Fall 2024', 'Fall 2025', 'Fall 2026', 'Spring 2026'])[1 + g * 17 %% 4],
+    (ARRAY['American', 'International', 'Other'])[1 + g * 13 %% 3],
+    CASE WHEN g %% 5 = 0 THEN NULL ELSE 2.5 + (g * 37 %% 151) / 100.0 END,
+    CASE WHEN g %% 3 = 0 THEN NULL ELSE 290 + g * 11 %% 51 END,
+    CASE WHEN g %% 3 = 0 THEN NULL ELSE 140 + g * 19 %% 31 END,
+    CASE WHEN g %% 4 = 0 THEN NULL ELSE 3.0 + (g * 3 %% 7) / 2.0 END,
+    (ARRAY['Masters', 'PhD', 'PhD', 'Masters', 'Other'])[1 + g * 23 %% 5],
+    prog,
+    uni
+FROM (
+    SELECT
+        g,
+        CASE WHEN g %% 5 = 0 THEN 'Computer Science'
+             ELSE 'Program ' || (g * 101 %% 400) END AS prog,
+        (ARRAY['Johns Hopkins University', 'MIT', 'Stanford University',
+               'Carnegie Mellon University', 'Georgetown University',
+               'University ' || (g * 211 %% 300)])[1 + g * 29 %% 6] AS uni
+    FROM generate_series(%(start)s::bigint, %(stop)s::bigint) AS g
+) AS src;
+"""
+
+
+def bench_connect_kwargs():
+    """``DATABASE_URL`` kwargs with the benchmark schema as search_path.
+
+    Patch this over a module's ``get_db_connect_kwargs`` to run application
+    code unchanged against the benchmark tables.
+    """
+    return {**get_db_connect_kwargs(), "options": f"-c search_path={BENCH_SCHEMA}"}
+
+
+def connect():
+    """Autocommit connection whose search_path is the benchmark schema."""
+    conn = psycopg.connect(**get_db_connect_kwargs(), autocommit=True)
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA};")
+    conn.execute(f"SET search_path TO {BENCH_SCHEMA};")
+    return conn
+
+
+def populate(conn, num_rows, start=1):
+    """Insert ``num_rows`` synthetic applicants with p_ids from ``start``."""
+    conn.execute(POPULATE_QUERY, {"start": start, "stop": start + num_rows - 1})
+    conn.execute("VACUUM ANALYZE applicants;")
+
+
+def best_of(func, repeat=5):
+    """Return the fastest wall time of ``repeat`` calls, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
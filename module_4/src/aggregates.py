@@ -0,0 +1,341 @@
+"""Running analysis aggregates, kept current by triggers on ``applicants``."""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from psycopg import OperationalError
+from psycopg.sql import SQL, Identifier
+from db_config import connection, get_db_connect_kwargs
+
+# Counters behind the analysis questions: (column, type, per-row value,
+# predicate). Each column holds the sum of the value over the rows matching
+# the predicate, so a question's answer is arithmetic on a few columns of
+# one row. GPA and GRE sums are NUMERIC: float sums drift when rows are
+# added and subtracted in a different order than a full scan would.
+COUNTERS = [
+    ("entries", "BIGINT", "1", None),
+    ("fall_2026", "BIGINT", "1", "term = 'Fall 2026'"),
+    ("international", "BIGINT", "1", "us_or_international NOT IN ('American', 'Other')"),
+    ("gpa_sum", "NUMERIC", "gpa::numeric", None),
+    ("gpa_count", "BIGINT", "1", "gpa IS NOT NULL"),
+    ("gre_sum", "NUMERIC", "gre::numeric", None),
+    ("gre_count", "BIGINT", "1", "gre IS NOT NULL"),
+    ("gre_v_sum", "NUMERIC", "gre_v::numeric", None),
+    ("gre_v_count", "BIGINT", "1", "gre_v IS NOT NULL"),
+    ("gre_aw_sum", "NUMERIC", "gre_aw::numeric", None),
+    ("gre_aw_count", "BIGINT", "1", "gre_aw IS NOT NULL"),
+    (
+        "american_fall_2026_gpa_sum", "NUMERIC", "gpa::numeric",
+        "us_or_international = 'American' AND term = 'Fall 2026'",
+    ),
+    (
+        "american_fall_2026_gpa_count", "BIGINT", "1",
+        "us_or_international = 'American' AND term = 'Fall 2026' AND gpa IS NOT NULL",
+    ),
+    ("fall_2026_accepted", "BIGINT", "1", "term = 'Fall 2026' AND status = 'Accepted'"),
+    ("accepted_fall_2026_gpa_sum", "NUMERIC", "gpa::numeric", "status = 'Accepted' AND term = 'Fall 2026'"),
+    (
+        "accepted_fall_2026_gpa_count", "BIGINT", "1",
+        "status = 'Accepted' AND term = 'Fall 2026' AND gpa IS NOT NULL",
+    ),
+    (
+        "jhu_cs_masters", "BIGINT", "1",
+        "degree = 'Masters' AND program = 'Computer Science, Johns Hopkins University'",
+    ),
+    (
+        "phd_cs_accepted_2026", "BIGINT", "1",
+        """status = 'Accepted'
+        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+        AND degree = 'PhD'
+        AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+        AND program_name = 'Computer Science'""",
+    ),
+    (
+        "phd_cs_accepted_2026_llm", "BIGINT", "1",
+        """status = 'Accepted'
+        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+        AND degree = 'PhD'
+        AND llm_generated_program = 'Computer Science'
+        AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')""",
+    ),
+]
+
+# Columns whose distinct values questions 10 and 11 count. Instead of a
+# probabilistic sketch, analysis_distinct_values keeps the exact number of
+# rows per value: a value is present while its count is above zero, which
+# stays right when rows are deleted or rewritten.
+DISTINCT_COLUMNS = ("program_id", "university_id", "llm_program_id", "llm_university_id")
+
+COUNTER_COLUMNS = [name for name, _type, _value, _predicate in COUNTERS]
+
+
+def _delta_expressions():
+    """SELECT list summing every counter over ``changed`` rows times their sign."""
+    expressions = []
+    for name, _type, value, predicate in COUNTERS:
+        signed = "changed.sign" if value == "1" else "changed.sign * {}".format(value)
+        condition = " FILTER (WHERE {})".format(predicate) if predicate else ""
+        expressions.append("COALESCE(SUM({}){}, 0) AS {}".format(signed, condition, name))
+    return ",\n        ".join(expressions)
+
+
+# Applies a set of changed rows to the running totals. {changed} is a query
+# returning applicants rows with a leading ``sign`` column: 1 for rows that
+# arrived, -1 for rows that left. The WHERE skips statements that changed
+# nothing, so they do not lock the totals row.
+APPLY_COUNTERS_QUERY = """
+UPDATE analysis_aggregates AS totals
+SET {assignments}
+FROM (
+    SELECT
+        COUNT(*) AS changed_rows,
+        {expressions}
+    FROM ({{changed}}) AS changed
+) AS delta
+WHERE delta.changed_rows > 0;
+""".format(
+    assignments=",\n    ".join("{0} = totals.{0} + delta.{0}".format(name) for name in COUNTER_COLUMNS),
+    expressions=_delta_expressions(),
+)
+
+APPLY_DISTINCT_QUERY = """
+INSERT INTO analysis_distinct_values (dimension, value, occurrences)
+SELECT dims.dimension, dims.value, SUM(changed.sign)
+FROM ({{changed}}) AS changed
+CROSS JOIN LATERAL (VALUES {dimensions}) AS dims (dimension, value)
+WHERE dims.value IS NOT NULL
+GROUP BY dims.dimension, dims.value
+HAVING SUM(changed.sign) <> 0
+ON CONFLICT (dimension, value) DO UPDATE
+SET occurrences = analysis_distinct_values.occurrences + EXCLUDED.occurrences;
+""".format(
+    dimensions=", ".join("('{0}', changed.{0})".format(column) for column in DISTINCT_COLUMNS),
+)
+
+APPLY_QUERIES = [APPLY_COUNTERS_QUERY, APPLY_DISTINCT_QUERY]
+
+# Every writer (both loaders, refreshes, snapshot restores, ad-hoc SQL)
+# updates the totals in its own transaction through these statement-level
+# triggers, one per event because transition tables allow only one. A
+# single row holds the totals, so concurrent writers queue on it until
+# the first one commits.
+_TRIGGER_EVENTS = [
+    ("insert", "INSERT", "NEW TABLE AS new_rows", "SELECT 1 AS sign, * FROM new_rows"),
+    ("delete", "DELETE", "OLD TABLE AS old_rows", "SELECT -1 AS sign, * FROM old_rows"),
+    (
+        "update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1 AS sign, * FROM old_rows",
+    ),
+]
+
+
+def _trigger_queries():
+    queries = []
+    for event, keyword, referencing, changed in _TRIGGER_EVENTS:
+        body = "".join(query.format(changed=changed) for query in APPLY_QUERIES)
+        queries.append(
+            """
+    CREATE OR REPLACE FUNCTION applicants_aggregates_{event}()
+    RETURNS trigger AS $$
+    BEGIN
+    {body}
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """.format(event=event, body=body)
+        )
+        queries.append(
+            """
+    CREATE OR REPLACE TRIGGER applicants_aggregates_{event}
+    AFTER {keyword} ON applicants
+    REFERENCING {referencing}
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_aggregates_{event}();
+    """.format(event=event, keyword=keyword, referencing=referencing)
+        )
+    return queries
+
+
+AGGREGATE_TABLE_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS analysis_aggregates (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        {}
+    );
+    """.format(
+        ",\n        ".join(
+            "{} {} NOT NULL DEFAULT 0".format(name, column_type)
+            for name, column_type, _value, _predicate in COUNTERS
+        )
+    ),
+    """
+    CREATE TABLE IF NOT EXISTS analysis_distinct_values (
+        dimension TEXT NOT NULL,
+        value INTEGER NOT NULL,
+        occurrences BIGINT NOT NULL,
+        PRIMARY KEY (dimension, value)
+    );
+    """,
+]
+
+# Recomputes the totals from a full scan of applicants.
+REBUILD_QUERIES = [
+    "DELETE FROM analysis_aggregates;",
+    "INSERT INTO analysis_aggregates DEFAULT VALUES;",
+    "DELETE FROM analysis_distinct_values;",
+] + [query.format(changed="SELECT 1 AS sign, * FROM applicants") for query in APPLY_QUERIES]
+
+AGGREGATE_TRIGGER_QUERIES = _trigger_queries() + [
+    """
+    CREATE OR REPLACE FUNCTION applicants_aggregates_truncate()
+    RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM analysis_aggregates;
+        INSERT INTO analysis_aggregates DEFAULT VALUES;
+        DELETE FROM analysis_distinct_values;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_aggregates_truncate
+    AFTER TRUNCATE ON applicants
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_aggregates_truncate();
+    """,
+]
+
+# Tables, triggers and totals for the current rows, for load_data's schema.
+AGGREGATE_QUERIES = AGGREGATE_TABLE_QUERIES + AGGREGATE_TRIGGER_QUERIES + REBUILD_QUERIES
+
+# Writers wait while the totals are rebuilt; readers do not.
+LOCK_QUERY = "LOCK TABLE applicants IN SHARE MODE;"
+
+VERIFY_COUNTERS_QUERY = "SELECT {} FROM (SELECT 1 AS sign, * FROM applicants) AS changed;".format(
+    _delta_expressions()
+)
+STORED_COUNTERS_QUERY = "SELECT {} FROM analysis_aggregates;".format(", ".join(COUNTER_COLUMNS))
+
+# Dimensions whose stored counts differ from a full scan.
+VERIFY_DISTINCT_QUERY = """
+WITH expected AS (
+    SELECT dims.dimension, dims.value, COUNT(*) AS occurrences
+    FROM applicants AS changed
+    CROSS JOIN LATERAL (VALUES {dimensions}) AS dims (dimension, value)
+    WHERE dims.value IS NOT NULL
+    GROUP BY dims.dimension, dims.value
+), stored AS (
+    SELECT dimension, value, occurrences FROM analysis_distinct_values WHERE occurrences <> 0
+), differences AS (
+    (SELECT * FROM expected EXCEPT SELECT * FROM stored)
+    UNION ALL
+    (SELECT * FROM stored EXCEPT SELECT * FROM expected)
+)
+SELECT DISTINCT dimension FROM differences ORDER BY dimension;
+""".format(
+    dimensions=", ".join("('{0}', changed.{0})".format(column) for column in DISTINCT_COLUMNS),
+)
+
+
+def has_aggregates(cur):
+    """Return True when the triggers keep ``analysis_aggregates`` current."""
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+        "WHERE tgrelid = to_regclass('applicants') AND tgname = 'applicants_aggregates_insert');"
+    )
+    return cur.fetchone()[0]
+
+
+def subtract_table(cur, table):
+    """
+    Take the rows of ``table`` out of the totals on the open cursor.
+
+    For rows that leave ``applicants`` without firing its triggers, such as
+    a detached partition. Does nothing when the totals are not kept; the
+    caller commits.
+    """
+    if not has_aggregates(cur):
+        return
+    changed = SQL("SELECT -1 AS sign, * FROM {}").format(Identifier(table))
+    for query in APPLY_QUERIES:
+        cur.execute(SQL(query).format(changed=changed))
+
+
+def rebuild():
+    """
+    Recompute the totals from a full scan of ``applicants``.
+
+    Creates the tables and triggers if they are missing. Every write to
+    ``applicants`` waits until the rebuild commits, so this is an offline
+    step: stop the refresh and spool replay first (the CLI asks for
+    ``--offline`` to confirm). Returns the number of rows counted, or None
+    on a database error.
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                for query in AGGREGATE_TABLE_QUERIES + [LOCK_QUERY] + AGGREGATE_TRIGGER_QUERIES + REBUILD_QUERIES:
+                    cur.execute(query)
+                cur.execute("SELECT entries FROM analysis_aggregates;")
+                entries = cur.fetchone()[0]
+            conn.commit()
+        print("Rebuilt analysis aggregates over {} rows.".format(entries))
+        return entries
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def verify():
+    """
+    Compare the stored totals with a full scan of ``applicants``.
+
+    Both are read from one snapshot, so concurrent writers cannot cause
+    false alarms. Returns the names of the counters and distinct-value
+    dimensions that differ (empty when everything matches), or None on a
+    database error.
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            with conn.cursor() as cur:
+                cur.execute(STORED_COUNTERS_QUERY)
+                stored = cur.fetchone()
+                cur.execute(VERIFY_COUNTERS_QUERY)
+                expected = cur.fetchone()
+                mismatched = [
+                    name for name, have, want in zip(COUNTER_COLUMNS, stored or [None] * len(COUNTERS), expected)
+                    if have != want
+                ]
+                cur.execute(VERIFY_DISTINCT_QUERY)
+                mismatched += [row[0] for row in cur.fetchall()]
+
+        if mismatched:
+            print("Analysis aggregates differ from a full scan: {}.".format(", ".join(mismatched)))
+        else:
+            print("Analysis aggregates match a full scan.")
+        return mismatched
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def main(argv):
+    """CLI: ``aggregates.py verify|rebuild --offline`` (default ``verify``)."""
+    command = argv[0] if argv else "verify"
+    if command == "verify":
+        verify()
+    elif command == "rebuild" and "--offline" in argv[1:]:
+        rebuild()
+    elif command == "rebuild":
+        print(
+            "rebuild blocks writes to applicants for a full scan; stop the refresh "
+            "and spool replay, then run `aggregates.py rebuild --offline`."
+        )
+    else:
+        print("Usage: aggregates.py verify|rebuild --offline")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
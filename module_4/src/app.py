@@ -1,5 +1,6 @@
 """Flask application factory and executable entrypoint."""
 
+import os
 from flask import Flask
 
 def create_app():
@@ -17,6 +18,13 @@ def create_app():
     from pages import bp
     app.register_blueprint(bp)
 
+    # Drain refresh batches spooled during a database outage in the
+    # background; SPOOL_REPLAY_INTERVAL=0 turns this off.
+    interval = float(os.getenv("SPOOL_REPLAY_INTERVAL", "30"))
+    if interval > 0:
+        from update_data import start_spool_replayer
+        start_spool_replayer(interval)
+
     return app
 
 
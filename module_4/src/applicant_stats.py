@@ -0,0 +1,187 @@
+"""Applicant statistics for any term, degree, status and institution set.
+
+Backs ``/api/stats``. Filters come from the query string; each one is an
+``= ANY`` (``IN`` on SQLite) predicate on an indexed column, and each
+combination of filters is one statement text that psycopg prepares on the
+server, so repeated calls skip parsing and planning. Results are cached per
+filter set and data version (see ``result_cache``).
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from db_config import is_sqlite
+import columnar
+import result_cache
+
+# List filters: (query parameter, column, column with fields=llm).
+FILTERS = [
+    ("term", "term", "term"),
+    ("degree", "degree", "degree"),
+    ("status", "status", "status"),
+    ("university", "university_name", "llm_generated_university"),
+    ("program", "program_name", "llm_generated_program"),
+]
+# Most values one list filter may have.
+MAX_VALUES = 50
+FIELDS = ("scraped", "llm")
+
+# Statistics returned for the matching rows, in SELECT order. Rates are
+# percentages of the matching rows; averages skip missing values. Both are
+# rounded to two places like the analysis answers.
+STATS = [
+    ("entries", "COUNT(*)"),
+    ("accepted", "COUNT(*) FILTER (WHERE status = 'Accepted')"),
+    ("acceptance_rate", "ROUND(100.0 * COUNT(*) FILTER (WHERE status = 'Accepted') / NULLIF(COUNT(*), 0), 2)"),
+    (
+        "international_rate",
+        "ROUND(100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other')) "
+        "/ NULLIF(COUNT(*), 0), 2)",
+    ),
+    ("avg_gpa", "ROUND(AVG(gpa){cast}, 2)"),
+    ("avg_gre", "ROUND(AVG(gre){cast}, 2)"),
+    ("avg_gre_v", "ROUND(AVG(gre_v){cast}, 2)"),
+    ("avg_gre_aw", "ROUND(AVG(gre_aw){cast}, 2)"),
+]
+
+
+def normalize_filters(args):
+    """
+    Validate query-string ``args`` (``{name: [values]}``) into a filter dict.
+
+    List filters may repeat (``?university=MIT&university=Stanford
+    University``); their values are trimmed, deduplicated and sorted, so
+    equal filter sets share a statement and a cache entry. ``year`` limits
+    ``date_added`` to one calendar year and ``fields=llm`` filters on the
+    LLM-generated names. Raises ValueError for unknown parameters and bad
+    values.
+    """
+    names = {name for name, _column, _llm_column in FILTERS}
+    unknown = sorted(set(args) - names - {"year", "fields"})
+    if unknown:
+        raise ValueError("Unknown parameter(s): {}.".format(", ".join(unknown)))
+
+    filters = {}
+    for name, _column, _llm_column in FILTERS:
+        values = sorted({value.strip() for value in args.get(name, []) if value.strip()})
+        if len(values) > MAX_VALUES:
+            raise ValueError("At most {} values for '{}'.".format(MAX_VALUES, name))
+        if values:
+            filters[name] = values
+
+    if args.get("year"):
+        try:
+            year = int(args["year"][-1])
+        except ValueError:
+            raise ValueError("'year' must be a whole number.") from None
+        if not 1900 <= year <= 9998:
+            raise ValueError("'year' is out of range.")
+        filters["year"] = year
+
+    fields = args.get("fields", ["scraped"])[-1]
+    if fields not in FIELDS:
+        raise ValueError("'fields' must be one of: {}.".format(", ".join(FIELDS)))
+    filters["fields"] = fields
+    return filters
+
+
+def _columns(filters):
+    """``(column, values)`` for each list filter in ``filters``."""
+    llm = filters.get("fields") == "llm"
+    return [
+        (llm_column if llm else column, filters[name])
+        for name, column, llm_column in FILTERS
+        if name in filters
+    ]
+
+
+def _year_range(year):
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def columnar_stats(store, filters):
+    """Compute ``STATS`` for ``filters`` with masks over a ``columnar.ColumnStore``."""
+    mask = np.ones(len(store), dtype=bool)
+    for column, values in _columns(filters):
+        mask &= store.isin(column, values)
+    if "year" in filters:
+        mask &= store.dates(*_year_range(filters["year"]))
+    accepted = store.isin("status", ["Accepted"])
+    values = [
+        store.count(mask),
+        store.count(mask & accepted),
+        store.percent(accepted, of=mask),
+        store.percent(store.notin("us_or_international", ["American", "Other"]), of=mask),
+    ] + [store.mean(column, mask) for column in ("gpa", "gre", "gre_v", "gre_aw")]
+    return dict(zip((name for name, _expression in STATS), values))
+
+
+def build_query(filters, sqlite=False):
+    """
+    Return ``(sql, params)`` computing ``STATS`` over the rows ``filters`` match.
+
+    The SQL depends only on which filters are present (and, on SQLite, how
+    many values each has), never on the values, so it can be prepared once
+    per connection.
+    """
+    conditions, params = [], []
+    for column, values in _columns(filters):
+        if sqlite:
+            conditions.append("{} IN ({})".format(column, ", ".join(["%s"] * len(values))))
+            params.extend(values)
+        else:
+            conditions.append("{} = ANY(%s)".format(column))
+            params.append(list(values))
+    if "year" in filters:
+        conditions.append("date_added >= %s AND date_added < %s")
+        params.extend(_year_range(filters["year"]))
+
+    cast = "" if sqlite else "::numeric"
+    sql = "SELECT {} FROM applicants{};".format(
+        ", ".join(expression.format(cast=cast) for _name, expression in STATS),
+        " WHERE " + " AND ".join(conditions) if conditions else "",
+    )
+    return sql, params
+
+
+def _cache_params(filters):
+    return tuple((name, tuple(value) if isinstance(value, list) else value) for name, value in sorted(filters.items()))
+
+
+def applicant_stats(connection, filters):
+    """
+    Return ``{"stats": {...}, "cached": bool}`` for ``filters`` on ``connection``.
+
+    ``filters`` comes from ``normalize_filters``. A result cached for the
+    same filters and data version is returned without querying applicants.
+    With ``ANALYSIS_COLUMNAR=1`` the stats come from the in-process
+    ``columnar`` store instead of SQL.
+    """
+    cache = result_cache.get_cache() if result_cache.cache_enabled() else None
+    with connection.cursor() as cur:
+        version = result_cache.data_version(cur) if cache else None
+        if version is not None:
+            cached = cache.get("applicant_stats", _cache_params(filters), version)
+            if cached is not None:
+                return {"stats": dict(cached), "cached": True}
+
+        if columnar.columnar_enabled():
+            store = columnar.get_store()
+            with store.lock:
+                store.refresh(cur)
+                stats = columnar_stats(store, filters)
+        else:
+            sql, params = build_query(filters, sqlite=is_sqlite(connection))
+            cur.execute(sql, params, prepare=True)
+            stats = dict(zip((name for name, _expression in STATS), cur.fetchone()))
+
+    stats = {name: float(value) if isinstance(value, Decimal) else value for name, value in stats.items()}
+    if version is not None:
+        cache.put("applicant_stats", _cache_params(filters), version, stats)
+    return {"stats": stats, "cached": False}
@@ -0,0 +1,272 @@
+"""In-process columnar copy of applicants for vectorized analysis.
+
+``ColumnStore`` holds ``applicants`` as typed NumPy arrays, one per column:
+scores as float64 (NaN when missing), ``date_added`` as int32 days since
+1970-01-01 and text columns dictionary-encoded as int32 codes (0 is NULL).
+Filters are boolean masks over the arrays, so answering a question or a
+``/api/stats`` filter costs no database round trip once the store is loaded.
+
+``refresh`` keeps the store current: it reloads nothing while the data
+version (see ``result_cache``) is unchanged, and otherwise merges only the
+rows of newer ingest batches (see ``ingest_ledger.changed_since``), falling
+back to a full load when those cannot explain the change. Set
+``ANALYSIS_COLUMNAR=1`` to answer questions and stats from the store.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+from ingest_ledger import batch_finished, changed_since
+import result_cache
+
+FLOAT_COLUMNS = ("gpa", "gre", "gre_v", "gre_aw")
+CATEGORY_COLUMNS = (
+    "status", "term", "us_or_international", "degree", "program",
+    "program_name", "university_name", "llm_generated_program", "llm_generated_university",
+)
+# Read in this order from applicants.
+LOAD_COLUMNS = ("p_id", "ingest_batch_id", "date_added") + FLOAT_COLUMNS + CATEGORY_COLUMNS
+
+# date_added code for a missing date; below every real day.
+MISSING_DAY = np.iinfo(np.int32).min
+# ingest_batch_id of rows written before the ledger existed.
+NO_BATCH = 0
+
+# Compared with the store after a merge: a different row count means rows
+# were deleted, a different stamp total that rows were written under a
+# batch id at or below the one the store read from.
+CHECK_QUERY = "SELECT COUNT(*), COALESCE(SUM(ingest_batch_id), 0) FROM applicants;"
+
+TWO_PLACES = Decimal("0.01")
+
+
+def columnar_enabled():
+    """
+    Return True when ``ANALYSIS_COLUMNAR`` opts into the in-process store.
+
+    Questions with a ``columnar`` entry (see ``query_data.QUESTIONS``) and
+    ``/api/stats`` are then answered from ``get_store`` instead of SQL.
+    """
+    flag = os.getenv("ANALYSIS_COLUMNAR", "").strip().lower()
+    return flag in ("1", "true", "yes", "on")
+
+
+def _round(value):
+    """Round like PostgreSQL's ``ROUND(x::numeric, 2)``: 15 digits, then half away from zero."""
+    if isinstance(value, float):
+        value = Decimal("{:.15g}".format(value))
+    return value.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def _days(values):
+    """Encode dates (``date``, ISO text or None) as int32 days since the epoch."""
+    days = np.array(values, dtype="datetime64[D]")
+    return np.where(np.isnat(days), MISSING_DAY, days.astype(np.int64)).astype(np.int32)
+
+
+def _day(value):
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+class Dictionary:
+    """Append-only mapping between the values of one text column and int32 codes."""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value):
+        """Return the code of ``value``, adding it if it is new."""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values):
+        """Return the codes of ``values`` as an int32 array; None is 0."""
+        codes, code = self.codes, self.code
+        return np.fromiter(
+            (codes[value] if value in codes else code(value) for value in values),
+            dtype=np.int32,
+            count=len(values),
+        )
+
+
+class ColumnStore:
+    """
+    ``applicants`` as NumPy arrays, sorted by ``p_id``, with vectorized filters.
+
+    Masks come from ``isin``, ``notin`` and ``dates`` and combine with ``&``
+    and ``|``; ``count``, ``percent``, ``mean`` and ``distinct`` reduce them.
+    Percentages and means are Decimals rounded to two places, or None when
+    nothing matches, so answers format exactly like the SQL ones. Hold
+    ``lock`` while refreshing and querying, so a concurrent refresh cannot
+    swap the arrays between two masks.
+    """
+
+    def __init__(self):
+        self.dictionaries = {name: Dictionary() for name in CATEGORY_COLUMNS}
+        self.columns = self._encode([])
+        self.version = None
+        self.batch_id = None
+        self.since = None
+        self.loads = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.columns["p_id"])
+
+    def _encode(self, rows):
+        values = dict(zip(LOAD_COLUMNS, zip(*rows))) if rows else {name: () for name in LOAD_COLUMNS}
+        columns = {
+            "p_id": np.array(values["p_id"], dtype=np.int64),
+            "ingest_batch_id": np.array(
+                [NO_BATCH if batch is None else batch for batch in values["ingest_batch_id"]], dtype=np.int64
+            ),
+            "date_added": _days(values["date_added"]),
+        }
+        for name in FLOAT_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.float64)
+        for name in CATEGORY_COLUMNS:
+            columns[name] = self.dictionaries[name].encode(values[name])
+        return columns
+
+    def load(self, cur):
+        """Replace the store with every row of ``applicants`` on the open cursor."""
+        cur.execute("SELECT {} FROM applicants ORDER BY p_id;".format(", ".join(LOAD_COLUMNS)))
+        self.columns = self._encode(cur.fetchall())
+        self.batch_id = int(self.columns["ingest_batch_id"].max(initial=NO_BATCH))
+        self.loads += 1
+
+    def _merge(self, rows):
+        """
+        Overwrite rows already held and add new ones, keeping p_id order.
+
+        Returns False, leaving the arrays as they are, when every row is
+        already held with the same values.
+        """
+        delta = self._encode(rows)
+        # A row rewritten by several newer batches is reported once per batch.
+        delta_ids, last = np.unique(delta["p_id"][::-1], return_index=True)
+        delta = {name: column[::-1][last] for name, column in delta.items()}
+
+        p_ids = self.columns["p_id"]
+        positions = np.searchsorted(p_ids, delta_ids)
+        held = positions < len(p_ids)
+        held[held] = p_ids[positions[held]] == delta_ids[held]
+        if held.all() and all(
+            np.array_equal(column[positions], delta[name], equal_nan=column.dtype.kind == "f")
+            for name, column in self.columns.items()
+        ):
+            return False
+
+        columns = {}
+        for name, column in self.columns.items():
+            # Copies, so concurrent readers keep a consistent set of arrays.
+            column = column.copy()
+            column[positions[held]] = delta[name][held]
+            columns[name] = np.concatenate([column, delta[name][~held]])
+        if (~held).any() and len(p_ids) and delta_ids[~held][0] < p_ids[-1]:
+            order = np.argsort(columns["p_id"], kind="stable")
+            columns = {name: column[order] for name, column in columns.items()}
+        self.columns = columns
+        self.batch_id = max(self.batch_id, int(delta["ingest_batch_id"].max(initial=NO_BATCH)))
+        return True
+
+    def refresh(self, cur):
+        """
+        Bring the store up to date with ``applicants`` on the open cursor.
+
+        Does nothing while the data version is unchanged. Otherwise only
+        rows of ingest batches newer than the store are read and merged,
+        and those of the newest batch it holds too while that batch is
+        unfinished, since chunked loads commit several times under one id.
+        The whole table is loaded on the first refresh, and whenever the
+        merge cannot account for the new version: it changed nothing (an
+        UPDATE that kept its batch id), or the row count or the total of
+        the batch ids differs from the store's.
+        """
+        with self.lock:
+            version = result_cache.data_version(cur)
+            if version is not None and version == self.version:
+                return
+            if self.batch_id is None:
+                self.load(cur)
+            else:
+                merged = self._merge(changed_since(cur, self.since, LOAD_COLUMNS))
+                cur.execute(CHECK_QUERY)
+                count, stamps = cur.fetchone()
+                if not merged or count != len(self) or stamps != int(self.columns["ingest_batch_id"].sum()):
+                    self.load(cur)
+            self.since = self.batch_id if batch_finished(cur, self.batch_id) else self.batch_id - 1
+            self.version = version
+
+    # -------------------- Masks --------------------
+    def isin(self, column, values):
+        """Rows whose ``column`` is one of ``values``."""
+        dictionary = self.dictionaries[column]
+        # One flag per code, then a single gather over the column.
+        wanted = np.zeros(len(dictionary.values), dtype=bool)
+        wanted[[dictionary.codes[value] for value in values if value in dictionary.codes]] = True
+        return wanted[self.columns[column]]
+
+    def notin(self, column, values):
+        """Rows whose ``column`` is set and none of ``values`` (SQL ``NOT IN``)."""
+        return (self.columns[column] != 0) & ~self.isin(column, values)
+
+    def dates(self, start, stop):
+        """Rows added on or after ``start`` and before ``stop``."""
+        days = self.columns["date_added"]
+        return (days >= _day(start)) & (days < _day(stop))
+
+    # -------------------- Reductions --------------------
+    def count(self, mask=None):
+        """Number of rows in ``mask`` (all rows by default)."""
+        return len(self) if mask is None else int(np.count_nonzero(mask))
+
+    def percent(self, mask, of=None):
+        """Percentage of the rows in ``of`` (all rows by default) that are in ``mask``."""
+        total = self.count(of)
+        if not total:
+            return None
+        matched = self.count(mask if of is None else mask & of)
+        return _round(Decimal(100) * matched / total)
+
+    def mean(self, column, mask=None):
+        """Average of the set values of a score column within ``mask``."""
+        values = self.columns[column] if mask is None else self.columns[column][mask]
+        values = values[~np.isnan(values)]
+        return _round(float(values.mean())) if len(values) else None
+
+    def distinct(self, column):
+        """Number of distinct set values of a text column."""
+        codes = np.unique(self.columns[column])
+        return int(np.count_nonzero(codes))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store, created empty on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ColumnStore()
+        return _store
+
+
+def reset_store():
+    """Forget the process-wide store; the next refresh loads the table again."""
+    global _store
+    with _store_lock:
+        _store = None
+
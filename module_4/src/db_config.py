@@ -1,4 +1,14 @@
+import atexit
 import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg
+from psycopg import OperationalError
+from psycopg_pool import ConnectionPool
+
+import sqlite_backend
 
 
 def get_db_connect_kwargs():
@@ -6,7 +16,8 @@ def get_db_connect_kwargs():
     Build psycopg connection kwargs from DATABASE_URL.
 
     Required variable:
-    - DATABASE_URL
+    - DATABASE_URL: a PostgreSQL URL, or ``sqlite:///path/to/file.db`` for
+      the embedded SQLite backend (see ``sqlite_backend``).
     """
     # Centralize DB connection wiring so all modules use the same
     # environment-driven configuration surface.
@@ -17,3 +28,185 @@ def get_db_connect_kwargs():
         )
 
     return {"conninfo": database_url}
+
+
+def backend(conn):
+    """Return ``"sqlite"`` or ``"postgres"`` for ``conn`` (a connection or cursor)."""
+    return "sqlite" if getattr(conn, "backend", None) == "sqlite" else "postgres"
+
+
+def is_sqlite(conn):
+    """Return True when ``conn`` (a connection or cursor) is SQLite-backed."""
+    return backend(conn) == "sqlite"
+
+
+def backend_query(conn, name, query):
+    """
+    Return the SQL ``conn``'s backend runs for PostgreSQL's ``query``.
+
+    ``name`` is the name of the constant holding ``query``. On SQLite the
+    statement comes from ``sqlite_backend.QUERIES`` instead, and is None
+    where SQLite does without the feature.
+    """
+    if is_sqlite(conn):
+        return sqlite_backend.QUERIES[name]
+    return query
+
+
+# When this process last wrote to the primary (time.monotonic()), if ever.
+_last_write = None
+
+
+def note_write():
+    """
+    Record that this process just wrote to the primary.
+
+    For the next ``DATABASE_READ_AFTER_WRITE_SECONDS`` (default 5),
+    ``get_db_read_connect_kwargs`` sends reads to the primary, so they see
+    the write even if the replica has not replayed it yet.
+    """
+    global _last_write
+    _last_write = time.monotonic()
+
+
+def get_db_read_connect_kwargs():
+    """
+    Build psycopg connection kwargs for read-only queries.
+
+    Optional variable:
+    - DATABASE_READ_URL: a read replica. Without it, or right after a write
+      (see ``note_write``), reads go to ``DATABASE_URL``.
+    """
+    read_url = os.getenv("DATABASE_READ_URL")
+    window = float(os.getenv("DATABASE_READ_AFTER_WRITE_SECONDS", "5"))
+    if not read_url or (_last_write is not None and time.monotonic() - _last_write < window):
+        return get_db_connect_kwargs()
+
+    return {"conninfo": read_url}
+
+
+def pipeline_enabled():
+    """
+    Return True when ``DATABASE_PIPELINE`` opts into psycopg pipeline mode.
+
+    Pipeline mode queues statements without waiting for each reply, which
+    matters when PostgreSQL is on another host. It needs libpq 14 or newer;
+    with an older libpq the setting is ignored.
+    """
+    flag = os.getenv("DATABASE_PIPELINE", "").strip().lower()
+    return flag in ("1", "true", "yes", "on") and psycopg.Pipeline.is_supported()
+
+
+def pool_enabled():
+    """
+    Return False when ``DATABASE_POOL`` turns the shared connection pool off.
+
+    Pooling is on by default; set ``DATABASE_POOL=0`` to open a fresh
+    connection per call instead.
+    """
+    flag = os.getenv("DATABASE_POOL", "1").strip().lower()
+    return flag not in ("0", "false", "no", "off")
+
+
+# One pool per distinct set of connect kwargs, shared by every module.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connect_kwargs=None):
+    """
+    Return the process-wide connection pool for ``connect_kwargs``.
+
+    Defaults to ``get_db_connect_kwargs()``. The pool is created on first use
+    and sized by ``DATABASE_POOL_MIN_SIZE`` (default 1) and
+    ``DATABASE_POOL_MAX_SIZE`` (default 10). Every borrowed connection is
+    checked first, so one dropped by the server is replaced instead of
+    failing the request. Waiting longer than ``DATABASE_POOL_TIMEOUT``
+    seconds (default 30) for a free connection raises ``PoolTimeout``, an
+    ``OperationalError``.
+    """
+    if connect_kwargs is None:
+        connect_kwargs = get_db_connect_kwargs()
+    key = tuple(sorted(connect_kwargs.items()))
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            kwargs = dict(connect_kwargs)
+            conninfo = kwargs.pop("conninfo", "")
+            pool = ConnectionPool(
+                conninfo,
+                kwargs=kwargs,
+                min_size=int(os.getenv("DATABASE_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+                timeout=float(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+                check=ConnectionPool.check_connection,
+                name="applicants-{}".format(len(_pools) + 1),
+                open=True,
+            )
+            try:
+                # Fail like a plain connect would when the server is down,
+                # instead of keeping a pool that can never hand anything out.
+                pool.wait(timeout=pool.timeout)
+            except OperationalError:
+                pool.close()
+                raise
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def connection(connect_kwargs=None, autocommit=False):
+    """
+    Borrow a database connection for the duration of a ``with`` block.
+
+    Behaves like ``with psycopg.connect(...) as conn``: the transaction is
+    committed on success and rolled back on error. The connection then goes
+    back to the shared pool instead of being closed. With pooling turned off
+    (see ``pool_enabled``) a new connection is opened and closed.
+
+    A ``sqlite:///`` URL uses the SQLite file instead. With pooling on,
+    each thread keeps one open connection to it (see
+    ``sqlite_backend.connect``).
+    """
+    if connect_kwargs is None:
+        connect_kwargs = get_db_connect_kwargs()
+
+    if connect_kwargs.get("conninfo", "").startswith(sqlite_backend.URL_PREFIX):
+        with sqlite_backend.connect(
+            connect_kwargs["conninfo"], autocommit=autocommit, shared=pool_enabled()
+        ) as conn:
+            yield conn
+        return
+
+    if not pool_enabled():
+        with psycopg.connect(**connect_kwargs, autocommit=autocommit) as conn:
+            yield conn
+        return
+
+    with get_pool(connect_kwargs).connection() as conn:
+        conn.autocommit = autocommit
+        yield conn
+
+
+def pool_stats():
+    """
+    Return ``{pool name: statistics}`` for every pool opened so far.
+
+    The statistics are psycopg_pool's counters (``pool_size``,
+    ``pool_available``, ``requests_num``, ``requests_waiting``,
+    ``connections_num`` and so on), read without resetting them.
+    """
+    with _pools_lock:
+        return {pool.name: pool.get_stats() for pool in _pools.values()}
+
+
+def close_pools():
+    """Close every pool, e.g. on shutdown; later calls open new ones."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+atexit.register(close_pools)
@@ -0,0 +1,224 @@
+"""Streaming export of the applicants table as CSV, JSON Lines or Parquet."""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import csv
+import io
+import itertools
+import json
+import time
+import zlib
+from psycopg import OperationalError
+from db_config import connection, get_db_read_connect_kwargs
+
+# Scraped columns, in load order; derived and internal columns are left out.
+EXPORT_COLUMNS = (
+    ("p_id", "int64"),
+    ("program", "string"),
+    ("comments", "string"),
+    ("date_added", "date32"),
+    ("url", "string"),
+    ("status", "string"),
+    ("term", "string"),
+    ("us_or_international", "string"),
+    ("gpa", "float64"),
+    ("gre", "float64"),
+    ("gre_v", "float64"),
+    ("gre_aw", "float64"),
+    ("degree", "string"),
+    ("llm_generated_program", "string"),
+    ("llm_generated_university", "string"),
+)
+
+EXPORT_QUERY = "SELECT {} FROM applicants ORDER BY p_id;".format(
+    ", ".join(name for name, _type in EXPORT_COLUMNS)
+)
+
+# Format name -> (HTTP content type, file extension).
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def iter_row_chunks(chunk_size=DEFAULT_CHUNK_SIZE, query=EXPORT_QUERY):
+    """
+    Yield the rows of ``query`` (by default ``EXPORT_QUERY``) in lists of at
+    most ``chunk_size``.
+
+    Rows come from a named (server-side) cursor, so only one chunk is held
+    in memory at a time however large the table is. Reads go to the read
+    replica when one is configured.
+    """
+    with connection(get_db_read_connect_kwargs()) as conn:
+        with conn.cursor(name="applicants_export") as cur:
+            cur.itersize = chunk_size
+            cur.execute(query)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+
+def _encode_csv(chunks):
+    header = io.StringIO()
+    csv.writer(header).writerow(name for name, _type in EXPORT_COLUMNS)
+    yield header.getvalue().encode("utf-8")
+    for rows in chunks:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_jsonl(chunks):
+    names = [name for name, _type in EXPORT_COLUMNS]
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=str) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+# Parquet output (exports and snapshots) is zstd-compressed.
+PARQUET_COMPRESSION = "zstd"
+
+
+def arrow_schema(columns=EXPORT_COLUMNS):
+    """Return the pyarrow schema for ``(name, pyarrow type name)`` columns."""
+    import pyarrow
+
+    return pyarrow.schema(
+        [(name, getattr(pyarrow, type_name)()) for name, type_name in columns]
+    )
+
+
+def rows_to_arrow(rows, schema):
+    """Build a pyarrow Table from rows matching ``schema``, one column at a time."""
+    import pyarrow
+
+    return pyarrow.Table.from_arrays(
+        [pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+        schema=schema,
+    )
+
+
+def _encode_parquet(chunks):
+    # Imported here so CSV and JSON Lines exports work without pyarrow.
+    import pyarrow.parquet
+
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+    # Each chunk becomes one row group, flushed before the next is read.
+    for rows in chunks:
+        writer.write_table(rows_to_arrow(rows, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    "csv": _encode_csv,
+    "jsonl": _encode_jsonl,
+    "parquet": _encode_parquet,
+}
+
+
+def stream_export(fmt, chunk_size=DEFAULT_CHUNK_SIZE, gzip=False, stats=None):
+    """
+    Yield the whole ``applicants`` table encoded as ``fmt``, chunk by chunk.
+
+    ``fmt`` is one of ``EXPORT_FORMATS``. With ``gzip`` the output is a gzip
+    stream compressed on the fly. When the export finishes, ``stats`` (if
+    given) is filled with ``rows``, ``bytes`` (as sent) and ``seconds``,
+    and the throughput is printed.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError("Unknown export format '{}'.".format(fmt))
+    if stats is None:
+        stats = {}
+    stats.update(rows=0, bytes=0, seconds=0.0)
+    started = time.perf_counter()
+
+    # Connect and start the query before producing any output, so callers
+    # can still report a database error instead of a truncated file.
+    row_chunks = iter_row_chunks(chunk_size)
+    first = next(row_chunks, None)
+
+    def counted_chunks():
+        for rows in itertools.chain([first] if first else [], row_chunks):
+            stats["rows"] += len(rows)
+            yield rows
+
+    # wbits=31 writes a gzip header and trailer around the deflate stream.
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    for data in ENCODERS[fmt](counted_chunks()):
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            stats["bytes"] += len(data)
+            yield data
+    if compressor is not None:
+        data = compressor.flush()
+        stats["bytes"] += len(data)
+        yield data
+
+    stats["seconds"] = time.perf_counter() - started
+    print(
+        "Exported {} rows as {} ({} bytes) in {:.2f}s: {:.0f} rows/s.".format(
+            stats["rows"], fmt, stats["bytes"], stats["seconds"],
+            stats["rows"] / stats["seconds"] if stats["seconds"] else 0,
+        )
+    )
+
+
+def export_to_file(path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write the ``applicants`` export to ``path``.
+
+    ``fmt`` defaults to the file extension and a trailing ``.gz`` turns on
+    gzip (e.g. ``applicants.jsonl.gz``). Returns the stats dict described in
+    ``stream_export``, or None on a database error.
+    """
+    gzip = path.endswith(".gz")
+    if fmt is None:
+        fmt = os.path.splitext(path[:-3] if gzip else path)[1].lstrip(".")
+    stats = {}
+    try:
+        with open(path, "wb") as f:
+            for data in stream_export(fmt, chunk_size=chunk_size, gzip=gzip, stats=stats):
+                f.write(data)
+        return stats
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+if __name__ == "__main__":
+    export_to_file(sys.argv[1] if len(sys.argv) > 1 else "applicants.csv")
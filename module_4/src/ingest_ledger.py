@@ -0,0 +1,101 @@
+"""Ledger of ingest batches and "what changed since batch N" lookups."""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from psycopg import OperationalError
+from db_config import connection, get_db_connect_kwargs
+
+BEGIN_BATCH_QUERY = """
+INSERT INTO ingest_batches (source, rows_received) VALUES (%s, %s) RETURNING id;
+"""
+
+FINISH_BATCH_QUERY = """
+UPDATE ingest_batches
+SET finished_at = clock_timestamp(), rows_received = %s, rows_inserted = %s, rows_updated = %s
+WHERE id = %s;
+"""
+
+BATCH_COLUMNS = (
+    "id", "source", "started_at", "finished_at",
+    "rows_received", "rows_inserted", "rows_updated",
+)
+
+
+def begin_batch(cur, source, rows_received=0):
+    """
+    Record the start of an ingest run on the open cursor and return its id.
+
+    Writers stamp every row they insert or rewrite with this id in
+    ``applicants.ingest_batch_id``. The row is only visible once the
+    caller commits.
+    """
+    cur.execute(BEGIN_BATCH_QUERY, (source, rows_received))
+    return cur.fetchone()[0]
+
+
+def finish_batch(cur, batch_id, rows_received, rows_inserted, rows_updated=0):
+    """Set the end time and row counts of batch ``batch_id``; the caller commits."""
+    cur.execute(FINISH_BATCH_QUERY, (rows_received, rows_inserted, rows_updated, batch_id))
+
+
+def list_batches(limit=20):
+    """
+    Return the newest ``limit`` ledger entries as dicts, newest first.
+
+    A batch with ``finished_at`` None was interrupted or is still running.
+    Returns an empty list on a database error.
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT {} FROM ingest_batches ORDER BY id DESC LIMIT %s;".format(
+                        ", ".join(BATCH_COLUMNS)
+                    ),
+                    (limit,),
+                )
+                return [dict(zip(BATCH_COLUMNS, row)) for row in cur.fetchall()]
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return []
+
+
+def latest_batch_id(cur):
+    """Return the highest batch id stamped on any applicant (None if none)."""
+    cur.execute("SELECT MAX(ingest_batch_id) FROM applicants;")
+    return cur.fetchone()[0]
+
+
+def batch_finished(cur, batch_id):
+    """
+    Return False while batch ``batch_id`` can still commit rows.
+
+    That is while its ledger entry has no ``finished_at``: chunked loads
+    commit every chunk under the batch before finishing it. A batch without
+    a visible entry counts as finished, since none of its rows are visible
+    either.
+    """
+    cur.execute("SELECT finished_at FROM ingest_batches WHERE id = %s;", (batch_id,))
+    row = cur.fetchone()
+    return row is None or row[0] is not None
+
+
+def changed_since(cur, batch_id, columns=("p_id",)):
+    """
+    Return ``columns`` of applicants inserted or rewritten after ``batch_id``.
+
+    Uses the ``ingest_batch_id`` index, so the cost follows the size of the
+    delta rather than the table. ``batch_id`` None returns every row,
+    including ones written before the ledger existed. Rows are ordered by
+    batch, then p_id. Deleted rows are not reported.
+    """
+    query = "SELECT {} FROM applicants".format(", ".join(columns))
+    params = ()
+    if batch_id is not None:
+        query += " WHERE ingest_batch_id > %s"
+        params = (batch_id,)
+    cur.execute(query + " ORDER BY ingest_batch_id, p_id;", params)
+    return cur.fetchall()
@@ -0,0 +1,223 @@
+"""Top-N rankings of universities, programs, degrees and terms.
+
+Backs ``/api/leaderboard``, for questions like "top 10 programs by
+acceptance rate, with at least 50 reports". ``Cube`` counts the rows of
+the in-process columnar store (see ``columnar``) per (university, program,
+degree, term, status) cell, with their GPA sums. A ranking filters and
+regroups the cells, which are far fewer than the rows, and never reads the
+table. The cube is rebuilt when a refresh of the store brings in a new
+ingest batch.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from decimal import Decimal
+
+import numpy as np
+
+import columnar
+
+# Cube dimensions: (query parameter, columnar store column). Every one but
+# status can be ranked and filtered on.
+DIMENSIONS = [
+    ("university", "university_name"),
+    ("program", "program_name"),
+    ("degree", "degree"),
+    ("term", "term"),
+    ("status", "status"),
+]
+RANKABLE = [name for name, _column in DIMENSIONS if name != "status"]
+METRICS = ("acceptance_rate", "reports", "accepted", "avg_gpa")
+ORDERS = ("desc", "asc")
+DEFAULT_MIN_REPORTS = 50
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+MAX_VALUES = 50
+# Rankings over at most this many possible groups (the product of the
+# ``by`` dictionary sizes) total into a dense array instead of sorting.
+DENSE_GROUPS = 1 << 22
+
+
+def _integer(args, name, default, low, high=None):
+    if not args.get(name):
+        return default
+    try:
+        value = int(args[name][-1])
+    except ValueError:
+        raise ValueError("'{}' must be an integer.".format(name)) from None
+    if value < low or (high is not None and value > high):
+        bounds = "from {} to {}".format(low, high) if high is not None else "at least {}".format(low)
+        raise ValueError("'{}' must be {}.".format(name, bounds))
+    return value
+
+
+def normalize_query(args):
+    """
+    Validate query-string ``args`` (``{name: [values]}``) into a ranking query.
+
+    ``by`` names what is ranked (default program) and may repeat to rank
+    combinations such as university and program. ``metric`` is one of
+    ``METRICS`` (default acceptance_rate) and ``order`` is desc or asc.
+    Groups with fewer than ``min_reports`` rows (default 50) are left out,
+    and ``limit`` (default 10, at most 100) caps the rows returned.
+    ``university``, ``program``, ``degree`` and ``term`` filter and may
+    repeat. Raises ValueError for unknown parameters and bad values.
+    """
+    unknown = sorted(set(args) - set(RANKABLE) - {"by", "metric", "order", "min_reports", "limit"})
+    if unknown:
+        raise ValueError("Unknown parameter(s): {}.".format(", ".join(unknown)))
+
+    by = list(dict.fromkeys(args.get("by") or ["program"]))
+    if any(name not in RANKABLE for name in by):
+        raise ValueError("'by' must be among: {}.".format(", ".join(RANKABLE)))
+    query = {
+        "by": by,
+        "metric": args.get("metric", ["acceptance_rate"])[-1],
+        "order": args.get("order", ["desc"])[-1],
+        "min_reports": _integer(args, "min_reports", DEFAULT_MIN_REPORTS, 1),
+        "limit": _integer(args, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT),
+        "filters": {},
+    }
+    if query["metric"] not in METRICS:
+        raise ValueError("'metric' must be one of: {}.".format(", ".join(METRICS)))
+    if query["order"] not in ORDERS:
+        raise ValueError("'order' must be one of: {}.".format(", ".join(ORDERS)))
+    for name in RANKABLE:
+        values = sorted({value.strip() for value in args.get(name, []) if value.strip()})
+        if len(values) > MAX_VALUES:
+            raise ValueError("At most {} values for '{}'.".format(MAX_VALUES, name))
+        if values:
+            query["filters"][name] = values
+    return query
+
+
+class Cube:
+    """
+    Row counts and GPA totals of a ``ColumnStore`` per dimension cell.
+
+    Cell ``i`` is the combination of codes ``codes[column][i]`` for each
+    dimension column; only cells with rows are kept. ``reports`` counts
+    rows, ``accepted`` is ``reports`` in the Accepted cells, and
+    ``gpa_sum`` and ``gpa_count`` cover the rows with a GPA.
+    Built from the arrays of one refresh; check ``columns is
+    store.columns`` before reuse.
+    """
+
+    def __init__(self, store):
+        self.columns = store.columns
+        dimensions = [column for _name, column in DIMENSIONS]
+        shape = tuple(len(store.dictionaries[column].values) for column in dimensions)
+
+        combined = np.ravel_multi_index([store.columns[column] for column in dimensions], shape)
+        cells, cell_ids = np.unique(combined, return_inverse=True)
+        self.codes = {
+            column: codes.astype(np.int32) for column, codes in zip(dimensions, np.unravel_index(cells, shape))
+        }
+        gpa = store.columns["gpa"]
+        present = ~np.isnan(gpa)
+        self.reports = np.bincount(cell_ids, minlength=len(cells))
+        self.gpa_count = np.bincount(cell_ids, weights=present, minlength=len(cells)).astype(np.int64)
+        self.gpa_sum = np.bincount(cell_ids, weights=np.where(present, gpa, 0.0), minlength=len(cells))
+        accepted_code = store.dictionaries["status"].codes.get("Accepted", -1)
+        self.accepted = np.where(self.codes["status"] == accepted_code, self.reports, 0)
+
+    def __len__(self):
+        return len(self.reports)
+
+    def _cells(self, store, query):
+        """Ids of the cells that match the filters and have every ``by`` value."""
+        match = np.ones(len(self), dtype=bool)
+        for name, column in DIMENSIONS:
+            if name in query["by"]:
+                match &= self.codes[column] != 0
+            if name in query["filters"]:
+                dictionary = store.dictionaries[column]
+                codes = [dictionary.codes[value] for value in query["filters"][name] if value in dictionary.codes]
+                match &= np.isin(self.codes[column], codes)
+        return np.flatnonzero(match)
+
+    def top(self, store, query):
+        """
+        Return ``(groups, rows)``: the number of groups with enough reports
+        and the first ``limit`` of them ranked by the metric.
+
+        Ties go to the group with more reports, then to the values the
+        store encoded first.
+        """
+        cells = self._cells(store, query)
+        names, columns = zip(*[(name, column) for name, column in DIMENSIONS if name in query["by"]])
+        shape = tuple(len(store.dictionaries[column].values) for column in columns)
+        group_ids = np.ravel_multi_index([self.codes[column][cells] for column in columns], shape)
+        if np.prod(shape, dtype=np.int64) <= DENSE_GROUPS:
+            keys = np.arange(np.prod(shape, dtype=np.int64))
+        else:
+            keys, group_ids = np.unique(group_ids, return_inverse=True)
+
+        def total(values):
+            return np.bincount(group_ids, weights=values[cells], minlength=len(keys))
+
+        reports = total(self.reports).astype(np.int64)
+        accepted = total(self.accepted).astype(np.int64)
+        gpa_count = total(self.gpa_count).astype(np.int64)
+        gpa_sum = total(self.gpa_sum)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics = {
+                "reports": reports,
+                "accepted": accepted,
+                "acceptance_rate": 100.0 * accepted / reports,
+                "avg_gpa": gpa_sum / gpa_count,
+            }
+
+        metric = metrics[query["metric"]]
+        keep = np.flatnonzero((reports >= query["min_reports"]) & ~np.isnan(metric))
+        ranked = -metric[keep] if query["order"] == "desc" else metric[keep]
+        order = keep[np.lexsort((keys[keep], -reports[keep], ranked))][: query["limit"]]
+
+        codes = np.unravel_index(keys[order], shape)
+        rows = []
+        for position, group in enumerate(order):
+            row = {
+                name: store.dictionaries[column].values[column_codes[position]]
+                for name, column, column_codes in zip(names, columns, codes)
+            }
+            row.update(
+                reports=int(reports[group]),
+                accepted=int(accepted[group]),
+                # Half up, like /api/stats (see ``columnar._round``).
+                acceptance_rate=float(columnar._round(Decimal(100) * int(accepted[group]) / int(reports[group]))),
+                avg_gpa=float(columnar._round(float(metrics["avg_gpa"][group]))) if gpa_count[group] else None,
+            )
+            rows.append(row)
+        return len(keep), rows
+
+
+_cube = None
+
+
+def get_cube(store):
+    """Return the ``Cube`` of ``store``, rebuilt if the store changed since."""
+    global _cube
+    if _cube is None or _cube.columns is not store.columns:
+        _cube = Cube(store)
+    return _cube
+
+
+def leaderboard(connection, query):
+    """
+    Return ``{"groups": n, "rows": [...]}`` for ``query`` on ``connection``.
+
+    ``query`` comes from ``normalize_query``. The columnar store is
+    refreshed first (reading only new ingest batches, see
+    ``columnar.ColumnStore.refresh``). ``groups`` counts the groups with at
+    least ``min_reports`` reports; each row names its group by the ``by``
+    parameters and has its reports, acceptances, acceptance rate and
+    average GPA (None without GPAs).
+    """
+    store = columnar.get_store()
+    with store.lock:
+        with connection.cursor() as cur:
+            store.refresh(cur)
+        groups, rows = get_cube(store).top(store, query)
+    return {"groups": groups, "rows": rows}
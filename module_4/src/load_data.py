@@ -8,10 +8,17 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import psycopg
 from psycopg import OperationalError, sql
 import json
+import hashlib
+import mmap
 from datetime import datetime
 #creates db using python so manual db creation in terminal no longer required (only run once to init DB)
 from psycopg.sql import SQL, Identifier
-from db_config import get_db_connect_kwargs
+from db_config import backend_query, connection, get_db_connect_kwargs, is_sqlite
+from partitions import ensure_partitions, is_partitioned
+from ingest_ledger import begin_batch, finish_batch
+from aggregates import AGGREGATE_QUERIES
+from rollups import ROLLUP_QUERIES
+from result_cache import DATA_VERSION_QUERIES, bump_version
 
 def create_database(db_name, db_user, db_password, db_host, db_port):
     """
@@ -39,45 +46,736 @@ def create_database(db_name, db_user, db_password, db_host, db_port):
     except OperationalError as e:
         print("Error '{}' occurred.".format(e))
 
-def create_table():
+# Dictionary-encoded names. Raw program strings and the LLM-generated fields
+# share these tables, so applicants can count and group on integer ids.
+DIMENSION_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS programs (
+        id SERIAL PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS universities (
+        id SERIAL PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    """,
+    """
+    CREATE OR REPLACE FUNCTION program_dimension_id(program_name TEXT)
+    RETURNS INTEGER AS $$
+    DECLARE
+        result INTEGER;
+    BEGIN
+        IF program_name IS NULL THEN
+            RETURN NULL;
+        END IF;
+        SELECT id INTO result FROM programs WHERE name = program_name;
+        IF result IS NULL THEN
+            INSERT INTO programs (name) VALUES (program_name)
+            ON CONFLICT (name) DO NOTHING
+            RETURNING id INTO result;
+        END IF;
+        IF result IS NULL THEN
+            -- Another session inserted the same name concurrently.
+            SELECT id INTO result FROM programs WHERE name = program_name;
+        END IF;
+        RETURN result;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION university_dimension_id(university_name TEXT)
+    RETURNS INTEGER AS $$
+    DECLARE
+        result INTEGER;
+    BEGIN
+        IF university_name IS NULL THEN
+            RETURN NULL;
+        END IF;
+        SELECT id INTO result FROM universities WHERE name = university_name;
+        IF result IS NULL THEN
+            INSERT INTO universities (name) VALUES (university_name)
+            ON CONFLICT (name) DO NOTHING
+            RETURNING id INTO result;
+        END IF;
+        IF result IS NULL THEN
+            -- Another session inserted the same name concurrently.
+            SELECT id INTO result FROM universities WHERE name = university_name;
+        END IF;
+        RETURN result;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
+
+# Column layout of ``applicants``. program_name/university_name split the raw
+# "Program, University" string once at write time so analysis queries can
+# filter and count them without re-running SPLIT_PART on every row.
+APPLICANT_COLUMNS = """
+    program TEXT,
+    comments TEXT,
+    date_added DATE,
+    url TEXT,
+    status TEXT,
+    term TEXT,
+    us_or_international TEXT,
+    gpa FLOAT,
+    gre FLOAT,
+    gre_v FLOAT,
+    gre_aw FLOAT,
+    degree TEXT,
+    llm_generated_program TEXT,
+    llm_generated_university TEXT,
+    program_name TEXT GENERATED ALWAYS AS (TRIM(SPLIT_PART(program, ',', 1))) STORED,
+    university_name TEXT GENERATED ALWAYS AS (TRIM(SPLIT_PART(program, ',', 2))) STORED,
+    program_id INTEGER,
+    university_id INTEGER,
+    llm_program_id INTEGER,
+    llm_university_id INTEGER,
+    content_hash TEXT,
+    ingest_batch_id BIGINT"""
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE applicants (
+    p_id BIGINT PRIMARY KEY,{columns}
+);
+""".format(columns=APPLICANT_COLUMNS)
+
+# Optional layout: one partition per date_added year, plus a default
+# partition for rows without a date. A partitioned table cannot have a
+# primary key on p_id alone, so uniqueness is (p_id, date_added) with NULL
+# dates treated as equal (NULLS NOT DISTINCT needs PostgreSQL 15). p_id is
+# therefore only unique per date: a post whose date_added changes is stored
+# again under the new date. Loaders use a target-less ON CONFLICT for both.
+CREATE_PARTITIONED_TABLE_QUERIES = [
+    """
+    CREATE TABLE applicants (
+        p_id BIGINT NOT NULL,{columns},
+        CONSTRAINT applicants_p_id_date_key UNIQUE NULLS NOT DISTINCT (p_id, date_added)
+    ) PARTITION BY RANGE (date_added);
+    """.format(columns=APPLICANT_COLUMNS),
+    "CREATE TABLE applicants_undated PARTITION OF applicants DEFAULT;",
+]
+
+# Creates any missing year partitions for a batch of dates; a no-op when
+# applicants is not partitioned. Loaders call it before each insert batch.
+# Rows of a year written before its partition existed (ad-hoc SQL) sit in
+# the default partition, and PostgreSQL refuses to create a partition that
+# would take rows from it. They are deleted through applicants, kept in a
+# temporary table while the partition is created, and inserted again, so
+# the statement triggers see them leave and come back.
+PARTITION_FUNCTION_QUERIES = [
+    """
+    CREATE OR REPLACE FUNCTION ensure_applicant_partitions(dates DATE[])
+    RETURNS INTEGER AS $$
+    DECLARE
+        partition_year INTEGER;
+        partition_name TEXT;
+        range_start DATE;
+        range_end DATE;
+        stored_columns TEXT;
+        created INTEGER := 0;
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'applicants'::regclass
+        ) THEN
+            RETURN 0;
+        END IF;
+        FOR partition_year IN
+            SELECT DISTINCT EXTRACT(YEAR FROM d)::INTEGER
+            FROM unnest(dates) AS d
+            WHERE d IS NOT NULL
+        LOOP
+            partition_name := 'applicants_y' || partition_year;
+            IF to_regclass(partition_name) IS NULL THEN
+                range_start := make_date(partition_year, 1, 1);
+                range_end := make_date(partition_year + 1, 1, 1);
+                IF EXISTS (
+                    SELECT 1 FROM applicants WHERE date_added >= range_start AND date_added < range_end
+                ) THEN
+                    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO stored_columns
+                    FROM pg_attribute
+                    WHERE attrelid = 'applicants'::regclass AND attnum > 0
+                        AND NOT attisdropped AND attgenerated = '';
+                    CREATE TEMP TABLE applicants_moved (LIKE applicants);
+                    EXECUTE format(
+                        'WITH moved AS (DELETE FROM applicants WHERE date_added >= %L AND date_added < %L '
+                        'RETURNING %s) INSERT INTO applicants_moved (%s) SELECT %s FROM moved',
+                        range_start, range_end, stored_columns, stored_columns, stored_columns
+                    );
+                END IF;
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF applicants FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, range_start, range_end
+                );
+                IF to_regclass('pg_temp.applicants_moved') IS NOT NULL THEN
+                    EXECUTE format(
+                        'INSERT INTO applicants (%s) SELECT %s FROM applicants_moved',
+                        stored_columns, stored_columns
+                    );
+                    DROP TABLE pg_temp.applicants_moved;
+                END IF;
+                created := created + 1;
+            END IF;
+        END LOOP;
+        RETURN created;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
+
+# Brings a table created from the original column list up to date in place
+# (the same statements are frozen in migration 1 of migrations.py). Adding a STORED generated column rewrites
+# the whole table under an ACCESS EXCLUSIVE lock, so an upgraded table gets
+# program_name/university_name as plain columns instead: adding them only
+# changes the catalog, the migration's batched backfill fills existing rows
+# (its ``SET program = program`` fires the trigger) and the trigger keeps
+# new and edited rows in step. Tables that already have the generated
+# columns get no trigger.
+UPGRADE_COLUMN_QUERIES = [
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS program_name TEXT;",
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS university_name TEXT;",
+    """
+    CREATE OR REPLACE FUNCTION applicants_split_program()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.program_name := TRIM(SPLIT_PART(NEW.program, ',', 1));
+        NEW.university_name := TRIM(SPLIT_PART(NEW.program, ',', 2));
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = 'applicants'::regclass AND attname = 'program_name'
+              AND attgenerated = ''
+        ) THEN
+            CREATE OR REPLACE TRIGGER applicants_split_program
+            BEFORE INSERT OR UPDATE OF program ON applicants
+            FOR EACH ROW EXECUTE FUNCTION applicants_split_program();
+        END IF;
+    END;
+    $$;
+    """,
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS program_id INTEGER;",
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS university_id INTEGER;",
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS llm_program_id INTEGER;",
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS llm_university_id INTEGER;",
+]
+
+# The loaders resolve a batch's dimension ids in the statement that inserts it
+# (DIMENSION_CTES), so this row trigger only fires for writers that leave ids
+# missing (ad-hoc SQL, old rows re-fired by the backfill) and for rows whose
+# names change. The WHEN clauses are checked without calling into plpgsql.
+# Dimension rows are never deleted, so the ids carry no REFERENCES
+# constraint: the four extra RI checks per row doubled bulk-load time.
+MISSING_DIMENSION_IDS = """
+(NEW.program IS NOT NULL AND (NEW.program_id IS NULL OR NEW.university_id IS NULL))
+OR (NEW.llm_generated_program IS NOT NULL AND NEW.llm_program_id IS NULL)
+OR (NEW.llm_generated_university IS NOT NULL AND NEW.llm_university_id IS NULL)
+"""
+TRIGGER_QUERIES = [
+    """
+    CREATE OR REPLACE FUNCTION applicants_resolve_dimensions()
+    RETURNS trigger AS $$
+    BEGIN
+        -- Generated columns are not computed yet in a BEFORE trigger, so the
+        -- program split is repeated here.
+        NEW.program_id := program_dimension_id(TRIM(SPLIT_PART(NEW.program, ',', 1)));
+        NEW.university_id := university_dimension_id(TRIM(SPLIT_PART(NEW.program, ',', 2)));
+        NEW.llm_program_id := program_dimension_id(NEW.llm_generated_program);
+        NEW.llm_university_id := university_dimension_id(NEW.llm_generated_university);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_resolve_dimensions
+    BEFORE INSERT ON applicants
+    FOR EACH ROW WHEN ({missing})
+    EXECUTE FUNCTION applicants_resolve_dimensions();
+    """.format(missing=MISSING_DIMENSION_IDS),
+    """
+    CREATE OR REPLACE TRIGGER applicants_resolve_dimensions_update
+    BEFORE UPDATE OF program, llm_generated_program, llm_generated_university
+    ON applicants
+    FOR EACH ROW WHEN (
+        OLD.program IS DISTINCT FROM NEW.program
+        OR OLD.llm_generated_program IS DISTINCT FROM NEW.llm_generated_program
+        OR OLD.llm_generated_university IS DISTINCT FROM NEW.llm_generated_university
+        OR {missing}
+    )
+    EXECUTE FUNCTION applicants_resolve_dimensions();
+    """.format(missing=MISSING_DIMENSION_IDS),
+]
+
+# Common table expressions that add the names of the rows in a ``batch`` CTE
+# to the dimension tables, in sorted order so concurrent loaders take their
+# locks in the same order. The statement's snapshot cannot see the names it
+# adds, so program_ids/university_ids also take the RETURNING rows. A name
+# another session adds concurrently is in neither; its id stays NULL and
+# the trigger fills it in. Written between the ``batch`` CTE and the insert,
+# which joins the ids in with DIMENSION_JOINS.
+DIMENSION_CTES = """
+new_programs AS (
+    INSERT INTO programs (name)
+    SELECT TRIM(SPLIT_PART(program, ',', 1)) FROM batch WHERE program IS NOT NULL
+    UNION
+    SELECT llm_generated_program FROM batch WHERE llm_generated_program IS NOT NULL
+    ORDER BY 1
+    ON CONFLICT (name) DO NOTHING
+    RETURNING id, name
+),
+new_universities AS (
+    INSERT INTO universities (name)
+    SELECT TRIM(SPLIT_PART(program, ',', 2)) FROM batch WHERE program IS NOT NULL
+    UNION
+    SELECT llm_generated_university FROM batch WHERE llm_generated_university IS NOT NULL
+    ORDER BY 1
+    ON CONFLICT (name) DO NOTHING
+    RETURNING id, name
+),
+program_ids AS (
+    SELECT id, name FROM programs UNION ALL SELECT id, name FROM new_programs
+),
+university_ids AS (
+    SELECT id, name FROM universities UNION ALL SELECT id, name FROM new_universities
+)"""
+
+# Selected as program_id, university_id, llm_program_id, llm_university_id.
+DIMENSION_JOINS = """
+LEFT JOIN program_ids p ON p.name = TRIM(SPLIT_PART(batch.program, ',', 1))
+LEFT JOIN university_ids u ON u.name = TRIM(SPLIT_PART(batch.program, ',', 2))
+LEFT JOIN program_ids lp ON lp.name = batch.llm_generated_program
+LEFT JOIN university_ids lu ON lu.name = batch.llm_generated_university"""
+
+# Fingerprint of a row's scraped content, kept in content_hash by trigger on
+# every write. Upserts compare it with the stored one (BEFORE INSERT trigger
+# results are visible in EXCLUDED) and skip rows that did not change. Dates
+# are formatted explicitly so the hash does not depend on DateStyle.
+CONTENT_HASH_QUERIES = [
+    """
+    CREATE OR REPLACE FUNCTION applicant_content_hash(
+        program TEXT, comments TEXT, date_added DATE, url TEXT, status TEXT,
+        term TEXT, us_or_international TEXT, gpa FLOAT, gre FLOAT, gre_v FLOAT,
+        gre_aw FLOAT, degree TEXT, llm_generated_program TEXT,
+        llm_generated_university TEXT
+    ) RETURNS TEXT AS $$
+        SELECT md5(ROW(
+            program, comments, to_char(date_added, 'YYYY-MM-DD'), url, status, term,
+            us_or_international, gpa, gre, gre_v, gre_aw, degree,
+            llm_generated_program, llm_generated_university
+        )::text);
+    $$ LANGUAGE sql IMMUTABLE;
+    """,
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS content_hash TEXT;",
+    """
+    CREATE OR REPLACE FUNCTION applicants_set_content_hash()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.content_hash := applicant_content_hash(
+            NEW.program, NEW.comments, NEW.date_added, NEW.url, NEW.status,
+            NEW.term, NEW.us_or_international, NEW.gpa, NEW.gre, NEW.gre_v,
+            NEW.gre_aw, NEW.degree, NEW.llm_generated_program,
+            NEW.llm_generated_university
+        );
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_set_content_hash
+    BEFORE INSERT OR UPDATE OF
+        program, comments, date_added, url, status, term, us_or_international,
+        gpa, gre, gre_v, gre_aw, degree, llm_generated_program, llm_generated_university
+    ON applicants
+    FOR EACH ROW EXECUTE FUNCTION applicants_set_content_hash();
+    """,
+]
+
+# Ledger of ingest runs. Each loader opens a batch (see ingest_ledger), stamps
+# the rows it inserts or rewrites with its id and records its counts when it
+# is done, so consumers can process only what changed since a batch they have
+# seen. Like the dimension ids, ingest_batch_id has no REFERENCES constraint.
+INGEST_BATCH_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS ingest_batches (
+        id BIGSERIAL PRIMARY KEY,
+        source TEXT NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        finished_at TIMESTAMPTZ,
+        rows_received INTEGER NOT NULL DEFAULT 0,
+        rows_inserted INTEGER NOT NULL DEFAULT 0,
+        rows_updated INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS ingest_batch_id BIGINT;",
+]
+
+# "Changed since batch N" lookups (ingest_ledger.changed_since).
+INGEST_BATCH_INDEX_QUERIES = [
+    "CREATE INDEX IF NOT EXISTS applicants_ingest_batch_idx "
+    "ON applicants (ingest_batch_id);",
+]
+
+# Indexes matching the predicates used by query_data.questions.
+INDEX_QUERIES = [
+    # Q1, Q5, Q6: term filter, with status and gpa for index-only scans.
+    "CREATE INDEX IF NOT EXISTS applicants_term_status_idx "
+    "ON applicants (term, status) INCLUDE (gpa);",
+    # Q4: American applicants per term.
+    "CREATE INDEX IF NOT EXISTS applicants_term_origin_idx "
+    "ON applicants (term, us_or_international) INCLUDE (gpa);",
+    # Q7: degree + exact program string.
+    "CREATE INDEX IF NOT EXISTS applicants_degree_program_idx "
+    "ON applicants (degree, program);",
+    # Q8: accepted rows by split program name, degree and date range.
+    "CREATE INDEX IF NOT EXISTS applicants_accepted_program_idx "
+    "ON applicants (program_name, degree, date_added) INCLUDE (university_name) "
+    "WHERE status = 'Accepted';",
+    # Q9: the same question over the LLM-generated names.
+    "CREATE INDEX IF NOT EXISTS applicants_accepted_llm_program_idx "
+    "ON applicants (llm_generated_program, degree, date_added) INCLUDE (llm_generated_university) "
+    "WHERE status = 'Accepted';",
+]
+
+# /api/stats lookups (applicant_stats): institution, program, degree and
+# term filters, covering every column the statistics read.
+STATS_INDEX_QUERIES = [
+    "CREATE INDEX IF NOT EXISTS applicants_stats_idx "
+    "ON applicants (university_name, program_name, degree, term) "
+    "INCLUDE (status, us_or_international, gpa, gre, gre_v, gre_aw, date_added);",
+]
+
+# Original applicants column shape with the LLM names and split program names
+# read back from the dimension tables, for consumers that should not depend
+# on the duplicated text columns.
+VIEW_QUERIES = [
+    """
+    CREATE OR REPLACE VIEW applicants_normalized AS
+    SELECT
+        a.p_id,
+        a.program,
+        a.comments,
+        a.date_added,
+        a.url,
+        a.status,
+        a.term,
+        a.us_or_international,
+        a.gpa,
+        a.gre,
+        a.gre_v,
+        a.gre_aw,
+        a.degree,
+        lp.name AS llm_generated_program,
+        lu.name AS llm_generated_university,
+        a.program_id,
+        a.university_id,
+        a.llm_program_id,
+        a.llm_university_id,
+        p.name AS program_name,
+        u.name AS university_name
+    FROM applicants a
+    LEFT JOIN programs p ON p.id = a.program_id
+    LEFT JOIN universities u ON u.id = a.university_id
+    LEFT JOIN programs lp ON lp.id = a.llm_program_id
+    LEFT JOIN universities lu ON lu.id = a.llm_university_id;
+    """,
+]
+
+# Full DDL for a fresh database, in dependency order.
+SCHEMA_QUERIES = (
+    DIMENSION_QUERIES + [CREATE_TABLE_QUERY] + PARTITION_FUNCTION_QUERIES
+    + TRIGGER_QUERIES + CONTENT_HASH_QUERIES + INGEST_BATCH_QUERIES
+    + INDEX_QUERIES + INGEST_BATCH_INDEX_QUERIES + STATS_INDEX_QUERIES + VIEW_QUERIES + AGGREGATE_QUERIES
+    + ROLLUP_QUERIES + DATA_VERSION_QUERIES
+)
+
+# Same schema with applicants partitioned by date_added year.
+PARTITIONED_SCHEMA_QUERIES = (
+    DIMENSION_QUERIES + CREATE_PARTITIONED_TABLE_QUERIES + PARTITION_FUNCTION_QUERIES
+    + TRIGGER_QUERIES + CONTENT_HASH_QUERIES + INGEST_BATCH_QUERIES
+    + INDEX_QUERIES + INGEST_BATCH_INDEX_QUERIES + STATS_INDEX_QUERIES + VIEW_QUERIES + AGGREGATE_QUERIES
+    + ROLLUP_QUERIES + DATA_VERSION_QUERIES
+)
+
+DROP_APPLICANTS_QUERY = "DROP TABLE IF EXISTS applicants CASCADE;"
+CLEAR_APPLICANTS_QUERY = "TRUNCATE TABLE applicants;"
+
+
+def create_table(partitioned=False):
     """
     Drops and creates the 'applicants' table in the 'applicant_data' database using psycopg3.
     Uses p_id from the last part of the URL as a BIGINT primary key.
+
+    With ``partitioned`` the table is range-partitioned by ``date_added``
+    year; year partitions are then created on demand by the loaders. A
+    SQLite database gets its own schema (see ``sqlite_backend.QUERIES``)
+    and is never partitioned.
     """
     try:
-        with psycopg.connect(**get_db_connect_kwargs()) as conn:
+        with connection(get_db_connect_kwargs()) as conn:
             with conn.cursor() as cur:
-                # Step 1: Drop table if it exists
-                cur.execute("DROP TABLE IF EXISTS applicants;")
+                # Step 1: Drop table (and the views built on it) if it exists
+                cur.execute(backend_query(conn, "DROP_APPLICANTS_QUERY", DROP_APPLICANTS_QUERY))
+                schema = backend_query(
+                    conn, "SCHEMA_QUERIES", PARTITIONED_SCHEMA_QUERIES if partitioned else SCHEMA_QUERIES
+                )
                 print("Dropped existing table 'applicants' (if it existed).")
 
-                # Step 2: Create table
-                create_table_query = """
-                CREATE TABLE applicants (
-                    p_id BIGINT PRIMARY KEY,
-                    program TEXT,
-                    comments TEXT,
-                    date_added DATE,
-                    url TEXT,
-                    status TEXT,
-                    term TEXT,
-                    us_or_international TEXT,
-                    gpa FLOAT,
-                    gre FLOAT,
-                    gre_v FLOAT,
-                    gre_aw FLOAT,
-                    degree TEXT,
-                    llm_generated_program TEXT,
-                    llm_generated_university TEXT
-                );
-                """
-                cur.execute(create_table_query)
+                # Step 2: Create dimension tables, applicants and its indexes
+                for query in schema:
+                    cur.execute(query)
                 conn.commit()
                 print("Table 'applicants' created successfully (psycopg3).")
 
     except OperationalError as e:
         print("Error '{}' occurred.".format(e))
 
+
+# Shared by the full and incremental loaders so both write identical rows.
+# Parameters are a row from _entry_to_row followed by the ingest batch id.
+# SQLite runs it once per row; PostgreSQL takes INSERT_BATCH_QUERY instead.
+INSERT_QUERY = """
+INSERT INTO applicants (
+    p_id, program, comments, date_added, url, status, term,
+    us_or_international, gpa, gre, gre_v, gre_aw, degree,
+    llm_generated_program, llm_generated_university, ingest_batch_id
+) VALUES (
+    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+)
+ON CONFLICT DO NOTHING;
+"""
+
+# INSERT_QUERY for a whole batch with its dimension ids resolved set-wise.
+# Parameters are one array per INSERT_QUERY column.
+INSERT_BATCH_QUERY = """
+WITH batch AS (
+    SELECT * FROM unnest(
+        %s::bigint[], %s::text[], %s::text[], %s::date[], %s::text[],
+        %s::text[], %s::text[], %s::text[], %s::float8[], %s::float8[],
+        %s::float8[], %s::float8[], %s::text[], %s::text[], %s::text[],
+        %s::bigint[]
+    ) AS b (
+        p_id, program, comments, date_added, url, status, term,
+        us_or_international, gpa, gre, gre_v, gre_aw, degree,
+        llm_generated_program, llm_generated_university, ingest_batch_id
+    )
+),{dimensions}
+INSERT INTO applicants (
+    p_id, program, comments, date_added, url, status, term,
+    us_or_international, gpa, gre, gre_v, gre_aw, degree,
+    llm_generated_program, llm_generated_university, ingest_batch_id,
+    program_id, university_id, llm_program_id, llm_university_id
+)
+SELECT batch.*, p.id, u.id, lp.id, lu.id FROM batch{joins}
+ON CONFLICT DO NOTHING;
+""".format(dimensions=DIMENSION_CTES, joins=DIMENSION_JOINS)
+
+
+def insert_rows(cur, rows):
+    """
+    Insert ``rows`` (an ``_entry_to_row`` tuple plus the ingest batch id
+    each) on the open cursor and return how many were inserted.
+
+    Rows whose key already exists are skipped. On PostgreSQL the batch is
+    one ``INSERT_BATCH_QUERY``; SQLite runs ``INSERT_QUERY`` per row and
+    bumps the data version (see ``result_cache.bump_version``).
+    """
+    if is_sqlite(cur):
+        cur.executemany(INSERT_QUERY, rows)
+        inserted = cur.rowcount
+        if inserted > 0:
+            bump_version(cur)
+        return inserted
+    cur.execute(INSERT_BATCH_QUERY, [list(column) for column in zip(*rows)])
+    return cur.rowcount
+
+
+# Change-detecting batch write: inserts new rows, rewrites rows whose content
+# hash changed and leaves the rest untouched. Parameters are one array per
+# scraped column, then the ingest batch id. ``existing`` reads the pre-upsert
+# snapshot, so each returned row is reported as inserted or updated. New
+# rows get their dimension ids like INSERT_BATCH_QUERY; a rewritten row only
+# re-resolves them (by trigger) when its names changed. {conflict} and
+# {match} come from UPSERT_KEYS.
+UPSERT_QUERY = """
+WITH batch AS (
+    SELECT * FROM unnest(
+        %s::bigint[], %s::text[], %s::text[], %s::date[], %s::text[],
+        %s::text[], %s::text[], %s::text[], %s::float8[], %s::float8[],
+        %s::float8[], %s::float8[], %s::text[], %s::text[], %s::text[]
+    ) AS b (
+        p_id, program, comments, date_added, url, status, term,
+        us_or_international, gpa, gre, gre_v, gre_aw, degree,
+        llm_generated_program, llm_generated_university
+    )
+),{dimensions},
+existing AS (
+    SELECT p_id, date_added FROM applicants
+    WHERE p_id IN (SELECT p_id FROM batch)
+),
+upserted AS (
+    INSERT INTO applicants (
+        p_id, program, comments, date_added, url, status, term,
+        us_or_international, gpa, gre, gre_v, gre_aw, degree,
+        llm_generated_program, llm_generated_university, ingest_batch_id,
+        program_id, university_id, llm_program_id, llm_university_id
+    )
+    SELECT batch.*, %s::bigint, p.id, u.id, lp.id, lu.id FROM batch{joins}
+    ON CONFLICT ({conflict}) DO UPDATE SET
+        program = EXCLUDED.program,
+        comments = EXCLUDED.comments,
+        date_added = EXCLUDED.date_added,
+        url = EXCLUDED.url,
+        status = EXCLUDED.status,
+        term = EXCLUDED.term,
+        us_or_international = EXCLUDED.us_or_international,
+        gpa = EXCLUDED.gpa,
+        gre = EXCLUDED.gre,
+        gre_v = EXCLUDED.gre_v,
+        gre_aw = EXCLUDED.gre_aw,
+        degree = EXCLUDED.degree,
+        llm_generated_program = EXCLUDED.llm_generated_program,
+        llm_generated_university = EXCLUDED.llm_generated_university,
+        ingest_batch_id = EXCLUDED.ingest_batch_id
+    WHERE applicants.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    RETURNING p_id, date_added
+)
+SELECT NOT EXISTS (SELECT 1 FROM existing e WHERE {match}) AS inserted
+FROM upserted u;
+"""
+
+# Unique key per layout: (conflict target, existing-row match, row key).
+UPSERT_KEYS = {
+    False: ("p_id", "e.p_id = u.p_id", lambda row: row[0]),
+    True: (
+        "p_id, date_added",
+        "e.p_id = u.p_id AND e.date_added IS NOT DISTINCT FROM u.date_added",
+        lambda row: (row[0], row[3]),
+    ),
+}
+
+
+# p_ids looked up per statement when counting a SQLite upsert's existing rows.
+SQLITE_LOOKUP_BATCH = 500
+
+
+def _upsert_rows_sqlite(cur, latest, batch_id):
+    """
+    Upsert ``latest`` (``{p_id: row}``) on SQLite and return the counts.
+
+    SQLite reports one rowcount for the whole ``executemany``, so the rows
+    that already existed are counted first, in ``SQLITE_LOOKUP_BATCH``
+    chunks to stay under the parameter limit.
+    """
+    existing = 0
+    p_ids = list(latest)
+    for start in range(0, len(p_ids), SQLITE_LOOKUP_BATCH):
+        chunk = p_ids[start:start + SQLITE_LOOKUP_BATCH]
+        cur.execute(
+            "SELECT count(*) FROM applicants WHERE p_id IN ({});".format(", ".join(["%s"] * len(chunk))),
+            chunk,
+        )
+        existing += cur.fetchone()[0]
+    query = backend_query(cur, "UPSERT_QUERY", UPSERT_QUERY)
+    cur.executemany(query, [row + (batch_id,) for row in latest.values()])
+    written = cur.rowcount
+    if written > 0:
+        bump_version(cur)
+    inserted = len(latest) - existing
+    updated = written - inserted
+    return {"inserted": inserted, "updated": updated, "unchanged": existing - updated}
+
+
+def upsert_rows(cur, rows, batch_id=None):
+    """
+    Upsert ``_entry_to_row``-shaped ``rows`` in one statement on the open cursor.
+
+    When a batch repeats a key, the last row wins. Inserted and updated rows
+    are stamped with ingest batch ``batch_id``. Returns a dict with
+    ``inserted``, ``updated`` and ``unchanged`` counts; the caller commits.
+    On SQLite the rows are written one statement each.
+    """
+    if is_sqlite(cur):
+        return _upsert_rows_sqlite(cur, {row[0]: row for row in rows}, batch_id)
+    conflict, match, key = UPSERT_KEYS[is_partitioned(cur)]
+    latest = {key(row): row for row in rows}
+    if not latest:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    ensure_partitions(cur, (row[3] for row in latest.values()))
+    cur.execute(
+        UPSERT_QUERY.format(
+            conflict=conflict, match=match, dimensions=DIMENSION_CTES, joins=DIMENSION_JOINS
+        ),
+        [list(column) for column in zip(*latest.values())] + [batch_id],
+    )
+    flags = [row[0] for row in cur.fetchall()]
+    inserted = sum(flags)
+    updated = len(flags) - inserted
+    return {"inserted": inserted, "updated": updated, "unchanged": len(latest) - len(flags)}
+
+
+def _parse_p_id(url):
+    """Return the numeric GradCafe id at the end of ``url`` or None."""
+    if url and "/" in url:
+        try:
+            return int(url.rstrip("/").split("/")[-1])
+        except ValueError:
+            return None
+    return None
+
+
+def _entry_to_row(entry):
+    """
+    Convert one baseline JSON entry into an ``applicants`` insert tuple.
+
+    Returns None when the entry has no usable p_id in its URL.
+    """
+    # Extract p_id from URL
+    url = entry.get("url")
+    p_id = _parse_p_id(url)
+    if p_id is None:
+        return None
+
+    # Convert date safely
+    date_val = None
+    if entry.get("date_added"):
+        try:
+            date_val = datetime.strptime(entry["date_added"], "%B %d, %Y").date()
+        except ValueError:
+            date_val = None
+
+    # Convert numeric fields safely
+    gpa = float(entry.get("GPA")) if entry.get("GPA") else None
+    gre = float(entry.get("GRE Score")) if entry.get("GRE Score") else None
+    gre_v = float(entry.get("GRE V Score")) if entry.get("GRE V Score") else None
+    gre_aw = float(entry.get("GRE AW Score")) if entry.get("GRE AW Score") else None
+
+    return (
+        p_id,
+        entry.get("program", ""),
+        entry.get("comments"),
+        date_val,
+        url,
+        entry.get("status"),
+        entry.get("term"),
+        entry.get("US/International"),
+        gpa,
+        gre,
+        gre_v,
+        gre_aw,
+        entry.get("Degree"),
+        entry.get("llm-generated-program"),
+        entry.get("llm-generated-university")
+    )
+
+
 def bulk_insert_json(json_file_path, batch_size=1000):
     """
     Bulk inserts JSON Lines data into the 'applicants' table using psycopg3.
@@ -86,89 +784,39 @@ def bulk_insert_json(json_file_path, batch_size=1000):
     Prints the number of duplicates skipped.
     """
     try:
-        with psycopg.connect(**get_db_connect_kwargs()) as conn:
+        with connection(get_db_connect_kwargs()) as conn:
             with conn.cursor() as cur:
 
-                # Step 1: Clear existing data
-                cur.execute("TRUNCATE TABLE applicants;")
+                # Step 1: Clear existing data and open the ingest batch
+                cur.execute(backend_query(conn, "CLEAR_APPLICANTS_QUERY", CLEAR_APPLICANTS_QUERY))
+                if is_sqlite(conn):
+                    bump_version(cur)
+                batch_id = begin_batch(cur, "bulk_load")
                 conn.commit()
                 print("Existing data deleted from 'applicants' table.")
 
-                # Step 2: Prepare insert query with conflict handling
-                insert_query = """
-                INSERT INTO applicants (
-                    p_id, program, comments, date_added, url, status, term,
-                    us_or_international, gpa, gre, gre_v, gre_aw, degree,
-                    llm_generated_program, llm_generated_university
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                ON CONFLICT (p_id) DO NOTHING;
-                """
-
                 batch = []
                 count_inserted = 0
                 count_duplicates = 0
 
-                # Step 3: Read JSON Lines file and populate batches
+                # Step 2: Read JSON Lines file and populate batches
                 with open(json_file_path, "r") as f:
                     for line in f:
                         line = line.strip()
                         if not line:
                             continue
 
-                        entry = json.loads(line)
-
-                        # Extract p_id from URL
-                        p_id = None
-                        url = entry.get("url")
-                        if url and "/" in url:
-                            try:
-                                p_id = int(url.rstrip("/").split("/")[-1])
-                            except ValueError:
-                                p_id = None
-
-                        if p_id is None:
+                        row = _entry_to_row(json.loads(line))
+                        if row is None:
                             continue  # skip rows with invalid/missing URL
 
-                        # Convert date safely
-                        date_val = None
-                        if entry.get("date_added"):
-                            try:
-                                date_val = datetime.strptime(entry["date_added"], "%B %d, %Y").date()
-                            except ValueError:
-                                date_val = None
-
-                        # Convert numeric fields safely
-                        gpa = float(entry.get("GPA")) if entry.get("GPA") else None
-                        gre = float(entry.get("GRE Score")) if entry.get("GRE Score") else None
-                        gre_v = float(entry.get("GRE V Score")) if entry.get("GRE V Score") else None
-                        gre_aw = float(entry.get("GRE AW Score")) if entry.get("GRE AW Score") else None
-
-                        program_field = entry.get("program", "")
-
                         # Add row to batch
-                        batch.append((
-                            p_id,
-                            program_field,
-                            entry.get("comments"),
-                            date_val,
-                            url,
-                            entry.get("status"),
-                            entry.get("term"),
-                            entry.get("US/International"),
-                            gpa,
-                            gre,
-                            gre_v,
-                            gre_aw,
-                            entry.get("Degree"),
-                            entry.get("llm-generated-program"),
-                            entry.get("llm-generated-university")
-                        ))
+                        batch.append(row + (batch_id,))
 
                         # Insert batch if size reached
                         if len(batch) >= batch_size:
-                            cur.executemany(insert_query, batch)
+                            ensure_partitions(cur, (r[3] for r in batch))
+                            insert_rows(cur, batch)
                             conn.commit()
 
                             # Count inserted vs duplicates
@@ -184,7 +832,8 @@ def bulk_insert_json(json_file_path, batch_size=1000):
 
                 # Insert any remaining rows
                 if batch:
-                    cur.executemany(insert_query, batch)
+                    ensure_partitions(cur, (r[3] for r in batch))
+                    insert_rows(cur, batch)
                     conn.commit()
 
                     for row in batch:
@@ -195,21 +844,265 @@ def bulk_insert_json(json_file_path, batch_size=1000):
                             count_duplicates += 1
                     print("'{}' records inserted in total.".format(count_inserted))
 
+                finish_batch(cur, batch_id, count_inserted + count_duplicates, count_inserted)
+                conn.commit()
                 print("Number of duplicates skipped: '{}'".format(count_duplicates))
 
         print("All records inserted successfully!")
 
     except OperationalError as e:
         print("Error '{}' occurred.".format(e))
+
+# -------------------- Incremental load --------------------
+# Sidecar file (next to the JSONL) recording how far a previous run got.
+STATE_SUFFIX = ".ingest_state.json"
+# Bytes before the saved offset that must still match for a resume to be safe.
+CHECKSUM_WINDOW = 4096
+
+
+def _state_path_for(json_file_path):
+    """Return the default ingest-state sidecar path for ``json_file_path``."""
+    return str(json_file_path) + STATE_SUFFIX
+
+
+def _read_state(state_path):
+    """Load saved ingest state, or None if it is missing or unreadable."""
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(state_path, offset, checksum):
+    """Persist the byte offset and window checksum of ingested data."""
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"offset": offset, "checksum": checksum}, f)
+    os.replace(tmp_path, state_path)
+
+
+def _window_checksum(mm, offset):
+    """SHA-256 of the ``CHECKSUM_WINDOW`` bytes that end at ``offset``."""
+    return hashlib.sha256(mm[max(0, offset - CHECKSUM_WINDOW):offset]).hexdigest()
+
+
+def _resume_offset(mm, state):
+    """
+    Return the saved offset if it still describes a prefix of ``mm``.
+
+    A rewritten or truncated file fails the checksum and returns None, so the
+    caller falls back to a p_id search or a full scan.
+    """
+    if not state:
+        return None
+    offset = state.get("offset")
+    if not isinstance(offset, int) or offset < 0 or offset > len(mm):
+        return None
+    if _window_checksum(mm, offset) != state.get("checksum"):
+        return None
+    return offset
+
+
+def _line_start_at_or_after(mm, pos):
+    """Return the offset of the first line starting at or after ``pos``."""
+    if pos <= 0:
+        return 0
+    newline = mm.find(b"\n", pos - 1)
+    return len(mm) if newline == -1 else newline + 1
+
+
+def _line_p_id(line):
+    """Parse the p_id out of one raw JSONL line, or None if it has none."""
+    try:
+        return _parse_p_id(json.loads(line).get("url"))
+    except ValueError:
+        return None
+
+
+def find_offset_after_p_id(mm, max_p_id):
+    """
+    Binary-search a p_id-sorted JSONL buffer for the first row above ``max_p_id``.
+
+    Returns the byte offset of that row's line, or ``len(mm)`` when every row
+    is already at or below ``max_p_id``. Lines without a p_id are skipped.
+    """
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = _line_start_at_or_after(mm, mid)
+        if start >= hi:
+            # No line begins in [mid, hi); the answer is left of mid.
+            hi = mid
+            continue
+        end = mm.find(b"\n", start)
+        end = len(mm) if end == -1 else end
+        p_id = _line_p_id(mm[start:end])
+        if p_id is None or p_id <= max_p_id:
+            lo = end + 1
+        else:
+            hi = mid
+    return _line_start_at_or_after(mm, lo)
+
+
+def incremental_load_json(json_file_path, batch_size=1000, state_path=None, sorted_by_p_id=False):
+    """
+    Append only the unseen tail of a JSON Lines file to ``applicants``.
+
+    The table is not truncated. The byte offset reached by the last run and a
+    checksum of the bytes just before it are kept in a sidecar state file; if
+    the checksum still matches, reading resumes at that offset. Otherwise, when
+    ``sorted_by_p_id`` is True, the memory-mapped file is binary-searched for
+    the first row above ``MAX(p_id)``; failing both (or when the table is
+    empty), the whole file is scanned and existing rows are skipped by
+    ``ON CONFLICT``.
+
+    Returns the number of rows inserted, or None on a database error.
+    """
+    state_path = state_path or _state_path_for(json_file_path)
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                with open(json_file_path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        print("No records to load from '{}'.".format(json_file_path))
+                        return 0
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        # An empty table (e.g. after create_table) always
+                        # reloads from the start, whatever the state says.
+                        cur.execute("SELECT MAX(p_id) FROM applicants;")
+                        max_p_id = cur.fetchone()[0]
+                        offset = None
+                        if max_p_id is not None:
+                            offset = _resume_offset(mm, _read_state(state_path))
+                            if offset is None and sorted_by_p_id:
+                                offset = find_offset_after_p_id(mm, max_p_id)
+                        offset = offset or 0
+                        batch_id = begin_batch(cur, "incremental_load")
+                        conn.commit()
+
+                        batch = []
+                        count_received = 0
+                        count_inserted = 0
+                        pos = offset
+                        while pos < len(mm):
+                            end = mm.find(b"\n", pos)
+                            complete = end != -1
+                            end = end if complete else len(mm)
+                            line = mm[pos:end].strip()
+                            if line:
+                                try:
+                                    entry = json.loads(line)
+                                except ValueError:
+                                    if not complete:
+                                        break  # partially written last line
+                                    raise
+                                row = _entry_to_row(entry)
+                                if row is not None:
+                                    batch.append(row + (batch_id,))
+                                    count_received += 1
+                            pos = end + 1 if complete else end
+
+                            if len(batch) >= batch_size:
+                                ensure_partitions(cur, (r[3] for r in batch))
+                                count_inserted += insert_rows(cur, batch)
+                                conn.commit()
+                                _write_state(state_path, pos, _window_checksum(mm, pos))
+                                batch = []
+
+                        if batch:
+                            ensure_partitions(cur, (r[3] for r in batch))
+                            count_inserted += insert_rows(cur, batch)
+                        finish_batch(cur, batch_id, count_received, count_inserted)
+                        conn.commit()
+                        _write_state(state_path, pos, _window_checksum(mm, pos))
+
+        print("'{}' new records inserted from offset {}.".format(count_inserted, offset))
+        return count_inserted
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def upsert_json(json_file_path, batch_size=1000):
+    """
+    Upsert a JSON Lines file into ``applicants`` without truncating it.
+
+    New rows are inserted, rows whose content changed since they were
+    stored are updated, and identical rows are not rewritten (see
+    ``upsert_rows``). Returns the summed counts dict, or None on a
+    database error.
+    """
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                batch_id = begin_batch(cur, "upsert_load")
+                conn.commit()
+                batch = []
+                with open(json_file_path, "r") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        row = _entry_to_row(json.loads(line))
+                        if row is not None:
+                            batch.append(row)
+                        if len(batch) >= batch_size:
+                            for name, count in upsert_rows(cur, batch, batch_id).items():
+                                totals[name] += count
+                            conn.commit()
+                            batch = []
+
+                for name, count in upsert_rows(cur, batch, batch_id).items():
+                    totals[name] += count
+                finish_batch(cur, batch_id, sum(totals.values()), totals["inserted"], totals["updated"])
+                conn.commit()
+
+        print(
+            "'{inserted}' inserted, '{updated}' updated, '{unchanged}' unchanged.".format(**totals)
+        )
+        return totals
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
 dirname = os.path.dirname(__file__)
 filename = os.path.join(dirname, 'module_2/llm_extend_applicant_data.json')
 
 
-def main():
-    """CLI entrypoint for local schema initialization and baseline load."""
-    create_table()
+def main(incremental=False, sorted_by_p_id=False, upgrade=False, partitioned=False, upsert=False):
+    """
+    CLI entrypoint for local schema initialization and baseline load.
+
+    With ``incremental`` the existing table is kept and only new rows of the
+    baseline file are loaded (see ``incremental_load_json``). ``upgrade``
+    only applies pending schema migrations (see ``migrations.migrate``). ``partitioned``
+    recreates the table partitioned by ``date_added`` year. ``upsert``
+    keeps the table and picks up edited rows (see ``upsert_json``).
+    """
+    if upgrade:
+        from migrations import migrate
+        migrate()
+        return
+    if incremental:
+        incremental_load_json(filename, sorted_by_p_id=sorted_by_p_id)
+        return
+    if upsert:
+        upsert_json(filename)
+        return
+    create_table(partitioned=partitioned)
     bulk_insert_json(filename)
 
 
 if __name__ == "__main__":
-    main()
+    main(
+        incremental="--incremental" in sys.argv[1:],
+        sorted_by_p_id="--sorted" in sys.argv[1:],
+        upgrade="--upgrade-schema" in sys.argv[1:],
+        partitioned="--partitioned" in sys.argv[1:],
+        upsert="--upsert" in sys.argv[1:],
+    )
@@ -0,0 +1,1140 @@
+"""Versioned, in-place schema migrations for the applicants database."""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import psycopg
+from psycopg import OperationalError
+from psycopg.sql import SQL, Identifier
+from db_config import get_db_connect_kwargs
+from partitions import is_partitioned
+
+MIGRATIONS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# Held for the whole run so two deploys cannot interleave migrations.
+ADVISORY_LOCK_QUERY = "SELECT pg_advisory_lock(hashtext('schema_migrations'));"
+
+# Ordered schema changes. Append new entries; never edit an applied one.
+# The SQL is written out here rather than taken from load_data and the other
+# modules, so it stays what databases already upgraded ran. A changed
+# function, trigger, view or index there needs a new entry; the tests check
+# that the latest definitions here match create_table's.
+#
+# - statements: idempotent DDL (IF NOT EXISTS / OR REPLACE), because
+#   create_table already builds the latest schema and a fresh database only
+#   records the versions. New columns also go into load_data's CREATE TABLE.
+#   Non-concurrent statements run in one transaction.
+# - concurrent: statements are CREATE INDEX CONCURRENTLY and run outside a
+#   transaction so writers are not blocked while the index builds.
+# - backfill: an UPDATE with a single LIMIT %s placeholder, repeated and
+#   committed batch by batch until it touches no rows.
+# - offline: the statements block writers (not readers) for a full scan of
+#   applicants. migrate stops before such a migration unless it is run with
+#   offline=True (``migrations.py --offline``) while the writers are stopped.
+#
+# Statements that add nullable columns or create triggers lock applicants
+# only for a catalog change; docs/source/operational_notes.rst lists the lock
+# each migration takes.
+MIGRATIONS = [
+    {
+        "version": 1,
+        "description": "split name columns, dimension tables and ids",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS programs (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS universities (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );
+            """,
+            """
+            CREATE OR REPLACE FUNCTION program_dimension_id(program_name TEXT)
+            RETURNS INTEGER AS $$
+            DECLARE
+                result INTEGER;
+            BEGIN
+                IF program_name IS NULL THEN
+                    RETURN NULL;
+                END IF;
+                SELECT id INTO result FROM programs WHERE name = program_name;
+                IF result IS NULL THEN
+                    INSERT INTO programs (name) VALUES (program_name)
+                    ON CONFLICT (name) DO NOTHING
+                    RETURNING id INTO result;
+                END IF;
+                IF result IS NULL THEN
+                    -- Another session inserted the same name concurrently.
+                    SELECT id INTO result FROM programs WHERE name = program_name;
+                END IF;
+                RETURN result;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE FUNCTION university_dimension_id(university_name TEXT)
+            RETURNS INTEGER AS $$
+            DECLARE
+                result INTEGER;
+            BEGIN
+                IF university_name IS NULL THEN
+                    RETURN NULL;
+                END IF;
+                SELECT id INTO result FROM universities WHERE name = university_name;
+                IF result IS NULL THEN
+                    INSERT INTO universities (name) VALUES (university_name)
+                    ON CONFLICT (name) DO NOTHING
+                    RETURNING id INTO result;
+                END IF;
+                IF result IS NULL THEN
+                    -- Another session inserted the same name concurrently.
+                    SELECT id INTO result FROM universities WHERE name = university_name;
+                END IF;
+                RETURN result;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS program_name TEXT;",
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS university_name TEXT;",
+            """
+            CREATE OR REPLACE FUNCTION applicants_split_program()
+            RETURNS trigger AS $$
+            BEGIN
+                NEW.program_name := TRIM(SPLIT_PART(NEW.program, ',', 1));
+                NEW.university_name := TRIM(SPLIT_PART(NEW.program, ',', 2));
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM pg_attribute
+                    WHERE attrelid = 'applicants'::regclass AND attname = 'program_name'
+                      AND attgenerated = ''
+                ) THEN
+                    CREATE OR REPLACE TRIGGER applicants_split_program
+                    BEFORE INSERT OR UPDATE OF program ON applicants
+                    FOR EACH ROW EXECUTE FUNCTION applicants_split_program();
+                END IF;
+            END;
+            $$;
+            """,
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS program_id INTEGER;",
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS university_id INTEGER;",
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS llm_program_id INTEGER;",
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS llm_university_id INTEGER;",
+            """
+            CREATE OR REPLACE FUNCTION applicants_resolve_dimensions()
+            RETURNS trigger AS $$
+            BEGIN
+                -- Generated columns are not computed yet in a BEFORE trigger, so the
+                -- program split is repeated here.
+                NEW.program_id := program_dimension_id(TRIM(SPLIT_PART(NEW.program, ',', 1)));
+                NEW.university_id := university_dimension_id(TRIM(SPLIT_PART(NEW.program, ',', 2)));
+                NEW.llm_program_id := program_dimension_id(NEW.llm_generated_program);
+                NEW.llm_university_id := university_dimension_id(NEW.llm_generated_university);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_resolve_dimensions
+            BEFORE INSERT OR UPDATE OF program, llm_generated_program, llm_generated_university
+            ON applicants
+            FOR EACH ROW EXECUTE FUNCTION applicants_resolve_dimensions();
+            """,
+            """
+            CREATE OR REPLACE VIEW applicants_normalized AS
+            SELECT
+                a.p_id,
+                a.program,
+                a.comments,
+                a.date_added,
+                a.url,
+                a.status,
+                a.term,
+                a.us_or_international,
+                a.gpa,
+                a.gre,
+                a.gre_v,
+                a.gre_aw,
+                a.degree,
+                lp.name AS llm_generated_program,
+                lu.name AS llm_generated_university,
+                a.program_id,
+                a.university_id,
+                a.llm_program_id,
+                a.llm_university_id,
+                p.name AS program_name,
+                u.name AS university_name
+            FROM applicants a
+            LEFT JOIN programs p ON p.id = a.program_id
+            LEFT JOIN universities u ON u.id = a.university_id
+            LEFT JOIN programs lp ON lp.id = a.llm_program_id
+            LEFT JOIN universities lu ON lu.id = a.llm_university_id;
+            """,
+        ],
+        "backfill": """
+        UPDATE applicants SET program = program
+        WHERE p_id IN (
+            SELECT p_id FROM applicants
+            WHERE (program IS NOT NULL AND (program_id IS NULL OR university_id IS NULL))
+               OR (llm_generated_program IS NOT NULL AND llm_program_id IS NULL)
+               OR (llm_generated_university IS NOT NULL AND llm_university_id IS NULL)
+            LIMIT %s
+        );
+        """,
+    },
+    {
+        "version": 2,
+        "description": "analysis indexes",
+        "statements": [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_term_status_idx "
+            "ON applicants (term, status) INCLUDE (gpa);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_term_origin_idx "
+            "ON applicants (term, us_or_international) INCLUDE (gpa);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_degree_program_idx "
+            "ON applicants (degree, program);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_accepted_program_idx "
+            "ON applicants (program_name, degree, date_added) INCLUDE (university_name) WHERE status = 'Accepted';",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_accepted_llm_program_idx "
+            "ON applicants (llm_generated_program, degree, date_added) INCLUDE (llm_generated_university) WHERE status = 'Accepted';",
+        ],
+        "concurrent": True,
+    },
+    {
+        "version": 3,
+        "description": "year partition helper",
+        "statements": [
+            """
+            CREATE OR REPLACE FUNCTION ensure_applicant_partitions(dates DATE[])
+            RETURNS INTEGER AS $$
+            DECLARE
+                partition_year INTEGER;
+                partition_name TEXT;
+                created INTEGER := 0;
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'applicants'::regclass
+                ) THEN
+                    RETURN 0;
+                END IF;
+                FOR partition_year IN
+                    SELECT DISTINCT EXTRACT(YEAR FROM d)::INTEGER
+                    FROM unnest(dates) AS d
+                    WHERE d IS NOT NULL
+                LOOP
+                    partition_name := 'applicants_y' || partition_year;
+                    IF to_regclass(partition_name) IS NULL THEN
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF applicants FOR VALUES FROM (%L) TO (%L)',
+                            partition_name,
+                            make_date(partition_year, 1, 1),
+                            make_date(partition_year + 1, 1, 1)
+                        );
+                        created := created + 1;
+                    END IF;
+                END LOOP;
+                RETURN created;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+        ],
+    },
+    {
+        "version": 4,
+        "description": "content hash for change-detecting upserts",
+        "statements": [
+            """
+            CREATE OR REPLACE FUNCTION applicant_content_hash(
+                program TEXT, comments TEXT, date_added DATE, url TEXT, status TEXT,
+                term TEXT, us_or_international TEXT, gpa FLOAT, gre FLOAT, gre_v FLOAT,
+                gre_aw FLOAT, degree TEXT, llm_generated_program TEXT,
+                llm_generated_university TEXT
+            ) RETURNS TEXT AS $$
+                SELECT md5(ROW(
+                    program, comments, to_char(date_added, 'YYYY-MM-DD'), url, status, term,
+                    us_or_international, gpa, gre, gre_v, gre_aw, degree,
+                    llm_generated_program, llm_generated_university
+                )::text);
+            $$ LANGUAGE sql IMMUTABLE;
+            """,
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS content_hash TEXT;",
+            """
+            CREATE OR REPLACE FUNCTION applicants_set_content_hash()
+            RETURNS trigger AS $$
+            BEGIN
+                NEW.content_hash := applicant_content_hash(
+                    NEW.program, NEW.comments, NEW.date_added, NEW.url, NEW.status,
+                    NEW.term, NEW.us_or_international, NEW.gpa, NEW.gre, NEW.gre_v,
+                    NEW.gre_aw, NEW.degree, NEW.llm_generated_program,
+                    NEW.llm_generated_university
+                );
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_set_content_hash
+            BEFORE INSERT OR UPDATE OF
+                program, comments, date_added, url, status, term, us_or_international,
+                gpa, gre, gre_v, gre_aw, degree, llm_generated_program, llm_generated_university
+            ON applicants
+            FOR EACH ROW EXECUTE FUNCTION applicants_set_content_hash();
+            """,
+        ],
+        "backfill": """
+        UPDATE applicants SET content_hash = applicant_content_hash(
+            program, comments, date_added, url, status, term, us_or_international,
+            gpa, gre, gre_v, gre_aw, degree, llm_generated_program, llm_generated_university
+        )
+        WHERE p_id IN (
+            SELECT p_id FROM applicants WHERE content_hash IS NULL LIMIT %s
+        );
+        """,
+    },
+    {
+        "version": 5,
+        "description": "ingest batch ledger and applicants.ingest_batch_id",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS ingest_batches (
+                id BIGSERIAL PRIMARY KEY,
+                source TEXT NOT NULL,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                finished_at TIMESTAMPTZ,
+                rows_received INTEGER NOT NULL DEFAULT 0,
+                rows_inserted INTEGER NOT NULL DEFAULT 0,
+                rows_updated INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            "ALTER TABLE applicants ADD COLUMN IF NOT EXISTS ingest_batch_id BIGINT;",
+        ],
+    },
+    {
+        "version": 6,
+        "description": "ingest batch index",
+        "statements": [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_ingest_batch_idx "
+            "ON applicants (ingest_batch_id);",
+        ],
+        "concurrent": True,
+    },
+    {
+        "version": 7,
+        "description": "versioned analysis answers behind the answers_table view",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS analysis_versions (
+                version BIGSERIAL PRIMARY KEY,
+                computed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS analysis_answers (
+                version BIGINT NOT NULL,
+                position INTEGER NOT NULL,
+                question TEXT,
+                answer TEXT,
+                PRIMARY KEY (version, position)
+            );
+            """,
+            """
+            DO $$
+            DECLARE
+                first_version BIGINT;
+            BEGIN
+                IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('answers_table')) = 'r' THEN
+                    INSERT INTO analysis_versions DEFAULT VALUES RETURNING version INTO first_version;
+                    INSERT INTO analysis_answers (version, position, question, answer)
+                    SELECT first_version, row_number() OVER (), question, answer FROM answers_table;
+                    DROP TABLE answers_table;
+                END IF;
+            END
+            $$;
+            """,
+            """
+            CREATE OR REPLACE VIEW answers_table AS
+            SELECT question, answer
+            FROM analysis_answers
+            WHERE version = (SELECT max(version) FROM analysis_versions)
+            ORDER BY position;
+            """,
+        ],
+    },
+    {
+        "version": 8,
+        "description": "running analysis aggregates maintained by triggers",
+        # Writers wait from the lock until the totals are built and committed,
+        # so no row is counted twice or missed.
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS analysis_aggregates (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                entries BIGINT NOT NULL DEFAULT 0,
+                fall_2026 BIGINT NOT NULL DEFAULT 0,
+                international BIGINT NOT NULL DEFAULT 0,
+                gpa_sum NUMERIC NOT NULL DEFAULT 0,
+                gpa_count BIGINT NOT NULL DEFAULT 0,
+                gre_sum NUMERIC NOT NULL DEFAULT 0,
+                gre_count BIGINT NOT NULL DEFAULT 0,
+                gre_v_sum NUMERIC NOT NULL DEFAULT 0,
+                gre_v_count BIGINT NOT NULL DEFAULT 0,
+                gre_aw_sum NUMERIC NOT NULL DEFAULT 0,
+                gre_aw_count BIGINT NOT NULL DEFAULT 0,
+                american_fall_2026_gpa_sum NUMERIC NOT NULL DEFAULT 0,
+                american_fall_2026_gpa_count BIGINT NOT NULL DEFAULT 0,
+                fall_2026_accepted BIGINT NOT NULL DEFAULT 0,
+                accepted_fall_2026_gpa_sum NUMERIC NOT NULL DEFAULT 0,
+                accepted_fall_2026_gpa_count BIGINT NOT NULL DEFAULT 0,
+                jhu_cs_masters BIGINT NOT NULL DEFAULT 0,
+                phd_cs_accepted_2026 BIGINT NOT NULL DEFAULT 0,
+                phd_cs_accepted_2026_llm BIGINT NOT NULL DEFAULT 0
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS analysis_distinct_values (
+                dimension TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                occurrences BIGINT NOT NULL,
+                PRIMARY KEY (dimension, value)
+            );
+            """,
+            "LOCK TABLE applicants IN SHARE MODE;",
+            """
+            CREATE OR REPLACE FUNCTION applicants_aggregates_insert()
+            RETURNS trigger AS $$
+            BEGIN
+                UPDATE analysis_aggregates AS totals
+                SET entries = totals.entries + delta.entries,
+                    fall_2026 = totals.fall_2026 + delta.fall_2026,
+                    international = totals.international + delta.international,
+                    gpa_sum = totals.gpa_sum + delta.gpa_sum,
+                    gpa_count = totals.gpa_count + delta.gpa_count,
+                    gre_sum = totals.gre_sum + delta.gre_sum,
+                    gre_count = totals.gre_count + delta.gre_count,
+                    gre_v_sum = totals.gre_v_sum + delta.gre_v_sum,
+                    gre_v_count = totals.gre_v_count + delta.gre_v_count,
+                    gre_aw_sum = totals.gre_aw_sum + delta.gre_aw_sum,
+                    gre_aw_count = totals.gre_aw_count + delta.gre_aw_count,
+                    american_fall_2026_gpa_sum = totals.american_fall_2026_gpa_sum + delta.american_fall_2026_gpa_sum,
+                    american_fall_2026_gpa_count = totals.american_fall_2026_gpa_count + delta.american_fall_2026_gpa_count,
+                    fall_2026_accepted = totals.fall_2026_accepted + delta.fall_2026_accepted,
+                    accepted_fall_2026_gpa_sum = totals.accepted_fall_2026_gpa_sum + delta.accepted_fall_2026_gpa_sum,
+                    accepted_fall_2026_gpa_count = totals.accepted_fall_2026_gpa_count + delta.accepted_fall_2026_gpa_count,
+                    jhu_cs_masters = totals.jhu_cs_masters + delta.jhu_cs_masters,
+                    phd_cs_accepted_2026 = totals.phd_cs_accepted_2026 + delta.phd_cs_accepted_2026,
+                    phd_cs_accepted_2026_llm = totals.phd_cs_accepted_2026_llm + delta.phd_cs_accepted_2026_llm
+                FROM (
+                    SELECT
+                        COUNT(*) AS changed_rows,
+                        COALESCE(SUM(changed.sign), 0) AS entries,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026'), 0) AS fall_2026,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international NOT IN ('American', 'Other')), 0) AS international,
+                        COALESCE(SUM(changed.sign * gpa::numeric), 0) AS gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0) AS gpa_count,
+                        COALESCE(SUM(changed.sign * gre::numeric), 0) AS gre_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre IS NOT NULL), 0) AS gre_count,
+                        COALESCE(SUM(changed.sign * gre_v::numeric), 0) AS gre_v_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre_v IS NOT NULL), 0) AS gre_v_count,
+                        COALESCE(SUM(changed.sign * gre_aw::numeric), 0) AS gre_aw_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre_aw IS NOT NULL), 0) AS gre_aw_count,
+                        COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026'), 0) AS american_fall_2026_gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS american_fall_2026_gpa_count,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted'), 0) AS fall_2026_accepted,
+                        COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026'), 0) AS accepted_fall_2026_gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS accepted_fall_2026_gpa_count,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE degree = 'Masters' AND program = 'Computer Science, Johns Hopkins University'), 0) AS jhu_cs_masters,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                        AND degree = 'PhD'
+                        AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+                        AND program_name = 'Computer Science'), 0) AS phd_cs_accepted_2026,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                        AND degree = 'PhD'
+                        AND llm_generated_program = 'Computer Science'
+                        AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')), 0) AS phd_cs_accepted_2026_llm
+                    FROM (SELECT 1 AS sign, * FROM new_rows) AS changed
+                ) AS delta
+                WHERE delta.changed_rows > 0;
+
+                INSERT INTO analysis_distinct_values (dimension, value, occurrences)
+                SELECT dims.dimension, dims.value, SUM(changed.sign)
+                FROM (SELECT 1 AS sign, * FROM new_rows) AS changed
+                CROSS JOIN LATERAL (VALUES ('program_id', changed.program_id), ('university_id', changed.university_id), ('llm_program_id', changed.llm_program_id), ('llm_university_id', changed.llm_university_id)) AS dims (dimension, value)
+                WHERE dims.value IS NOT NULL
+                GROUP BY dims.dimension, dims.value
+                HAVING SUM(changed.sign) <> 0
+                ON CONFLICT (dimension, value) DO UPDATE
+                SET occurrences = analysis_distinct_values.occurrences + EXCLUDED.occurrences;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_aggregates_insert
+            AFTER INSERT ON applicants
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_aggregates_insert();
+            """,
+            """
+            CREATE OR REPLACE FUNCTION applicants_aggregates_delete()
+            RETURNS trigger AS $$
+            BEGIN
+                UPDATE analysis_aggregates AS totals
+                SET entries = totals.entries + delta.entries,
+                    fall_2026 = totals.fall_2026 + delta.fall_2026,
+                    international = totals.international + delta.international,
+                    gpa_sum = totals.gpa_sum + delta.gpa_sum,
+                    gpa_count = totals.gpa_count + delta.gpa_count,
+                    gre_sum = totals.gre_sum + delta.gre_sum,
+                    gre_count = totals.gre_count + delta.gre_count,
+                    gre_v_sum = totals.gre_v_sum + delta.gre_v_sum,
+                    gre_v_count = totals.gre_v_count + delta.gre_v_count,
+                    gre_aw_sum = totals.gre_aw_sum + delta.gre_aw_sum,
+                    gre_aw_count = totals.gre_aw_count + delta.gre_aw_count,
+                    american_fall_2026_gpa_sum = totals.american_fall_2026_gpa_sum + delta.american_fall_2026_gpa_sum,
+                    american_fall_2026_gpa_count = totals.american_fall_2026_gpa_count + delta.american_fall_2026_gpa_count,
+                    fall_2026_accepted = totals.fall_2026_accepted + delta.fall_2026_accepted,
+                    accepted_fall_2026_gpa_sum = totals.accepted_fall_2026_gpa_sum + delta.accepted_fall_2026_gpa_sum,
+                    accepted_fall_2026_gpa_count = totals.accepted_fall_2026_gpa_count + delta.accepted_fall_2026_gpa_count,
+                    jhu_cs_masters = totals.jhu_cs_masters + delta.jhu_cs_masters,
+                    phd_cs_accepted_2026 = totals.phd_cs_accepted_2026 + delta.phd_cs_accepted_2026,
+                    phd_cs_accepted_2026_llm = totals.phd_cs_accepted_2026_llm + delta.phd_cs_accepted_2026_llm
+                FROM (
+                    SELECT
+                        COUNT(*) AS changed_rows,
+                        COALESCE(SUM(changed.sign), 0) AS entries,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026'), 0) AS fall_2026,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international NOT IN ('American', 'Other')), 0) AS international,
+                        COALESCE(SUM(changed.sign * gpa::numeric), 0) AS gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0) AS gpa_count,
+                        COALESCE(SUM(changed.sign * gre::numeric), 0) AS gre_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre IS NOT NULL), 0) AS gre_count,
+                        COALESCE(SUM(changed.sign * gre_v::numeric), 0) AS gre_v_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre_v IS NOT NULL), 0) AS gre_v_count,
+                        COALESCE(SUM(changed.sign * gre_aw::numeric), 0) AS gre_aw_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre_aw IS NOT NULL), 0) AS gre_aw_count,
+                        COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026'), 0) AS american_fall_2026_gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS american_fall_2026_gpa_count,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted'), 0) AS fall_2026_accepted,
+                        COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026'), 0) AS accepted_fall_2026_gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS accepted_fall_2026_gpa_count,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE degree = 'Masters' AND program = 'Computer Science, Johns Hopkins University'), 0) AS jhu_cs_masters,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                        AND degree = 'PhD'
+                        AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+                        AND program_name = 'Computer Science'), 0) AS phd_cs_accepted_2026,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                        AND degree = 'PhD'
+                        AND llm_generated_program = 'Computer Science'
+                        AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')), 0) AS phd_cs_accepted_2026_llm
+                    FROM (SELECT -1 AS sign, * FROM old_rows) AS changed
+                ) AS delta
+                WHERE delta.changed_rows > 0;
+
+                INSERT INTO analysis_distinct_values (dimension, value, occurrences)
+                SELECT dims.dimension, dims.value, SUM(changed.sign)
+                FROM (SELECT -1 AS sign, * FROM old_rows) AS changed
+                CROSS JOIN LATERAL (VALUES ('program_id', changed.program_id), ('university_id', changed.university_id), ('llm_program_id', changed.llm_program_id), ('llm_university_id', changed.llm_university_id)) AS dims (dimension, value)
+                WHERE dims.value IS NOT NULL
+                GROUP BY dims.dimension, dims.value
+                HAVING SUM(changed.sign) <> 0
+                ON CONFLICT (dimension, value) DO UPDATE
+                SET occurrences = analysis_distinct_values.occurrences + EXCLUDED.occurrences;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_aggregates_delete
+            AFTER DELETE ON applicants
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_aggregates_delete();
+            """,
+            """
+            CREATE OR REPLACE FUNCTION applicants_aggregates_update()
+            RETURNS trigger AS $$
+            BEGIN
+                UPDATE analysis_aggregates AS totals
+                SET entries = totals.entries + delta.entries,
+                    fall_2026 = totals.fall_2026 + delta.fall_2026,
+                    international = totals.international + delta.international,
+                    gpa_sum = totals.gpa_sum + delta.gpa_sum,
+                    gpa_count = totals.gpa_count + delta.gpa_count,
+                    gre_sum = totals.gre_sum + delta.gre_sum,
+                    gre_count = totals.gre_count + delta.gre_count,
+                    gre_v_sum = totals.gre_v_sum + delta.gre_v_sum,
+                    gre_v_count = totals.gre_v_count + delta.gre_v_count,
+                    gre_aw_sum = totals.gre_aw_sum + delta.gre_aw_sum,
+                    gre_aw_count = totals.gre_aw_count + delta.gre_aw_count,
+                    american_fall_2026_gpa_sum = totals.american_fall_2026_gpa_sum + delta.american_fall_2026_gpa_sum,
+                    american_fall_2026_gpa_count = totals.american_fall_2026_gpa_count + delta.american_fall_2026_gpa_count,
+                    fall_2026_accepted = totals.fall_2026_accepted + delta.fall_2026_accepted,
+                    accepted_fall_2026_gpa_sum = totals.accepted_fall_2026_gpa_sum + delta.accepted_fall_2026_gpa_sum,
+                    accepted_fall_2026_gpa_count = totals.accepted_fall_2026_gpa_count + delta.accepted_fall_2026_gpa_count,
+                    jhu_cs_masters = totals.jhu_cs_masters + delta.jhu_cs_masters,
+                    phd_cs_accepted_2026 = totals.phd_cs_accepted_2026 + delta.phd_cs_accepted_2026,
+                    phd_cs_accepted_2026_llm = totals.phd_cs_accepted_2026_llm + delta.phd_cs_accepted_2026_llm
+                FROM (
+                    SELECT
+                        COUNT(*) AS changed_rows,
+                        COALESCE(SUM(changed.sign), 0) AS entries,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026'), 0) AS fall_2026,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international NOT IN ('American', 'Other')), 0) AS international,
+                        COALESCE(SUM(changed.sign * gpa::numeric), 0) AS gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0) AS gpa_count,
+                        COALESCE(SUM(changed.sign * gre::numeric), 0) AS gre_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre IS NOT NULL), 0) AS gre_count,
+                        COALESCE(SUM(changed.sign * gre_v::numeric), 0) AS gre_v_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre_v IS NOT NULL), 0) AS gre_v_count,
+                        COALESCE(SUM(changed.sign * gre_aw::numeric), 0) AS gre_aw_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE gre_aw IS NOT NULL), 0) AS gre_aw_count,
+                        COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026'), 0) AS american_fall_2026_gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS american_fall_2026_gpa_count,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted'), 0) AS fall_2026_accepted,
+                        COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026'), 0) AS accepted_fall_2026_gpa_sum,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS accepted_fall_2026_gpa_count,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE degree = 'Masters' AND program = 'Computer Science, Johns Hopkins University'), 0) AS jhu_cs_masters,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                        AND degree = 'PhD'
+                        AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+                        AND program_name = 'Computer Science'), 0) AS phd_cs_accepted_2026,
+                        COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                        AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                        AND degree = 'PhD'
+                        AND llm_generated_program = 'Computer Science'
+                        AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')), 0) AS phd_cs_accepted_2026_llm
+                    FROM (SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1 AS sign, * FROM old_rows) AS changed
+                ) AS delta
+                WHERE delta.changed_rows > 0;
+
+                INSERT INTO analysis_distinct_values (dimension, value, occurrences)
+                SELECT dims.dimension, dims.value, SUM(changed.sign)
+                FROM (SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1 AS sign, * FROM old_rows) AS changed
+                CROSS JOIN LATERAL (VALUES ('program_id', changed.program_id), ('university_id', changed.university_id), ('llm_program_id', changed.llm_program_id), ('llm_university_id', changed.llm_university_id)) AS dims (dimension, value)
+                WHERE dims.value IS NOT NULL
+                GROUP BY dims.dimension, dims.value
+                HAVING SUM(changed.sign) <> 0
+                ON CONFLICT (dimension, value) DO UPDATE
+                SET occurrences = analysis_distinct_values.occurrences + EXCLUDED.occurrences;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_aggregates_update
+            AFTER UPDATE ON applicants
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_aggregates_update();
+            """,
+            """
+            CREATE OR REPLACE FUNCTION applicants_aggregates_truncate()
+            RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM analysis_aggregates;
+                INSERT INTO analysis_aggregates DEFAULT VALUES;
+                DELETE FROM analysis_distinct_values;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_aggregates_truncate
+            AFTER TRUNCATE ON applicants
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_aggregates_truncate();
+            """,
+            "DELETE FROM analysis_aggregates;",
+            "INSERT INTO analysis_aggregates DEFAULT VALUES;",
+            "DELETE FROM analysis_distinct_values;",
+            """
+            UPDATE analysis_aggregates AS totals
+            SET entries = totals.entries + delta.entries,
+                fall_2026 = totals.fall_2026 + delta.fall_2026,
+                international = totals.international + delta.international,
+                gpa_sum = totals.gpa_sum + delta.gpa_sum,
+                gpa_count = totals.gpa_count + delta.gpa_count,
+                gre_sum = totals.gre_sum + delta.gre_sum,
+                gre_count = totals.gre_count + delta.gre_count,
+                gre_v_sum = totals.gre_v_sum + delta.gre_v_sum,
+                gre_v_count = totals.gre_v_count + delta.gre_v_count,
+                gre_aw_sum = totals.gre_aw_sum + delta.gre_aw_sum,
+                gre_aw_count = totals.gre_aw_count + delta.gre_aw_count,
+                american_fall_2026_gpa_sum = totals.american_fall_2026_gpa_sum + delta.american_fall_2026_gpa_sum,
+                american_fall_2026_gpa_count = totals.american_fall_2026_gpa_count + delta.american_fall_2026_gpa_count,
+                fall_2026_accepted = totals.fall_2026_accepted + delta.fall_2026_accepted,
+                accepted_fall_2026_gpa_sum = totals.accepted_fall_2026_gpa_sum + delta.accepted_fall_2026_gpa_sum,
+                accepted_fall_2026_gpa_count = totals.accepted_fall_2026_gpa_count + delta.accepted_fall_2026_gpa_count,
+                jhu_cs_masters = totals.jhu_cs_masters + delta.jhu_cs_masters,
+                phd_cs_accepted_2026 = totals.phd_cs_accepted_2026 + delta.phd_cs_accepted_2026,
+                phd_cs_accepted_2026_llm = totals.phd_cs_accepted_2026_llm + delta.phd_cs_accepted_2026_llm
+            FROM (
+                SELECT
+                    COUNT(*) AS changed_rows,
+                    COALESCE(SUM(changed.sign), 0) AS entries,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026'), 0) AS fall_2026,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international NOT IN ('American', 'Other')), 0) AS international,
+                    COALESCE(SUM(changed.sign * gpa::numeric), 0) AS gpa_sum,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0) AS gpa_count,
+                    COALESCE(SUM(changed.sign * gre::numeric), 0) AS gre_sum,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE gre IS NOT NULL), 0) AS gre_count,
+                    COALESCE(SUM(changed.sign * gre_v::numeric), 0) AS gre_v_sum,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE gre_v IS NOT NULL), 0) AS gre_v_count,
+                    COALESCE(SUM(changed.sign * gre_aw::numeric), 0) AS gre_aw_sum,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE gre_aw IS NOT NULL), 0) AS gre_aw_count,
+                    COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026'), 0) AS american_fall_2026_gpa_sum,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS american_fall_2026_gpa_count,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted'), 0) AS fall_2026_accepted,
+                    COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026'), 0) AS accepted_fall_2026_gpa_sum,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026' AND gpa IS NOT NULL), 0) AS accepted_fall_2026_gpa_count,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE degree = 'Masters' AND program = 'Computer Science, Johns Hopkins University'), 0) AS jhu_cs_masters,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                    AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                    AND degree = 'PhD'
+                    AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+                    AND program_name = 'Computer Science'), 0) AS phd_cs_accepted_2026,
+                    COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'
+                    AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                    AND degree = 'PhD'
+                    AND llm_generated_program = 'Computer Science'
+                    AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')), 0) AS phd_cs_accepted_2026_llm
+                FROM (SELECT 1 AS sign, * FROM applicants) AS changed
+            ) AS delta
+            WHERE delta.changed_rows > 0;
+            """,
+            """
+            INSERT INTO analysis_distinct_values (dimension, value, occurrences)
+            SELECT dims.dimension, dims.value, SUM(changed.sign)
+            FROM (SELECT 1 AS sign, * FROM applicants) AS changed
+            CROSS JOIN LATERAL (VALUES ('program_id', changed.program_id), ('university_id', changed.university_id), ('llm_program_id', changed.llm_program_id), ('llm_university_id', changed.llm_university_id)) AS dims (dimension, value)
+            WHERE dims.value IS NOT NULL
+            GROUP BY dims.dimension, dims.value
+            HAVING SUM(changed.sign) <> 0
+            ON CONFLICT (dimension, value) DO UPDATE
+            SET occurrences = analysis_distinct_values.occurrences + EXCLUDED.occurrences;
+            """,
+        ],
+        "offline": True,
+    },
+    {
+        "version": 9,
+        "description": "data-version counter for the analysis result cache",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS applicants_data_version (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                version BIGINT NOT NULL DEFAULT 0
+            );
+            """,
+            "INSERT INTO applicants_data_version DEFAULT VALUES ON CONFLICT DO NOTHING;",
+            """
+            CREATE OR REPLACE FUNCTION applicants_data_version_bump()
+            RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'TRUNCATE'
+                    OR (TG_OP = 'DELETE' AND EXISTS (SELECT 1 FROM old_rows))
+                    OR (TG_OP <> 'DELETE' AND EXISTS (SELECT 1 FROM new_rows)) THEN
+                    UPDATE applicants_data_version SET version = version + 1;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_data_version_insert
+            AFTER INSERT ON applicants REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_data_version_update
+            AFTER UPDATE ON applicants REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_data_version_delete
+            AFTER DELETE ON applicants REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_data_version_truncate
+            AFTER TRUNCATE ON applicants
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+            """,
+        ],
+    },
+    {
+        "version": 10,
+        "description": "covering index for the stats API",
+        "statements": [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS applicants_stats_idx "
+            "ON applicants (university_name, program_name, degree, term) INCLUDE (status, us_or_international, gpa, gre, gre_v, gre_aw, date_added);",
+        ],
+        "concurrent": True,
+    },
+    {
+        "version": 11,
+        "description": "daily trend rollups maintained by triggers",
+        # Like version 8: writers wait until the rollups are built.
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS applicant_daily_rollups (
+                day DATE NOT NULL,
+                term TEXT NOT NULL,
+                degree TEXT NOT NULL,
+                program TEXT NOT NULL,
+                entries BIGINT NOT NULL DEFAULT 0,
+                accepted BIGINT NOT NULL DEFAULT 0,
+                gpa_sum NUMERIC NOT NULL DEFAULT 0,
+                gpa_count BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, term, degree, program)
+            );
+            """,
+            "LOCK TABLE applicants IN SHARE MODE;",
+            """
+            CREATE OR REPLACE FUNCTION applicants_rollups_insert()
+            RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO applicant_daily_rollups (day, term, degree, program, entries, accepted, gpa_sum, gpa_count)
+                SELECT changed.date_added, COALESCE(changed.term, ''), COALESCE(changed.degree, ''), COALESCE(changed.program_name, ''), COALESCE(SUM(changed.sign), 0), COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'), 0), COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE gpa IS NOT NULL), 0), COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0)
+                FROM (SELECT 1 AS sign, * FROM new_rows) AS changed
+                WHERE changed.date_added IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+                ORDER BY 1, 2, 3, 4
+                ON CONFLICT (day, term, degree, program) DO UPDATE
+                SET entries = applicant_daily_rollups.entries + EXCLUDED.entries, accepted = applicant_daily_rollups.accepted + EXCLUDED.accepted, gpa_sum = applicant_daily_rollups.gpa_sum + EXCLUDED.gpa_sum, gpa_count = applicant_daily_rollups.gpa_count + EXCLUDED.gpa_count;
+
+                DELETE FROM applicant_daily_rollups
+                WHERE entries = 0 AND day IN (SELECT date_added FROM (SELECT 1 AS sign, * FROM new_rows) AS changed);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_rollups_insert
+            AFTER INSERT ON applicants
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_rollups_insert();
+            """,
+            """
+            CREATE OR REPLACE FUNCTION applicants_rollups_delete()
+            RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO applicant_daily_rollups (day, term, degree, program, entries, accepted, gpa_sum, gpa_count)
+                SELECT changed.date_added, COALESCE(changed.term, ''), COALESCE(changed.degree, ''), COALESCE(changed.program_name, ''), COALESCE(SUM(changed.sign), 0), COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'), 0), COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE gpa IS NOT NULL), 0), COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0)
+                FROM (SELECT -1 AS sign, * FROM old_rows) AS changed
+                WHERE changed.date_added IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+                ORDER BY 1, 2, 3, 4
+                ON CONFLICT (day, term, degree, program) DO UPDATE
+                SET entries = applicant_daily_rollups.entries + EXCLUDED.entries, accepted = applicant_daily_rollups.accepted + EXCLUDED.accepted, gpa_sum = applicant_daily_rollups.gpa_sum + EXCLUDED.gpa_sum, gpa_count = applicant_daily_rollups.gpa_count + EXCLUDED.gpa_count;
+
+                DELETE FROM applicant_daily_rollups
+                WHERE entries = 0 AND day IN (SELECT date_added FROM (SELECT -1 AS sign, * FROM old_rows) AS changed);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_rollups_delete
+            AFTER DELETE ON applicants
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_rollups_delete();
+            """,
+            """
+            CREATE OR REPLACE FUNCTION applicants_rollups_update()
+            RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO applicant_daily_rollups (day, term, degree, program, entries, accepted, gpa_sum, gpa_count)
+                SELECT changed.date_added, COALESCE(changed.term, ''), COALESCE(changed.degree, ''), COALESCE(changed.program_name, ''), COALESCE(SUM(changed.sign), 0), COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'), 0), COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE gpa IS NOT NULL), 0), COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0)
+                FROM (SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1 AS sign, * FROM old_rows) AS changed
+                WHERE changed.date_added IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+                ORDER BY 1, 2, 3, 4
+                ON CONFLICT (day, term, degree, program) DO UPDATE
+                SET entries = applicant_daily_rollups.entries + EXCLUDED.entries, accepted = applicant_daily_rollups.accepted + EXCLUDED.accepted, gpa_sum = applicant_daily_rollups.gpa_sum + EXCLUDED.gpa_sum, gpa_count = applicant_daily_rollups.gpa_count + EXCLUDED.gpa_count;
+
+                DELETE FROM applicant_daily_rollups
+                WHERE entries = 0 AND day IN (SELECT date_added FROM (SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1 AS sign, * FROM old_rows) AS changed);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_rollups_update
+            AFTER UPDATE ON applicants
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_rollups_update();
+            """,
+            """
+            CREATE OR REPLACE FUNCTION applicants_rollups_truncate()
+            RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM applicant_daily_rollups;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_rollups_truncate
+            AFTER TRUNCATE ON applicants
+            FOR EACH STATEMENT EXECUTE FUNCTION applicants_rollups_truncate();
+            """,
+            "DELETE FROM applicant_daily_rollups;",
+            """
+            INSERT INTO applicant_daily_rollups (day, term, degree, program, entries, accepted, gpa_sum, gpa_count)
+            SELECT changed.date_added, COALESCE(changed.term, ''), COALESCE(changed.degree, ''), COALESCE(changed.program_name, ''), COALESCE(SUM(changed.sign), 0), COALESCE(SUM(changed.sign) FILTER (WHERE status = 'Accepted'), 0), COALESCE(SUM(changed.sign * gpa::numeric) FILTER (WHERE gpa IS NOT NULL), 0), COALESCE(SUM(changed.sign) FILTER (WHERE gpa IS NOT NULL), 0)
+            FROM (SELECT 1 AS sign, * FROM applicants) AS changed
+            WHERE changed.date_added IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+            ORDER BY 1, 2, 3, 4
+            ON CONFLICT (day, term, degree, program) DO UPDATE
+            SET entries = applicant_daily_rollups.entries + EXCLUDED.entries, accepted = applicant_daily_rollups.accepted + EXCLUDED.accepted, gpa_sum = applicant_daily_rollups.gpa_sum + EXCLUDED.gpa_sum, gpa_count = applicant_daily_rollups.gpa_count + EXCLUDED.gpa_count;
+            """,
+        ],
+        "offline": True,
+    },
+    {
+        "version": 12,
+        "description": "move dated rows out of the default partition when adding a year",
+        "statements": [
+            """
+            CREATE OR REPLACE FUNCTION ensure_applicant_partitions(dates DATE[])
+            RETURNS INTEGER AS $$
+            DECLARE
+                partition_year INTEGER;
+                partition_name TEXT;
+                range_start DATE;
+                range_end DATE;
+                stored_columns TEXT;
+                created INTEGER := 0;
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'applicants'::regclass
+                ) THEN
+                    RETURN 0;
+                END IF;
+                FOR partition_year IN
+                    SELECT DISTINCT EXTRACT(YEAR FROM d)::INTEGER
+                    FROM unnest(dates) AS d
+                    WHERE d IS NOT NULL
+                LOOP
+                    partition_name := 'applicants_y' || partition_year;
+                    IF to_regclass(partition_name) IS NULL THEN
+                        range_start := make_date(partition_year, 1, 1);
+                        range_end := make_date(partition_year + 1, 1, 1);
+                        IF EXISTS (
+                            SELECT 1 FROM applicants WHERE date_added >= range_start AND date_added < range_end
+                        ) THEN
+                            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO stored_columns
+                            FROM pg_attribute
+                            WHERE attrelid = 'applicants'::regclass AND attnum > 0
+                                AND NOT attisdropped AND attgenerated = '';
+                            CREATE TEMP TABLE applicants_moved (LIKE applicants);
+                            EXECUTE format(
+                                'WITH moved AS (DELETE FROM applicants WHERE date_added >= %L AND date_added < %L '
+                                'RETURNING %s) INSERT INTO applicants_moved (%s) SELECT %s FROM moved',
+                                range_start, range_end, stored_columns, stored_columns, stored_columns
+                            );
+                        END IF;
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF applicants FOR VALUES FROM (%L) TO (%L)',
+                            partition_name, range_start, range_end
+                        );
+                        IF to_regclass('pg_temp.applicants_moved') IS NOT NULL THEN
+                            EXECUTE format(
+                                'INSERT INTO applicants (%s) SELECT %s FROM applicants_moved',
+                                stored_columns, stored_columns
+                            );
+                            DROP TABLE pg_temp.applicants_moved;
+                        END IF;
+                        created := created + 1;
+                    END IF;
+                END LOOP;
+                RETURN created;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+        ],
+    },
+    {
+        "version": 13,
+        "description": "dimension trigger only fills ids the loaders left missing",
+        "statements": [
+            """
+            CREATE OR REPLACE FUNCTION applicants_resolve_dimensions()
+            RETURNS trigger AS $$
+            BEGIN
+                -- Generated columns are not computed yet in a BEFORE trigger, so the
+                -- program split is repeated here.
+                NEW.program_id := program_dimension_id(TRIM(SPLIT_PART(NEW.program, ',', 1)));
+                NEW.university_id := university_dimension_id(TRIM(SPLIT_PART(NEW.program, ',', 2)));
+                NEW.llm_program_id := program_dimension_id(NEW.llm_generated_program);
+                NEW.llm_university_id := university_dimension_id(NEW.llm_generated_university);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_resolve_dimensions
+            BEFORE INSERT ON applicants
+            FOR EACH ROW WHEN (
+                (NEW.program IS NOT NULL AND (NEW.program_id IS NULL OR NEW.university_id IS NULL))
+                OR (NEW.llm_generated_program IS NOT NULL AND NEW.llm_program_id IS NULL)
+                OR (NEW.llm_generated_university IS NOT NULL AND NEW.llm_university_id IS NULL)
+            )
+            EXECUTE FUNCTION applicants_resolve_dimensions();
+            """,
+            """
+            CREATE OR REPLACE TRIGGER applicants_resolve_dimensions_update
+            BEFORE UPDATE OF program, llm_generated_program, llm_generated_university
+            ON applicants
+            FOR EACH ROW WHEN (
+                OLD.program IS DISTINCT FROM NEW.program
+                OR OLD.llm_generated_program IS DISTINCT FROM NEW.llm_generated_program
+                OR OLD.llm_generated_university IS DISTINCT FROM NEW.llm_generated_university
+                OR (NEW.program IS NOT NULL AND (NEW.program_id IS NULL OR NEW.university_id IS NULL))
+                OR (NEW.llm_generated_program IS NOT NULL AND NEW.llm_program_id IS NULL)
+                OR (NEW.llm_generated_university IS NOT NULL AND NEW.llm_university_id IS NULL)
+            )
+            EXECUTE FUNCTION applicants_resolve_dimensions();
+            """,
+        ],
+    },
+]
+
+
+def applied_versions(cur):
+    """Return the set of migration versions recorded in ``schema_migrations``."""
+    cur.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cur.fetchall()}
+
+
+def _drop_invalid_indexes(cur):
+    """Drop indexes left INVALID by an interrupted concurrent build."""
+    cur.execute(
+        """
+        SELECT c.relname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass('applicants') AND NOT i.indisvalid;
+        """
+    )
+    for (name,) in cur.fetchall():
+        cur.execute(SQL("DROP INDEX CONCURRENTLY IF EXISTS {};").format(Identifier(name)))
+
+
+def run_backfill(cur, query, batch_size=10000):
+    """
+    Repeat a ``LIMIT %s`` UPDATE until it matches no rows.
+
+    Meant for an autocommit connection, so each batch commits on its own and
+    row locks are held only briefly. Returns the number of rows updated.
+    """
+    total = 0
+    while True:
+        cur.execute(query, (batch_size,))
+        if cur.rowcount <= 0:
+            return total
+        total += cur.rowcount
+
+
+def apply_migration(conn, migration, batch_size=10000):
+    """
+    Apply one migration on an autocommit connection and record its version.
+
+    Returns the number of rows backfilled.
+    """
+    with conn.cursor() as cur:
+        if migration.get("concurrent"):
+            # Partitioned tables do not support CONCURRENTLY; there the
+            # build takes a short lock per partition instead.
+            partitioned = is_partitioned(cur)
+            _drop_invalid_indexes(cur)
+            for statement in migration["statements"]:
+                if partitioned:
+                    statement = statement.replace(" CONCURRENTLY", "", 1)
+                cur.execute(statement)
+        else:
+            with conn.transaction():
+                for statement in migration["statements"]:
+                    cur.execute(statement)
+
+        backfilled = 0
+        if migration.get("backfill"):
+            backfilled = run_backfill(cur, migration["backfill"], batch_size)
+            cur.execute("ANALYZE applicants;")
+
+        cur.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+            (migration["version"], migration["description"]),
+        )
+    return backfilled
+
+
+def migrate(batch_size=10000, offline=False):
+    """
+    Apply every pending migration in version order.
+
+    Existing rows are never reloaded; a run that stops midway (e.g. during a
+    backfill) simply resumes on the next call. Without ``offline`` the run
+    stops before the first pending offline migration, so writes are only
+    blocked when the caller has stopped the writers and asked for it.
+    Returns the list of versions applied, or None on a database error.
+    """
+    try:
+        # A dedicated connection, not a pooled one: the advisory lock is held
+        # by the session and must go away with it.
+        with psycopg.connect(**get_db_connect_kwargs(), autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(MIGRATIONS_TABLE_QUERY)
+                cur.execute(ADVISORY_LOCK_QUERY)
+                done = applied_versions(cur)
+
+            applied = []
+            for migration in MIGRATIONS:
+                if migration["version"] in done:
+                    continue
+                if migration.get("offline") and not offline:
+                    print(
+                        "Stopped before migration {}: {}. It blocks writes to applicants for a "
+                        "full scan; stop the refresh and spool replay, then run "
+                        "`python3 src/migrations.py --offline`.".format(
+                            migration["version"], migration["description"]
+                        )
+                    )
+                    return applied
+                backfilled = apply_migration(conn, migration, batch_size)
+                print(
+                    "Applied migration {}: {} ({} rows backfilled).".format(
+                        migration["version"], migration["description"], backfilled
+                    )
+                )
+                applied.append(migration["version"])
+
+        if not applied:
+            print("Schema is up to date.")
+        return applied
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+if __name__ == "__main__":
+    migrate(offline="--offline" in sys.argv[1:])
@@ -1,10 +1,19 @@
 """Flask route handlers and rendering helpers for analysis UI."""
 
-from flask import Blueprint, jsonify, redirect, render_template, request, url_for
+from flask import (
+    Blueprint, Response, jsonify, redirect, render_template, request, stream_with_context, url_for
+)
 import subprocess
 import sys
 import re
 from query_data import connect, questions
+from db_config import note_write
+from export_data import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, stream_export
+from applicant_stats import applicant_stats, normalize_filters
+from percentiles import normalize_query, percentiles
+import leaderboard
+import rollups
+from psycopg import OperationalError
 
 # Blueprint definition
 bp = Blueprint("main", __name__)
@@ -36,6 +45,9 @@ def check_db_completion():
     else:
         status_message = "Last requested database update complete."
         db_process = None
+        # The refresh wrote to the primary; read from there until the
+        # replica has had time to catch up.
+        note_write()
 
 
 def _format_percentages_in_text(value):
@@ -71,12 +83,11 @@ def _render_analysis_page():
     check_db_completion()
 
     # Fetch analysis results for display.
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM answers_table")
-    query_answers = cur.fetchall()
-    cur.close()
-    conn.close()
+    with connect(read_only=True) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM answers_table")
+        query_answers = cur.fetchall()
+        cur.close()
 
     formatted_answers = []
     for row in query_answers:
@@ -164,11 +175,160 @@ def update_analysis_route():
 
     if request.method == "POST":
         # Run analysis queries
-        conn = connect()
-        questions(conn)
+        # Analysis reads may go to a replica; the answers go to the primary.
+        with connect(read_only=True) as conn, connect() as write_conn:
+            questions(conn, write_connection=write_conn)
         status_message = "Analysis complete."
         if _wants_json_response():
             return jsonify({"ok": True, "busy": False, "message": status_message}), 200
         return redirect(url_for("main.index"), code=303)
 
     return _render_analysis_page(), 200
+
+# -------------------- Export route --------------------
+@bp.route("/export/applicants.<fmt>")
+def export_route(fmt):
+    """
+    Stream the whole applicants table as CSV, JSON Lines or Parquet.
+
+    Rows are read chunk by chunk through a server-side cursor and sent as
+    they are encoded (chunked transfer), gzip-compressed when the client
+    accepts it. ``?chunk_size=`` overrides the rows per chunk.
+    Returns:
+    - 404 for an unknown format
+    - 503 if the database cannot be reached
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"ok": False, "message": "Unknown export format."}), 404
+
+    content_type, extension = EXPORT_FORMATS[fmt]
+    gzip = "gzip" in request.accept_encodings
+    chunk_size = max(1, request.args.get("chunk_size", DEFAULT_CHUNK_SIZE, type=int))
+    stream = stream_export(fmt, chunk_size=chunk_size, gzip=gzip)
+    try:
+        # An empty JSON Lines export yields no chunk at all.
+        first = next(stream, b"")
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return jsonify({"ok": False, "message": "Database unavailable."}), 503
+
+    def body():
+        yield first
+        yield from stream
+
+    headers = {"Content-Disposition": 'attachment; filename="applicants.{}"'.format(extension)}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(body()), mimetype=content_type, headers=headers)
+
+
+# -------------------- Stats API route --------------------
+@bp.route("/api/stats")
+def stats_route():
+    """
+    Applicant statistics for the rows matching the query-string filters.
+
+    ``term``, ``degree``, ``status``, ``university`` and ``program`` may
+    repeat to match any of several values; ``year`` limits the date added
+    and ``fields=llm`` matches the LLM-generated names (see
+    ``applicant_stats.normalize_filters``).
+    Returns JSON:
+    - 200 with ok=true, the filters, the stats and whether they were cached
+    - 400 for an unknown parameter or a bad value
+    - 503 if the database cannot be reached
+    """
+    try:
+        filters = normalize_filters(request.args.to_dict(flat=False))
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    try:
+        with connect(read_only=True) as conn:
+            result = applicant_stats(conn, filters)
+    except OperationalError:
+        return jsonify({"ok": False, "message": "Database unavailable."}), 503
+    return jsonify({"ok": True, "filters": filters, **result}), 200
+
+
+# -------------------- Percentiles API route --------------------
+@bp.route("/api/percentiles")
+def percentiles_route():
+    """
+    Percentile ranks and distributions of scores within an applicant cohort.
+
+    ``university``, ``program``, ``degree`` and ``status`` (default
+    Accepted; ``any`` for every status) select the cohort and may repeat;
+    ``gpa``, ``gre``, ``gre_v`` and ``gre_aw`` are the scores to rank (see
+    ``percentiles.normalize_query``).
+    Returns JSON:
+    - 200 with ok=true, the filters and a summary per score
+    - 400 for an unknown parameter or a bad value
+    - 503 if the database cannot be reached
+    """
+    try:
+        filters, scores = normalize_query(request.args.to_dict(flat=False))
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    try:
+        with connect(read_only=True) as conn:
+            result = percentiles(conn, filters, scores)
+    except OperationalError:
+        return jsonify({"ok": False, "message": "Database unavailable."}), 503
+    return jsonify({"ok": True, "filters": filters, "scores": result}), 200
+
+
+@bp.route("/api/trends")
+def trends_route():
+    """
+    Results posted, acceptance rate and average GPA over time.
+
+    ``start`` and ``end`` bound the days, ``granularity`` is day, week or
+    month, ``term``, ``degree`` and ``program`` filter and may repeat, and
+    ``by`` splits the series by one of them (see
+    ``rollups.normalize_query``).
+    Returns JSON:
+    - 200 with ok=true, the granularity and the series
+    - 400 for an unknown parameter or a bad value
+    - 503 if the database cannot be reached
+    """
+    try:
+        query = rollups.normalize_query(request.args.to_dict(flat=False))
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    try:
+        with connect(read_only=True) as conn:
+            result = rollups.trends(conn, query)
+    except OperationalError:
+        return jsonify({"ok": False, "message": "Database unavailable."}), 503
+    return jsonify({"ok": True, "granularity": query["granularity"], **result}), 200
+
+
+@bp.route("/api/leaderboard")
+def leaderboard_route():
+    """
+    Top-N universities, programs, degrees or terms by a metric.
+
+    ``by`` names what is ranked and may repeat, ``metric`` is
+    acceptance_rate, reports, accepted or avg_gpa, ``order`` is desc or
+    asc, ``min_reports`` is the support threshold and ``limit`` the number
+    of rows; ``university``, ``program``, ``degree`` and ``term`` filter
+    (see ``leaderboard.normalize_query``).
+    Returns JSON:
+    - 200 with ok=true, the query, the number of qualifying groups and the rows
+    - 400 for an unknown parameter or a bad value
+    - 503 if the database cannot be reached
+    """
+    try:
+        query = leaderboard.normalize_query(request.args.to_dict(flat=False))
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    try:
+        with connect(read_only=True) as conn:
+            result = leaderboard.leaderboard(conn, query)
+    except OperationalError:
+        return jsonify({"ok": False, "message": "Database unavailable."}), 503
+    return jsonify({"ok": True, "query": query, **result}), 200
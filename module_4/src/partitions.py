@@ -0,0 +1,117 @@
+"""Year-partition maintenance for a partitioned ``applicants`` table."""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from psycopg import OperationalError
+from psycopg.sql import SQL, Identifier
+from db_config import backend_query, connection, get_db_connect_kwargs
+from aggregates import subtract_table
+import rollups
+from result_cache import bump_version
+
+ARCHIVE_PREFIX = "applicants_archive_y"
+
+ENSURE_PARTITIONS_QUERY = "SELECT ensure_applicant_partitions(%s::date[]);"
+
+
+def partition_name(year):
+    """Return the name of the ``applicants`` partition holding ``year``."""
+    return "applicants_y{}".format(int(year))
+
+
+def ensure_partitions(cur, dates, fetch=True):
+    """
+    Create any missing year partitions for ``dates`` on the open cursor.
+
+    Delegates to the ``ensure_applicant_partitions`` SQL function, which is
+    a no-op on an unpartitioned table. Returns the number of partitions
+    created. In pipeline mode pass ``fetch=False`` so the call is queued
+    with the following insert instead of forcing a round trip; it then
+    returns None. SQLite tables are never partitioned.
+    """
+    dates = sorted({d for d in dates if d is not None})
+    query = backend_query(cur, "ENSURE_PARTITIONS_QUERY", ENSURE_PARTITIONS_QUERY)
+    if not dates or query is None:
+        return 0
+    cur.execute(query, (dates,))
+    if not fetch:
+        return None
+    return cur.fetchone()[0]
+
+
+def is_partitioned(cur):
+    """Return True when ``applicants`` is a partitioned table."""
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass('applicants'));"
+    )
+    return cur.fetchone()[0]
+
+
+def list_partitions():
+    """
+    Return ``(name, row_estimate)`` for every attached ``applicants`` partition.
+
+    Row counts are the planner's estimates, so the call stays cheap on large
+    tables. Returns an empty list for an unpartitioned table or on error.
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT c.relname, c.reltuples::BIGINT
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'applicants'::regclass
+                    ORDER BY c.relname;
+                    """
+                )
+                return cur.fetchall()
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return []
+
+
+def detach_partition(year):
+    """
+    Detach the partition for ``year`` and keep it as an archive table.
+
+    The detached table is renamed to ``applicants_archive_y<year>`` so it
+    no longer shows up in analysis queries but can be re-attached or dumped
+    later. Detaching fires no DELETE triggers, so its rows are taken out of
+    the analysis aggregates and the daily rollups, and the data version is
+    bumped, in the same transaction. Returns the archive table name, or
+    None if there was no such partition or a database error occurred.
+    """
+    name = partition_name(year)
+    archive = ARCHIVE_PREFIX + str(int(year))
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT 1 FROM pg_inherits
+                    WHERE inhparent = 'applicants'::regclass
+                      AND inhrelid = to_regclass(%s);
+                    """,
+                    (name,),
+                )
+                if cur.fetchone() is None:
+                    print("No partition '{}' to detach.".format(name))
+                    return None
+                cur.execute(SQL("ALTER TABLE applicants DETACH PARTITION {};").format(Identifier(name)))
+                subtract_table(cur, name)
+                rollups.subtract_table(cur, name)
+                bump_version(cur)
+                cur.execute(SQL("ALTER TABLE {} RENAME TO {};").format(Identifier(name), Identifier(archive)))
+                conn.commit()
+                print("Partition '{}' detached as '{}'.".format(name, archive))
+                return archive
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
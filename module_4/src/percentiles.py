@@ -0,0 +1,185 @@
+"""Percentile ranks of GPA and GRE scores within applicant cohorts.
+
+Backs ``/api/percentiles``. A cohort is every applicant matching some of
+university, program, degree and status (by default the accepted ones).
+For each score, ``ScoreIndex`` keeps the values of the in-process columnar
+store (see ``columnar``) sorted within each (university, program, degree,
+status) group. A rank or a quantile is then a binary search per matching
+group instead of a scan. The index is rebuilt when a refresh of the store
+brings in a new ingest batch.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from decimal import Decimal
+
+import numpy as np
+
+import columnar
+
+SCORES = ("gpa", "gre", "gre_v", "gre_aw")
+# Cohort filters: (query parameter, columnar store column).
+DIMENSIONS = [
+    ("university", "university_name"),
+    ("program", "program_name"),
+    ("degree", "degree"),
+    ("status", "status"),
+]
+DEFAULT_STATUS = ["Accepted"]
+MAX_VALUES = 50
+# Reported cut points of each cohort's distribution.
+QUANTILES = (("p10", 0.10), ("p25", 0.25), ("median", 0.50), ("p75", 0.75), ("p90", 0.90))
+
+
+def normalize_query(args):
+    """
+    Validate query-string ``args`` (``{name: [values]}``) into ``(filters, scores)``.
+
+    ``filters`` maps each given dimension to its sorted, deduplicated
+    values; ``status`` defaults to Accepted and ``status=any`` drops it.
+    ``scores`` maps each given score (``gpa=3.7``) to a float; with none,
+    every score's distribution is returned without a rank. Raises
+    ValueError for unknown parameters and bad values.
+    """
+    names = {name for name, _column in DIMENSIONS}
+    unknown = sorted(set(args) - names - set(SCORES))
+    if unknown:
+        raise ValueError("Unknown parameter(s): {}.".format(", ".join(unknown)))
+
+    filters = {}
+    for name, _column in DIMENSIONS:
+        values = sorted({value.strip() for value in args.get(name, []) if value.strip()})
+        if len(values) > MAX_VALUES:
+            raise ValueError("At most {} values for '{}'.".format(MAX_VALUES, name))
+        if values:
+            filters[name] = values
+    filters.setdefault("status", DEFAULT_STATUS)
+    if filters["status"] == ["any"]:
+        del filters["status"]
+
+    scores = {}
+    for name in SCORES:
+        if args.get(name):
+            try:
+                scores[name] = float(args[name][-1])
+            except ValueError:
+                raise ValueError("'{}' must be a number.".format(name)) from None
+            if not np.isfinite(scores[name]):
+                raise ValueError("'{}' must be a number.".format(name))
+    return filters, scores
+
+
+class ScoreIndex:
+    """
+    One score column of a ``ColumnStore``, sorted by group and then value.
+
+    Values are replaced by their position among the column's distinct
+    values, so group ``g``'s sorted values occupy
+    ``keys[offsets[g]:offsets[g + 1]]`` as ``g * len(distinct) + position``
+    and one ``np.searchsorted`` call counts values below a score in every
+    matching group at once. Built from the arrays of one refresh; check
+    ``columns is store.columns`` before reuse.
+    """
+
+    def __init__(self, store, column):
+        self.columns = store.columns
+        dimensions = [store_column for _name, store_column in DIMENSIONS]
+        shape = tuple(len(store.dictionaries[name].values) for name in dimensions)
+
+        values = store.columns[column]
+        present = ~np.isnan(values)
+        combined = np.ravel_multi_index([store.columns[name][present] for name in dimensions], shape)
+        self.distinct, value_codes = np.unique(values[present], return_inverse=True)
+        groups, group_ids = np.unique(combined, return_inverse=True)
+        self.group_codes = dict(zip(dimensions, np.unravel_index(groups, shape)))
+
+        width = len(self.distinct)
+        self.keys = np.sort(group_ids.astype(np.int64) * width + value_codes)
+        self.offsets = np.searchsorted(self.keys, np.arange(len(groups) + 1, dtype=np.int64) * width)
+        ordered = self.distinct[self.keys % width] if width else self.distinct
+        self.sums = np.add.reduceat(ordered, self.offsets[:-1]) if len(groups) else np.zeros(0)
+
+    def groups(self, store, filters):
+        """Ids of the groups matching ``filters`` (``{parameter: values}``)."""
+        match = np.ones(len(self.offsets) - 1, dtype=bool)
+        for name, column in DIMENSIONS:
+            if name in filters:
+                dictionary = store.dictionaries[column]
+                codes = [dictionary.codes[value] for value in filters[name] if value in dictionary.codes]
+                match &= np.isin(self.group_codes[column], codes)
+        return np.flatnonzero(match)
+
+    def count_below(self, groups, position):
+        """Number of values in ``groups`` below the ``position``-th distinct value."""
+        width = len(self.distinct)
+        found = np.searchsorted(self.keys, groups * width + position)
+        return int((found - self.offsets[groups]).sum())
+
+    def quantile(self, groups, size, fraction):
+        """The value at rank ``floor(fraction * (size - 1))`` of the cohort (lower method)."""
+        rank = int(fraction * (size - 1))
+        low, high = 0, len(self.distinct) - 1
+        # Smallest distinct value with more than ``rank`` cohort values at or below it.
+        while low < high:
+            middle = (low + high) // 2
+            if self.count_below(groups, middle + 1) > rank:
+                high = middle
+            else:
+                low = middle + 1
+        return float(self.distinct[low])
+
+    def summary(self, groups, score=None):
+        """Distribution of the cohort made of ``groups``, with ``score``'s rank when given."""
+        size = int((self.offsets[groups + 1] - self.offsets[groups]).sum())
+        result = {"n": size}
+        if not size:
+            return result
+        for name, fraction in ((("min", 0.0),) + QUANTILES + (("max", 1.0),)):
+            result[name] = self.quantile(groups, size, fraction)
+        # Half up, like /api/stats (see ``columnar._round``).
+        result["mean"] = float(columnar._round(float(self.sums[groups].sum()) / size))
+        if score is not None:
+            below = self.count_below(groups, np.searchsorted(self.distinct, score, side="left"))
+            equal = self.count_below(groups, np.searchsorted(self.distinct, score, side="right")) - below
+            result.update(
+                value=score,
+                below=below,
+                equal=equal,
+                # Share below, counting ties as half: the median scores 50.
+                percentile=float(columnar._round(Decimal(100) * (2 * below + equal) / (2 * size))),
+            )
+        return result
+
+
+_indexes = {}
+
+
+def score_index(store, column):
+    """Return the ``ScoreIndex`` of ``column``, rebuilt if the store changed since."""
+    index = _indexes.get(column)
+    if index is None or index.columns is not store.columns:
+        index = _indexes[column] = ScoreIndex(store, column)
+    return index
+
+
+def percentiles(connection, filters, scores):
+    """
+    Return ``{score: summary}`` for the cohort ``filters`` selects on ``connection``.
+
+    ``filters`` and ``scores`` come from ``normalize_query``. The columnar
+    store is refreshed first (reading only new ingest batches, see
+    ``columnar.ColumnStore.refresh``). Each summary has the cohort size
+    ``n``, the min, quantiles, max and mean, and for a given score its
+    ``percentile`` and the counts ``below`` and ``equal`` to it.
+    """
+    store = columnar.get_store()
+    with store.lock:
+        with connection.cursor() as cur:
+            store.refresh(cur)
+        result = {}
+        for column in (scores or SCORES):
+            index = score_index(store, column)
+            result[column] = index.summary(index.groups(store, filters), scores.get(column))
+    return result
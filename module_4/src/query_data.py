@@ -1,270 +1,809 @@
 """Database connectivity and analysis-query execution helpers."""
 
-import psycopg
-from psycopg import OperationalError
-from db_config import get_db_connect_kwargs
-
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import islice
 
-def connect():
+from psycopg import OperationalError
+from db_config import (
+    backend,
+    backend_query,
+    connection,
+    get_db_connect_kwargs,
+    get_db_read_connect_kwargs,
+    is_sqlite,
+    note_write,
+    pipeline_enabled,
+)
+from aggregates import has_aggregates
+import columnar
+import result_cache
+
+
+@contextmanager
+def connect(read_only=False):
     """
-    Establish and return a connection to the PostgreSQL database.
-
-    This function attempts to connect using psycopg and returns
-    the connection object so it can be reused by other functions.
+    Borrow a connection to the database for a ``with`` block.
+
+    The connection comes from the shared pool (see ``db_config.connection``)
+    and is returned to it when the block ends, so page renders do not pay
+    for a new connection each time. ``read_only`` connections go to the read
+    replica when one is configured (see
+    ``db_config.get_db_read_connect_kwargs``). Connection errors are printed
+    and re-raised.
     """
+    kwargs = get_db_read_connect_kwargs() if read_only else get_db_connect_kwargs()
     try:
-        # Attempt to open a connection to the PostgreSQL database
-        connection = psycopg.connect(**get_db_connect_kwargs())
+        with connection(kwargs) as conn:
+            yield conn
     except OperationalError as e:
         # Print an error message if the database connection fails
         print(f"The error '{e}' occurred")
+        raise
+
+
+def _sqlite_2dp(expression):
+    """Format ``expression`` to two decimals like ``ROUND(...::numeric, 2)``; NULL stays NULL."""
+    return "IIF(({0}) IS NULL, NULL, printf('%.2f', {0}))".format(expression)
+
+
+def _average(column):
+    """Average from the running totals, rounded like ``ROUND(AVG(...)::numeric, 2)``."""
+    return "ROUND({0}_sum / NULLIF({0}_count, 0), 2)".format(column)
+
+
+def _distinct_count(dimension):
+    return (
+        "(SELECT COUNT(*) FROM analysis_distinct_values "
+        "WHERE dimension = '{}' AND occurrences > 0)".format(dimension)
+    )
+
+
+# Question 8's universities, for the columnar answers.
+PHD_CS_UNIVERSITIES = ["Georgetown University", "MIT", "Stanford University", "Carnegie Mellon University"]
+
+
+# Question registry, in display order. Each question is a dict:
+# - id: unique name, used for timings and ``depends_on``;
+# - question: the text shown on the page;
+# - select: PostgreSQL SELECT expressions. Every expression aggregates the
+#   whole applicants table, with FILTER clauses instead of a WHERE, so the
+#   planner can put any number of questions into one scan;
+# - sqlite_select (optional): the same in SQLite's dialect (see
+#   sqlite_backend), where it differs. Dates are ISO text, and SQLite's
+#   applicants keeps no dimension ids, so questions 10 and 11 count the
+#   names those ids encode;
+# - aggregate_select (optional): the same answer read from the running
+#   totals in analysis_aggregates (see the aggregates module). Questions
+#   without one scan applicants even when the totals are kept;
+# - columnar (optional): ``columnar(store)`` returning the same values from
+#   a ``columnar.ColumnStore``, used with ``ANALYSIS_COLUMNAR=1``;
+# - format: a format string filled with the selected values, or a callable
+#   ``format(values, dependencies)`` returning the answer text;
+# - label: printed in front of the answer;
+# - depends_on (optional): ids of questions whose values the callable
+#   format receives, as ``{id: values}``;
+# - timeout_ms (optional): statement timeout for the scan that answers the
+#   question (see ``statement_timeout_ms``).
+#
+# Adding a question means adding an entry here; ``plan_questions`` decides
+# which scan it joins.
+QUESTIONS = [
+    {
+        "id": "fall_2026_applicants",
+        "question": 'How many entries do you have in your database who have applied for Fall 2026?',
+        "select": ["COUNT(*) FILTER (WHERE term = 'Fall 2026')"],
+        "aggregate_select": ["fall_2026"],
+        "columnar": lambda store: [store.count(store.isin("term", ["Fall 2026"]))],
+        "format": "{}",
+        "label": 'Fall 2026 Applicants: ',
+    },
+    {
+        "id": "percent_international",
+        "question": 'What percentage of entries are from international students (not American or Other) (to two decimal places)?',
+        "select": [
+            """ROUND(
+                100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other'))
+                / COUNT(*),
+                2
+            )""",
+        ],
+        "sqlite_select": [_sqlite_2dp(
+            "100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other')) / COUNT(*)"
+        )],
+        "aggregate_select": ["ROUND(100.0 * international / entries, 2)"],
+        "columnar": lambda store: [store.percent(store.notin("us_or_international", ["American", "Other"]))],
+        "format": "{}",
+        "label": 'Percent International: ',
+    },
+    {
+        "id": "average_stats",
+        "question": 'What is the average GPA, GRE, GRE V, GRE AW of applicants who provide these metrics?',
+        "select": [
+            "ROUND(AVG(gpa)::numeric, 2)",
+            "ROUND(AVG(gre)::numeric, 2)",
+            "ROUND(AVG(gre_v)::numeric, 2)",
+            "ROUND(AVG(gre_aw)::numeric, 2)",
+        ],
+        "sqlite_select": [
+            _sqlite_2dp("AVG(gpa)"), _sqlite_2dp("AVG(gre)"), _sqlite_2dp("AVG(gre_v)"), _sqlite_2dp("AVG(gre_aw)"),
+        ],
+        "aggregate_select": [_average("gpa"), _average("gre"), _average("gre_v"), _average("gre_aw")],
+        "columnar": lambda store: [store.mean(column) for column in ("gpa", "gre", "gre_v", "gre_aw")],
+        "format": "GPA: {} GRE: {} GRE V: {} GRE AW: {}",
+        "label": 'Average Stats: ',
+    },
+    {
+        "id": "american_fall_2026_gpa",
+        "question": 'What is their average GPA of American students in Fall 2026?',
+        "select": [
+            """ROUND((
+                AVG(gpa) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026')
+            )::numeric, 2)""",
+        ],
+        "sqlite_select": [
+            _sqlite_2dp("AVG(gpa) FILTER (WHERE us_or_international = 'American' AND term = 'Fall 2026')"),
+        ],
+        "aggregate_select": [_average("american_fall_2026_gpa")],
+        "columnar": lambda store: [
+            store.mean("gpa", store.isin("us_or_international", ["American"]) & store.isin("term", ["Fall 2026"])),
+        ],
+        "format": "{}",
+        "label": 'AVG GPA of Fall 2026 American Students: ',
+    },
+    {
+        "id": "fall_2026_acceptance_percent",
+        "question": 'What percent of entries for Fall 2026 are Acceptances (to two decimal places)?',
+        "select": [
+            """ROUND(
+                100.0 * COUNT(*) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted')
+                / COUNT(*),
+                2
+            )""",
+        ],
+        "sqlite_select": [
+            _sqlite_2dp("100.0 * COUNT(*) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted') / COUNT(*)"),
+        ],
+        "aggregate_select": ["ROUND(100.0 * fall_2026_accepted / entries, 2)"],
+        "columnar": lambda store: [
+            store.percent(store.isin("term", ["Fall 2026"]) & store.isin("status", ["Accepted"])),
+        ],
+        "format": "{}",
+        "label": 'Percent of acceptance for Fall 2026: ',
+    },
+    {
+        "id": "accepted_fall_2026_gpa",
+        "question": 'What is the average GPA of applicants who applied for Fall 2026 who are Acceptances?',
+        "select": [
+            """ROUND((
+                AVG(gpa) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026')
+            )::numeric, 2)""",
+        ],
+        "sqlite_select": [_sqlite_2dp("AVG(gpa) FILTER (WHERE status = 'Accepted' AND term = 'Fall 2026')")],
+        "aggregate_select": [_average("accepted_fall_2026_gpa")],
+        "columnar": lambda store: [
+            store.mean("gpa", store.isin("status", ["Accepted"]) & store.isin("term", ["Fall 2026"])),
+        ],
+        "format": "{}",
+        "label": 'Avg GPA of Fall 2026 Accepted students: ',
+    },
+    {
+        "id": "jhu_cs_masters",
+        "question": 'How many entries are from applicants who applied to JHU for a masters degrees in Computer Science?',
+        "select": [
+            """COUNT(*) FILTER (
+                WHERE degree = 'Masters'
+                AND program = 'Computer Science, Johns Hopkins University'
+            )""",
+        ],
+        "aggregate_select": ["jhu_cs_masters"],
+        "columnar": lambda store: [store.count(
+            store.isin("degree", ["Masters"])
+            & store.isin("program", ["Computer Science, Johns Hopkins University"])
+        )],
+        "format": "{}",
+        "label": 'Number of entries from JHU Comp Sci Masters Applicants: ',
+    },
+    {
+        "id": "phd_cs_acceptances_2026",
+        "question": 'How many entries from 2026 are acceptances from applicants who applied to Georgetown University, MIT, Stanford University, or Carnegie Mellon University for a PhD in Computer Science?',
+        "select": [
+            """COUNT(*) FILTER (
+                WHERE status = 'Accepted'
+                AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                AND degree = 'PhD'
+                AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+                AND program_name = 'Computer Science'
+            )""",
+        ],
+        "sqlite_select": [
+            """COUNT(*) FILTER (
+                WHERE status = 'Accepted'
+                AND date_added >= '2026-01-01' AND date_added < '2027-01-01'
+                AND degree = 'PhD'
+                AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+                AND program_name = 'Computer Science'
+            )""",
+        ],
+        "aggregate_select": ["phd_cs_accepted_2026"],
+        "columnar": lambda store: [store.count(
+            store.isin("status", ["Accepted"])
+            & store.dates("2026-01-01", "2027-01-01")
+            & store.isin("degree", ["PhD"])
+            & store.isin("university_name", PHD_CS_UNIVERSITIES)
+            & store.isin("program_name", ["Computer Science"])
+        )],
+        "format": "{}",
+        "label": 'Number of acceptances to Georgetown University, MIT, Stanford University, or Carnegie Mellon for a PhD in Computer Science: ',
+    },
+    {
+        "id": "phd_cs_acceptances_2026_llm",
+        "question": 'Do your numbers for question 8 change if you use LLM Generated Fields?',
+        "select": [
+            """COUNT(*) FILTER (
+                WHERE status = 'Accepted'
+                AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01'
+                AND degree = 'PhD'
+                AND llm_generated_program = 'Computer Science'
+                AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+            )""",
+        ],
+        "sqlite_select": [
+            """COUNT(*) FILTER (
+                WHERE status = 'Accepted'
+                AND date_added >= '2026-01-01' AND date_added < '2027-01-01'
+                AND degree = 'PhD'
+                AND llm_generated_program = 'Computer Science'
+                AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+            )""",
+        ],
+        "aggregate_select": ["phd_cs_accepted_2026_llm"],
+        "columnar": lambda store: [store.count(
+            store.isin("status", ["Accepted"])
+            & store.dates("2026-01-01", "2027-01-01")
+            & store.isin("degree", ["PhD"])
+            & store.isin("llm_generated_program", ["Computer Science"])
+            & store.isin("llm_generated_university", PHD_CS_UNIVERSITIES)
+        )],
+        "format": "{}",
+        "label": 'Same as last question but by using llm fields',
+    },
+    {
+        "id": "unique_names",
+        "question": 'How many unique program names and university names are in the data set?',
+        "select": ["COUNT(DISTINCT program_id)", "COUNT(DISTINCT university_id)"],
+        "sqlite_select": ["COUNT(DISTINCT program_name)", "COUNT(DISTINCT university_name)"],
+        "aggregate_select": [_distinct_count("program_id"), _distinct_count("university_id")],
+        "columnar": lambda store: [store.distinct("program_name"), store.distinct("university_name")],
+        "format": "{}, {}",
+        "label": 'Number of unique programs and universities in dataset, respectively: ',
+    },
+    {
+        "id": "unique_llm_names",
+        "question": 'How many unique llm-generated program names and university names are in the data set?',
+        "select": ["COUNT(DISTINCT llm_program_id)", "COUNT(DISTINCT llm_university_id)"],
+        "sqlite_select": ["COUNT(DISTINCT llm_generated_program)", "COUNT(DISTINCT llm_generated_university)"],
+        "aggregate_select": [_distinct_count("llm_program_id"), _distinct_count("llm_university_id")],
+        "columnar": lambda store: [
+            store.distinct("llm_generated_program"), store.distinct("llm_generated_university"),
+        ],
+        "format": "{}, {}",
+        "label": 'Number of unique llm-generated programs and universities in dataset, respectively: ',
+    },
+]
+
+
+def check_registry(registry):
+    """
+    Raise ValueError if ``registry`` repeats an id, depends on an unknown
+    one, or selects a different number of values for another backend.
+    """
+    ids = [question["id"] for question in registry]
+    duplicates = sorted({question_id for question_id in ids if ids.count(question_id) > 1})
+    if duplicates:
+        raise ValueError("Duplicate question ids: {}".format(", ".join(duplicates)))
+    for question in registry:
+        unknown = [dependency for dependency in question.get("depends_on", ()) if dependency not in ids]
+        if unknown:
+            raise ValueError("Question '{}' depends on unknown ids: {}".format(question["id"], ", ".join(unknown)))
+        for key in ("sqlite_select", "aggregate_select"):
+            if key in question and len(question[key]) != len(question["select"]):
+                raise ValueError("Question '{}' selects {} values in {}".format(
+                    question["id"], len(question[key]), key
+                ))
 
-    # Return the database connection object
-    return connection
 
+check_registry(QUESTIONS)
 
-def questions(connection):
-    """
-    Run a series of analytical SQL queries against the applicants table.
+_COUNT_DISTINCT = re.compile(r"COUNT\(DISTINCT (\w+)\)")
 
-    This function:
-    - Recreates the answers_table
-    - Executes multiple analysis queries
-    - Stores each question and its answer in answers_table
-    - Returns all question–answer pairs for use in Flask
+
+def plan_scans(selects, grouping_sets=True, table="applicants"):
+    """
+    Group the questions' SELECT lists into as few scans of applicants as possible.
+
+    ``selects`` holds one list of whole-table aggregate expressions per
+    question, so all of them fit in a single SELECT. With ``grouping_sets``
+    the questions that only count distinct column values are split off into
+    a second scan that hashes each column in one ``GROUPING SETS``
+    aggregate: PostgreSQL sorts the input of every ``COUNT(DISTINCT)``
+    separately, which costs more than the extra scan. SQLite has no
+    grouping sets and gets one scan.
+
+    Returns ``(sql, question_indexes)`` pairs; each scan's single row holds
+    the values of its questions' expressions in order. ``table`` is the
+    relation the SELECTs read from.
     """
+    aggregate, distinct = [], []
+    for index, expressions in enumerate(selects):
+        if grouping_sets and all(_COUNT_DISTINCT.fullmatch(e) for e in expressions):
+            distinct.append(index)
+        else:
+            aggregate.append(index)
+
+    scans = []
+    if aggregate:
+        expressions = [e for index in aggregate for e in selects[index]]
+        scans.append(("SELECT {} FROM {};".format(", ".join(expressions), table), aggregate))
+    if distinct:
+        counted = [_COUNT_DISTINCT.fullmatch(e).group(1) for index in distinct for e in selects[index]]
+        columns = list(dict.fromkeys(counted))
+        # Each grouping set yields one row per distinct value of its column
+        # and NULL in the others, so COUNT(column) is COUNT(DISTINCT column).
+        sql = "SELECT {} FROM (SELECT {} FROM {} GROUP BY GROUPING SETS ({})) AS groups;".format(
+            ", ".join("COUNT({})".format(column) for column in counted),
+            ", ".join(columns),
+            table,
+            ", ".join("({})".format(column) for column in columns),
+        )
+        scans.append((sql, distinct))
+    return scans
 
-    # Open a database cursor using a context manager
-    with connection.cursor() as cur:
 
-        # Remove any existing answers table so results are always fresh
-        cur.execute("DROP TABLE IF EXISTS answers_table;")
-
-        # Create a new table to store analysis questions and answers
-        cur.execute("""
-            CREATE TABLE answers_table (
-                question TEXT,
-                answer TEXT
-            );
-        """)
-        connection.commit()
-
-        # List used to collect answers for returning to the caller
-        answers = []
-
-        # --- QUERY 1 ---
-        # Count how many applicants applied for Fall 2026
-        question = 'How many entries do you have in your database who have applied for Fall 2026?'
-        cur.execute("""
-            SELECT COUNT(p_id)
-            FROM applicants
-            WHERE term = 'Fall 2026';
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Fall 2026 Applicants: ', result)
+def plan_questions(registry, source="postgres"):
+    """
+    Plan ``registry``'s questions into scans for ``source``.
 
-        # --- QUERY 2 ---
-        # Calculate percentage of applicants who are international students
-        question = 'What percentage of entries are from international students (not American or Other) (to two decimal places)?'
-        cur.execute("""
-            SELECT ROUND(
-                100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other'))
-                / COUNT(*),
-                2
-            )
-            FROM applicants;
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Percent International: ', result)
-
-        # --- QUERY 3 ---
-        # Compute average GPA and GRE metrics for applicants who provided them
-        question = 'What is the average GPA, GRE, GRE V, GRE AW of applicants who provide these metrics?'
-        cur.execute("""
-            SELECT
-                ROUND(AVG(gpa)::numeric, 2),
-                ROUND(AVG(gre)::numeric, 2),
-                ROUND(AVG(gre_v)::numeric, 2),
-                ROUND(AVG(gre_aw)::numeric, 2)
-            FROM applicants;
-        """)
-        avg_gpa, avg_gre, avg_gre_v, avg_gre_aw = cur.fetchone()
-
-        result_str = f"GPA: {avg_gpa} GRE: {avg_gre} GRE V: {avg_gre_v} GRE AW: {avg_gre_aw}"
-
-        answers.append([question, result_str])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, result_str)
-        )
-        print('Average Stats: ', result_str)
-
-        # --- QUERY 4 ---
-        # Calculate the average GPA of American applicants for Fall 2026
-        question = 'What is their average GPA of American students in Fall 2026?'
-        cur.execute("""
-            SELECT ROUND(AVG(gpa)::numeric, 2)
-            FROM applicants
-            WHERE us_or_international = 'American' AND term = 'Fall 2026';
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
+    ``source`` is ``"postgres"`` or ``"sqlite"`` to scan applicants, or
+    ``"aggregates"`` to read the running totals; there, questions without
+    an ``aggregate_select`` are planned into scans of applicants. Returns
+    ``plan_scans``-style pairs whose indexes point into ``registry``.
+    """
+    if source == "sqlite":
+        return plan_scans(
+            [question.get("sqlite_select", question["select"]) for question in registry], grouping_sets=False
         )
-        print('AVG GPA of Fall 2026 American Students: ', result)
+    if source == "postgres":
+        return plan_scans([question["select"] for question in registry])
 
-        # --- QUERY 5 ---
-        # Compute the acceptance percentage for Fall 2026 applicants
-        question = 'What percent of entries for Fall 2026 are Acceptances (to two decimal places)?'
-        cur.execute("""
-            SELECT ROUND(
-                100.0 * COUNT(*) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted')
-                / COUNT(*),
-                2
+    from_totals = [index for index, question in enumerate(registry) if question.get("aggregate_select")]
+    from_table = [index for index, question in enumerate(registry) if not question.get("aggregate_select")]
+    scans = []
+    for indexes, key, table in (
+        (from_totals, "aggregate_select", "analysis_aggregates"),
+        (from_table, "select", "applicants"),
+    ):
+        for sql, planned in plan_scans([registry[index][key] for index in indexes], table=table):
+            scans.append((sql, [indexes[position] for position in planned]))
+    return scans
+
+
+POSTGRES_SCANS = plan_questions(QUESTIONS, "postgres")
+SQLITE_SCANS = plan_questions(QUESTIONS, "sqlite")
+AGGREGATE_SCANS = plan_questions(QUESTIONS, "aggregates")
+
+
+def incremental_enabled():
+    """
+    Return False when ``ANALYSIS_INCREMENTAL`` turns the running aggregates off.
+
+    On by default; set ``ANALYSIS_INCREMENTAL=0`` to answer every question
+    from a scan of applicants instead.
+    """
+    flag = os.getenv("ANALYSIS_INCREMENTAL", "1").strip().lower()
+    return flag not in ("0", "false", "no", "off")
+
+
+def parallel_enabled():
+    """
+    Return True when ``ANALYSIS_PARALLEL`` opts into running scans concurrently.
+
+    Each scan then runs on its own pooled read connection (see
+    ``run_scans``).
+    """
+    flag = os.getenv("ANALYSIS_PARALLEL", "").strip().lower()
+    return flag in ("1", "true", "yes", "on")
+
+
+def statement_timeout_ms():
+    """
+    Return the default per-scan statement timeout from ``ANALYSIS_STATEMENT_TIMEOUT_MS``.
+
+    None (the default, or 0) leaves the server's setting alone. A question's
+    ``timeout_ms`` overrides it for the scan that answers it.
+    """
+    timeout = int(os.getenv("ANALYSIS_STATEMENT_TIMEOUT_MS", "0") or 0)
+    return timeout or None
+
+
+def _scans(connection, cur, indexes=None):
+    """
+    Return the planned analysis scans for ``connection``'s backend.
+
+    PostgreSQL reads the running aggregates when its triggers keep them;
+    SQLite, and PostgreSQL without them, scan applicants. With ``indexes``
+    only those questions are planned.
+    """
+    source = backend(connection)
+    if source == "postgres" and incremental_enabled() and has_aggregates(cur):
+        source = "aggregates"
+    scans = {"sqlite": SQLITE_SCANS, "aggregates": AGGREGATE_SCANS, "postgres": POSTGRES_SCANS}[source]
+    if indexes is None or len(indexes) == len(QUESTIONS):
+        return scans
+    return [
+        (sql, [indexes[position] for position in planned])
+        for sql, planned in plan_questions([QUESTIONS[index] for index in indexes], source)
+    ]
+
+
+def _scan_timeout(indexes):
+    """Longest statement timeout asked for by the questions of one scan, or None."""
+    default = statement_timeout_ms()
+    timeouts = [QUESTIONS[index].get("timeout_ms", default) for index in indexes]
+    return max(timeouts) if None not in timeouts else None
+
+
+# Sets a statement timeout in milliseconds for the rest of the transaction.
+STATEMENT_TIMEOUT_QUERY = "SELECT set_config('statement_timeout', %s, true);"
+
+
+def _run_pooled_scan(sql, timeout_ms):
+    """Run one scan on a read connection borrowed from the pool; return (row, ms)."""
+    started = time.perf_counter()
+    with connection(get_db_read_connect_kwargs()) as conn, conn.cursor() as cur:
+        timeout_query = backend_query(conn, "STATEMENT_TIMEOUT_QUERY", STATEMENT_TIMEOUT_QUERY)
+        if timeout_ms and timeout_query:
+            cur.execute(timeout_query, (str(timeout_ms),))
+        cur.execute(sql)
+        row = cur.fetchone()
+    return row, (time.perf_counter() - started) * 1000
+
+
+def run_scans(connection, cur, scans, pipeline=False, parallel=False):
+    """
+    Run ``scans`` and return ``(results, milliseconds)``, one entry per scan.
+
+    - By default the scans run one after another on ``cur``.
+    - In pipeline mode each scan gets its own cursor and all of them are
+      sent before the first result is read, so the set costs one round
+      trip; a scan's time is measured until its result is read.
+    - With ``parallel`` every scan runs at the same time on its own pooled
+      read connection, so the wall time is close to the slowest scan.
+      Each reads its own snapshot, which only matters while a refresh is
+      writing. A single scan stays on ``cur``.
+
+    Scans sharing ``connection`` share one statement timeout, the longest
+    any of them asks for (see ``statement_timeout_ms``); parallel scans get
+    their own. A scan that runs past it raises ``QueryCanceled``, an
+    ``OperationalError``, like any other database error.
+    """
+    timeouts = [_scan_timeout(indexes) for _sql, indexes in scans]
+
+    if parallel and len(scans) > 1:
+        with ThreadPoolExecutor(max_workers=len(scans), thread_name_prefix="analysis-scan") as executor:
+            futures = [
+                executor.submit(_run_pooled_scan, sql, timeout)
+                for (sql, _indexes), timeout in zip(scans, timeouts)
+            ]
+            finished = [future.result() for future in futures]
+        return [row for row, _ms in finished], [ms for _row, ms in finished]
+
+    timeout = max(timeouts) if timeouts and None not in timeouts else None
+    timeout_query = backend_query(connection, "STATEMENT_TIMEOUT_QUERY", STATEMENT_TIMEOUT_QUERY)
+    if timeout and timeout_query:
+        cur.execute(timeout_query, (str(timeout),))
+
+    results, milliseconds = [], []
+    started = time.perf_counter()
+    if not pipeline:
+        for sql, _indexes in scans:
+            scan_started = time.perf_counter()
+            cur.execute(sql)
+            results.append(cur.fetchone())
+            milliseconds.append((time.perf_counter() - scan_started) * 1000)
+    else:
+        cursors = [connection.cursor() for _ in scans]
+        for scan_cur, (sql, _indexes) in zip(cursors, scans):
+            scan_cur.execute(sql)
+        for scan_cur in cursors:
+            results.append(scan_cur.fetchone())
+            milliseconds.append((time.perf_counter() - started) * 1000)
+            scan_cur.close()
+    return results, milliseconds
+
+
+# Milliseconds spent on each question (the time of the scan that answered
+# it, 0.0 when it came from the cache) in the last questions() run, by
+# question id.
+_last_timings = {}
+
+
+def last_timings():
+    """Return ``{question id: milliseconds}`` for the last ``questions`` run."""
+    return dict(_last_timings)
+
+
+def _answer_columnar(cur, indexes, rows, cache, version):
+    """
+    Fill ``rows`` from the columnar store for the questions in ``indexes``
+    that have a ``columnar`` entry, and return the indexes of the others.
+
+    The store is brought up to date on ``cur`` first (see
+    ``columnar.ColumnStore.refresh``).
+    """
+    store = columnar.get_store()
+    remaining = []
+    with store.lock:
+        store.refresh(cur)
+        for index in indexes:
+            question = QUESTIONS[index]
+            if "columnar" not in question:
+                remaining.append(index)
+                continue
+            started = time.perf_counter()
+            rows[index] = tuple(question["columnar"](store))
+            _last_timings[question["id"]] = (time.perf_counter() - started) * 1000
+            if version is not None:
+                cache.put(question["id"], (), version, rows[index])
+    return remaining
+
+
+def _fetch_rows(connection, cur, pipeline, parallel=False):
+    """
+    Return one result row per question, in order.
+
+    Rows cached for the current data version (see ``result_cache``) are
+    used as they are. With ``ANALYSIS_COLUMNAR`` the others are answered
+    from the in-process columnar store where they can be; only the rest are
+    planned into scans. New rows are cached. Records each question's time for
+    ``last_timings``.
+    """
+    cache = result_cache.get_cache() if result_cache.cache_enabled() else None
+    version = result_cache.data_version(cur) if cache else None
+
+    rows = [None] * len(QUESTIONS)
+    _last_timings.clear()
+    missing = []
+    for index, question in enumerate(QUESTIONS):
+        if version is not None:
+            rows[index] = cache.get(question["id"], (), version)
+        if rows[index] is None:
+            missing.append(index)
+        else:
+            _last_timings[question["id"]] = 0.0
+    if not missing:
+        return rows
+    if columnar.columnar_enabled():
+        missing = _answer_columnar(cur, missing, rows, cache, version)
+        if not missing:
+            return rows
+
+    scans = _scans(connection, cur, missing)
+    results, milliseconds = run_scans(connection, cur, scans, pipeline=pipeline, parallel=parallel)
+
+    # Hand each question the slice of its scan's row that it selected.
+    for (_sql, indexes), result, ms in zip(scans, results, milliseconds):
+        values = iter(result)
+        for index in indexes:
+            rows[index] = tuple(islice(values, len(QUESTIONS[index]["select"])))
+            _last_timings[QUESTIONS[index]["id"]] = ms
+            if version is not None:
+                cache.put(QUESTIONS[index]["id"], (), version, rows[index])
+    return rows
+
+
+def format_answers(registry, rows):
+    """
+    Return ``[question, answer]`` pairs for ``registry`` and its value rows.
+
+    A string ``format`` is filled with the question's values; a callable
+    one is called with them and the values of its ``depends_on`` questions.
+    Each answer is printed after its label.
+    """
+    values_by_id = {question["id"]: row for question, row in zip(registry, rows)}
+    answers = []
+    for question, row in zip(registry, rows):
+        answer_format = question["format"]
+        if callable(answer_format):
+            dependencies = {dependency: values_by_id[dependency] for dependency in question.get("depends_on", ())}
+            result_str = answer_format(row, dependencies)
+        else:
+            result_str = answer_format.format(*row)
+        answers.append([question["question"], result_str])
+        print(question["label"], result_str)
+    return answers
+
+
+# Answers are stored as numbered versions. A run inserts its answers under a
+# new version and deletes older ones in the same transaction; answers_table
+# is a view of the newest version. Readers never wait on a run (there is no
+# DDL, and MVCC shows them the previous version until the run commits) and
+# never see the answers missing.
+ANSWERS_SCHEMA_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS analysis_versions (
+        version BIGSERIAL PRIMARY KEY,
+        computed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analysis_answers (
+        version BIGINT NOT NULL,
+        position INTEGER NOT NULL,
+        question TEXT,
+        answer TEXT,
+        PRIMARY KEY (version, position)
+    );
+    """,
+    # Before versions, answers_table was a table that every run dropped and
+    # recreated. Keep its answers as the first version.
+    """
+    DO $$
+    DECLARE
+        first_version BIGINT;
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('answers_table')) = 'r' THEN
+            INSERT INTO analysis_versions DEFAULT VALUES RETURNING version INTO first_version;
+            INSERT INTO analysis_answers (version, position, question, answer)
+            SELECT first_version, row_number() OVER (), question, answer FROM answers_table;
+            DROP TABLE answers_table;
+        END IF;
+    END
+    $$;
+    """,
+    """
+    CREATE OR REPLACE VIEW answers_table AS
+    SELECT question, answer
+    FROM analysis_answers
+    WHERE version = (SELECT max(version) FROM analysis_versions)
+    ORDER BY position;
+    """,
+]
+
+# Publishes a version in one statement, so a pipelined run does not wait
+# for the new version number.
+STORE_ANSWERS_QUERY = """
+WITH new_version AS (
+    INSERT INTO analysis_versions DEFAULT VALUES RETURNING version
+), stored AS (
+    INSERT INTO analysis_answers (version, position, question, answer)
+    SELECT new_version.version, answers.position, answers.question, answers.answer
+    FROM new_version, (VALUES {values}) AS answers (position, question, answer)
+), pruned AS (
+    DELETE FROM analysis_answers
+    WHERE version < (SELECT version FROM new_version)
+)
+DELETE FROM analysis_versions
+WHERE version < (SELECT version FROM new_version);
+"""
+
+
+ANSWER_VERSIONS_EXIST_QUERY = "SELECT to_regclass('analysis_answers') IS NOT NULL;"
+
+
+def _has_answer_versions(connection, cur):
+    cur.execute(backend_query(connection, "ANSWER_VERSIONS_EXIST_QUERY", ANSWER_VERSIONS_EXIST_QUERY))
+    return bool(cur.fetchone()[0])
+
+
+def store_answers(connection, answers):
+    """
+    Publish ``answers`` (question, answer pairs) as the newest version.
+
+    Creates the versioned answer tables on first use, converting an old
+    ``answers_table`` table. Commits ``connection``.
+    """
+    with connection.cursor() as cur:
+        if not _has_answer_versions(connection, cur):
+            for query in backend_query(connection, "ANSWERS_SCHEMA_QUERIES", ANSWERS_SCHEMA_QUERIES):
+                cur.execute(query)
+
+        rows = [(position, question, answer) for position, (question, answer) in enumerate(answers, 1)]
+        if is_sqlite(connection):
+            new_version, store, prune_answers, prune_versions = backend_query(
+                connection, "STORE_ANSWERS_QUERY", STORE_ANSWERS_QUERY
             )
-            FROM applicants;
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Percent of acceptance for Fall 2026: ', result)
-
-        # --- QUERY 6 ---
-        # Calculate average GPA of accepted applicants for Fall 2026
-        question = 'What is the average GPA of applicants who applied for Fall 2026 who are Acceptances?'
-        cur.execute("""
-            SELECT ROUND(AVG(gpa)::numeric, 2)
-            FROM applicants
-            WHERE status = 'Accepted' AND term = 'Fall 2026';
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Avg GPA of Fall 2026 Accepted students: ', result)
-
-        # --- QUERY 7 ---
-        # Count applicants applying to JHU for a Master's in Computer Science
-        question = 'How many entries are from applicants who applied to JHU for a masters degrees in Computer Science?'
-        cur.execute("""
-            SELECT COUNT(p_id)
-            FROM applicants
-            WHERE degree = 'Masters'
-            AND program = 'Computer Science, Johns Hopkins University';
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Number of entries from JHU Comp Sci Masters Applicants: ', result)
-
-        # --- QUERY 8 ---
-        # Count PhD acceptances in CS at selected universities during 2026
-        question = 'How many entries from 2026 are acceptances from applicants who applied to Georgetown University, MIT, Stanford University, or Carnegie Mellon University for a PhD in Computer Science?'
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM applicants
-            WHERE status = 'Accepted'
-            AND EXTRACT(YEAR FROM date_added) = 2026
-            AND degree = 'PhD'
-            AND TRIM(SPLIT_PART(program, ',', 2)) IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
-            AND TRIM(SPLIT_PART(program, ',', 1)) = 'Computer Science';
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Number of acceptances to Georgetown University, MIT, Stanford University, or Carnegie Mellon for a PhD in Computer Science: ', result)
-
-        # --- QUERY 9 ---
-        # Repeat Query 8 using LLM-generated program and university fields
-        question = 'Do your numbers for question 8 change if you use LLM Generated Fields?'
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM applicants
-            WHERE status = 'Accepted'
-            AND EXTRACT(YEAR FROM date_added) = 2026
-            AND degree = 'PhD'
-            AND llm_generated_program = 'Computer Science'
-            AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University');
-        """)
-        result = cur.fetchone()[0]
-
-        answers.append([question, str(result)])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, str(result))
-        )
-        print('Same as last question but by using llm fields', result)
-
-        # --- QUERY 10 ---
-        # Count unique program and university names from raw program strings
-        question = 'How many unique program names and university names are in the data set?'
-        cur.execute("""
-            SELECT 
-                COUNT(DISTINCT TRIM(SPLIT_PART(program, ',', 1))),
-                COUNT(DISTINCT TRIM(SPLIT_PART(program, ',', 2)))
-            FROM applicants;
-        """)
-        unique_programs, unique_universities = cur.fetchone()
-
-        result_str = f"{unique_programs}, {unique_universities}"
-        answers.append([question, result_str])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, result_str)
-        )
-        print('Number of unique programs and universities in dataset, respectively: ', result_str)
-
-        # --- QUERY 11 ---
-        # Count unique program and university names from LLM-generated fields
-        question = 'How many unique llm-generated program names and university names are in the data set?'
-        cur.execute("""
-            SELECT 
-                COUNT(DISTINCT llm_generated_program),
-                COUNT(DISTINCT llm_generated_university)
-            FROM applicants;
-        """)
-        unique_programs, unique_universities = cur.fetchone()
-
-        result_str = f"{unique_programs}, {unique_universities}"
-        answers.append([question, result_str])
-        cur.execute(
-            "INSERT INTO answers_table (question, answer) VALUES (%s, %s)",
-            (question, result_str)
-        )
-        print('Number of unique llm-generated programs and universities in dataset, respectively: ', result_str)
+            cur.execute(new_version)
+            version = cur.fetchone()[0]
+            cur.execute(
+                store.format(values=", ".join(["(%s, %s, %s, %s)"] * len(rows))),
+                [value for row in rows for value in (version,) + row],
+            )
+            cur.execute(prune_answers, (version,))
+            cur.execute(prune_versions, (version,))
+        else:
+            # Typed first row, so the VALUES list is not all unknown text.
+            values = ", ".join(["(%s::integer, %s::text, %s::text)"] + ["(%s, %s, %s)"] * (len(rows) - 1))
+            cur.execute(STORE_ANSWERS_QUERY.format(values=values), [value for row in rows for value in row])
+    connection.commit()
+
+
+def analysis_refresh_enabled():
+    """
+    Return True when ``ANALYSIS_REFRESH_AFTER_INGEST`` asks for fresh answers
+    after every refresh that wrote rows (see ``refresh_after_ingest``).
+    """
+    flag = os.getenv("ANALYSIS_REFRESH_AFTER_INGEST", "").strip().lower()
+    return flag in ("1", "true", "yes", "on")
+
+
+def refresh_after_ingest():
+    """
+    Recompute the answers if ``analysis_refresh_enabled``.
+
+    Runs on the primary, which already has the rows just written. Returns
+    True when new answers were stored; a database error is printed and
+    leaves the previous answers in place.
+    """
+    if not analysis_refresh_enabled():
+        return False
+    try:
+        with connect() as conn:
+            questions(conn)
+    except OperationalError:
+        return False
+    return True
+
+
+def questions(connection, pipeline=None, write_connection=None, parallel=None):
+    """
+    Run a series of analytical SQL queries against the applicants table.
+
+    This function:
+    - Answers every question on ``connection`` from running totals or in as few table scans as possible
+    - Publishes the answers as a new version of answers_table
+    - Returns all question–answer pairs for use in Flask
+
+    On PostgreSQL the answers are read from ``analysis_aggregates``, which
+    triggers keep current on every write (see the aggregates module), unless
+    ``ANALYSIS_INCREMENTAL`` turns that off or the triggers are missing.
+    Otherwise ``plan_questions`` decides how the questions in ``QUESTIONS``
+    share scans. Questions cached for the current data version (see
+    ``result_cache``) are not queried, and with ``ANALYSIS_COLUMNAR=1`` the
+    questions are answered from the in-process ``columnar`` store. The answers are stored with ``store_answers`` on ``write_connection``
+    (default: ``connection``); page reads keep seeing the previous answers
+    until it commits and never wait for it.
+
+    Passing a replica connection for the reads and a primary connection for
+    ``write_connection`` keeps the heavy queries off the primary.
+
+    ``pipeline`` selects psycopg pipeline mode; by default it follows
+    ``DATABASE_PIPELINE`` (see ``db_config.pipeline_enabled``). Results are
+    identical either way. ``parallel`` runs the scans concurrently on pooled
+    connections; by default it follows ``ANALYSIS_PARALLEL`` (see
+    ``parallel_enabled``). ``last_timings`` reports how long each question
+    took.
+    """
+    if pipeline is None:
+        pipeline = pipeline_enabled()
+    if parallel is None:
+        parallel = parallel_enabled()
+    if write_connection is None:
+        write_connection = connection
+
+    # In pipeline mode every statement below is queued and only results and
+    # commits wait for replies.
+    with connection.pipeline() if pipeline else nullcontext(), connection.cursor() as cur:
+        rows = _fetch_rows(connection, cur, pipeline, parallel)
+
+    answers = format_answers(QUESTIONS, rows)
 
-        # Commit all inserted answers to the database
-        connection.commit()
+    with write_connection.pipeline() if pipeline else nullcontext():
+        store_answers(write_connection, answers)
+    note_write()
 
     # Return list of question–answer pairs
     return answers
@@ -272,8 +811,8 @@ def questions(connection):
 
 # Allow this file to be executed directly for testing purposes
 def main():
-    conn = connect()
-    questions(conn)
+    with connect() as conn:
+        questions(conn)
 
 
 if __name__ == "__main__":
@@ -3,8 +3,11 @@
 from module_2.scrape import scrape_data       # Function to scrape data from the website
 from module_2.clean import clean_data         # Function to clean/format the scraped data
 from update_data import insert_applicants_from_json_batch  # Function to insert data into SQL DB
-import psycopg                                # PostgreSQL database connector
-from db_config import get_db_connect_kwargs
+from update_data import upsert_applicants_from_json_batch  # Insert-or-refresh variant
+from update_data import replay_spool  # Drains batches spooled during a DB outage
+from query_data import refresh_after_ingest  # Optional answers refresh after new rows
+import os
+from db_config import connection, get_db_connect_kwargs  # Pooled PostgreSQL connections
 
 def get_newest_p():
     """
@@ -13,7 +16,7 @@ def get_newest_p():
         int or None: The maximum p_id in the table, or None if table is empty
     """
     # Connect to the PostgreSQL database
-    with psycopg.connect(**get_db_connect_kwargs()) as conn:
+    with connection(get_db_connect_kwargs()) as conn:
         # Open a cursor to execute SQL commands
         with conn.cursor() as cur:
             # Get the maximum p_id from the applicants table
@@ -24,17 +27,31 @@ def get_newest_p():
     max_p_id = int(max_p_id) if max_p_id is not None else None
     return max_p_id
 
-def update_db():
+def update_db(rescrape=None):
     """
     Update the database with any new applicants not yet stored.
     Steps:
+      0. Replay any batches spooled while the database was unreachable.
       1. Get the newest p_id in the database.
       2. Scrape the first page of the site to see what the newest entry is.
       3. Calculate how many new entries are missing from the DB.
       4. Scrape the missing entries, clean them, and insert into the database.
+      5. Recompute the analysis answers if ``ANALYSIS_REFRESH_AFTER_INGEST``
+         is set (see ``query_data.refresh_after_ingest``).
+
+    ``rescrape`` (default: the ``REFRESH_RESCRAPE`` environment variable, 0)
+    also re-fetches that many already-stored entries and upserts the lot, so
+    posts edited on the site since they were loaded are picked up.
     Returns:
         int: 0 if new data was added, 1 if database was already up-to-date
     """
+    if rescrape is None:
+        rescrape = int(os.getenv("REFRESH_RESCRAPE", "0"))
+
+    # Spooled rows count towards the newest stored p_id, so they are not
+    # scraped again.
+    replay_spool()
+
     # First fetch one row to inspect the newest site p_id without pulling
     # the full missing range yet.
     new_data = scrape_data(1)
@@ -48,6 +65,15 @@ def update_db():
     # Positive value means the local DB is behind the latest site row.
     num_data_needed = newest_site_p - get_newest_p()
     print(num_data_needed)
+    if rescrape > 0:
+        # Re-fetch recent entries too; unchanged ones are not rewritten.
+        new_data_cleaned = clean_data(scrape_data(num_data_needed + rescrape))
+        counts = upsert_applicants_from_json_batch(new_data_cleaned)
+        print(counts)
+        if counts and (counts["inserted"] or counts["updated"]):
+            refresh_after_ingest()
+            return 0  # New or edited data was written
+        return 1
     if num_data_needed != 0:
         # Scrape the missing entries
         new_data = scrape_data(num_data_needed)
@@ -55,6 +81,9 @@ def update_db():
         new_data_cleaned = clean_data(new_data)
         # Insert new applicants into the database
         flag = insert_applicants_from_json_batch(new_data_cleaned)
+        if flag != -1:
+            # With ANALYSIS_REFRESH_AFTER_INGEST set, recompute the answers.
+            refresh_after_ingest()
 
         return 0  # New data was added
     else: 
@@ -0,0 +1,286 @@
+"""Analysis results cached by question, parameters and data version.
+
+A cached value is only used while the data it was computed from is
+unchanged. ``data_version`` returns a token that changes whenever
+``applicants`` does: on PostgreSQL a counter bumped by statement-level
+triggers in the writer's transaction, plus the table's oid (a recreated
+table gets a new one); on SQLite the schema version and a counter the
+writers bump with every write. Entries for older tokens are never hit
+again and age out of the LRU.
+
+With ``ANALYSIS_CACHE_DIR`` set, values are also written to that directory,
+one JSON file per entry, so processes on the host share them.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+from datetime import date, datetime
+from decimal import Decimal
+
+import sqlite_backend
+from db_config import is_sqlite
+
+# Counter bumped by every statement that changes applicants. Zero-row
+# statements (an upsert that changed nothing, a refresh of known rows) do
+# not bump it, so they keep the cache warm.
+DATA_VERSION_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS applicants_data_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL DEFAULT 0
+    );
+    """,
+    "INSERT INTO applicants_data_version DEFAULT VALUES ON CONFLICT DO NOTHING;",
+    """
+    CREATE OR REPLACE FUNCTION applicants_data_version_bump()
+    RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE'
+            OR (TG_OP = 'DELETE' AND EXISTS (SELECT 1 FROM old_rows))
+            OR (TG_OP <> 'DELETE' AND EXISTS (SELECT 1 FROM new_rows)) THEN
+            UPDATE applicants_data_version SET version = version + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_data_version_insert
+    AFTER INSERT ON applicants REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_data_version_update
+    AFTER UPDATE ON applicants REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_data_version_delete
+    AFTER DELETE ON applicants REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_data_version_truncate
+    AFTER TRUNCATE ON applicants
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_data_version_bump();
+    """,
+]
+
+BUMP_VERSION_QUERY = "UPDATE applicants_data_version SET version = version + 1;"
+
+DEFAULT_CACHE_SIZE = 256
+
+
+def cache_enabled():
+    """
+    Return False when ``ANALYSIS_CACHE`` turns the result cache off.
+
+    On by default; set ``ANALYSIS_CACHE=0`` to compute every result.
+    """
+    flag = os.getenv("ANALYSIS_CACHE", "1").strip().lower()
+    return flag not in ("0", "false", "no", "off")
+
+
+def data_version(cur):
+    """
+    Return the current data-version token on the open cursor, or None.
+
+    None means the version cannot be told (the PostgreSQL counter is not
+    installed yet), and nothing should be cached or served from the cache.
+    """
+    if is_sqlite(cur):
+        # One statement there; see sqlite_backend.QUERIES.
+        cur.execute(sqlite_backend.QUERIES["DATA_VERSION_QUERY"])
+        return tuple(cur.fetchone())
+    cur.execute(
+        "SELECT to_regclass('applicants')::oid::bigint, "
+        "to_regclass('applicants_data_version') IS NOT NULL;"
+    )
+    table_oid, has_counter = cur.fetchone()
+    if not has_counter:
+        return None
+    cur.execute("SELECT version FROM applicants_data_version;")
+    return (table_oid, cur.fetchone()[0])
+
+
+def bump_version(cur):
+    """
+    Mark ``applicants`` as changed on the open cursor; the caller commits.
+
+    On PostgreSQL this is for changes that fire no triggers, such as
+    detaching a partition, and does nothing when the counter is not
+    installed. SQLite has no statement triggers, so its writers call it
+    after every write to ``applicants``, in the same transaction.
+    """
+    if is_sqlite(cur):
+        read, write = sqlite_backend.QUERIES["BUMP_VERSION_QUERY"]
+        cur.execute(read)
+        cur.execute(write.format(version=cur.fetchone()[0] + 1))
+        return
+    cur.execute("SELECT to_regclass('applicants_data_version') IS NOT NULL;")
+    if cur.fetchone()[0]:
+        cur.execute(BUMP_VERSION_QUERY)
+
+
+def _encode(value):
+    """``json.dump`` default: tag Decimal, datetime and date values so they round-trip."""
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    raise TypeError("Cannot cache {!r}".format(value))
+
+
+def _decode(obj):
+    """``json.load`` object hook: undo ``_encode``'s tags, leaving other objects as they are."""
+    if "decimal" in obj:
+        return Decimal(obj["decimal"])
+    if "datetime" in obj:
+        return datetime.fromisoformat(obj["datetime"])
+    if "date" in obj:
+        return date.fromisoformat(obj["date"])
+    return obj
+
+
+def _freeze(value):
+    """Turn JSON-decoded lists back into the tuples results are made of."""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _freeze(item) for key, item in value.items()}
+    return value
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of results keyed by ``(name, params, version)``.
+
+    ``params`` and the value must be JSON-serializable apart from Decimal,
+    date and datetime values; lists in a value come back as tuples. With a
+    ``directory``, entries are also read from and written to files there,
+    and files for other data versions are removed when a new one is stored.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(obj):
+        return hashlib.sha256(json.dumps(obj, default=_encode).encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key):
+        name, params, version = key
+        return os.path.join(
+            self.directory, "{}-{}.json".format(self._digest(version), self._digest([name, params]))
+        )
+
+    def _read_file(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return _freeze(json.load(f, object_hook=_decode))
+        except (OSError, ValueError):
+            return None
+
+    def _write_file(self, key, value):
+        path = self._path(key)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=_encode)
+        os.replace(tmp, path)
+        current = os.path.basename(path).split("-")[0]
+        for existing in os.listdir(self.directory):
+            if existing.endswith(".json") and not existing.startswith(current + "-"):
+                # Another process may have removed it already.
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, existing))
+
+    def get(self, name, params, version):
+        """Return the cached value, or None on a miss."""
+        key = (name, params, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self._read_file(key) if self.directory else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, name, params, version, value):
+        """Store ``value``, evicting the least recently used entries over the limit."""
+        key = (name, params, version)
+        if self.directory:
+            self._write_file(key, value)
+        with self._lock:
+            self._remember(key, value)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry in memory and on disk, and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+        if self.directory and os.path.isdir(self.directory):
+            for existing in os.listdir(self.directory):
+                if existing.endswith(".json"):
+                    # Another process sharing the directory may remove it first.
+                    with suppress(FileNotFoundError):
+                        os.remove(os.path.join(self.directory, existing))
+
+    def stats(self):
+        """Return ``{"entries", "hits", "misses"}``."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide cache, created on first use.
+
+    It holds up to ``ANALYSIS_CACHE_SIZE`` entries (default 256) and is
+    backed by ``ANALYSIS_CACHE_DIR`` when that is set.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", str(DEFAULT_CACHE_SIZE))),
+                directory=os.getenv("ANALYSIS_CACHE_DIR") or None,
+            )
+        return _cache
+
+
+def reset_cache():
+    """Forget the process-wide cache; the next ``get_cache`` reads the settings again."""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,446 @@
+"""Daily rollups of applicants for trend charts, kept current by triggers.
+
+``applicant_daily_rollups`` holds one row per (day, term, degree, program)
+with the results posted, acceptances and GPA totals of that day. Statement
+level triggers on ``applicants`` apply every write to it in the writer's
+transaction, like the running totals in ``aggregates``. ``trends`` answers
+range queries from it, rolling days up into weeks or months on read.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from datetime import date
+from decimal import Decimal
+
+from psycopg import OperationalError
+from psycopg.sql import SQL, Identifier
+from db_config import backend, connection, get_db_connect_kwargs
+import columnar
+import result_cache
+
+# Rollup key: (rollup column, applicants column). A NULL is stored as ''
+# so it can be part of the primary key; rows without a date_added are not
+# rolled up, as they have no day.
+DIMENSIONS = [("term", "term"), ("degree", "degree"), ("program", "program_name")]
+
+# Measures: (column, type, per-row value, predicate), summed like the
+# counters in aggregates.COUNTERS.
+MEASURES = [
+    ("entries", "BIGINT", "1", None),
+    ("accepted", "BIGINT", "1", "status = 'Accepted'"),
+    ("gpa_sum", "NUMERIC", "gpa::numeric", "gpa IS NOT NULL"),
+    ("gpa_count", "BIGINT", "1", "gpa IS NOT NULL"),
+]
+MEASURE_COLUMNS = [name for name, _type, _value, _predicate in MEASURES]
+KEY_COLUMNS = ["day"] + [name for name, _column in DIMENSIONS]
+
+GRANULARITIES = ("day", "week", "month")
+MAX_VALUES = 50
+
+
+def _measure_expressions(sign):
+    expressions = []
+    for name, _type, value, predicate in MEASURES:
+        signed = sign if value == "1" else "{} * {}".format(sign, value)
+        condition = " FILTER (WHERE {})".format(predicate) if predicate else ""
+        expressions.append("COALESCE(SUM({}){}, 0)".format(signed, condition))
+    return expressions
+
+
+def _key_expressions(source):
+    return ["{}.date_added".format(source)] + [
+        "COALESCE({}.{}, '')".format(source, column) for _name, column in DIMENSIONS
+    ]
+
+
+# Adds a set of changed rows to the rollups. {changed} is a query returning
+# applicants rows with a leading ``sign`` column (see aggregates), grouped
+# into one upsert per key, in key order so concurrent writers lock rows in
+# the same order. Rows whose entries reach zero are removed.
+APPLY_ROLLUP_QUERIES = [
+    """
+INSERT INTO applicant_daily_rollups ({columns})
+SELECT {keys}, {measures}
+FROM ({{changed}}) AS changed
+WHERE changed.date_added IS NOT NULL
+GROUP BY {positions}
+ORDER BY {positions}
+ON CONFLICT ({key_columns}) DO UPDATE
+SET {assignments};
+""".format(
+        columns=", ".join(KEY_COLUMNS + MEASURE_COLUMNS),
+        keys=", ".join(_key_expressions("changed")),
+        measures=", ".join(_measure_expressions("changed.sign")),
+        positions=", ".join(str(position) for position in range(1, len(KEY_COLUMNS) + 1)),
+        key_columns=", ".join(KEY_COLUMNS),
+        assignments=", ".join(
+            "{0} = applicant_daily_rollups.{0} + EXCLUDED.{0}".format(name) for name in MEASURE_COLUMNS
+        ),
+    ),
+    """
+DELETE FROM applicant_daily_rollups
+WHERE entries = 0 AND day IN (SELECT date_added FROM ({changed}) AS changed);
+""",
+]
+
+ROLLUP_TABLE_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS applicant_daily_rollups (
+        day DATE NOT NULL,
+        {dimensions},
+        {measures},
+        PRIMARY KEY ({key_columns})
+    );
+    """.format(
+        dimensions=",\n        ".join("{} TEXT NOT NULL".format(name) for name, _column in DIMENSIONS),
+        measures=",\n        ".join(
+            "{} {} NOT NULL DEFAULT 0".format(name, column_type)
+            for name, column_type, _value, _predicate in MEASURES
+        ),
+        key_columns=", ".join(KEY_COLUMNS),
+    ),
+]
+
+_TRIGGER_EVENTS = [
+    ("insert", "INSERT", "NEW TABLE AS new_rows", "SELECT 1 AS sign, * FROM new_rows"),
+    ("delete", "DELETE", "OLD TABLE AS old_rows", "SELECT -1 AS sign, * FROM old_rows"),
+    (
+        "update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1 AS sign, * FROM old_rows",
+    ),
+]
+
+
+def _trigger_queries():
+    queries = []
+    for event, keyword, referencing, changed in _TRIGGER_EVENTS:
+        body = "".join(query.format(changed=changed) for query in APPLY_ROLLUP_QUERIES)
+        queries.append(
+            """
+    CREATE OR REPLACE FUNCTION applicants_rollups_{event}()
+    RETURNS trigger AS $$
+    BEGIN
+    {body}
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """.format(event=event, body=body)
+        )
+        queries.append(
+            """
+    CREATE OR REPLACE TRIGGER applicants_rollups_{event}
+    AFTER {keyword} ON applicants
+    REFERENCING {referencing}
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_rollups_{event}();
+    """.format(event=event, keyword=keyword, referencing=referencing)
+        )
+    return queries
+
+
+ROLLUP_TRIGGER_QUERIES = _trigger_queries() + [
+    """
+    CREATE OR REPLACE FUNCTION applicants_rollups_truncate()
+    RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM applicant_daily_rollups;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER applicants_rollups_truncate
+    AFTER TRUNCATE ON applicants
+    FOR EACH STATEMENT EXECUTE FUNCTION applicants_rollups_truncate();
+    """,
+]
+
+# Recomputes the rollups from a full scan of applicants.
+REBUILD_QUERIES = ["DELETE FROM applicant_daily_rollups;"] + [
+    APPLY_ROLLUP_QUERIES[0].format(changed="SELECT 1 AS sign, * FROM applicants")
+]
+
+# Table, triggers and rollups of the current rows, for load_data's schema.
+ROLLUP_QUERIES = ROLLUP_TABLE_QUERIES + ROLLUP_TRIGGER_QUERIES + REBUILD_QUERIES
+
+# Writers wait while the rollups are rebuilt; readers do not.
+LOCK_QUERY = "LOCK TABLE applicants IN SHARE MODE;"
+
+# Rollup keys whose row is missing, extra or different from a full scan.
+VERIFY_QUERY = """
+WITH expected ({columns}) AS (
+    SELECT {keys}, {measures}
+    FROM (SELECT 1 AS sign, * FROM applicants) AS changed
+    WHERE changed.date_added IS NOT NULL
+    GROUP BY {positions}
+), stored AS (
+    SELECT {columns} FROM applicant_daily_rollups
+)
+SELECT COUNT(*) FROM (
+    SELECT DISTINCT {key_columns} FROM (
+        (SELECT * FROM expected EXCEPT SELECT * FROM stored)
+        UNION ALL
+        (SELECT * FROM stored EXCEPT SELECT * FROM expected)
+    ) AS differences
+) AS keys;
+""".format(
+    key_columns=", ".join(KEY_COLUMNS),
+    keys=", ".join(_key_expressions("changed")),
+    measures=", ".join(_measure_expressions("changed.sign")),
+    positions=", ".join(str(position) for position in range(1, len(KEY_COLUMNS) + 1)),
+    columns=", ".join(KEY_COLUMNS + MEASURE_COLUMNS),
+)
+
+
+def has_rollups(cur):
+    """Return True when the triggers keep ``applicant_daily_rollups`` current."""
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+        "WHERE tgrelid = to_regclass('applicants') AND tgname = 'applicants_rollups_insert');"
+    )
+    return cur.fetchone()[0]
+
+
+def subtract_table(cur, table):
+    """
+    Take the rows of ``table`` out of the rollups on the open cursor.
+
+    For rows that leave ``applicants`` without firing its triggers, such as
+    a detached partition. Does nothing when the rollups are not kept; the
+    caller commits.
+    """
+    if not has_rollups(cur):
+        return
+    changed = SQL("SELECT -1 AS sign, * FROM {}").format(Identifier(table))
+    for query in APPLY_ROLLUP_QUERIES:
+        cur.execute(SQL(query).format(changed=changed))
+
+
+def rebuild():
+    """
+    Recompute the rollups from a full scan of ``applicants``.
+
+    Creates the table and triggers if they are missing. Every write to
+    ``applicants`` waits until the rebuild commits, so like
+    ``aggregates.rebuild`` it is an offline step that the CLI only runs
+    with ``--offline``. Returns the number of rollup rows, or None on a
+    database error.
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                for query in ROLLUP_TABLE_QUERIES + [LOCK_QUERY] + ROLLUP_TRIGGER_QUERIES + REBUILD_QUERIES:
+                    cur.execute(query)
+                cur.execute("SELECT COUNT(*) FROM applicant_daily_rollups;")
+                rows = cur.fetchone()[0]
+            conn.commit()
+        print("Rebuilt {} daily rollup rows.".format(rows))
+        return rows
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def verify():
+    """
+    Compare the rollups with a full scan of ``applicants`` in one snapshot.
+
+    Returns the number of rollup rows that are missing, extra or different
+    (0 when everything matches), or None on a database error.
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            with conn.cursor() as cur:
+                cur.execute(VERIFY_QUERY)
+                differences = cur.fetchone()[0]
+
+        if differences:
+            print("{} daily rollup rows differ from a full scan.".format(differences))
+        else:
+            print("Daily rollups match a full scan.")
+        return differences
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def _parse_date(args, name):
+    if not args.get(name):
+        return None
+    try:
+        return date.fromisoformat(args[name][-1])
+    except ValueError:
+        raise ValueError("'{}' must be a date (YYYY-MM-DD).".format(name)) from None
+
+
+def normalize_query(args):
+    """
+    Validate query-string ``args`` (``{name: [values]}``) into a trend query.
+
+    ``start`` and ``end`` (inclusive ISO dates) bound the days;
+    ``granularity`` is day, week (starting Monday) or month (default week);
+    ``term``, ``degree`` and ``program`` may repeat to filter, and ``by``
+    names one of them to get a series per value. Raises ValueError for
+    unknown parameters and bad values.
+    """
+    names = [name for name, _column in DIMENSIONS]
+    unknown = sorted(set(args) - set(names) - {"start", "end", "granularity", "by"})
+    if unknown:
+        raise ValueError("Unknown parameter(s): {}.".format(", ".join(unknown)))
+
+    query = {"granularity": args.get("granularity", ["week"])[-1]}
+    if query["granularity"] not in GRANULARITIES:
+        raise ValueError("'granularity' must be one of: {}.".format(", ".join(GRANULARITIES)))
+    if args.get("by"):
+        query["by"] = args["by"][-1]
+        if query["by"] not in names:
+            raise ValueError("'by' must be one of: {}.".format(", ".join(names)))
+    for name in ("start", "end"):
+        value = _parse_date(args, name)
+        if value is not None:
+            query[name] = value
+    if "start" in query and "end" in query and query["start"] > query["end"]:
+        raise ValueError("'start' must not be after 'end'.")
+    for name in names:
+        values = sorted({value.strip() for value in args.get(name, []) if value.strip()})
+        if len(values) > MAX_VALUES:
+            raise ValueError("At most {} values for '{}'.".format(MAX_VALUES, name))
+        if values:
+            query[name] = values
+    return query
+
+
+def build_query(query, source="rollups"):
+    """
+    Return ``(sql, params)`` for ``query`` from ``source``.
+
+    ``rollups`` sums ``applicant_daily_rollups``; ``postgres`` and
+    ``sqlite`` aggregate ``applicants`` itself, for databases without the
+    rollups. Rows are (period, [by value,] entries, accepted, gpa_sum,
+    gpa_count), ordered by period.
+    """
+    if source == "rollups":
+        table, day = "applicant_daily_rollups", "day"
+        columns = {name: name for name, _column in DIMENSIONS}
+        measures = ["SUM({})".format(name) for name in MEASURE_COLUMNS]
+    else:
+        table, day = "applicants", "date_added"
+        columns = {name: "COALESCE({}, '')".format(column) for name, column in DIMENSIONS}
+        measures = ["COUNT(*)", "COUNT(*) FILTER (WHERE status = 'Accepted')", "SUM(gpa)", "COUNT(gpa)"]
+
+    if source == "sqlite":
+        period = {
+            "day": day,
+            "week": "date({}, '-6 days', 'weekday 1')".format(day),
+            "month": "strftime('%Y-%m-01', {})".format(day),
+        }[query["granularity"]]
+    else:
+        period = "date_trunc('{}', {})::date".format(query["granularity"], day)
+
+    conditions, params = ["{} IS NOT NULL".format(day)], []
+    if "start" in query:
+        conditions.append("{} >= %s".format(day))
+        params.append(query["start"].isoformat())
+    if "end" in query:
+        conditions.append("{} <= %s".format(day))
+        params.append(query["end"].isoformat())
+    for name, _column in DIMENSIONS:
+        if name not in query:
+            continue
+        if source == "sqlite":
+            conditions.append("{} IN ({})".format(columns[name], ", ".join(["%s"] * len(query[name]))))
+            params.extend(query[name])
+        else:
+            conditions.append("{} = ANY(%s)".format(columns[name]))
+            params.append(query[name])
+
+    groups = [period] + ([columns[query["by"]]] if "by" in query else [])
+    sql = "SELECT {groups}, {measures} FROM {table} WHERE {conditions} GROUP BY {positions} ORDER BY {positions};".format(
+        groups=", ".join(groups),
+        measures=", ".join(measures),
+        table=table,
+        conditions=" AND ".join(conditions),
+        positions=", ".join(str(position) for position in range(1, len(groups) + 1)),
+    )
+    return sql, params
+
+
+def _point(period, entries, accepted, gpa_sum, gpa_count):
+    return {
+        "period": period if isinstance(period, str) else period.isoformat(),
+        "entries": int(entries),
+        "accepted": int(accepted),
+        # Half up, like /api/stats (see ``columnar._round``).
+        "acceptance_rate": float(columnar._round(Decimal(100) * int(accepted) / int(entries))) if entries else None,
+        "avg_gpa": float(columnar._round(Decimal(str(gpa_sum)) / int(gpa_count))) if gpa_count else None,
+    }
+
+
+def _cache_params(query):
+    return tuple(
+        (name, tuple(value) if isinstance(value, list) else str(value)) for name, value in sorted(query.items())
+    )
+
+
+def trends(connection, query):
+    """
+    Return ``{"series": [...], "source": ..., "cached": bool}`` for ``query``.
+
+    ``query`` comes from ``normalize_query``. Each series is
+    ``{"value": ..., "points": [...]}`` (a single series with value None
+    unless ``by`` is given; '' stands for a missing value and comes back as
+    None); each point has the period's first day, entries, acceptances,
+    acceptance rate and average GPA. PostgreSQL reads the rollups when the
+    triggers keep them, otherwise ``applicants`` is aggregated. Results are
+    cached per query and data version (see ``result_cache``).
+    """
+    cache = result_cache.get_cache() if result_cache.cache_enabled() else None
+    with connection.cursor() as cur:
+        version = result_cache.data_version(cur) if cache else None
+        if version is not None:
+            cached = cache.get("trends", _cache_params(query), version)
+            if cached is not None:
+                return dict(cached, cached=True)
+
+        source = backend(connection)
+        if source == "postgres" and has_rollups(cur):
+            source = "rollups"
+        sql, params = build_query(query, source)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+
+    series = {}
+    for row in rows:
+        value = (row[1] or None) if "by" in query else None
+        series.setdefault(value, []).append(_point(row[0], *row[-4:]))
+    result = {
+        "series": [{"value": value, "points": points} for value, points in series.items()],
+        "source": source,
+    }
+    if version is not None:
+        cache.put("trends", _cache_params(query), version, result)
+    return dict(result, cached=False)
+
+
+def main(argv):
+    """CLI: ``rollups.py verify|rebuild --offline`` (default ``verify``)."""
+    command = argv[0] if argv else "verify"
+    if command == "verify":
+        verify()
+    elif command == "rebuild" and "--offline" in argv[1:]:
+        rebuild()
+    elif command == "rebuild":
+        print(
+            "rebuild blocks writes to applicants for a full scan; stop the refresh "
+            "and spool replay, then run `rollups.py rebuild --offline`."
+        )
+    else:
+        print("Usage: rollups.py verify|rebuild --offline")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
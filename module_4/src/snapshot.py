@@ -0,0 +1,197 @@
+"""Columnar (Parquet) snapshots of the applicants table: save, restore, load."""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import io
+import time
+import pyarrow.csv
+import pyarrow.parquet
+from psycopg import OperationalError
+from db_config import connection, get_db_connect_kwargs, note_write
+from ingest_ledger import begin_batch, finish_batch
+from export_data import (
+    DEFAULT_CHUNK_SIZE,
+    EXPORT_COLUMNS,
+    PARQUET_COMPRESSION,
+    arrow_schema,
+    iter_row_chunks,
+    rows_to_arrow,
+)
+
+# The export columns plus the stored content hash, which is costly to
+# recompute (it formats every float as text) and is carried over as is.
+SNAPSHOT_COLUMNS = EXPORT_COLUMNS + (("content_hash", "string"),)
+COLUMN_NAMES = [name for name, _type in SNAPSHOT_COLUMNS]
+
+SNAPSHOT_QUERY = "SELECT {} FROM applicants ORDER BY p_id;".format(", ".join(COLUMN_NAMES))
+
+# Record batches are re-encoded as CSV by pyarrow and streamed to COPY.
+RESTORE_BATCH_SIZE = 65536
+
+RESTORE_CSV_OPTIONS = pyarrow.csv.WriteOptions(
+    include_header=False,
+    # Quote every non-null value so COPY reads unquoted empty fields as NULL
+    # and "" as the empty string.
+    quoting_style="all_valid",
+)
+
+# Staging table shaped like a snapshot; dropped when the restore commits.
+CREATE_STAGING_QUERY = """
+CREATE TEMP TABLE applicants_restore ON COMMIT DROP AS
+SELECT {columns} FROM applicants WITH NO DATA;
+""".format(columns=", ".join(COLUMN_NAMES))
+
+COPY_STAGING_QUERY = "COPY applicants_restore ({columns}) FROM STDIN (FORMAT csv);"
+
+# Set-based equivalents of the per-row dimension and content hash triggers,
+# which are disabled while the staged rows are moved into applicants. Rows
+# without a stored hash (e.g. restored from a plain export) get one here.
+# Every restored row is stamped with the restore's ingest batch.
+RESTORE_QUERIES = [
+    "SELECT ensure_applicant_partitions(ARRAY(SELECT DISTINCT date_added FROM applicants_restore));",
+    """
+    INSERT INTO programs (name)
+    SELECT TRIM(SPLIT_PART(program, ',', 1)) FROM applicants_restore WHERE program IS NOT NULL
+    UNION
+    SELECT llm_generated_program FROM applicants_restore WHERE llm_generated_program IS NOT NULL
+    ON CONFLICT (name) DO NOTHING;
+    """,
+    """
+    INSERT INTO universities (name)
+    SELECT TRIM(SPLIT_PART(program, ',', 2)) FROM applicants_restore WHERE program IS NOT NULL
+    UNION
+    SELECT llm_generated_university FROM applicants_restore WHERE llm_generated_university IS NOT NULL
+    ON CONFLICT (name) DO NOTHING;
+    """,
+    "ALTER TABLE applicants DISABLE TRIGGER applicants_resolve_dimensions;",
+    "ALTER TABLE applicants DISABLE TRIGGER applicants_set_content_hash;",
+    """
+    INSERT INTO applicants (
+        {columns}, program_id, university_id, llm_program_id, llm_university_id,
+        ingest_batch_id, content_hash
+    )
+    SELECT
+        {staged}, p.id, u.id, lp.id, lu.id, %(batch_id)s,
+        COALESCE(r.content_hash, applicant_content_hash(
+            r.program, r.comments, r.date_added, r.url, r.status, r.term,
+            r.us_or_international, r.gpa, r.gre, r.gre_v, r.gre_aw, r.degree,
+            r.llm_generated_program, r.llm_generated_university
+        ))
+    FROM applicants_restore r
+    LEFT JOIN programs p ON p.name = TRIM(SPLIT_PART(r.program, ',', 1))
+    LEFT JOIN universities u ON u.name = TRIM(SPLIT_PART(r.program, ',', 2))
+    LEFT JOIN programs lp ON lp.name = r.llm_generated_program
+    LEFT JOIN universities lu ON lu.name = r.llm_generated_university;
+    """.format(
+        columns=", ".join(name for name, _type in EXPORT_COLUMNS),
+        staged=", ".join("r." + name for name, _type in EXPORT_COLUMNS),
+    ),
+    "ALTER TABLE applicants ENABLE TRIGGER applicants_resolve_dimensions;",
+    "ALTER TABLE applicants ENABLE TRIGGER applicants_set_content_hash;",
+]
+
+
+def save_snapshot(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write ``applicants`` to a zstd-compressed Parquet snapshot at ``path``.
+
+    The file holds the export columns (see ``export_data``) plus
+    ``content_hash``, typed, one row group per chunk. Returns the number of
+    rows written, or None on a database error.
+    """
+    started = time.perf_counter()
+    schema = arrow_schema(SNAPSHOT_COLUMNS)
+    rows_written = 0
+    try:
+        with pyarrow.parquet.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+            for rows in iter_row_chunks(chunk_size, query=SNAPSHOT_QUERY):
+                writer.write_table(rows_to_arrow(rows, schema))
+                rows_written += len(rows)
+
+        print(
+            "Saved {} rows to '{}' in {:.2f}s.".format(
+                rows_written, path, time.perf_counter() - started
+            )
+        )
+        return rows_written
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def restore_snapshot(path, batch_size=RESTORE_BATCH_SIZE):
+    """
+    Replace the contents of ``applicants`` with the rows in a snapshot.
+
+    Rows are copied into a staging table with COPY, then moved into
+    ``applicants`` in one statement that resolves dimension ids set-wise
+    instead of per row. Everything happens in a single transaction, so
+    readers see either the old rows or the restored ones. Parquet files from
+    ``/export/applicants.parquet`` restore too; their content hashes are
+    computed on the way in. Returns the number of rows restored, or None on
+    a database error.
+    """
+    started = time.perf_counter()
+    snapshot = pyarrow.parquet.ParquetFile(path)
+    columns = [name for name in COLUMN_NAMES if name in snapshot.schema_arrow.names]
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE TABLE applicants;")
+                batch_id = begin_batch(cur, "snapshot_restore")
+                cur.execute(CREATE_STAGING_QUERY)
+                with cur.copy(COPY_STAGING_QUERY.format(columns=", ".join(columns))) as copy:
+                    for batch in snapshot.iter_batches(batch_size=batch_size, columns=columns):
+                        buffer = io.BytesIO()
+                        pyarrow.csv.write_csv(batch, buffer, RESTORE_CSV_OPTIONS)
+                        copy.write(buffer.getbuffer())
+                for query in RESTORE_QUERIES:
+                    cur.execute(query, {"batch_id": batch_id})
+                restored = snapshot.metadata.num_rows
+                finish_batch(cur, batch_id, restored, restored)
+                cur.execute("ANALYZE applicants;")
+            conn.commit()
+        note_write()
+
+        print(
+            "Restored {} rows from '{}' in {:.2f}s.".format(
+                restored, path, time.perf_counter() - started
+            )
+        )
+        return restored
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        return None
+
+
+def load_arrays(path, columns=None):
+    """
+    Read a snapshot into NumPy arrays for offline analysis.
+
+    Returns a dict of column name -> array: ``p_id`` as int64, scores as
+    float64 with NaN for missing values, ``date_added`` as datetime64[D]
+    (NaT when missing) and text columns as object arrays. ``columns``
+    limits which columns are read.
+    """
+    table = pyarrow.parquet.read_table(path, columns=columns)
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def main(argv):
+    """CLI: ``snapshot.py save|restore [path]`` (default ``applicants.parquet``)."""
+    command = argv[0] if argv else "save"
+    path = argv[1] if len(argv) > 1 else "applicants.parquet"
+    if command == "save":
+        save_snapshot(path)
+    elif command == "restore":
+        restore_snapshot(path)
+    else:
+        print("Usage: snapshot.py save|restore [path]")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,126 @@
+"""Durable on-disk spool for cleaned batches the database could not take.
+
+The spool is a directory of JSON Lines segments, one cleaned entry per line.
+A segment is written to a temporary name, fsynced and renamed into place, so
+readers only ever see complete segments. Segment names sort in write order
+and end in the write mode of the batch (see ``segment_mode``). Replaying
+them into the database is ``update_data.replay_spool``.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import fcntl
+import json
+import time
+from contextlib import contextmanager
+
+DEFAULT_SPOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool")
+SEGMENT_SUFFIX = ".jsonl"
+# Entries per segment; a larger batch is split over several segments.
+SEGMENT_MAX_ENTRIES = 1000
+LOCK_NAME = ".replay.lock"
+# How a segment's entries are written back: "insert" skips stored p_ids like
+# the refresh insert, "upsert" rewrites changed rows. Segments spooled
+# before the mode was recorded replay as upserts, as they always did.
+MODES = ("insert", "upsert")
+DEFAULT_MODE = "upsert"
+
+
+def spool_dir():
+    """Return the spool directory (``INGEST_SPOOL_DIR`` or ``src/spool``)."""
+    return os.getenv("INGEST_SPOOL_DIR", DEFAULT_SPOOL_DIR)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def append_batch(entries, mode=DEFAULT_MODE):
+    """
+    Durably write ``entries`` to new spool segments, to be replayed in ``mode``.
+
+    Returns the list of segment paths written. Each segment is on disk (data
+    and directory entry) before this returns.
+    """
+    if mode not in MODES:
+        raise ValueError("Unknown spool mode {!r}.".format(mode))
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    prefix = "{:020d}-{}".format(time.time_ns(), os.getpid())
+    paths = []
+    for number, start in enumerate(range(0, len(entries), SEGMENT_MAX_ENTRIES)):
+        path = os.path.join(directory, "{}-{:04d}.{}{}".format(prefix, number, mode, SEGMENT_SUFFIX))
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for entry in entries[start:start + SEGMENT_MAX_ENTRIES]:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        paths.append(path)
+    if paths:
+        _fsync_dir(directory)
+    return paths
+
+
+def pending_segments():
+    """Return the complete segments waiting to be replayed, oldest first."""
+    directory = spool_dir()
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(SEGMENT_SUFFIX)
+    ]
+
+
+def segment_mode(path):
+    """Return the write mode a segment was spooled with (see ``MODES``)."""
+    name = os.path.basename(path)[:-len(SEGMENT_SUFFIX)]
+    mode = os.path.splitext(name)[1][1:]
+    return mode if mode in MODES else DEFAULT_MODE
+
+
+def read_segment(path):
+    """Return the entries stored in one segment."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def remove_segments(paths):
+    """Delete replayed segments; ones already removed are ignored."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if paths:
+        _fsync_dir(os.path.dirname(paths[0]))
+
+
+@contextmanager
+def replay_lock():
+    """
+    Hold the spool's replay lock, yielding False if another replayer has it.
+
+    The Flask process and the refresh subprocess may both try to drain the
+    spool; the lock keeps them from replaying the same segments at once.
+    """
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_NAME), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
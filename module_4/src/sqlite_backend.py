@@ -0,0 +1,391 @@
+"""Embedded SQLite storage for single-node deployments and local benchmarks.
+
+Selected by a ``sqlite:///path/to/applicants.db`` ``DATABASE_URL`` (see
+``db_config.connection``). The connection and cursor wrappers below accept
+the psycopg calls the rest of the code makes (``%s`` placeholders, cursors
+as context managers, ``conn.pipeline()``) and raise psycopg's exception
+types, so callers keep their ``except OperationalError`` handling. SQL that
+differs between the two databases is kept in ``QUERIES`` and looked up with
+``db_config.backend_query``.
+"""
+import sys
+import os
+
+# Ensure current folder is in sys.path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timezone
+import psycopg
+
+URL_PREFIX = "sqlite:///"
+
+# WAL lets page renders read while a refresh writes; NORMAL sync is durable
+# across application crashes, and only an OS crash can lose the last commits.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA busy_timeout = 5000;",
+)
+
+# psycopg placeholders: %s, %(name)s and the %% escape.
+_PLACEHOLDER = re.compile(r"%(?:\((\w+)\))?([s%])")
+
+# Declared column types parsed back into Python objects, like psycopg does.
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMPTZ", lambda value: datetime.fromisoformat(value.decode()))
+
+
+# ---- SQL that differs from PostgreSQL ----
+#
+# QUERIES maps the name of a PostgreSQL statement (the module constant the
+# PostgreSQL code runs) to its SQLite spelling; ``db_config.backend_query``
+# picks between the two. None marks a PostgreSQL feature SQLite does
+# without, and the caller skips that step.
+
+# The program split is a plain generated column and the analysis queries
+# count names directly, so there are no dimension tables, triggers, views,
+# content hash or running aggregates. Upserts compare the scraped columns
+# instead of a content hash. ingest_batches ids are AUTOINCREMENT, so like a
+# sequence they are never reused.
+_PROGRAM_NAME = (
+    "TRIM(CASE WHEN instr(program, ',') = 0 THEN program "
+    "ELSE substr(program, 1, instr(program, ',') - 1) END)"
+)
+_UNIVERSITY_NAME = (
+    "TRIM(CASE WHEN instr(program, ',') = 0 THEN '' "
+    "WHEN instr(substr(program, instr(program, ',') + 1), ',') = 0 "
+    "THEN substr(program, instr(program, ',') + 1) "
+    "ELSE substr(substr(program, instr(program, ',') + 1), 1, "
+    "instr(substr(program, instr(program, ',') + 1), ',') - 1) END)"
+)
+_SCHEMA_QUERIES = [
+    """
+    CREATE TABLE applicants (
+        p_id INTEGER PRIMARY KEY,
+        program TEXT,
+        comments TEXT,
+        date_added DATE,
+        url TEXT,
+        status TEXT,
+        term TEXT,
+        us_or_international TEXT,
+        gpa REAL,
+        gre REAL,
+        gre_v REAL,
+        gre_aw REAL,
+        degree TEXT,
+        llm_generated_program TEXT,
+        llm_generated_university TEXT,
+        program_name TEXT GENERATED ALWAYS AS ({program_name}) STORED,
+        university_name TEXT GENERATED ALWAYS AS ({university_name}) STORED,
+        ingest_batch_id INTEGER
+    );
+    """.format(program_name=_PROGRAM_NAME, university_name=_UNIVERSITY_NAME),
+    """
+    CREATE TABLE IF NOT EXISTS ingest_batches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f+00:00', 'now')),
+        finished_at TIMESTAMPTZ,
+        rows_received INTEGER NOT NULL DEFAULT 0,
+        rows_inserted INTEGER NOT NULL DEFAULT 0,
+        rows_updated INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    # SQLite has no INCLUDE; the covered columns go at the end of the key.
+    "CREATE INDEX applicants_term_status_idx ON applicants (term, status, gpa);",
+    "CREATE INDEX applicants_term_origin_idx ON applicants (term, us_or_international, gpa);",
+    "CREATE INDEX applicants_degree_program_idx ON applicants (degree, program);",
+    "CREATE INDEX applicants_accepted_program_idx "
+    "ON applicants (program_name, degree, date_added, university_name) "
+    "WHERE status = 'Accepted';",
+    "CREATE INDEX applicants_accepted_llm_program_idx "
+    "ON applicants (llm_generated_program, degree, date_added, llm_generated_university) "
+    "WHERE status = 'Accepted';",
+    "CREATE INDEX applicants_ingest_batch_idx ON applicants (ingest_batch_id);",
+    "CREATE INDEX applicants_stats_idx ON applicants "
+    "(university_name, program_name, degree, term, status, us_or_international, "
+    "gpa, gre, gre_v, gre_aw, date_added);",
+]
+
+# Columns taken from a scraped entry, after p_id.
+SCRAPED_COLUMNS = (
+    "program", "comments", "date_added", "url", "status", "term",
+    "us_or_international", "gpa", "gre", "gre_v", "gre_aw", "degree",
+    "llm_generated_program", "llm_generated_university",
+)
+
+# Run once per row. A row is only rewritten when one of its scraped columns
+# differs from the stored one.
+_UPSERT_QUERY = """
+INSERT INTO applicants (
+    p_id, program, comments, date_added, url, status, term,
+    us_or_international, gpa, gre, gre_v, gre_aw, degree,
+    llm_generated_program, llm_generated_university, ingest_batch_id
+) VALUES (
+    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+)
+ON CONFLICT (p_id) DO UPDATE SET
+    {assignments}, ingest_batch_id = excluded.ingest_batch_id
+WHERE ({stored}) IS NOT ({scraped});
+""".format(
+    assignments=", ".join("{0} = excluded.{0}".format(name) for name in SCRAPED_COLUMNS),
+    stored=", ".join("applicants." + name for name in SCRAPED_COLUMNS),
+    scraped=", ".join("excluded." + name for name in SCRAPED_COLUMNS),
+)
+
+# SQLite only ever had answers_table from questions(), so there is nothing
+# to convert.
+_ANSWERS_SCHEMA_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS analysis_versions (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        computed_at TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f+00:00', 'now'))
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analysis_answers (
+        version INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        question TEXT,
+        answer TEXT,
+        PRIMARY KEY (version, position)
+    );
+    """,
+    "DROP TABLE IF EXISTS answers_table;",
+    """
+    CREATE VIEW answers_table AS
+    SELECT question, answer
+    FROM analysis_answers
+    WHERE version = (SELECT max(version) FROM analysis_versions)
+    ORDER BY position;
+    """,
+]
+
+# SQLite has no data-modifying CTEs, so a version is published in steps:
+# the new version (fetched), its answers ({values} rows of version,
+# position, question, answer), then the older versions are pruned.
+_STORE_ANSWERS_QUERIES = [
+    "INSERT INTO analysis_versions DEFAULT VALUES RETURNING version;",
+    "INSERT INTO analysis_answers (version, position, question, answer) VALUES {values};",
+    "DELETE FROM analysis_answers WHERE version < %s;",
+    "DELETE FROM analysis_versions WHERE version < %s;",
+]
+
+# SQLite has only row-level triggers, which would double the cost of a bulk
+# load. Instead the writers bump the database header's user_version in the
+# transaction of every write to applicants (see ``result_cache.bump_version``),
+# so a chunked load changes the token at each commit; the schema version
+# changes when the table is recreated (and once when store_answers first
+# creates the answer tables). Ad-hoc SQL that bypasses the writers needs
+# ``ResultCache.clear``.
+_DATA_VERSION_QUERY = """
+SELECT (SELECT schema_version FROM pragma_schema_version()), (SELECT user_version FROM pragma_user_version());
+"""
+
+# PRAGMA values cannot be bound, so the bump reads the counter and writes
+# the next value in. Run after a write, so the transaction holds the lock.
+_BUMP_VERSION_QUERIES = [
+    "PRAGMA user_version;",
+    "PRAGMA user_version = {version:d};",
+]
+
+QUERIES = {
+    # load_data
+    "SCHEMA_QUERIES": _SCHEMA_QUERIES,
+    "DROP_APPLICANTS_QUERY": "DROP TABLE IF EXISTS applicants;",
+    "CLEAR_APPLICANTS_QUERY": "DELETE FROM applicants;",
+    "UPSERT_QUERY": _UPSERT_QUERY,
+    # partitions: SQLite tables are never partitioned.
+    "ENSURE_PARTITIONS_QUERY": None,
+    # query_data
+    "STATEMENT_TIMEOUT_QUERY": None,
+    "ANSWER_VERSIONS_EXIST_QUERY": "SELECT count(*) FROM sqlite_master WHERE name = 'analysis_answers';",
+    "ANSWERS_SCHEMA_QUERIES": _ANSWERS_SCHEMA_QUERIES,
+    "STORE_ANSWERS_QUERY": _STORE_ANSWERS_QUERIES,
+    # result_cache
+    "DATA_VERSION_QUERY": _DATA_VERSION_QUERY,
+    "BUMP_VERSION_QUERY": _BUMP_VERSION_QUERIES,
+}
+
+
+def database_path(conninfo):
+    """Return the file path of a ``sqlite:///`` URL (``:memory:`` works too)."""
+    return conninfo[len(URL_PREFIX):]
+
+
+def _translate(query):
+    def replace(match):
+        name, kind = match.groups()
+        if kind == "%":
+            return "%"
+        return ":" + name if name else "?"
+
+    return _PLACEHOLDER.sub(replace, query)
+
+
+def _adapt(params):
+    def value(item):
+        return item.isoformat() if isinstance(item, date) else item
+
+    if isinstance(params, dict):
+        return {name: value(item) for name, item in params.items()}
+    return [value(item) for item in params]
+
+
+@contextmanager
+def _psycopg_errors():
+    # Callers catch psycopg's classes; a locked or unreachable database file
+    # is an OperationalError in both libraries.
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        raise psycopg.OperationalError(str(e)) from e
+    except sqlite3.IntegrityError as e:
+        raise psycopg.IntegrityError(str(e)) from e
+    except sqlite3.DatabaseError as e:
+        raise psycopg.DatabaseError(str(e)) from e
+
+
+class Cursor:
+    """A ``sqlite3.Cursor`` that takes psycopg-style queries and parameters."""
+
+    backend = "sqlite"
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        # Accepted for server-side cursor callers; SQLite steps rows lazily.
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=None, prepare=None):
+        # ``prepare`` is accepted for psycopg callers; sqlite3 caches the
+        # compiled statements itself.
+        with _psycopg_errors():
+            if params is None:
+                self._cursor.execute(query)
+            else:
+                self._cursor.execute(_translate(query), _adapt(params))
+        return self
+
+    def executemany(self, query, params_seq):
+        with _psycopg_errors():
+            self._cursor.executemany(_translate(query), (_adapt(params) for params in params_seq))
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """A ``sqlite3.Connection`` with the psycopg connection calls used here."""
+
+    backend = "sqlite"
+
+    def __init__(self, conn, autocommit=False, shared=False):
+        self._conn = conn
+        self._shared = shared
+        self.autocommit = autocommit
+
+    @property
+    def autocommit(self):
+        return self._conn.isolation_level is None
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._conn.isolation_level = None if value else "DEFERRED"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Like psycopg: commit on success, roll back on error, then close.
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+        return False
+
+    def cursor(self, name=None):
+        return Cursor(self._conn.cursor())
+
+    def execute(self, query, params=None):
+        return self.cursor().execute(query, params)
+
+    def pipeline(self):
+        # Nothing to batch: every statement runs in-process.
+        return nullcontext()
+
+    def commit(self):
+        with _psycopg_errors():
+            self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        # A shared connection stays open for the thread's next borrower.
+        if not self._shared:
+            self._conn.close()
+
+
+def _clock_timestamp():
+    return datetime.now(timezone.utc).isoformat(sep=" ")
+
+
+def _open(path):
+    with _psycopg_errors():
+        conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.create_function("clock_timestamp", 0, _clock_timestamp)
+    return conn
+
+
+# Per-thread open connections by file path, for shared connects.
+_local = threading.local()
+
+
+def connect(conninfo, autocommit=False, shared=False):
+    """
+    Open the database of a ``sqlite:///`` URL in WAL mode.
+
+    The file is created if missing. ``clock_timestamp()`` is provided as a
+    SQL function so the ingest ledger's queries run unchanged.
+
+    With ``shared`` the calling thread reuses one open connection per file
+    instead of opening a new one, the SQLite counterpart of the PostgreSQL
+    pool: closing the last connection to a WAL database checkpoints and
+    deletes the WAL file, which a page render would otherwise pay for.
+    """
+    path = database_path(conninfo)
+    if not shared:
+        return Connection(_open(path), autocommit=autocommit)
+    cache = _local.__dict__.setdefault("connections", {})
+    if path not in cache:
+        cache[path] = _open(path)
+    return Connection(cache[path], autocommit=autocommit, shared=True)
@@ -4,17 +4,91 @@ import os
 
 # Ensure current folder is in sys.path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-import psycopg
 from psycopg import OperationalError, sql
+import threading
+from contextlib import nullcontext
 from datetime import datetime
 #creates db using python so manual db creation in terminal no longer required (only run once to init DB)
 from psycopg.sql import SQL, Identifier
-from db_config import get_db_connect_kwargs
+from db_config import connection, get_db_connect_kwargs, is_sqlite, note_write, pipeline_enabled
+from partitions import ensure_partitions
+from load_data import DIMENSION_CTES, DIMENSION_JOINS, insert_rows, upsert_rows
+from ingest_ledger import begin_batch, finish_batch
+import spool
 
-def insert_applicants_from_json_batch(entries):
+def _entries_to_rows(entries):
+    """Convert cleaned scraper entries into INSERT-ordered row tuples."""
+    rows = []
+    for entry in entries:
+        # Extract p_id
+        p_id = None
+        url = entry.get("url")
+        if url and "/" in url:
+            try:
+                p_id = int(url.rstrip("/").split("/")[-1])
+            except ValueError:
+                pass
+
+        if p_id is None:
+            continue
+
+        # Date conversion
+        date_val = None
+        if entry.get("date_added"):
+            try:
+                date_val = datetime.strptime(
+                    entry["date_added"], "%B %d, %Y"
+                ).date()
+            except ValueError:
+                pass
+
+        # Numeric conversions for DB float columns.
+        gpa = float(entry.get("GPA")) if entry.get("GPA") else None
+        gre = float(entry.get("GRE Score")) if entry.get("GRE Score") else None
+        gre_v = float(entry.get("GRE V Score")) if entry.get("GRE V Score") else None
+        gre_aw = float(entry.get("GRE AW")) if entry.get("GRE AW") else None
+
+        rows.append((
+            p_id,
+            entry.get("program", ""),
+            entry.get("comments"),
+            date_val,
+            url,
+            entry.get("status"),
+            entry.get("term"),
+            entry.get("US/International"),
+            gpa,
+            gre,
+            gre_v,
+            gre_aw,
+            entry.get("Degree"),
+            entry.get("llm-generated-program", ""),
+            entry.get("llm-generated-university", "")
+        ))
+    return rows
+
+
+def _insert_rows_sqlite(cur, rows):
+    """SQLite version of the batched insert; returns the rows inserted."""
+    if not rows:
+        return 0
+    batch_id = begin_batch(cur, "refresh")
+    inserted = insert_rows(cur, [row + (batch_id,) for row in rows])
+    finish_batch(cur, batch_id, len(rows), inserted)
+    return inserted
+
+
+def insert_applicants_from_json_batch(entries, pipeline=None):
     """
     Insert a batch of cleaned applicant records into ``applicants``.
 
+    ``pipeline`` selects psycopg pipeline mode, which sends the partition
+    check and the insert together; by default it follows
+    ``DATABASE_PIPELINE`` (see ``db_config.pipeline_enabled``).
+
+    If the database cannot be reached, the entries are written to the
+    local spool (see ``spool``) and replayed later by ``replay_spool``.
+
     Returns:
         1 - at least one row hit ON CONFLICT
         0 - all rows inserted successfully
@@ -24,77 +98,79 @@ def insert_applicants_from_json_batch(entries):
     # function can report mixed outcomes deterministically.
     had_conflict = False
     had_success = False
+    if pipeline is None:
+        pipeline = pipeline_enabled()
 
     try:
-        with psycopg.connect(**get_db_connect_kwargs()) as conn:
+        # In pipeline mode the partition check and the insert are separate
+        # autocommitted statements (the insert is atomic on its own), so no
+        # BEGIN/COMMIT waits are added and the batch costs one round trip.
+        with connection(get_db_connect_kwargs(), autocommit=pipeline) as conn:
             with conn.cursor() as cur:
 
+                # The whole batch goes over as one array per column, so a
+                # refresh costs a single round trip however many rows it has.
+                # The ingest ledger entry (see ``ingest_ledger``) and the
+                # dimension ids (see ``load_data.DIMENSION_CTES``) are
+                # written by the same statement, so they add no round trip.
                 insert_query = """
-                INSERT INTO applicants (
-                    p_id, program, comments, date_added, url, status, term,
-                    us_or_international, gpa, gre, gre_v, gre_aw, degree,
-                    llm_generated_program, llm_generated_university
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                WITH ingest AS (
+                    SELECT nextval(pg_get_serial_sequence('ingest_batches', 'id')) AS id
+                ), batch AS (
+                    SELECT * FROM unnest(
+                        %s::bigint[], %s::text[], %s::text[], %s::date[], %s::text[],
+                        %s::text[], %s::text[], %s::text[], %s::float8[], %s::float8[],
+                        %s::float8[], %s::float8[], %s::text[], %s::text[], %s::text[]
+                    ) AS b (
+                        p_id, program, comments, date_added, url, status, term,
+                        us_or_international, gpa, gre, gre_v, gre_aw, degree,
+                        llm_generated_program, llm_generated_university
+                    )
+                ),{dimensions},
+                ins AS (
+                    INSERT INTO applicants (
+                        p_id, program, comments, date_added, url, status, term,
+                        us_or_international, gpa, gre, gre_v, gre_aw, degree,
+                        llm_generated_program, llm_generated_university, ingest_batch_id,
+                        program_id, university_id, llm_program_id, llm_university_id
+                    )
+                    SELECT batch.*, ingest.id, p.id, u.id, lp.id, lu.id
+                    FROM batch CROSS JOIN ingest{joins}
+                    ON CONFLICT DO NOTHING
+                    RETURNING p_id
+                ), ledger AS (
+                    INSERT INTO ingest_batches (
+                        id, source, finished_at, rows_received, rows_inserted
+                    )
+                    SELECT ingest.id, 'refresh', clock_timestamp(), %s, (SELECT count(*) FROM ins)
+                    FROM ingest
                 )
-                ON CONFLICT (p_id) DO NOTHING
-                RETURNING p_id;
-                """
-
-                for entry in entries:
-                    # Extract p_id
-                    p_id = None
-                    url = entry.get("url")
-                    if url and "/" in url:
-                        try:
-                            p_id = int(url.rstrip("/").split("/")[-1])
-                        except ValueError:
-                            pass
-
-                    if p_id is None:
-                        continue
-
-                    # Date conversion
-                    date_val = None
-                    if entry.get("date_added"):
-                        try:
-                            date_val = datetime.strptime(
-                                entry["date_added"], "%B %d, %Y"
-                            ).date()
-                        except ValueError:
-                            pass
-
-                    # Numeric conversions for DB float columns.
-                    gpa = float(entry.get("GPA")) if entry.get("GPA") else None
-                    gre = float(entry.get("GRE Score")) if entry.get("GRE Score") else None
-                    gre_v = float(entry.get("GRE V Score")) if entry.get("GRE V Score") else None
-                    gre_aw = float(entry.get("GRE AW")) if entry.get("GRE AW") else None
-
-                    cur.execute(insert_query, (
-                        p_id,
-                        entry.get("program", ""),
-                        entry.get("comments"),
-                        date_val,
-                        url,
-                        entry.get("status"),
-                        entry.get("term"),
-                        entry.get("US/International"),
-                        gpa,
-                        gre,
-                        gre_v,
-                        gre_aw,
-                        entry.get("Degree"),
-                        entry.get("llm-generated-program", ""),
-                        entry.get("llm-generated-university", "")
-                    ))
-
-                    if cur.fetchone():
-                        had_success = True
-                    else:
-                        had_conflict = True
-                        #print(f"Conflict detected for p_id: {p_id}")
+                SELECT p_id FROM ins;
+                """.format(dimensions=DIMENSION_CTES, joins=DIMENSION_JOINS)
+
+                rows = _entries_to_rows(entries)
+
+                if is_sqlite(conn):
+                    inserted = _insert_rows_sqlite(cur, rows)
+                else:
+                    with conn.pipeline() if pipeline else nullcontext():
+                        # Year partitions must exist before rows can be routed to them.
+                        ensure_partitions(cur, (row[3] for row in rows), fetch=not pipeline)
+                        if rows:
+                            cur.execute(
+                                insert_query,
+                                [list(column) for column in zip(*rows)] + [len(rows)],
+                            )
+                    # RETURNING only lists rows that were inserted; anything
+                    # missing hit ON CONFLICT (including repeats in the batch).
+                    inserted = len(cur.fetchall()) if rows else 0
+
+                if rows:
+                    had_success = inserted > 0
+                    had_conflict = inserted < len(rows)
 
                 conn.commit()
+        note_write()
 
         if had_conflict:
             return 1
@@ -104,4 +180,144 @@ def insert_applicants_from_json_batch(entries):
 
     except OperationalError as e:
         print("Error '{}' occurred.".format(e))
+        _spool_entries(entries, "insert")
         return -1
+
+
+def upsert_applicants_from_json_batch(entries):
+    """
+    Insert new applicants and refresh edited ones from a cleaned batch.
+
+    Unlike ``insert_applicants_from_json_batch``, a row that already exists
+    is rewritten when its content hash changed (see ``load_data.upsert_rows``).
+    On a DB error the entries are spooled like in
+    ``insert_applicants_from_json_batch``.
+
+    Returns:
+        dict with ``inserted``, ``updated`` and ``unchanged`` counts, or
+        None if a DB error occurred
+    """
+    try:
+        with connection(get_db_connect_kwargs()) as conn:
+            with conn.cursor() as cur:
+                rows = _entries_to_rows(entries)
+                batch_id = begin_batch(cur, "refresh_upsert")
+                counts = upsert_rows(cur, rows, batch_id)
+                finish_batch(cur, batch_id, len(rows), counts["inserted"], counts["updated"])
+            conn.commit()
+        note_write()
+        return counts
+
+    except OperationalError as e:
+        print("Error '{}' occurred.".format(e))
+        _spool_entries(entries, "upsert")
+        return None
+
+
+def _spool_entries(entries, mode=spool.DEFAULT_MODE):
+    """Keep a batch the database refused, and how to write it, so the scrape is not lost."""
+    if entries:
+        spool.append_batch(list(entries), mode)
+        print("Spooled {} entries for replay.".format(len(entries)))
+
+
+def _replay_inserts(cur, rows, batch_id):
+    """Insert spooled refresh rows like the live insert, leaving stored p_ids alone."""
+    inserted = 0
+    if rows:
+        ensure_partitions(cur, (row[3] for row in rows))
+        inserted = insert_rows(cur, [row + (batch_id,) for row in rows])
+    return {"inserted": inserted, "updated": 0, "unchanged": len(rows) - inserted}
+
+
+# Entries replayed per transaction; whole segments are taken at a time.
+REPLAY_BATCH_ENTRIES = 5000
+
+
+def replay_spool(batch_entries=REPLAY_BATCH_ENTRIES):
+    """
+    Drain spooled entries into ``applicants``, oldest segments first.
+
+    Consecutive segments with the same write mode (see ``spool.MODES``) are
+    replayed in groups of about ``batch_entries`` entries, one transaction
+    per group, and deleted once it commits. Batches the refresh insert
+    spooled are inserted like it, skipping p_ids already stored (reported
+    as unchanged). Upserted batches keep one row per p_id (the latest
+    spooled entry wins) and skip rows that are already stored unchanged.
+    Either way, replaying a segment twice, e.g. after a crash between
+    commit and delete, changes nothing.
+
+    Returns:
+        dict with ``segments``, ``inserted``, ``updated`` and ``unchanged``
+        counts, or None if the database is still unreachable or another
+        process is replaying
+    """
+    totals = {"segments": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    with spool.replay_lock() as locked:
+        if not locked:
+            return None
+        segments = spool.pending_segments()
+        try:
+            while segments:
+                group, entries = [], []
+                mode = spool.segment_mode(segments[0])
+                while segments and (
+                    not group or (len(entries) < batch_entries and spool.segment_mode(segments[0]) == mode)
+                ):
+                    group.append(segments.pop(0))
+                    entries.extend(spool.read_segment(group[-1]))
+
+                with connection(get_db_connect_kwargs()) as conn:
+                    with conn.cursor() as cur:
+                        rows = _entries_to_rows(entries)
+                        batch_id = begin_batch(cur, "spool_replay")
+                        if mode == "insert":
+                            counts = _replay_inserts(cur, rows, batch_id)
+                        else:
+                            counts = upsert_rows(cur, rows, batch_id)
+                        finish_batch(cur, batch_id, len(rows), counts["inserted"], counts["updated"])
+                    conn.commit()
+                spool.remove_segments(group)
+                note_write()
+
+                totals["segments"] += len(group)
+                for name, count in counts.items():
+                    totals[name] += count
+
+        except OperationalError as e:
+            print("Error '{}' occurred.".format(e))
+            return None
+
+    if totals["segments"]:
+        print(
+            "Replayed {segments} spool segments: '{inserted}' inserted, "
+            "'{updated}' updated, '{unchanged}' unchanged.".format(**totals)
+        )
+    return totals
+
+
+_replayer = None
+
+
+def start_spool_replayer(interval):
+    """
+    Replay the spool every ``interval`` seconds on a daemon thread.
+
+    Only one replayer runs per process; calling this again returns the
+    running one. Returns ``(thread, stop_event)``; set the event to stop it.
+    """
+    global _replayer
+    if _replayer is not None and _replayer[0].is_alive():
+        return _replayer
+
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            if spool.pending_segments():
+                replay_spool()
+
+    thread = threading.Thread(target=run, name="spool-replayer", daemon=True)
+    thread.start()
+    _replayer = (thread, stop)
+    return _replayer
@@ -18,9 +18,39 @@ if str(SRC_DIR) not in sys.path:
 
 from src.app import create_app
 
+import load_data
+import query_data
 import refresh_data
 
 
+@pytest.fixture(autouse=True)
+def unpooled_connections(monkeypatch):
+    """Open plain connections so tests can swap in ``psycopg.connect`` doubles.
+
+    The shared pool itself is covered in ``test_pool.py``.
+    """
+    monkeypatch.setenv("DATABASE_POOL", "0")
+
+
+@pytest.fixture(autouse=True)
+def uncached_analysis(monkeypatch):
+    """Compute every analysis result, so tests see each query they stub.
+
+    The result cache is covered in ``test_result_cache.py``.
+    """
+    monkeypatch.setenv("ANALYSIS_CACHE", "0")
+
+
+@pytest.fixture(autouse=True)
+def isolated_spool(monkeypatch, tmp_path):
+    """Spool refused batches under the test's tmp dir, with no background replayer.
+
+    The spool and its replayer are covered in ``test_spool.py``.
+    """
+    monkeypatch.setenv("INGEST_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setenv("SPOOL_REPLAY_INTERVAL", "0")
+
+
 @pytest.fixture()
 def app():
     """Create a Flask app configured for test execution."""
@@ -246,28 +276,12 @@ def reset_real_applicants_table(real_postgres_ready, postgres_connect_kwargs):
     """Create/reset the applicants table schema for real DB integration tests."""
     with psycopg.connect(**postgres_connect_kwargs) as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS applicants (
-                    p_id BIGINT PRIMARY KEY,
-                    program TEXT,
-                    comments TEXT,
-                    date_added DATE,
-                    url TEXT,
-                    status TEXT,
-                    term TEXT,
-                    us_or_international TEXT,
-                    gpa FLOAT,
-                    gre FLOAT,
-                    gre_v FLOAT,
-                    gre_aw FLOAT,
-                    degree TEXT,
-                    llm_generated_program TEXT,
-                    llm_generated_university TEXT
-                );
-                """
-            )
-            cur.execute("TRUNCATE TABLE applicants;")
+            # Rebuild from load_data's DDL so tests always see the current
+            # columns, triggers and indexes, even if an older table is around.
+            cur.execute("DROP TABLE IF EXISTS applicants CASCADE;")
+            for query in load_data.SCHEMA_QUERIES:
+                cur.execute(query)
+            cur.execute("TRUNCATE TABLE ingest_batches RESTART IDENTITY;")
         conn.commit()
 
     yield
@@ -280,30 +294,13 @@ def reset_real_applicants_table(real_postgres_ready, postgres_connect_kwargs):
 
 @pytest.fixture()
 def seeded_answers_table(real_postgres_ready, postgres_connect_kwargs):
-    """Ensure answers_table exists with at least one row for analysis page tests."""
+    """Ensure answers_table has at least one row for analysis page tests."""
     with psycopg.connect(**postgres_connect_kwargs) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS answers_table (
-                    question TEXT,
-                    answer TEXT
-                );
-                """
-            )
-            cur.execute("TRUNCATE TABLE answers_table;")
-            cur.execute(
-                """
-                INSERT INTO answers_table (question, answer)
-                VALUES (%s, %s)
-                """,
-                ("Seeded question", "Seeded answer"),
-            )
-        conn.commit()
+        query_data.store_answers(conn, [("Seeded question", "Seeded answer")])
 
     yield
 
     with psycopg.connect(**postgres_connect_kwargs) as conn:
         with conn.cursor() as cur:
-            cur.execute("TRUNCATE TABLE answers_table;")
+            cur.execute("TRUNCATE TABLE analysis_answers, analysis_versions;")
         conn.commit()
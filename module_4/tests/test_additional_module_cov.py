@@ -5,6 +5,7 @@ from pathlib import Path
 import json
 import secrets
 import importlib.util
+from contextlib import nullcontext
 
 import pytest
 from psycopg import OperationalError
@@ -64,14 +65,25 @@ class _InsertCursor:
     def __exit__(self, exc_type, exc, tb):
         return False
 
-    def execute(self, _query, params):
-        self.params.append(params)
+    def execute(self, query, params=None):
+        # The batched INSERT sends one array per column, then the ledger's
+        # row count; record it per row. Partition maintenance is not a row.
+        if "INSERT INTO applicants" in query:
+            self.params.extend(zip(*params[:-1]))
+        else:
+            self._fetchone_values.insert(0, (0,))
 
     def fetchone(self):
         if self._fetchone_values:
             return self._fetchone_values.pop(0)
         return None
 
+    def fetchall(self):
+        # Values are the RETURNING rows; None stands for a conflicting row.
+        rows = [value for value in self._fetchone_values if value]
+        self._fetchone_values = []
+        return rows
+
 
 class _InsertConn:
     def __init__(self, fetchone_values):
@@ -97,7 +109,7 @@ class _LoadDataCursor:
     def __init__(self, select_results=None):
         self.select_results = list(select_results or [])
         self.executed = []
-        self.executemany_calls = []
+        self.rowcount = 0
         self._last_query = None
 
     def __enter__(self):
@@ -111,14 +123,20 @@ class _LoadDataCursor:
         self._last_query = query_text
         self.executed.append((query_text, params))
 
-    def executemany(self, query, params_list):
-        self.executemany_calls.append((str(query), list(params_list)))
+    @property
+    def insert_batches(self):
+        """Rows of each batched insert, turned back from column arrays."""
+        return [list(zip(*params)) for query, params in self.executed if query == load_data.INSERT_BATCH_QUERY]
 
     def fetchone(self):
         if "SELECT 1 FROM applicants" in (self._last_query or ""):
             if self.select_results:
                 return self.select_results.pop(0)
             return None
+        if "ensure_applicant_partitions" in (self._last_query or ""):
+            return (0,)
+        if "INSERT INTO ingest_batches" in (self._last_query or ""):
+            return (1,)
         return None
 
 
@@ -186,13 +204,13 @@ class _CtxConn:
 
 @pytest.mark.db
 def test_refresh_data_get_newest_p_returns_none_when_table_empty(monkeypatch):
-    monkeypatch.setattr(refresh_data.psycopg, "connect", lambda **_kwargs: _CtxConn(None))
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: _CtxConn(None))
     assert refresh_data.get_newest_p() is None
 
 
 @pytest.mark.db
 def test_refresh_data_get_newest_p_returns_int_value(monkeypatch):
-    monkeypatch.setattr(refresh_data.psycopg, "connect", lambda **_kwargs: _CtxConn(42))
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: _CtxConn(42))
     assert refresh_data.get_newest_p() == 42
 
 
@@ -252,10 +270,11 @@ def test_query_data_connect_failure_prints_error_and_raises(monkeypatch, capsys)
     def raise_operational_error(**_kwargs):
         raise OperationalError("boom")
 
-    monkeypatch.setattr(query_data.psycopg, "connect", raise_operational_error)
+    monkeypatch.setattr(db_config.psycopg, "connect", raise_operational_error)
 
-    with pytest.raises(UnboundLocalError):
-        query_data.connect()
+    with pytest.raises(OperationalError):
+        with query_data.connect():
+            pass
 
     out = capsys.readouterr().out
     assert "The error 'boom' occurred" in out
@@ -396,18 +415,19 @@ def test_load_data_bulk_insert_json_covers_batches_and_remainder(tmp_path, monke
 
     load_data.bulk_insert_json(str(jsonl_path), batch_size=2)
 
-    assert conn.commits == 3
+    assert conn.commits == 4
     assert any("TRUNCATE TABLE applicants" in q for q, _ in cursor.executed)
-    assert len(cursor.executemany_calls) == 2
-    assert len(cursor.executemany_calls[0][1]) == 2
-    assert len(cursor.executemany_calls[1][1]) == 1
-    first_row = cursor.executemany_calls[0][1][0]
+    batches = cursor.insert_batches
+    assert len(batches) == 2
+    assert len(batches[0]) == 2
+    assert len(batches[1]) == 1
+    first_row = batches[0][0]
     assert first_row[0] == 1001
     assert str(first_row[3]) == "2026-01-24"
-    second_valid_row = cursor.executemany_calls[0][1][1]
+    second_valid_row = batches[0][1]
     assert second_valid_row[0] == 1002
     assert second_valid_row[3] is None
-    remainder_row = cursor.executemany_calls[1][1][0]
+    remainder_row = batches[1][0]
     assert remainder_row[0] == 1003
     assert remainder_row[8] is None
     out = capsys.readouterr().out
@@ -448,8 +468,8 @@ def test_load_data_bulk_insert_json_remainder_inserted_branch(tmp_path, monkeypa
 
     # batch_size larger than row count forces the "remaining rows" branch.
     load_data.bulk_insert_json(str(jsonl_path), batch_size=2)
-    assert conn.commits == 2
-    assert len(cursor.executemany_calls) == 1
+    assert conn.commits == 3
+    assert len(cursor.insert_batches) == 1
 
 
 @pytest.mark.integration
@@ -459,7 +479,7 @@ def test_load_data_main_calls_create_and_bulk(monkeypatch):
     monkeypatch.setattr(
         load_data,
         "create_table",
-        lambda: calls.__setitem__("create_table", calls["create_table"] + 1),
+        lambda partitioned=False: calls.__setitem__("create_table", calls["create_table"] + 1),
     )
 
     def fake_bulk(path):
@@ -639,7 +659,7 @@ def test_update_data_invalid_url_and_invalid_date_return_minus_one(monkeypatch):
         def commit(self):
             return None
 
-    monkeypatch.setattr(update_data.psycopg, "connect", lambda **_kwargs: _Conn())
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: _Conn())
     entries = [
         {"url": "not-a-valid-url", "date_added": "bad date"},
     ]
@@ -651,7 +671,7 @@ def test_update_data_operational_error_returns_minus_one(monkeypatch, capsys):
     def boom(**_kwargs):
         raise OperationalError("db down")
 
-    monkeypatch.setattr(update_data.psycopg, "connect", boom)
+    monkeypatch.setattr(db_config.psycopg, "connect", boom)
     result = update_data.insert_applicants_from_json_batch([{"url": "https://x/1"}])
     assert result == -1
     assert "Error 'db down' occurred." in capsys.readouterr().out
@@ -660,7 +680,7 @@ def test_update_data_operational_error_returns_minus_one(monkeypatch, capsys):
 @pytest.mark.db
 def test_update_data_successful_insert_returns_zero_and_converts_fields(monkeypatch):
     conn = _InsertConn([(999,)])
-    monkeypatch.setattr(update_data.psycopg, "connect", lambda **_kwargs: conn)
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: conn)
 
     entries = [
         {
@@ -697,7 +717,7 @@ def test_update_data_successful_insert_returns_zero_and_converts_fields(monkeypa
 @pytest.mark.db
 def test_update_data_conflict_path_returns_one(monkeypatch):
     conn = _InsertConn([None])
-    monkeypatch.setattr(update_data.psycopg, "connect", lambda **_kwargs: conn)
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: conn)
 
     result = update_data.insert_applicants_from_json_batch(
         [{"url": "https://www.thegradcafe.com/result/1000"}]
@@ -709,7 +729,7 @@ def test_update_data_conflict_path_returns_one(monkeypatch):
 @pytest.mark.db
 def test_update_data_non_numeric_url_id_is_skipped(monkeypatch):
     conn = _InsertConn([])
-    monkeypatch.setattr(update_data.psycopg, "connect", lambda **_kwargs: conn)
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: conn)
 
     result = update_data.insert_applicants_from_json_batch(
         [{"url": "https://www.thegradcafe.com/result/not-a-number"}]
@@ -721,7 +741,7 @@ def test_update_data_non_numeric_url_id_is_skipped(monkeypatch):
 @pytest.mark.db
 def test_update_data_invalid_date_string_is_ignored_but_row_inserts(monkeypatch):
     conn = _InsertConn([(1001,)])
-    monkeypatch.setattr(update_data.psycopg, "connect", lambda **_kwargs: conn)
+    monkeypatch.setattr(db_config.psycopg, "connect", lambda **_kwargs: conn)
 
     result = update_data.insert_applicants_from_json_batch(
         [{"url": "https://www.thegradcafe.com/result/1001", "date_added": "not a date"}]
@@ -767,13 +787,16 @@ def test_pages_render_analysis_page_handles_short_rows(client, monkeypatch):
             return None
 
     class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
         def cursor(self):
             return _Cursor()
 
-        def close(self):
-            return None
-
-    monkeypatch.setattr(pages, "connect", lambda: _Conn())
+    monkeypatch.setattr(pages, "connect", lambda read_only=False: _Conn())
     pages.db_process = None
     pages.status_message = None
     pages.user_message = None
@@ -820,12 +843,15 @@ def test_pages_update_db_route_conflict_and_success_paths(client, monkeypatch):
             return None
 
     class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
         def cursor(self):
             return _Cursor()
 
-        def close(self):
-            return None
-
     class _RunningProc:
         def poll(self):
             return None
@@ -839,9 +865,8 @@ def test_pages_update_db_route_conflict_and_success_paths(client, monkeypatch):
     assert _cursor.execute("SELECT 1") is None
     assert _cursor.fetchall() == [("Q", "10%")]
     assert _cursor.close() is None
-    _conn = _Conn()
-    assert isinstance(_conn.cursor(), _Cursor)
-    assert _conn.close() is None
+    with _Conn() as _conn:
+        assert isinstance(_conn.cursor(), _Cursor)
     assert _StartedProc().poll() is None
 
     monkeypatch.setattr(pages.subprocess, "Popen", lambda *_a, **_k: _StartedProc())
@@ -880,12 +905,15 @@ def test_pages_update_analysis_route_conflict_and_success_paths(client, monkeypa
             return None
 
     class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
         def cursor(self):
             return _Cursor()
 
-        def close(self):
-            return None
-
     class _RunningProc:
         def poll(self):
             return None
@@ -895,13 +923,12 @@ def test_pages_update_analysis_route_conflict_and_success_paths(client, monkeypa
     assert _cursor.execute("SELECT 1") is None
     assert _cursor.fetchall() == [("Q", "50%")]
     assert _cursor.close() is None
-    _conn = _Conn()
-    assert isinstance(_conn.cursor(), _Cursor)
-    assert _conn.close() is None
+    with _Conn() as _conn:
+        assert isinstance(_conn.cursor(), _Cursor)
 
     calls = {"questions": 0}
-    monkeypatch.setattr(pages, "connect", lambda: _Conn())
-    monkeypatch.setattr(pages, "questions", lambda _conn: calls.__setitem__("questions", 1))
+    monkeypatch.setattr(pages, "connect", lambda read_only=False: _Conn())
+    monkeypatch.setattr(pages, "questions", lambda _conn, write_connection=None: calls.__setitem__("questions", 1))
 
     pages.db_process = _RunningProc()
     pages.status_message = None
@@ -948,8 +975,8 @@ def test_pages_non_json_redirect_branches_for_busy_and_post_success(client, monk
 
     # Successful POST /update_analysis without JSON accept should redirect.
     pages.db_process = None
-    monkeypatch.setattr(pages, "connect", lambda: _FakeConn())
-    monkeypatch.setattr(pages, "questions", lambda _conn: None)
+    monkeypatch.setattr(pages, "connect", lambda read_only=False: nullcontext(_FakeConn()))
+    monkeypatch.setattr(pages, "questions", lambda _conn, write_connection=None: None)
     resp_analysis_ok = client.post("/update_analysis", follow_redirects=False)
     assert resp_analysis_ok.status_code == 303
     assert resp_analysis_ok.headers["Location"].endswith("/analysis")
@@ -968,16 +995,19 @@ def test_pages_update_analysis_get_returns_rendered_page(client, monkeypatch):
             return None
 
     class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
         def cursor(self):
             return _Cursor()
 
-        def close(self):
-            return None
-
     pages.db_process = None
     pages.status_message = None
     pages.user_message = None
-    monkeypatch.setattr(pages, "connect", lambda: _Conn())
+    monkeypatch.setattr(pages, "connect", lambda read_only=False: _Conn())
 
     response = client.get("/update_analysis")
     html = response.data.decode("utf-8")
@@ -1019,19 +1049,15 @@ def test_query_data_script_main_path_runs_with_stubbed_db(monkeypatch):
 
     class _MainCursor:
         def __init__(self):
-            # Return values for the 11 SELECT fetchone() calls in questions().
+            # Return values for the running-aggregates check (absent, so
+            # questions() scans), the two planned scans in questions(): q1-q9
+            # in one row, then the distinct counts of q10 and q11, then the
+            # answer-table check in store_answers().
             self._vals = [
-                (2,),       # q1
-                (50.0,),    # q2
-                (3.9, 329.0, 162.0, 4.5),  # q3
-                (3.85,),    # q4
-                (50.0,),    # q5
-                (3.9,),     # q6
-                (1,),       # q7
-                (1,),       # q8
-                (1,),       # q9
-                (10, 20),   # q10
-                (8, 15),    # q11
+                (False,),
+                (2, 50.0, 3.9, 329.0, 162.0, 4.5, 3.85, 50.0, 3.9, 1, 1, 1),
+                (10, 20, 8, 15),
+                (True,),
             ]
 
         def __enter__(self):
@@ -1043,6 +1069,9 @@ def test_query_data_script_main_path_runs_with_stubbed_db(monkeypatch):
         def execute(self, _query, _params=None):
             return None
 
+        def executemany(self, _query, _params_seq):
+            return None
+
         def fetchone(self):
             return self._vals.pop(0)
 
@@ -1056,7 +1085,7 @@ def test_query_data_script_main_path_runs_with_stubbed_db(monkeypatch):
         def commit(self):
             return None
 
-    monkeypatch.setattr(query_data, "connect", lambda: _MainConn())
+    monkeypatch.setattr(query_data, "connect", lambda: nullcontext(_MainConn()))
     query_data.main()
 
 
@@ -1067,17 +1096,10 @@ def test_query_data_dunder_main_guard_executes_main(monkeypatch):
     class _MainCursor:
         def __init__(self):
             self._vals = [
-                (1,),
-                (10.0,),
-                (3.0, 320.0, 160.0, 4.0),
-                (3.1,),
-                (20.0,),
-                (3.2,),
-                (1,),
-                (1,),
-                (1,),
-                (2, 2),
-                (2, 2),
+                (False,),
+                (1, 10.0, 3.0, 320.0, 160.0, 4.0, 3.1, 20.0, 3.2, 1, 1, 1),
+                (2, 2, 2, 2),
+                (True,),
             ]
 
         def __enter__(self):
@@ -1089,10 +1111,19 @@ def test_query_data_dunder_main_guard_executes_main(monkeypatch):
         def execute(self, _query, _params=None):
             return None
 
+        def executemany(self, _query, _params_seq):
+            return None
+
         def fetchone(self):
             return self._vals.pop(0)
 
     class _MainConn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
         def cursor(self):
             return _MainCursor()
 
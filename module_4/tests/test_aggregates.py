@@ -0,0 +1,176 @@
+"""Tests for the trigger-maintained analysis aggregates."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import aggregates
+import load_data
+import query_data
+import snapshot
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.85",
+        "GRE Score": "325",
+        "GRE V Score": "160",
+        "GRE AW Score": "4.5",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+ENTRIES = [
+    _entry(1),
+    _entry(2, status="Rejected", GPA="3.335", **{"US/International": "International"}),
+    _entry(3, program="Computer Science, Johns Hopkins University", Degree="Masters"),
+    _entry(4, program="Physics", term="Fall 2025", date_added="December 30, 2025"),
+    _entry(5, program=None, GPA="", **{"llm-generated-program": None}),
+    _entry(6, program="History, Georgetown University", **{"llm-generated-university": "Georgetown University"}),
+]
+
+
+@pytest.fixture()
+def aggregates_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Point the writers and the aggregates module at the real database."""
+    for module in (aggregates, load_data, snapshot, update_data):
+        monkeypatch.setattr(module, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+
+
+def _answers(connect_kwargs, monkeypatch, incremental):
+    monkeypatch.setenv("ANALYSIS_INCREMENTAL", "1" if incremental else "0")
+    with psycopg.connect(**connect_kwargs) as conn:
+        return query_data.questions(conn, pipeline=False)
+
+
+def _assert_matches_scan(connect_kwargs, monkeypatch):
+    assert _answers(connect_kwargs, monkeypatch, True) == _answers(connect_kwargs, monkeypatch, False)
+    assert aggregates.verify() == []
+
+
+@pytest.mark.db
+def test_every_write_path_keeps_answers_equal_to_a_full_scan(
+    aggregates_db, postgres_connect_kwargs, monkeypatch, tmp_path
+):
+    assert update_data.insert_applicants_from_json_batch(ENTRIES[:4]) == 0
+    _assert_matches_scan(postgres_connect_kwargs, monkeypatch)
+
+    # Upsert: new rows, a changed status and an unchanged row.
+    update_data.upsert_applicants_from_json_batch(
+        [_entry(1, status="Rejected"), ENTRIES[3], ENTRIES[4], ENTRIES[5]]
+    )
+    _assert_matches_scan(postgres_connect_kwargs, monkeypatch)
+
+    # Ad-hoc SQL goes through the same triggers.
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("UPDATE applicants SET program = 'Physics, MIT', gpa = NULL WHERE p_id = 6;")
+        conn.execute("DELETE FROM applicants WHERE p_id IN (3, 4);")
+    _assert_matches_scan(postgres_connect_kwargs, monkeypatch)
+
+    # A snapshot restore replaces every row with COPY.
+    path = str(tmp_path / "applicants.parquet")
+    snapshot.save_snapshot(path)
+    snapshot.restore_snapshot(path)
+    _assert_matches_scan(postgres_connect_kwargs, monkeypatch)
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("TRUNCATE TABLE applicants;")
+        assert conn.execute("SELECT entries, gpa_sum FROM analysis_aggregates;").fetchone() == (0, 0)
+        assert conn.execute("SELECT COUNT(*) FROM analysis_distinct_values;").fetchone() == (0,)
+
+
+@pytest.mark.db
+def test_a_failed_write_leaves_the_totals_alone(aggregates_db, postgres_connect_kwargs):
+    assert update_data.insert_applicants_from_json_batch(ENTRIES[:2]) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            with conn.transaction():
+                conn.execute("INSERT INTO applicants (p_id, term) VALUES (9, 'Fall 2026');")
+                conn.execute("INSERT INTO applicants (p_id, term) VALUES (1, 'Fall 2026');")
+        assert conn.execute("SELECT entries, fall_2026 FROM analysis_aggregates;").fetchone() == (2, 2)
+
+
+@pytest.mark.db
+def test_verify_reports_drift_and_rebuild_repairs_it(aggregates_db, postgres_connect_kwargs, capsys):
+    assert update_data.insert_applicants_from_json_batch(ENTRIES) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("UPDATE analysis_aggregates SET fall_2026 = fall_2026 + 1;")
+        conn.execute("DELETE FROM analysis_distinct_values WHERE dimension = 'university_id';")
+
+    assert aggregates.verify() == ["fall_2026", "university_id"]
+    assert "differ from a full scan: fall_2026, university_id." in capsys.readouterr().out
+    assert aggregates.rebuild() == len(ENTRIES)
+    assert aggregates.verify() == []
+    assert "match a full scan" in capsys.readouterr().out
+
+
+@pytest.mark.db
+def test_rebuild_installs_missing_triggers(aggregates_db, postgres_connect_kwargs):
+    assert update_data.insert_applicants_from_json_batch(ENTRIES[:3]) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        for event in ("insert", "update", "delete", "truncate"):
+            conn.execute(f"DROP TRIGGER applicants_aggregates_{event} ON applicants;")
+        with conn.cursor() as cur:
+            assert aggregates.has_aggregates(cur) is False
+            # Nothing to fix up without the triggers.
+            aggregates.subtract_table(cur, "applicants")
+    # Without triggers questions() scans; the totals are stale meanwhile.
+    assert update_data.insert_applicants_from_json_batch(ENTRIES[3:]) == 0
+    assert "entries" in aggregates.verify()
+
+    assert aggregates.rebuild() == len(ENTRIES)
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            assert aggregates.has_aggregates(cur) is True
+    assert aggregates.verify() == []
+
+
+def test_main_dispatches_commands(monkeypatch, capsys):
+    called = []
+    monkeypatch.setattr(aggregates, "verify", lambda: called.append("verify"))
+    monkeypatch.setattr(aggregates, "rebuild", lambda: called.append("rebuild"))
+    aggregates.main([])
+    aggregates.main(["rebuild"])
+    aggregates.main(["rebuild", "--offline"])
+    aggregates.main(["bogus"])
+    # A rebuild blocks writers, so it only runs when asked for offline.
+    assert called == ["verify", "rebuild"]
+    out = capsys.readouterr().out
+    assert "run `aggregates.py rebuild --offline`" in out
+    assert "Usage: aggregates.py verify|rebuild" in out
+
+    monkeypatch.setattr(sys, "argv", ["aggregates.py", "bogus"])
+    spec = importlib.util.spec_from_file_location("__main__", SRC_DIR / "aggregates.py")
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    assert "Usage" in capsys.readouterr().out
+
+
+def test_rebuild_and_verify_operational_error(monkeypatch, capsys):
+    monkeypatch.setattr(aggregates, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("aggregates unavailable")
+
+    monkeypatch.setattr(psycopg, "connect", boom)
+    assert aggregates.rebuild() is None
+    assert aggregates.verify() is None
+    assert capsys.readouterr().out.count("aggregates unavailable") == 2
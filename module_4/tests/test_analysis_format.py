@@ -53,13 +53,17 @@ class _FakeConnection:
         # this fake connection so fetch behavior remains predictable.
         self._rows = rows
 
+    def __enter__(self):
+        # `connect()` is used as a context manager that lends a connection.
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
     def cursor(self):
         # Return a fake cursor bound to the same canned rows.
         return _FakeCursor(self._rows)
 
-    def close(self):
-        return None
-
 
 @pytest.mark.analysis
 def test_update_analysis_rendered_output_includes_answer_labels(
@@ -77,12 +81,12 @@ def test_update_analysis_rendered_output_includes_answer_labels(
         ("Q2", "Second answer"),
     ]
 
-    def fake_connect():
+    def fake_connect(read_only=False):
         # Route code calls `connect()` both before and after analysis logic.
         # Returning our fake connection keeps the test fully local.
         return _FakeConnection(rows)
 
-    def fake_questions(_conn):
+    def fake_questions(_conn, write_connection=None):
         # `questions(conn)` normally computes and stores analysis output.
         # For this test, no mutation is required.
         return None
@@ -126,11 +130,11 @@ def test_update_analysis_formats_percentages_to_two_decimals(
         ("International percentage", "52.3%"),
     ]
 
-    def fake_connect():
+    def fake_connect(read_only=False):
         # Emulate database reads used by `_render_analysis_page`.
         return _FakeConnection(rows)
 
-    def fake_questions(_conn):
+    def fake_questions(_conn, write_connection=None):
         # Keep analysis execution side-effect free in this unit-style route test.
         return None
 
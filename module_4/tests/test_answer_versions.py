@@ -0,0 +1,133 @@
+"""Tests for versioned analysis answers behind the answers_table view."""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+import query_data
+import refresh_data
+
+
+def _page_answers(conn):
+    return conn.execute("SELECT question, answer FROM answers_table;").fetchall()
+
+
+@pytest.fixture()
+def fresh_answers(postgres_connect_kwargs):
+    """Start without any answer tables, as before the first analysis run."""
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        for query in query_data.ANSWERS_SCHEMA_QUERIES:
+            conn.execute(query)
+        conn.execute("DROP VIEW answers_table;")
+        conn.execute("DROP TABLE analysis_answers, analysis_versions;")
+    return postgres_connect_kwargs
+
+
+@pytest.mark.db
+def test_each_run_publishes_a_new_version_and_prunes_old_ones(fresh_answers):
+    with psycopg.connect(**fresh_answers) as conn:
+        query_data.store_answers(conn, [("Q1", "1"), ("Q2", "2")])
+        query_data.store_answers(conn, [("Q2", "b"), ("Q1", "a")])
+        assert _page_answers(conn) == [("Q2", "b"), ("Q1", "a")]
+        assert conn.execute("SELECT version FROM analysis_versions;").fetchall() == [(2,)]
+        assert conn.execute("SELECT DISTINCT version FROM analysis_answers;").fetchall() == [(2,)]
+
+
+@pytest.mark.db
+def test_readers_see_previous_answers_without_waiting_for_a_run(fresh_answers):
+    with psycopg.connect(**fresh_answers) as conn:
+        query_data.store_answers(conn, [("Q1", "old")])
+
+    with psycopg.connect(**fresh_answers) as writer, psycopg.connect(**fresh_answers) as reader:
+        # A run that has written its version but not committed yet.
+        writer.execute(
+            query_data.STORE_ANSWERS_QUERY.format(values="(%s::integer, %s::text, %s::text)"),
+            (1, "Q1", "new"),
+        )
+        reader.execute("SET lock_timeout = '1s';")
+        assert _page_answers(reader) == [("Q1", "old")]
+        writer.commit()
+        assert _page_answers(reader) == [("Q1", "new")]
+
+
+@pytest.mark.db
+def test_an_old_answers_table_becomes_the_first_version(fresh_answers):
+    with psycopg.connect(**fresh_answers) as conn:
+        conn.execute("CREATE TABLE answers_table (question TEXT, answer TEXT);")
+        conn.execute("INSERT INTO answers_table VALUES ('Q1', 'kept'), ('Q2', 'too');")
+        conn.commit()
+        query_data.store_answers(conn, [("Q1", "fresh")])
+        assert _page_answers(conn) == [("Q1", "fresh")]
+
+        conn.execute("DROP VIEW answers_table;")
+        conn.execute("DROP TABLE analysis_answers, analysis_versions;")
+        conn.execute("CREATE TABLE answers_table (question TEXT, answer TEXT);")
+        conn.execute("INSERT INTO answers_table VALUES ('Q1', 'kept'), ('Q2', 'too');")
+        # As migration 7 runs them: twice is the same as once.
+        for _ in range(2):
+            for query in query_data.ANSWERS_SCHEMA_QUERIES:
+                conn.execute(query)
+        assert _page_answers(conn) == [("Q1", "kept"), ("Q2", "too")]
+
+
+def test_sqlite_answers_are_versioned_too(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    load_data.create_table()
+    with query_data.connect() as conn:
+        conn.execute("CREATE TABLE answers_table (question TEXT, answer TEXT);")
+        query_data.store_answers(conn, [("Q1", "1")])
+        query_data.store_answers(conn, [("Q1", "2"), ("Q2", "3")])
+        assert _page_answers(conn) == [("Q1", "2"), ("Q2", "3")]
+        assert conn.execute("SELECT version FROM analysis_versions;").fetchall() == [(2,)]
+
+
+def test_refresh_after_ingest_is_opt_in(monkeypatch):
+    runs = []
+    monkeypatch.setattr(query_data, "questions", lambda conn: runs.append(conn))
+    monkeypatch.setattr(query_data, "connect", lambda: _Borrow("conn"))
+    monkeypatch.delenv("ANALYSIS_REFRESH_AFTER_INGEST", raising=False)
+    assert query_data.refresh_after_ingest() is False
+
+    monkeypatch.setenv("ANALYSIS_REFRESH_AFTER_INGEST", "on")
+    assert query_data.refresh_after_ingest() is True
+    assert runs == ["conn"]
+
+    # A database error keeps the previous answers and does not fail the refresh.
+    monkeypatch.setattr(query_data, "connect", lambda: _Borrow(OperationalError("db down")))
+    assert query_data.refresh_after_ingest() is False
+
+
+class _Borrow:
+    def __init__(self, value):
+        self._value = value
+
+    def __enter__(self):
+        if isinstance(self._value, Exception):
+            raise self._value
+        return self._value
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("inserted, refreshed", [(0, 1), (1, 1), (-1, 0)])
+def test_update_db_refreshes_answers_after_rows_were_written(monkeypatch, inserted, refreshed):
+    refreshes = []
+    monkeypatch.setattr(refresh_data, "replay_spool", lambda: None)
+    monkeypatch.setattr(refresh_data, "scrape_data", lambda n: n)
+    monkeypatch.setattr(refresh_data, "clean_data", lambda _raw: [{"url": "https://www.thegradcafe.com/result/12"}])
+    monkeypatch.setattr(refresh_data, "get_newest_p", lambda: 10)
+    monkeypatch.setattr(refresh_data, "insert_applicants_from_json_batch", lambda _rows: inserted)
+    monkeypatch.setattr(refresh_data, "refresh_after_ingest", lambda: refreshes.append(True))
+
+    assert refresh_data.update_db() == 0
+    assert len(refreshes) == refreshed
@@ -9,6 +9,7 @@ the test process.
 import pytest
 import sys
 from pathlib import Path
+from contextlib import nullcontext
 
 SRC_DIR = Path(__file__).resolve().parents[1] / "src"
 if str(SRC_DIR) not in sys.path:
@@ -123,12 +124,12 @@ def test_update_analysis_post_returns_200_when_not_busy(client, monkeypatch):
     pages.db_process = None
     check_analysis_called = {"called": False}
 
-    def fake_connect():
-        # Route calls connect() before questions(); return a harmless object so
-        # this test validates control flow without requiring a live database.
-        return object()
+    def fake_connect(read_only=False):
+        # Route borrows a connection before questions(); lend a harmless object
+        # so this test validates control flow without requiring a live database.
+        return nullcontext(object())
 
-    def fake_questions(_conn):
+    def fake_questions(_conn, write_connection=None):
         check_analysis_called["called"] = True
 
     monkeypatch.setattr(pages, "connect", fake_connect)
@@ -158,7 +159,7 @@ def test_update_analysis_post_returns_409_when_busy_no_update(client, monkeypatc
     pages.db_process = _DummyProcess()
     check_analysis_called = {"called": False}
 
-    def fake_questions(_conn):
+    def fake_questions(_conn, write_connection=None):
         check_analysis_called["called"] = True
 
     # Execute helper branch once, then reset so the route assertion remains valid.
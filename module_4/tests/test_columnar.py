@@ -0,0 +1,206 @@
+"""Tests for the in-process columnar analysis engine."""
+
+import json
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import applicant_stats
+import columnar
+import ingest_ledger
+import load_data
+import query_data
+import result_cache
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.81",
+        "GRE Score": "331",
+        "GRE V Score": "160",
+        "GRE AW": "4.5",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+ENTRIES = [
+    _entry(1),
+    _entry(2, status="Rejected", GPA="3.52", **{"US/International": "International"}),
+    _entry(3, program="Computer Science, Stanford University", GPA="", **{"llm-generated-university": "Stanford University"}),
+    _entry(4, program="Computer Science, Johns Hopkins University", Degree="Masters", term="Fall 2025"),
+    _entry(5, program="Physics", date_added="", status="Interview", **{"US/International": "Other"}),
+    _entry(6, program="Computer Science, MIT", date_added="May 2, 2025", GPA="3.97"),
+]
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch(ENTRIES)
+
+
+@pytest.fixture()
+def store(sqlite_applicants):
+    """A store loaded from the SQLite applicants."""
+    store = columnar.ColumnStore()
+    with query_data.connect() as conn, conn.cursor() as cur:
+        store.refresh(cur)
+    return store
+
+
+def test_dictionary_encoding_keeps_codes_stable():
+    dictionary = columnar.Dictionary()
+    assert dictionary.encode(["b", None, "a", "b"]).tolist() == [1, 0, 2, 1]
+    assert dictionary.encode(["c", "a", None]).tolist() == [3, 2, 0]
+    assert dictionary.values == [None, "b", "a", "c"]
+    assert dictionary.encode([]).dtype == np.int32
+
+
+def test_columns_are_typed(store):
+    assert len(store) == 6 and store.loads == 1
+    assert store.columns["p_id"].tolist() == [1, 2, 3, 4, 5, 6]
+    assert store.columns["date_added"].dtype == np.int32
+    assert store.columns["date_added"][4] == columnar.MISSING_DAY
+    assert np.isnan(store.columns["gpa"][2])
+    assert store.dictionaries["term"].values[store.columns["term"][3]] == "Fall 2025"
+
+
+def test_masks_and_reductions(store):
+    accepted = store.isin("status", ["Accepted"])
+    assert store.count(accepted) == 4
+    assert store.count(store.isin("status", ["Waitlisted"])) == 0
+    assert store.count(store.notin("us_or_international", ["American"])) == 2
+    assert store.count(store.dates("2026-01-01", "2027-01-01")) == 4
+    assert store.percent(accepted, of=store.isin("term", ["Fall 2026"])) == Decimal("60.00")
+    assert store.percent(accepted, of=store.isin("term", ["Spring 1999"])) is None
+    assert store.mean("gpa", accepted) == Decimal("3.86")
+    assert store.mean("gpa", store.isin("program", ["Physics, Nowhere"])) is None
+    assert store.distinct("university_name") == 4
+
+
+def test_questions_match_the_sql_answers(sqlite_applicants, monkeypatch):
+    with query_data.connect() as conn:
+        scanned = query_data.questions(conn)
+        monkeypatch.setenv("ANALYSIS_COLUMNAR", "1")
+        columnar.reset_store()
+        monkeypatch.setattr(query_data, "run_scans", _no_scans)
+        assert query_data.questions(conn) == scanned
+    assert set(query_data.last_timings()) == {question["id"] for question in query_data.QUESTIONS}
+    columnar.reset_store()
+
+
+def test_questions_without_a_columnar_entry_are_scanned(sqlite_applicants, monkeypatch):
+    monkeypatch.setenv("ANALYSIS_COLUMNAR", "1")
+    columnar.reset_store()
+    monkeypatch.delitem(query_data.QUESTIONS[0], "columnar")
+    with query_data.connect() as conn:
+        answers = query_data.questions(conn)
+    assert answers[0][1] == "5"
+    columnar.reset_store()
+
+
+def test_stats_match_the_sql_stats(sqlite_applicants, monkeypatch):
+    filter_sets = [
+        {},
+        {"university": ["MIT", "Stanford University"], "degree": ["PhD"]},
+        {"program": ["Computer Science"], "year": ["2025"]},
+        {"university": ["Stanford University"], "fields": ["llm"]},
+        {"term": ["Spring 1999"]},
+    ]
+    with query_data.connect() as conn:
+        for args in filter_sets:
+            filters = applicant_stats.normalize_filters(args)
+            monkeypatch.setenv("ANALYSIS_COLUMNAR", "0")
+            expected = applicant_stats.applicant_stats(conn, filters)
+            monkeypatch.setenv("ANALYSIS_COLUMNAR", "1")
+            assert applicant_stats.applicant_stats(conn, filters) == expected
+    columnar.reset_store()
+
+
+def test_refresh_merges_only_new_batches(store, monkeypatch):
+    calls = []
+    changed_since = ingest_ledger.changed_since
+    monkeypatch.setattr(
+        columnar, "changed_since", lambda *args: calls.append(args[1]) or changed_since(*args)
+    )
+    with query_data.connect() as conn, conn.cursor() as cur:
+        # Unchanged data version: nothing is read.
+        store.refresh(cur)
+        assert calls == []
+
+        update_data.upsert_applicants_from_json_batch([_entry(2, GPA="3.10"), _entry(0, term="Spring 2027")])
+        store.refresh(cur)
+        assert calls == [1] and store.loads == 1
+        assert store.columns["p_id"].tolist() == [0, 1, 2, 3, 4, 5, 6]
+        assert store.columns["gpa"][2] == 3.10
+        assert store.count(store.isin("term", ["Spring 2027"])) == 1
+
+        cur.execute("DELETE FROM applicants WHERE p_id = 6;")
+        conn.commit()
+        update_data.insert_applicants_from_json_batch([_entry(7)])
+        store.refresh(cur)
+    assert store.loads == 2
+    assert store.columns["p_id"].tolist() == [0, 1, 2, 3, 4, 5, 7]
+
+
+def test_refresh_between_chunks_of_one_batch(store, monkeypatch, tmp_path):
+    upsert_rows = load_data.upsert_rows
+
+    def refresh_first(cur, rows, batch_id=None):
+        # Between the commits of two chunks stamped with the same batch.
+        with query_data.connect() as conn, conn.cursor() as other:
+            store.refresh(other)
+        return upsert_rows(cur, rows, batch_id)
+
+    monkeypatch.setattr(load_data, "upsert_rows", refresh_first)
+    path = tmp_path / "entries.jsonl"
+    path.write_text(
+        "".join(json.dumps(entry) + "\n" for entry in [_entry(2, GPA="3.10"), _entry(3, GPA="3.20")]),
+        encoding="utf-8",
+    )
+    load_data.upsert_json(str(path), batch_size=1)
+    with query_data.connect() as conn, conn.cursor() as cur:
+        store.refresh(cur)
+        assert store.columns["gpa"][1:3].tolist() == [3.10, 3.20]
+        assert store.loads == 1
+
+        # An UPDATE that keeps its batch id is not in any delta.
+        cur.execute("UPDATE applicants SET gpa = 2.5 WHERE p_id = 1;")
+        result_cache.bump_version(cur)
+        conn.commit()
+        store.refresh(cur)
+    assert store.columns["gpa"][0] == 2.5 and store.loads == 2
+
+
+def test_flag_and_process_wide_store(monkeypatch):
+    monkeypatch.delenv("ANALYSIS_COLUMNAR", raising=False)
+    assert columnar.columnar_enabled() is False
+    monkeypatch.setenv("ANALYSIS_COLUMNAR", "on")
+    assert columnar.columnar_enabled() is True
+    columnar.reset_store()
+    assert columnar.get_store() is columnar.get_store()
+    columnar.reset_store()
+
+
+def _no_scans(*_args, **_kwargs):
+    raise AssertionError("applicants was scanned")
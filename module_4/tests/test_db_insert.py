@@ -46,12 +46,12 @@ OPTIONAL_FIELDS = {
 @pytest.fixture()
 def use_real_postgres_for_update_data(monkeypatch, postgres_connect_kwargs):
     """Force update_data DB calls to use the env-driven PostgreSQL instance."""
-    original_connect = update_data.psycopg.connect
+    original_connect = psycopg.connect
 
     def fake_connect(**_kwargs):
         return original_connect(**postgres_connect_kwargs)
 
-    monkeypatch.setattr(update_data.psycopg, "connect", fake_connect)
+    monkeypatch.setattr(psycopg, "connect", fake_connect)
 
 
 @pytest.fixture()
@@ -188,3 +188,24 @@ def test_can_query_inserted_data_and_return_dict_with_required_keys_real_postgre
 
     # Also validate the helper's None-return path when no row exists.
     assert query_applicant_as_dict(99999999) is None
+
+
+@pytest.mark.db
+def test_insert_applicants_from_json_batch_mixed_batch_is_one_statement_real_postgres(
+    use_real_postgres_for_update_data,
+    postgres_connect_kwargs,
+    reset_real_applicants_table,
+    sample_entry,
+):
+    """A batch mixing new, existing and sparse rows inserts only the new ones."""
+    assert update_data.insert_applicants_from_json_batch([sample_entry]) == 0
+
+    # Every optional field missing, so whole array columns are NULL.
+    sparse = [{"url": f"https://www.thegradcafe.com/result/{p_id}"} for p_id in range(8000, 8500)]
+    assert update_data.insert_applicants_from_json_batch([sample_entry] + sparse) == 1
+    assert update_data.insert_applicants_from_json_batch(sparse) == 1
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*), COUNT(gpa), COUNT(date_added) FROM applicants;")
+            assert cur.fetchone() == (501, 1, 1)
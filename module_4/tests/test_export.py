@@ -0,0 +1,170 @@
+"""Tests for streaming applicants exports (module and Flask endpoint)."""
+
+import csv
+import gzip
+import io
+import json
+import runpy
+import sys
+from datetime import date
+from pathlib import Path
+
+import psycopg
+import pyarrow.parquet
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import export_data
+import load_data
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "comments": 'Said "yes", finally',
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.90",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+@pytest.fixture()
+def export_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Five applicants in the real database, one without date or GPA."""
+    monkeypatch.setattr(export_data, "get_db_read_connect_kwargs", lambda: postgres_connect_kwargs)
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    entries = [_entry(p_id) for p_id in (3, 1, 5, 2)] + [_entry(4, date_added="", GPA="")]
+    assert update_data.insert_applicants_from_json_batch(entries) == 0
+
+
+def _export(fmt, **kwargs):
+    return b"".join(export_data.stream_export(fmt, **kwargs))
+
+
+@pytest.mark.db
+def test_rows_are_streamed_in_fixed_size_chunks(export_db):
+    chunks = list(export_data.iter_row_chunks(chunk_size=2))
+    assert [len(rows) for rows in chunks] == [2, 2, 1]
+    assert [row[0] for rows in chunks for row in rows] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.db
+def test_csv_and_jsonl_exports_round_trip(export_db, capsys):
+    stats = {}
+    rows = list(csv.DictReader(io.StringIO(_export("csv", chunk_size=2, stats=stats).decode("utf-8"))))
+    assert [row["p_id"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert rows[0]["comments"] == 'Said "yes", finally'
+    assert rows[3]["date_added"] == "" and rows[3]["gpa"] == ""
+    assert stats["rows"] == 5 and stats["bytes"] > 0
+    assert "Exported 5 rows as csv" in capsys.readouterr().out
+
+    records = [json.loads(line) for line in _export("jsonl", chunk_size=3).decode("utf-8").splitlines()]
+    assert records[0]["date_added"] == "2026-03-03"
+    assert records[0]["gpa"] == 3.9
+    assert records[3]["date_added"] is None
+    assert list(records[0]) == [name for name, _type in export_data.EXPORT_COLUMNS]
+
+
+@pytest.mark.db
+def test_parquet_export_is_typed_and_gzip_wraps_any_format(export_db):
+    table = pyarrow.parquet.read_table(io.BytesIO(_export("parquet", chunk_size=2)))
+    assert table.num_rows == 5
+    assert pyarrow.parquet.ParquetFile(io.BytesIO(_export("parquet", chunk_size=2))).num_row_groups == 3
+    assert table.column("date_added").to_pylist()[0] == date(2026, 3, 3)
+    assert table.column("p_id").type == "int64"
+
+    compressed = _export("jsonl", gzip=True)
+    assert gzip.decompress(compressed) == _export("jsonl")
+
+
+@pytest.mark.db
+def test_empty_table_and_unknown_format(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    monkeypatch.setattr(export_data, "get_db_read_connect_kwargs", lambda: postgres_connect_kwargs)
+    assert _export("csv").decode("utf-8").strip() == ",".join(
+        name for name, _type in export_data.EXPORT_COLUMNS
+    )
+    assert pyarrow.parquet.read_table(io.BytesIO(_export("parquet"))).num_rows == 0
+    with pytest.raises(ValueError):
+        _export("xml")
+
+
+@pytest.mark.db
+def test_export_to_file_infers_format_and_gzip(export_db, tmp_path, monkeypatch):
+    path = tmp_path / "applicants.jsonl.gz"
+    assert export_data.export_to_file(str(path))["rows"] == 5
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert len(f.readlines()) == 5
+
+    # Script entrypoint: ``python src/export_data.py <path>``.
+    monkeypatch.setattr(sys, "argv", ["export_data.py", str(tmp_path / "applicants.csv")])
+    runpy.run_path(str(SRC_DIR / "export_data.py"), run_name="__main__")
+    assert (tmp_path / "applicants.csv").read_text().count("\n") == 6
+
+
+@pytest.mark.db
+def test_export_to_file_operational_error(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(export_data, "get_db_read_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("export failed")
+
+    monkeypatch.setattr(psycopg, "connect", boom)
+    assert export_data.export_to_file(str(tmp_path / "a.csv")) is None
+    assert "export failed" in capsys.readouterr().out
+
+
+@pytest.mark.web
+@pytest.mark.db
+def test_export_endpoint_streams_gzip_chunks(export_db, client):
+    response = client.get(
+        "/export/applicants.csv?chunk_size=2", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="applicants.csv"'
+    assert response.mimetype == "text/csv"
+    assert gzip.decompress(response.data).decode("utf-8").count("\n") == 6
+
+    plain = client.get("/export/applicants.jsonl")
+    assert "Content-Encoding" not in plain.headers
+    assert len(plain.data.decode("utf-8").splitlines()) == 5
+
+
+@pytest.mark.web
+def test_export_endpoint_empty_table_jsonl(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+
+    response = client.get("/export/applicants.jsonl")
+    assert response.status_code == 200
+    assert response.data == b""
+
+
+@pytest.mark.web
+def test_export_endpoint_unknown_format_and_db_down(client, monkeypatch, capsys):
+    assert client.get("/export/applicants.xml").status_code == 404
+
+    def boom(**_kwargs):
+        raise OperationalError("db down")
+
+    monkeypatch.setattr(export_data, "get_db_read_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+    monkeypatch.setattr(psycopg, "connect", boom)
+    response = client.get("/export/applicants.csv")
+    assert response.status_code == 503
+    assert response.get_json()["ok"] is False
+    assert "db down" in capsys.readouterr().out
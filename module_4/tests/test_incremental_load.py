@@ -0,0 +1,289 @@
+"""Incremental (offset-resuming) baseline load tests for load_data."""
+
+import json
+import mmap
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+
+
+def _entry(p_id, program="Computer Science, MIT"):
+    return {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": program,
+        "comments": "",
+        "date_added": "January 24, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.90",
+        "GRE Score": "329",
+        "GRE V Score": "162",
+        "GRE AW Score": "4.5",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+
+
+def _write_lines(path, p_ids, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        for p_id in p_ids:
+            f.write(json.dumps(_entry(p_id)) + "\n")
+
+
+def _mmap_of(path):
+    f = open(path, "rb")
+    return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _stored_p_ids(postgres_connect_kwargs):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT p_id FROM applicants ORDER BY p_id;")
+            return [row[0] for row in cur.fetchall()]
+
+
+@pytest.fixture()
+def use_real_postgres_for_load_data(monkeypatch, postgres_connect_kwargs):
+    """Point load_data at the env-driven PostgreSQL instance."""
+    monkeypatch.setattr(load_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+
+
+@pytest.mark.db
+def test_parse_p_id_handles_missing_and_non_numeric_urls():
+    assert load_data._parse_p_id("https://www.thegradcafe.com/result/123/") == 123
+    assert load_data._parse_p_id("https://www.thegradcafe.com/result/abc") is None
+    assert load_data._parse_p_id("no-slash") is None
+    assert load_data._parse_p_id(None) is None
+
+
+@pytest.mark.db
+def test_find_offset_after_p_id_locates_first_larger_row(tmp_path):
+    path = tmp_path / "sorted.jsonl"
+    _write_lines(path, [10, 20, 30, 40, 50])
+    f, mm = _mmap_of(path)
+    try:
+        lines = mm[:].split(b"\n")
+        third_line_offset = len(lines[0]) + len(lines[1]) + 2
+
+        assert load_data.find_offset_after_p_id(mm, 5) == 0
+        assert load_data.find_offset_after_p_id(mm, 20) == third_line_offset
+        assert load_data.find_offset_after_p_id(mm, 25) == third_line_offset
+        assert load_data.find_offset_after_p_id(mm, 50) == len(mm)
+    finally:
+        mm.close()
+        f.close()
+
+
+@pytest.mark.db
+def test_find_offset_after_p_id_skips_blank_and_invalid_lines(tmp_path):
+    path = tmp_path / "gaps.jsonl"
+    path.write_text(
+        "\n".join(
+            [
+                json.dumps(_entry(1)),
+                "",
+                "not json",
+                json.dumps({"url": "https://www.thegradcafe.com/result/x"}),
+                json.dumps(_entry(2)),
+            ]
+        ),
+        encoding="utf-8",
+    )
+    f, mm = _mmap_of(path)
+    try:
+        # The last row has no trailing newline and is still found.
+        offset = load_data.find_offset_after_p_id(mm, 1)
+        assert json.loads(mm[offset:])["url"].endswith("/2")
+        assert load_data.find_offset_after_p_id(mm, 2) == len(mm)
+    finally:
+        mm.close()
+        f.close()
+
+
+@pytest.mark.db
+def test_state_helpers_reject_missing_corrupt_and_stale_state(tmp_path):
+    state_path = tmp_path / "state.json"
+    assert load_data._read_state(str(state_path)) is None
+    state_path.write_text("{not json", encoding="utf-8")
+    assert load_data._read_state(str(state_path)) is None
+
+    data_path = tmp_path / "data.jsonl"
+    _write_lines(data_path, [1, 2])
+    f, mm = _mmap_of(data_path)
+    try:
+        good = {"offset": 10, "checksum": load_data._window_checksum(mm, 10)}
+        assert load_data._resume_offset(mm, good) == 10
+        assert load_data._resume_offset(mm, None) is None
+        assert load_data._resume_offset(mm, {"offset": "10"}) is None
+        assert load_data._resume_offset(mm, {"offset": len(mm) + 1}) is None
+        assert load_data._resume_offset(mm, {"offset": 10, "checksum": "stale"}) is None
+    finally:
+        mm.close()
+        f.close()
+
+
+@pytest.mark.db
+def test_incremental_load_resumes_from_saved_offset(
+    tmp_path,
+    use_real_postgres_for_load_data,
+    postgres_connect_kwargs,
+    reset_real_applicants_table,
+    capsys,
+):
+    path = tmp_path / "baseline.jsonl"
+    _write_lines(path, [101, 102, 103])
+
+    assert load_data.incremental_load_json(str(path), batch_size=2) == 3
+    state = json.loads(Path(load_data._state_path_for(path)).read_text())
+    assert state["offset"] == path.stat().st_size
+
+    # Rows already in the table are deleted so a rescan would be detectable:
+    # only the appended tail may come back.
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM applicants WHERE p_id = 101;")
+        conn.commit()
+
+    _write_lines(path, [104, 105], mode="a")
+    assert load_data.incremental_load_json(str(path)) == 2
+    assert _stored_p_ids(postgres_connect_kwargs) == [102, 103, 104, 105]
+
+    # Nothing new: a third run is a no-op.
+    assert load_data.incremental_load_json(str(path)) == 0
+    assert "new records inserted" in capsys.readouterr().out
+
+
+@pytest.mark.db
+def test_incremental_load_rewritten_file_falls_back_to_p_id_search(
+    tmp_path,
+    use_real_postgres_for_load_data,
+    postgres_connect_kwargs,
+    reset_real_applicants_table,
+):
+    path = tmp_path / "baseline.jsonl"
+    _write_lines(path, [201, 202])
+    assert load_data.incremental_load_json(str(path)) == 2
+
+    # Rewriting the prefix invalidates the checksum; with sorted_by_p_id the
+    # loader seeks past MAX(p_id) instead (201 is deliberately absent from the
+    # table again to prove it is not rescanned).
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM applicants WHERE p_id = 201;")
+        conn.commit()
+    _write_lines(path, [200, 201, 202, 203])
+
+    assert load_data.incremental_load_json(str(path), sorted_by_p_id=True) == 1
+    assert _stored_p_ids(postgres_connect_kwargs) == [202, 203]
+
+    # Unsorted fallback rescans everything and relies on ON CONFLICT.
+    Path(load_data._state_path_for(path)).unlink()
+    assert load_data.incremental_load_json(str(path)) == 2
+    assert _stored_p_ids(postgres_connect_kwargs) == [200, 201, 202, 203]
+
+
+@pytest.mark.db
+def test_incremental_load_empty_table_ignores_saved_state(
+    tmp_path,
+    use_real_postgres_for_load_data,
+    postgres_connect_kwargs,
+    reset_real_applicants_table,
+):
+    path = tmp_path / "baseline.jsonl"
+    _write_lines(path, [301, 302])
+    assert load_data.incremental_load_json(str(path)) == 2
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE TABLE applicants;")
+        conn.commit()
+
+    assert load_data.incremental_load_json(str(path)) == 2
+
+
+@pytest.mark.db
+def test_incremental_load_waits_for_partially_written_last_line(
+    tmp_path,
+    use_real_postgres_for_load_data,
+    postgres_connect_kwargs,
+    reset_real_applicants_table,
+):
+    path = tmp_path / "baseline.jsonl"
+    _write_lines(path, [401])
+    complete_line = json.dumps(_entry(402))
+    # A skipped invalid-URL row and a half-written row at EOF.
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n" + json.dumps({"url": "https://www.thegradcafe.com/result/bad"}) + "\n")
+        f.write(complete_line[:20])
+
+    assert load_data.incremental_load_json(str(path)) == 1
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(complete_line[20:])
+    # The final row now parses even without a trailing newline.
+    assert load_data.incremental_load_json(str(path)) == 1
+    assert _stored_p_ids(postgres_connect_kwargs) == [401, 402]
+
+
+@pytest.mark.db
+def test_incremental_load_invalid_complete_line_raises(
+    tmp_path, use_real_postgres_for_load_data, reset_real_applicants_table
+):
+    path = tmp_path / "broken.jsonl"
+    path.write_text("not json\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_data.incremental_load_json(str(path))
+
+
+@pytest.mark.db
+def test_incremental_load_empty_file_and_operational_error(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "empty.jsonl"
+    path.write_text("", encoding="utf-8")
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return self
+
+    monkeypatch.setattr(load_data, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+    monkeypatch.setattr(load_data.psycopg, "connect", lambda **_kwargs: _Conn())
+    assert load_data.incremental_load_json(str(path)) == 0
+    assert "No records to load" in capsys.readouterr().out
+
+    def boom(**_kwargs):
+        raise OperationalError("incremental failed")
+
+    monkeypatch.setattr(load_data.psycopg, "connect", boom)
+    assert load_data.incremental_load_json(str(path)) is None
+    assert "incremental failed" in capsys.readouterr().out
+
+
+@pytest.mark.integration
+def test_load_data_main_incremental_skips_create_table(monkeypatch):
+    calls = {}
+
+    monkeypatch.setattr(load_data, "create_table", lambda: calls.setdefault("create_table", True))
+
+    def fake_incremental(path, sorted_by_p_id=False):
+        calls["incremental"] = (path, sorted_by_p_id)
+
+    monkeypatch.setattr(load_data, "incremental_load_json", fake_incremental)
+    load_data.main(incremental=True, sorted_by_p_id=True)
+
+    assert calls == {"incremental": (load_data.filename, True)}
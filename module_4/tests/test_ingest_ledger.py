@@ -0,0 +1,146 @@
+"""Tests for the ingest batch ledger and ``ingest_batch_id`` stamping."""
+
+import json
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import ingest_ledger
+import load_data
+import snapshot
+import spool
+import update_data
+
+
+def _entry(p_id, status="Accepted"):
+    return {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": status,
+        "term": "Fall 2026",
+        "GPA": "3.90",
+    }
+
+
+def _write_lines(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries), encoding="utf-8")
+
+
+def _stamps(connect_kwargs):
+    with psycopg.connect(**connect_kwargs) as conn:
+        return dict(conn.execute("SELECT p_id, ingest_batch_id FROM applicants;").fetchall())
+
+
+def _changed_since(connect_kwargs, batch_id):
+    with psycopg.connect(**connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            return [row[0] for row in ingest_ledger.changed_since(cur, batch_id)]
+
+
+def _ledger():
+    return [
+        (batch["source"], batch["rows_received"], batch["rows_inserted"], batch["rows_updated"])
+        for batch in reversed(ingest_ledger.list_batches())
+    ]
+
+
+@pytest.fixture()
+def ledger_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Point every writer and the ledger at the real database."""
+    for module in (ingest_ledger, load_data, snapshot, update_data):
+        monkeypatch.setattr(module, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+
+
+@pytest.mark.db
+def test_loaders_stamp_rows_and_record_batches(ledger_db, postgres_connect_kwargs, tmp_path):
+    path = tmp_path / "applicants.jsonl"
+    _write_lines(path, [_entry(1), _entry(2), _entry(3)])
+    load_data.bulk_insert_json(str(path), batch_size=2)
+
+    _write_lines(path, [_entry(2), _entry(3, status="Rejected"), _entry(4)])
+    assert load_data.upsert_json(str(path)) == {"inserted": 1, "updated": 1, "unchanged": 1}
+
+    # An unchanged row keeps the batch that last wrote it.
+    assert _stamps(postgres_connect_kwargs) == {1: 1, 2: 1, 3: 2, 4: 2}
+    assert _changed_since(postgres_connect_kwargs, 1) == [3, 4]
+    assert _changed_since(postgres_connect_kwargs, 2) == []
+
+    _write_lines(path, [_entry(5)])
+    load_data.incremental_load_json(str(path), state_path=str(tmp_path / "state.json"))
+    assert _changed_since(postgres_connect_kwargs, 2) == [5]
+
+    assert _ledger() == [
+        ("bulk_load", 3, 3, 0),
+        ("upsert_load", 3, 1, 1),
+        ("incremental_load", 1, 1, 0),
+    ]
+    assert all(batch["finished_at"] >= batch["started_at"] for batch in ingest_ledger.list_batches())
+
+
+@pytest.mark.db
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_refresh_insert_writes_its_ledger_entry_in_the_same_statement(
+    ledger_db, postgres_connect_kwargs, pipeline
+):
+    assert update_data.insert_applicants_from_json_batch([_entry(1), _entry(2)], pipeline=pipeline) == 0
+    assert update_data.insert_applicants_from_json_batch([_entry(2), _entry(3)], pipeline=pipeline) == 1
+
+    assert _stamps(postgres_connect_kwargs) == {1: 1, 2: 1, 3: 2}
+    assert _ledger() == [("refresh", 2, 2, 0), ("refresh", 2, 1, 0)]
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            assert ingest_ledger.latest_batch_id(cur) == 2
+
+
+@pytest.mark.db
+def test_refresh_upsert_spool_replay_and_restore_are_batches(
+    ledger_db, postgres_connect_kwargs, tmp_path
+):
+    assert update_data.upsert_applicants_from_json_batch([_entry(1), _entry(2)])["inserted"] == 2
+    spool.append_batch([_entry(2, status="Rejected")])
+    assert update_data.replay_spool()["updated"] == 1
+    assert _changed_since(postgres_connect_kwargs, 1) == [2]
+
+    path = str(tmp_path / "applicants.parquet")
+    snapshot.save_snapshot(path)
+    snapshot.restore_snapshot(path)
+    # A restore replaces every row, so all of them count as changed.
+    assert set(_stamps(postgres_connect_kwargs).values()) == {3}
+    assert _changed_since(postgres_connect_kwargs, 2) == [1, 2]
+    assert _changed_since(postgres_connect_kwargs, None) == [1, 2]
+
+    assert _ledger() == [
+        ("refresh_upsert", 2, 2, 0),
+        ("spool_replay", 1, 0, 1),
+        ("snapshot_restore", 2, 2, 0),
+    ]
+    assert len(ingest_ledger.list_batches(limit=1)) == 1
+
+
+@pytest.mark.db
+def test_changed_since_none_includes_rows_from_before_the_ledger(ledger_db, postgres_connect_kwargs):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("INSERT INTO applicants (p_id, status) VALUES (7, 'Accepted');")
+        with conn.cursor() as cur:
+            assert ingest_ledger.latest_batch_id(cur) is None
+            assert ingest_ledger.changed_since(cur, None, columns=("p_id", "status")) == [(7, "Accepted")]
+            assert ingest_ledger.changed_since(cur, 0) == []
+
+
+def test_list_batches_operational_error(monkeypatch, capsys):
+    monkeypatch.setattr(ingest_ledger, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("ledger unavailable")
+
+    monkeypatch.setattr(psycopg, "connect", boom)
+    assert ingest_ledger.list_batches() == []
+    assert "ledger unavailable" in capsys.readouterr().out
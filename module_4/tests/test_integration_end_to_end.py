@@ -96,16 +96,19 @@ def test_post_update_analysis_succeeds_and_updates_analysis_from_stubbed_db(
             return None
 
     class _FakeConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
         def cursor(self):
             return _FakeCursor()
 
-        def close(self):
-            return None
-
-    def fake_connect():
+    def fake_connect(read_only=False):
         return _FakeConnection()
 
-    def fake_questions(_conn):
+    def fake_questions(_conn, write_connection=None):
         # Generate deterministic analysis from the updated in-memory rows.
         total_rows = len(updated_rows)
         accepted_rows = sum(1 for row in updated_rows if row["status"] == "Accepted")
@@ -0,0 +1,187 @@
+"""Tests for top-N rankings from the aggregate cube."""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import applicant_stats
+import columnar
+import leaderboard
+import load_data
+import query_data
+import update_data
+
+
+def _entry(p_id, program, status="Accepted", gpa="3.80", **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": program,
+        "date_added": "March 3, 2026",
+        "status": status,
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": gpa,
+        "Degree": "PhD",
+        "llm-generated-program": program.split(",")[0],
+        "llm-generated-university": program.split(", ")[-1],
+    }
+    entry.update(overrides)
+    return entry
+
+
+ENTRIES = [
+    _entry(1, "Computer Science, MIT"),
+    _entry(2, "Computer Science, MIT", "Rejected", "3.40"),
+    _entry(3, "Computer Science, Stanford University", gpa="3.90"),
+    _entry(4, "Computer Science, Stanford University", "Rejected", "3.60", Degree="Masters"),
+    _entry(5, "Physics, MIT"),
+    _entry(6, "Physics, MIT", gpa="3.60"),
+    _entry(7, "Physics, Stanford University", "Rejected", ""),
+    _entry(8, "History, MIT", "Wait listed", "", term="Fall 2025"),
+]
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch(ENTRIES)
+    columnar.reset_store()
+    yield
+    columnar.reset_store()
+
+
+def _query(**args):
+    return leaderboard.normalize_query({name: list(values) for name, values in args.items()})
+
+
+def _top(query):
+    with query_data.connect() as conn:
+        return leaderboard.leaderboard(conn, query)
+
+
+def _ranking(result, *names):
+    return [tuple(row[name] for name in names) for row in result["rows"]]
+
+
+def test_query_is_validated():
+    assert _query(min_reports=["3"], program=["Physics", " Physics"]) == {
+        "by": ["program"],
+        "metric": "acceptance_rate",
+        "order": "desc",
+        "min_reports": 3,
+        "limit": 10,
+        "filters": {"program": ["Physics"]},
+    }
+    assert _query(by=["university", "program", "university"])["by"] == ["university", "program"]
+    with pytest.raises(ValueError, match="Unknown parameter\\(s\\): status"):
+        _query(status=["Accepted"])
+    with pytest.raises(ValueError, match="'by' must be among: university, program, degree, term"):
+        _query(by=["status"])
+    with pytest.raises(ValueError, match="'metric' must be one of"):
+        _query(metric=["gre"])
+    with pytest.raises(ValueError, match="'order' must be one of: desc, asc"):
+        _query(order=["up"])
+    with pytest.raises(ValueError, match="'min_reports' must be an integer"):
+        _query(min_reports=["many"])
+    with pytest.raises(ValueError, match="'min_reports' must be at least 1"):
+        _query(min_reports=["0"])
+    with pytest.raises(ValueError, match="'limit' must be from 1 to 100"):
+        _query(limit=["101"])
+    with pytest.raises(ValueError, match="At most 50 values for 'term'"):
+        _query(term=[str(n) for n in range(51)])
+
+
+def test_top_programs_with_a_support_threshold(sqlite_applicants):
+    result = _top(_query(min_reports=["3"]))
+    assert result["groups"] == 2
+    assert result["rows"] == [
+        {"program": "Physics", "reports": 3, "accepted": 2, "acceptance_rate": 66.67, "avg_gpa": 3.7},
+        {"program": "Computer Science", "reports": 4, "accepted": 2, "acceptance_rate": 50.0, "avg_gpa": 3.68},
+    ]
+    assert _ranking(_top(_query(min_reports=["1"], order=["asc"], limit=["2"])), "program") == [
+        ("History",),
+        ("Computer Science",),
+    ]
+
+
+def test_rankings_by_combinations_and_filters(sqlite_applicants):
+    result = _top(_query(by=["program", "university"], metric=["avg_gpa"], min_reports=["1"]))
+    assert _ranking(result, "university", "program", "avg_gpa") == [
+        ("Stanford University", "Computer Science", 3.75),
+        ("MIT", "Physics", 3.7),
+        ("MIT", "Computer Science", 3.6),
+    ]
+    result = _top(
+        _query(by=["university"], metric=["accepted"], min_reports=["1"], degree=["PhD"], term=["Fall 2026"])
+    )
+    assert _ranking(result, "university", "accepted", "reports") == [("MIT", 3, 4), ("Stanford University", 1, 2)]
+    assert _top(_query(university=["Nowhere"], min_reports=["1"])) == {"groups": 0, "rows": []}
+
+
+def test_sparse_groups_rank_like_dense_ones(sqlite_applicants, monkeypatch):
+    query = _query(by=["university", "program"], min_reports=["1"])
+    dense = _top(query)
+    monkeypatch.setattr(leaderboard, "DENSE_GROUPS", 0)
+    assert _top(query) == dense
+
+
+def test_rates_round_like_the_stats_api(sqlite_applicants):
+    # 1 of 32 is 3.125%: half up gives 3.13, Python's round() 3.12.
+    update_data.insert_applicants_from_json_batch(
+        [_entry(100 + n, "Chemistry, MIT", "Accepted" if n == 0 else "Rejected") for n in range(32)]
+    )
+    [row] = _top(_query(program=["Chemistry"], min_reports=["1"]))["rows"]
+    filters = applicant_stats.normalize_filters({"program": ["Chemistry"]})
+    with query_data.connect() as conn:
+        stats = applicant_stats.applicant_stats(conn, filters)["stats"]
+    assert row["acceptance_rate"] == stats["acceptance_rate"] == 3.13
+
+
+def test_cube_is_rebuilt_only_after_a_new_batch(sqlite_applicants):
+    query = _query(by=["university"], min_reports=["1"])
+    _top(query)
+    cube = leaderboard.get_cube(columnar.get_store())
+    assert len(cube) == 7
+    _top(query)
+    assert leaderboard.get_cube(columnar.get_store()) is cube
+
+    update_data.insert_applicants_from_json_batch([_entry(9, "Physics, Stanford University")])
+    assert _ranking(_top(query), "university", "reports") == [("MIT", 5), ("Stanford University", 4)]
+    assert leaderboard.get_cube(columnar.get_store()) is not cube
+
+
+@pytest.mark.web
+def test_leaderboard_endpoint(client, sqlite_applicants):
+    response = client.get("/api/leaderboard?by=university&metric=reports&min_reports=1&limit=1")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ok"] is True and body["groups"] == 2
+    assert body["query"]["by"] == ["university"]
+    assert body["rows"] == [
+        {"university": "MIT", "reports": 5, "accepted": 3, "acceptance_rate": 60.0, "avg_gpa": 3.65}
+    ]
+
+    response = client.get("/api/leaderboard?limit=0")
+    assert response.status_code == 400
+    assert response.get_json() == {"ok": False, "message": "'limit' must be from 1 to 100."}
+
+
+@pytest.mark.web
+def test_leaderboard_endpoint_db_down(client, monkeypatch):
+    def boom(**_kwargs):
+        raise OperationalError("db down")
+
+    monkeypatch.setattr(query_data, "get_db_read_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+    monkeypatch.setattr(psycopg, "connect", boom)
+    response = client.get("/api/leaderboard")
+    assert response.status_code == 503
+    assert response.get_json() == {"ok": False, "message": "Database unavailable."}
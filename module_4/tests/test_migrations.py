@@ -0,0 +1,240 @@
+"""Tests for the versioned in-place schema migration runner."""
+
+import importlib.util
+import re
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import db_config
+import load_data
+import migrations
+
+
+# Column list of applicants before program_name/university_name existed.
+LEGACY_TABLE_QUERY = """
+CREATE TABLE applicants (
+    p_id BIGINT PRIMARY KEY,
+    program TEXT,
+    comments TEXT,
+    date_added DATE,
+    url TEXT,
+    status TEXT,
+    term TEXT,
+    us_or_international TEXT,
+    gpa FLOAT,
+    gre FLOAT,
+    gre_v FLOAT,
+    gre_aw FLOAT,
+    degree TEXT,
+    llm_generated_program TEXT,
+    llm_generated_university TEXT
+);
+"""
+
+HEAD = [migration["version"] for migration in migrations.MIGRATIONS]
+ONLINE_HEAD = HEAD[:HEAD.index(8)]
+
+# Statements that (re)define a named function, trigger, view or index.
+DEFINITION = re.compile(r"\s*CREATE (?:OR REPLACE (?:FUNCTION|TRIGGER|VIEW)|INDEX IF NOT EXISTS) (\w+)")
+
+
+def _execute(postgres_connect_kwargs, *queries):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            for query in queries:
+                cur.execute(query)
+        conn.commit()
+
+
+@pytest.fixture()
+def fresh_migrations(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Forget recorded versions and point the runner at the real database."""
+    monkeypatch.setattr(migrations, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    monkeypatch.setattr(load_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    _execute(postgres_connect_kwargs, "DROP TABLE IF EXISTS schema_migrations;")
+    yield
+    _execute(postgres_connect_kwargs, "DROP TABLE IF EXISTS schema_migrations;")
+
+
+def _index_validity(cur):
+    cur.execute(
+        """
+        SELECT c.relname, i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'applicants'::regclass;
+        """
+    )
+    return dict(cur.fetchall())
+
+
+@pytest.mark.db
+def test_migrate_upgrades_legacy_table_in_place(fresh_migrations, postgres_connect_kwargs, capsys):
+    _execute(
+        postgres_connect_kwargs,
+        "DROP TABLE applicants CASCADE;",
+        LEGACY_TABLE_QUERY,
+        """
+        INSERT INTO applicants (p_id, program, llm_generated_program, llm_generated_university)
+        VALUES (7, 'Physics, Stanford University', 'Physics', 'Stanford University'),
+               (8, NULL, NULL, NULL),
+               (9, 'History, MIT', 'History', 'MIT');
+        """,
+    )
+
+    # Online runs stop before the first migration that blocks writers.
+    assert migrations.migrate(batch_size=2) == ONLINE_HEAD
+    out = capsys.readouterr().out
+    assert "Applied migration 1: split name columns, dimension tables and ids (2 rows backfilled)." in out
+    assert "Stopped before migration 8" in out
+    assert migrations.migrate(batch_size=2, offline=True) == HEAD[len(ONLINE_HEAD):]
+    # Recorded versions make a second run a no-op.
+    assert migrations.migrate() == []
+    assert "Schema is up to date." in capsys.readouterr().out
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT program_name, university_name FROM applicants WHERE p_id = 7;")
+            assert cur.fetchone() == ("Physics", "Stanford University")
+            cur.execute(
+                """
+                SELECT program_id = llm_program_id, university_id = llm_university_id
+                FROM applicants WHERE p_id = 7;
+                """
+            )
+            assert cur.fetchone() == (True, True)
+            cur.execute("SELECT program_id, llm_university_id FROM applicants WHERE p_id = 8;")
+            assert cur.fetchone() == (None, None)
+            validity = _index_validity(cur)
+            cur.execute("SELECT version FROM schema_migrations ORDER BY version;")
+            assert [row[0] for row in cur.fetchall()] == HEAD
+            cur.execute("SELECT entries FROM analysis_aggregates;")
+            assert cur.fetchone() == (3,)
+            # Plain columns (no table rewrite), kept in step by trigger.
+            cur.execute(
+                "SELECT attgenerated FROM pg_attribute "
+                "WHERE attrelid = 'applicants'::regclass AND attname = 'program_name';"
+            )
+            assert cur.fetchone() == ("",)
+            cur.execute("INSERT INTO applicants (p_id, program) VALUES (10, 'Art, Yale');")
+            cur.execute("UPDATE applicants SET program = 'Law, MIT' WHERE p_id = 9;")
+            cur.execute("SELECT program_name, university_name FROM applicants WHERE p_id IN (9, 10) ORDER BY p_id;")
+            assert cur.fetchall() == [("Law", "MIT"), ("Art", "Yale")]
+
+    assert validity["applicants_accepted_program_idx"] is True
+    assert all(validity.values())
+
+
+@pytest.mark.db
+def test_migrate_rebuilds_index_left_invalid_by_failed_concurrent_build(
+    fresh_migrations, postgres_connect_kwargs
+):
+    _execute(
+        postgres_connect_kwargs,
+        "INSERT INTO applicants (p_id, term) VALUES (1, 'Fall 2026'), (2, 'Fall 2026');",
+        "DROP INDEX applicants_term_status_idx;",
+    )
+    # A unique build over duplicate terms fails after creating the index
+    # entry, exactly like a concurrent build interrupted mid-way.
+    with psycopg.connect(**postgres_connect_kwargs, autocommit=True) as conn:
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            conn.execute("CREATE UNIQUE INDEX CONCURRENTLY applicants_term_status_idx ON applicants (term);")
+        with conn.cursor() as cur:
+            assert _index_validity(cur)["applicants_term_status_idx"] is False
+
+    assert migrations.migrate(offline=True) == HEAD
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            assert _index_validity(cur)["applicants_term_status_idx"] is True
+            cur.execute("SELECT indexdef FROM pg_indexes WHERE indexname = 'applicants_term_status_idx';")
+            assert "UNIQUE" not in cur.fetchone()[0]
+
+
+@pytest.mark.db
+def test_migrate_builds_indexes_without_concurrently_on_partitioned_table(
+    fresh_migrations, postgres_connect_kwargs
+):
+    load_data.create_table(partitioned=True)
+    _execute(postgres_connect_kwargs, "DROP INDEX applicants_accepted_llm_program_idx;")
+
+    assert migrations.migrate(offline=True) == HEAD
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            assert "applicants_accepted_llm_program_idx" in _index_validity(cur)
+
+
+def test_trigger_migrations_block_writers_during_rebuild():
+    # The table lock, not the runner's advisory lock, keeps writers out while
+    # the running totals and rollups are built.
+    by_version = {migration["version"]: migration["statements"] for migration in migrations.MIGRATIONS}
+    for version in (8, 11):
+        assert "LOCK TABLE applicants IN SHARE MODE;" in by_version[version]
+        assert migrations.ADVISORY_LOCK_QUERY not in by_version[version]
+    # Only migrations that take that lock need a write pause.
+    assert [migration["version"] for migration in migrations.MIGRATIONS if migration.get("offline")] == [8, 11]
+
+
+def _definitions(statements):
+    found = {}
+    for statement in statements:
+        statement = statement.replace("CREATE INDEX CONCURRENTLY", "CREATE INDEX", 1)
+        match = DEFINITION.match(statement)
+        if match:
+            found[match.group(1)] = " ".join(statement.split())
+    return found
+
+
+def test_latest_migrations_match_the_fresh_schema():
+    # Migration SQL is frozen, so a definition changed in load_data (or the
+    # modules it collects DDL from) fails here until a migration carries it.
+    upgraded = {}
+    for migration in migrations.MIGRATIONS:
+        upgraded.update(_definitions(migration["statements"]))
+    fresh = _definitions(load_data.SCHEMA_QUERIES)
+
+    assert {name: upgraded.get(name) for name in fresh} == fresh
+
+
+@pytest.mark.db
+def test_migrate_operational_error(monkeypatch, capsys):
+    monkeypatch.setattr(migrations, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("migrate failed")
+
+    monkeypatch.setattr(migrations.psycopg, "connect", boom)
+    assert migrations.migrate() is None
+    assert "migrate failed" in capsys.readouterr().out
+
+
+@pytest.mark.integration
+def test_load_data_main_upgrade_only_migrates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations, "migrate", lambda: calls.append("migrate"))
+    monkeypatch.setattr(load_data, "create_table", lambda **_kwargs: calls.append("create"))
+    monkeypatch.setattr(load_data, "bulk_insert_json", lambda _path: calls.append("bulk"))
+
+    load_data.main(upgrade=True)
+    assert calls == ["migrate"]
+
+
+@pytest.mark.db
+def test_migrations_dunder_main_guard_runs_migrate(monkeypatch, capsys):
+    monkeypatch.setattr(db_config, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("expected in test")
+
+    monkeypatch.setattr("psycopg.connect", boom)
+    spec = importlib.util.spec_from_file_location("__main__", SRC_DIR / "migrations.py")
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    assert "expected in test" in capsys.readouterr().out
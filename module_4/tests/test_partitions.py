@@ -0,0 +1,190 @@
+"""Tests for the optional year-partitioned applicants layout."""
+
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+import partitions
+import update_data
+
+
+def _entry(p_id, date_added):
+    return {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "comments": "",
+        "date_added": date_added,
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.90",
+        "Degree": "Masters",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+
+
+@pytest.fixture()
+def partitioned_applicants(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Recreate applicants partitioned by year, pointing all modules at it."""
+    for module in (load_data, partitions, update_data):
+        monkeypatch.setattr(module, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    load_data.create_table(partitioned=True)
+    yield
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS applicants_archive_y2025;")
+        conn.commit()
+
+
+@pytest.mark.db
+def test_loaders_create_year_partitions_on_demand(
+    tmp_path, partitioned_applicants, postgres_connect_kwargs
+):
+    path = tmp_path / "baseline.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for p_id, date_added in [(1, "March 3, 2025"), (2, "January 24, 2026"), (3, "")]:
+            f.write(json.dumps(_entry(p_id, date_added)) + "\n")
+
+    load_data.bulk_insert_json(str(path), batch_size=2)
+    assert [name for name, _ in partitions.list_partitions()] == [
+        "applicants_undated",
+        "applicants_y2025",
+        "applicants_y2026",
+    ]
+
+    # Live inserts route new years and still detect duplicates, dated or not.
+    assert update_data.insert_applicants_from_json_batch([_entry(4, "May 1, 2027")]) == 0
+    assert update_data.insert_applicants_from_json_batch(
+        [_entry(2, "January 24, 2026"), _entry(3, "")]
+    ) == 1
+    assert partitions.partition_name(2027) in dict(partitions.list_partitions())
+
+    # Re-running the incremental loader over the same rows adds nothing.
+    assert load_data.incremental_load_json(str(path), state_path=str(tmp_path / "s.json")) == 0
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tableoid::regclass::text, p_id FROM applicants ORDER BY p_id;")
+            assert cur.fetchall() == [
+                ("applicants_y2025", 1),
+                ("applicants_y2026", 2),
+                ("applicants_undated", 3),
+                ("applicants_y2027", 4),
+            ]
+
+
+@pytest.mark.db
+def test_new_year_partition_takes_its_rows_from_the_default_partition(
+    partitioned_applicants, postgres_connect_kwargs
+):
+    # Written without ensure_partitions, so the 2028 row lands in the default partition.
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("INSERT INTO applicants (p_id, date_added, program) VALUES (7, '2028-02-01', 'Physics, MIT');")
+        (entries,) = conn.execute("SELECT entries FROM analysis_aggregates;").fetchone()
+
+    assert update_data.insert_applicants_from_json_batch([_entry(8, "March 3, 2028")]) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tableoid::regclass::text, p_id, program_name FROM applicants ORDER BY p_id;")
+            assert cur.fetchall() == [
+                ("applicants_y2028", 7, "Physics"),
+                ("applicants_y2028", 8, "Computer Science"),
+            ]
+            # Moving the row left the running totals as they were, plus the new row.
+            cur.execute("SELECT entries FROM analysis_aggregates;")
+            assert cur.fetchone() == (entries + 1,)
+
+
+@pytest.mark.db
+def test_date_range_queries_prune_to_one_partition(partitioned_applicants, postgres_connect_kwargs):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            partitions.ensure_partitions(cur, [date(2025, 6, 1), date(2026, 6, 1)])
+            # Q8-shaped predicate: the planner should only visit 2026.
+            cur.execute(
+                """
+                EXPLAIN (COSTS OFF)
+                SELECT COUNT(*) FROM applicants
+                WHERE status = 'Accepted'
+                  AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01';
+                """
+            )
+            plan = "\n".join(row[0] for row in cur.fetchall())
+        conn.rollback()
+
+    assert "applicants_y2026" in plan
+    assert "applicants_y2025" not in plan
+    assert "applicants_undated" not in plan
+
+
+@pytest.mark.db
+def test_detach_partition_archives_year(partitioned_applicants, postgres_connect_kwargs, capsys):
+    assert update_data.insert_applicants_from_json_batch([_entry(9, "March 3, 2025")]) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        (version_before,) = conn.execute("SELECT version FROM applicants_data_version;").fetchone()
+
+    assert partitions.detach_partition(2025) == "applicants_archive_y2025"
+    assert partitions.detach_partition(2025) is None
+    assert "No partition 'applicants_y2025'" in capsys.readouterr().out
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM applicants;")
+            assert cur.fetchone() == (0,)
+            cur.execute("SELECT p_id FROM applicants_archive_y2025;")
+            assert cur.fetchall() == [(9,)]
+            # Detaching fires no triggers; the running totals are fixed up too.
+            cur.execute("SELECT entries, gpa_count FROM analysis_aggregates;")
+            assert cur.fetchone() == (0, 0)
+            cur.execute("SELECT COUNT(*) FROM applicant_daily_rollups;")
+            assert cur.fetchone() == (0,)
+            # ...and cached analysis results are invalidated.
+            cur.execute("SELECT version FROM applicants_data_version;")
+            assert cur.fetchone() == (version_before + 1,)
+
+
+@pytest.mark.db
+def test_ensure_partitions_is_noop_on_unpartitioned_table(
+    postgres_connect_kwargs, reset_real_applicants_table, monkeypatch
+):
+    monkeypatch.setattr(partitions, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            assert partitions.ensure_partitions(cur, [None]) == 0
+            assert partitions.ensure_partitions(cur, [date(2026, 1, 1)]) == 0
+        conn.rollback()
+    assert partitions.list_partitions() == []
+
+
+@pytest.mark.db
+def test_partition_helpers_operational_error(monkeypatch, capsys):
+    monkeypatch.setattr(partitions, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("partition failed")
+
+    monkeypatch.setattr(psycopg, "connect", boom)
+    assert partitions.list_partitions() == []
+    assert partitions.detach_partition(2025) is None
+    assert capsys.readouterr().out.count("partition failed") == 2
+
+
+@pytest.mark.integration
+def test_load_data_main_partitioned_flag(monkeypatch):
+    calls = []
+    monkeypatch.setattr(load_data, "create_table", lambda partitioned=False: calls.append(partitioned))
+    monkeypatch.setattr(load_data, "bulk_insert_json", lambda _path: None)
+
+    load_data.main(partitioned=True)
+    assert calls == [True]
@@ -0,0 +1,171 @@
+"""Tests for percentile ranks within applicant cohorts."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import applicant_stats
+import columnar
+import load_data
+import percentiles
+import query_data
+import update_data
+
+
+def _entry(p_id, gpa, gre="", **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": gpa,
+        "GRE Score": gre,
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+ENTRIES = [
+    _entry(1, "3.50", "320"),
+    _entry(2, "3.70", "325"),
+    _entry(3, "3.70"),
+    _entry(4, "3.90", "330"),
+    _entry(5, "4.00", "315", program="Computer Science, Stanford University"),
+    _entry(6, "3.20", "310", status="Rejected"),
+    _entry(7, "3.80", "318", Degree="Masters"),
+    _entry(8, ""),
+]
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch(ENTRIES)
+    columnar.reset_store()
+    yield
+    columnar.reset_store()
+
+
+def _query(**args):
+    return percentiles.normalize_query({name: list(values) for name, values in args.items()})
+
+
+def _cohort(filters, scores):
+    with query_data.connect() as conn:
+        return percentiles.percentiles(conn, filters, scores)
+
+
+def test_query_is_validated():
+    assert _query(program=["Computer Science", " Computer Science"], gpa=["3.7"]) == (
+        {"program": ["Computer Science"], "status": ["Accepted"]},
+        {"gpa": 3.7},
+    )
+    assert _query(status=["any"]) == ({}, {})
+    with pytest.raises(ValueError, match="Unknown parameter\\(s\\): toefl"):
+        _query(toefl=["110"])
+    with pytest.raises(ValueError, match="'gre' must be a number"):
+        _query(gre=["high"])
+    with pytest.raises(ValueError, match="'gpa' must be a number"):
+        _query(gpa=["nan"])
+    with pytest.raises(ValueError, match="At most 50 values for 'degree'"):
+        _query(degree=[str(n) for n in range(51)])
+
+
+def test_rank_and_distribution_in_a_cohort(sqlite_applicants):
+    result = _cohort(*_query(university=["MIT"], degree=["PhD"], gpa=["3.7"]))
+    assert list(result) == ["gpa"]
+    assert result["gpa"] == {
+        "n": 4,
+        "min": 3.5,
+        "p10": 3.5,
+        "p25": 3.5,
+        "median": 3.7,
+        "p75": 3.7,
+        "p90": 3.7,
+        "max": 3.9,
+        "mean": 3.7,
+        "value": 3.7,
+        "below": 1,
+        "equal": 2,
+        "percentile": 50.0,
+    }
+
+
+def test_cohorts_across_groups_match_a_full_sort(sqlite_applicants):
+    result = _cohort(*_query(program=["Computer Science"], status=["any"], gre=["318"]))
+    gre = np.sort(np.array([320, 325, 330, 315, 310, 318], dtype=float))
+    assert result["gre"]["n"] == len(gre)
+    assert result["gre"]["median"] == gre[(len(gre) - 1) // 2]
+    assert result["gre"]["percentile"] == round(100 * (np.sum(gre < 318) + 0.5) / len(gre), 2)
+    assert (result["gre"]["min"], result["gre"]["max"]) == (310.0, 330.0)
+
+    everything = _cohort(*_query(status=["any"]))
+    assert list(everything) == list(percentiles.SCORES)
+    assert everything["gpa"]["n"] == 7 and everything["gre_v"] == {"n": 0}
+    assert _cohort(*_query(university=["Nowhere"], gpa=["3"]))["gpa"] == {"n": 0}
+
+
+def test_mean_rounds_like_the_stats_api(sqlite_applicants):
+    # 3.675 rounds half up to 3.68; Python's round() gives 3.67.
+    yale = {"program": "Physics, Yale University", "llm-generated-university": "Yale University"}
+    update_data.insert_applicants_from_json_batch([_entry(20, "3.60", **yale), _entry(21, "3.75", **yale)])
+    result = _cohort(*_query(university=["Yale University"]))
+    with query_data.connect() as conn:
+        stats = applicant_stats.applicant_stats(
+            conn, applicant_stats.normalize_filters({"university": ["Yale University"]})
+        )["stats"]
+    assert result["gpa"]["mean"] == stats["avg_gpa"] == 3.68
+
+
+def test_index_is_rebuilt_only_after_a_new_batch(sqlite_applicants):
+    filters, scores = _query(gpa=["3.9"])
+    _cohort(filters, scores)
+    index = percentiles.score_index(columnar.get_store(), "gpa")
+    assert _cohort(filters, scores)["gpa"]["percentile"] == 75.0
+    assert percentiles.score_index(columnar.get_store(), "gpa") is index
+
+    update_data.insert_applicants_from_json_batch([_entry(9, "2.90")])
+    assert _cohort(filters, scores)["gpa"]["n"] == 7
+    assert percentiles.score_index(columnar.get_store(), "gpa") is not index
+
+
+@pytest.mark.web
+def test_percentiles_endpoint(client, sqlite_applicants):
+    response = client.get("/api/percentiles?program=Computer+Science&degree=PhD&gpa=4&gre=320")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ok"] is True
+    assert body["filters"] == {"program": ["Computer Science"], "degree": ["PhD"], "status": ["Accepted"]}
+    assert body["scores"]["gpa"]["percentile"] == 90.0
+    assert body["scores"]["gre"]["n"] == 4
+
+    response = client.get("/api/percentiles?gpa=high")
+    assert response.status_code == 400
+    assert response.get_json() == {"ok": False, "message": "'gpa' must be a number."}
+
+
+@pytest.mark.web
+def test_percentiles_endpoint_db_down(client, monkeypatch):
+    def boom(**_kwargs):
+        raise OperationalError("db down")
+
+    monkeypatch.setattr(query_data, "get_db_read_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+    monkeypatch.setattr(psycopg, "connect", boom)
+    response = client.get("/api/percentiles?gpa=3.5")
+    assert response.status_code == 503
+    assert response.get_json() == {"ok": False, "message": "Database unavailable."}
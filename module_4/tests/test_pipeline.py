@@ -0,0 +1,90 @@
+"""Tests for the opt-in psycopg pipeline mode on refresh and analysis writes."""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import db_config
+import load_data
+import query_data
+import update_data
+
+
+def _entry(p_id, date_added="January 24, 2026", status="Accepted"):
+    return {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": date_added,
+        "status": status,
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.80",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+
+
+@pytest.mark.db
+@pytest.mark.parametrize("value, expected", [("1", True), ("On", True), ("", False), ("no", False)])
+def test_pipeline_enabled_reads_env(monkeypatch, value, expected):
+    monkeypatch.setenv("DATABASE_PIPELINE", value)
+    assert db_config.pipeline_enabled() is expected
+
+
+@pytest.mark.db
+def test_pipeline_enabled_requires_libpq_support(monkeypatch):
+    monkeypatch.setenv("DATABASE_PIPELINE", "1")
+    monkeypatch.setattr(db_config.psycopg.Pipeline, "is_supported", classmethod(lambda cls: False))
+    assert db_config.pipeline_enabled() is False
+
+
+@pytest.mark.db
+def test_pipelined_insert_matches_plain_insert(
+    monkeypatch, postgres_connect_kwargs, reset_real_applicants_table
+):
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    monkeypatch.setattr(load_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    load_data.create_table(partitioned=True)
+
+    # New year partition, new rows, then a mixed batch with a duplicate.
+    assert update_data.insert_applicants_from_json_batch([_entry(1, "May 2, 2027")], pipeline=True) == 0
+    assert update_data.insert_applicants_from_json_batch([_entry(1, "May 2, 2027"), _entry(2)], pipeline=True) == 1
+    assert update_data.insert_applicants_from_json_batch([{"url": "bad"}], pipeline=True) == -1
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tableoid::regclass::text, p_id FROM applicants ORDER BY p_id;")
+            assert cur.fetchall() == [("applicants_y2027", 1), ("applicants_y2026", 2)]
+
+
+@pytest.mark.db
+def test_pipelined_questions_match_plain_questions(
+    monkeypatch, postgres_connect_kwargs, reset_real_applicants_table, capsys
+):
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    update_data.insert_applicants_from_json_batch(
+        [_entry(1), _entry(2, status="Rejected"), _entry(3, "March 1, 2025")]
+    )
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        plain = query_data.questions(conn, pipeline=False)
+        plain_out = capsys.readouterr().out
+        monkeypatch.setenv("DATABASE_PIPELINE", "1")
+        pipelined = query_data.questions(conn)
+        pipelined_out = capsys.readouterr().out
+        with conn.cursor() as cur:
+            cur.execute("SELECT question, answer FROM answers_table;")
+            stored = [list(row) for row in cur.fetchall()]
+
+    assert pipelined == plain
+    assert pipelined_out == plain_out
+    assert stored == plain
+    assert [question for question, _answer in plain] == [q["question"] for q in query_data.QUESTIONS]
+    assert dict(plain)[query_data.QUESTIONS[0]["question"]] == "3"
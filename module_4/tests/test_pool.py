@@ -0,0 +1,103 @@
+"""Tests for the shared connection pool in db_config."""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import db_config
+import query_data
+import update_data
+
+
+@pytest.fixture()
+def pooled(monkeypatch, postgres_connect_kwargs, real_postgres_ready):
+    """Turn pooling back on (conftest disables it) with a small, fresh pool."""
+    monkeypatch.setenv("DATABASE_POOL", "1")
+    monkeypatch.setenv("DATABASE_POOL_MAX_SIZE", "2")
+    monkeypatch.setattr(db_config, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    db_config.close_pools()
+    yield
+    db_config.close_pools()
+
+
+def _backend_pid(conn):
+    return conn.execute("SELECT pg_backend_pid();").fetchone()[0]
+
+
+@pytest.mark.db
+def test_connections_are_reused_and_counted(pooled):
+    with db_config.connection() as conn:
+        first = _backend_pid(conn)
+    with query_data.connect() as conn:
+        assert _backend_pid(conn) == first
+
+    assert db_config.get_pool() is db_config.get_pool(db_config.get_db_connect_kwargs())
+    (name, stats), = db_config.pool_stats().items()
+    assert name == "applicants-1"
+    assert stats["requests_num"] == 2
+    assert stats["pool_max"] == 2
+
+
+@pytest.mark.db
+def test_borrowed_connection_commits_rolls_back_and_sets_autocommit(
+    pooled, postgres_connect_kwargs
+):
+    with db_config.connection() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS pool_probe (n INT);")
+        conn.execute("TRUNCATE pool_probe;")
+        conn.execute("INSERT INTO pool_probe VALUES (1);")
+
+    with pytest.raises(RuntimeError):
+        with db_config.connection() as conn:
+            conn.execute("INSERT INTO pool_probe VALUES (2);")
+            raise RuntimeError("abort")
+
+    with db_config.connection(autocommit=True) as conn:
+        assert conn.autocommit is True
+        # Same session, so the temp table is still there.
+        assert conn.execute("SELECT n FROM pool_probe;").fetchall() == [(1,)]
+    with db_config.connection() as conn:
+        assert conn.autocommit is False
+
+
+@pytest.mark.db
+def test_dropped_connection_is_replaced_before_use(pooled, postgres_connect_kwargs):
+    with db_config.connection() as conn:
+        dead = _backend_pid(conn)
+
+    with psycopg.connect(**postgres_connect_kwargs, autocommit=True) as admin:
+        admin.execute("SELECT pg_terminate_backend(%s);", (dead,))
+
+    # The health check notices the closed session and hands out a new one.
+    with db_config.connection() as conn:
+        assert _backend_pid(conn) != dead
+
+
+@pytest.mark.db
+def test_modules_borrow_from_the_pool(pooled, reset_real_applicants_table, monkeypatch, postgres_connect_kwargs):
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    entry = {"url": "https://www.thegradcafe.com/result/1", "program": "History, MIT"}
+
+    assert update_data.insert_applicants_from_json_batch([entry], pipeline=False) == 0
+    assert update_data.insert_applicants_from_json_batch([entry], pipeline=True) == 1
+
+    stats = db_config.pool_stats()["applicants-1"]
+    assert stats["requests_num"] == 2
+    assert stats["connections_num"] == 1
+
+
+@pytest.mark.db
+def test_unreachable_server_raises_and_keeps_no_pool(pooled, monkeypatch):
+    monkeypatch.setenv("DATABASE_POOL_TIMEOUT", "0.5")
+    unreachable = {"conninfo": "postgresql://postgres@127.0.0.1:1/none", "connect_timeout": 1}
+
+    with pytest.raises(psycopg.OperationalError):
+        with db_config.connection(unreachable):
+            pass
+    assert db_config.pool_stats() == {}
@@ -0,0 +1,113 @@
+"""Tests for the single-scan analysis planner in query_data."""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import query_data
+import update_data
+
+# The per-question SELECTs questions() ran before the planner, one scan each.
+PER_QUESTION_QUERIES = [
+    "SELECT COUNT(*) FROM applicants WHERE term = 'Fall 2026';",
+    """SELECT ROUND(100.0 * COUNT(*) FILTER (WHERE us_or_international NOT IN ('American', 'Other'))
+       / COUNT(*), 2) FROM applicants;""",
+    """SELECT ROUND(AVG(gpa)::numeric, 2), ROUND(AVG(gre)::numeric, 2),
+       ROUND(AVG(gre_v)::numeric, 2), ROUND(AVG(gre_aw)::numeric, 2) FROM applicants;""",
+    """SELECT ROUND(AVG(gpa)::numeric, 2) FROM applicants
+       WHERE us_or_international = 'American' AND term = 'Fall 2026';""",
+    """SELECT ROUND(100.0 * COUNT(*) FILTER (WHERE term = 'Fall 2026' AND status = 'Accepted')
+       / COUNT(*), 2) FROM applicants;""",
+    "SELECT ROUND(AVG(gpa)::numeric, 2) FROM applicants WHERE status = 'Accepted' AND term = 'Fall 2026';",
+    """SELECT COUNT(*) FROM applicants WHERE degree = 'Masters'
+       AND program = 'Computer Science, Johns Hopkins University';""",
+    """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+       AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01' AND degree = 'PhD'
+       AND university_name IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University')
+       AND program_name = 'Computer Science';""",
+    """SELECT COUNT(*) FROM applicants WHERE status = 'Accepted'
+       AND date_added >= DATE '2026-01-01' AND date_added < DATE '2027-01-01' AND degree = 'PhD'
+       AND llm_generated_program = 'Computer Science'
+       AND llm_generated_university IN ('Georgetown University', 'MIT', 'Stanford University', 'Carnegie Mellon University');""",
+    "SELECT COUNT(DISTINCT program_id), COUNT(DISTINCT university_id) FROM applicants;",
+    "SELECT COUNT(DISTINCT llm_program_id), COUNT(DISTINCT llm_university_id) FROM applicants;",
+]
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.85",
+        "GRE Score": "325",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+@pytest.mark.db
+def test_planned_answers_match_per_question_queries(
+    monkeypatch, postgres_connect_kwargs, reset_real_applicants_table
+):
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    update_data.insert_applicants_from_json_batch([
+        _entry(1),
+        _entry(2, status="Rejected", GPA="3.335", **{"US/International": "International"}),
+        _entry(3, program="Computer Science, Johns Hopkins University", Degree="Masters"),
+        _entry(4, program="Physics", term="Fall 2025", date_added="December 30, 2025"),
+        _entry(5, program=None, GPA="", **{"llm-generated-program": None}),
+        _entry(6, program="History, Georgetown University", **{"llm-generated-university": "Georgetown University"}),
+    ])
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        answers = query_data.questions(conn, pipeline=False)
+        expected = [
+            question["format"].format(*conn.execute(query).fetchone())
+            for query, question in zip(
+                PER_QUESTION_QUERIES, query_data.QUESTIONS
+            )
+        ]
+        stored = conn.execute("SELECT question, answer FROM answers_table;").fetchall()
+
+    assert [answer for _question, answer in answers] == expected
+    assert [list(row) for row in stored] == answers
+
+
+def test_questions_plan_into_two_postgres_scans_and_one_sqlite_scan():
+    (aggregate_sql, aggregate), (distinct_sql, distinct) = query_data.POSTGRES_SCANS
+    assert aggregate == list(range(9)) and distinct == [9, 10]
+    assert "GROUPING SETS" in distinct_sql and "DISTINCT" not in distinct_sql
+    assert aggregate_sql.count("FROM applicants") == 1
+
+    [(sqlite_sql, indexes)] = query_data.SQLITE_SCANS
+    assert indexes == list(range(11))
+    assert sqlite_sql.count("COUNT(DISTINCT") == 4
+
+
+def test_plan_scans_shares_grouping_set_columns():
+    selects = [
+        ["COUNT(DISTINCT term)", "COUNT(DISTINCT degree)"],
+        ["COUNT(DISTINCT term)"],
+    ]
+    [(sql, indexes)] = query_data.plan_scans(selects)
+    assert indexes == [0, 1]
+    assert sql == (
+        "SELECT COUNT(term), COUNT(degree), COUNT(term) FROM (SELECT term, degree FROM applicants "
+        "GROUP BY GROUPING SETS ((term), (degree))) AS groups;"
+    )
+    assert query_data.plan_scans(selects, grouping_sets=False) == [
+        ("SELECT COUNT(DISTINCT term), COUNT(DISTINCT degree), COUNT(DISTINCT term) FROM applicants;", [0, 1]),
+    ]
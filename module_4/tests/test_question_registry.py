@@ -0,0 +1,167 @@
+"""Tests for the analysis question registry and its scan executor."""
+
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+import query_data
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.85",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    """A SQLite database with three applicants, two of them for Fall 2026."""
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch([_entry(1), _entry(2), _entry(3, term="Fall 2025")])
+
+
+class _RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return (1,)
+
+
+def test_registry_ids_are_unique_and_checked():
+    ids = [question["id"] for question in query_data.QUESTIONS]
+    assert len(ids) == len(set(ids)) == 11
+
+    question = {"id": "q", "question": "Q?", "select": ["COUNT(*)"], "format": "{}", "label": "Q: "}
+    with pytest.raises(ValueError, match="Duplicate question ids: q"):
+        query_data.check_registry([question, dict(question)])
+    with pytest.raises(ValueError, match="'q' depends on unknown ids: missing"):
+        query_data.check_registry([dict(question, depends_on=["missing"])])
+    with pytest.raises(ValueError, match="'q' selects 2 values in sqlite_select"):
+        query_data.check_registry([dict(question, sqlite_select=["COUNT(*)", "COUNT(*)"])])
+
+
+def test_questions_without_totals_scan_applicants():
+    registry = [
+        {"id": "a", "select": ["COUNT(*)"], "aggregate_select": ["entries"]},
+        {"id": "b", "select": ["COUNT(DISTINCT term)"]},
+        {"id": "c", "select": ["AVG(gpa)"], "aggregate_select": ["gpa_sum"]},
+    ]
+    assert query_data.plan_questions(registry, "aggregates") == [
+        ("SELECT entries, gpa_sum FROM analysis_aggregates;", [0, 2]),
+        ("SELECT COUNT(term) FROM (SELECT term FROM applicants GROUP BY GROUPING SETS ((term))) AS groups;", [1]),
+    ]
+    # The built-in questions all read the totals, in one statement.
+    [(_sql, indexes)] = query_data.AGGREGATE_SCANS
+    assert indexes == list(range(11))
+
+
+def test_callable_formats_receive_their_dependencies(capsys):
+    registry = [
+        {"id": "total", "question": "Total?", "format": "{}", "label": "Total: "},
+        {
+            "id": "share",
+            "question": "Share?",
+            "format": lambda values, deps: "{} of {}".format(values[0], deps["total"][0]),
+            "label": "Share: ",
+            "depends_on": ["total"],
+        },
+    ]
+    assert query_data.format_answers(registry, [(10,), (4,)]) == [["Total?", "10"], ["Share?", "4 of 10"]]
+    assert capsys.readouterr().out == "Total:  10\nShare:  4 of 10\n"
+
+
+def test_flags_and_timeouts_from_environment(monkeypatch):
+    monkeypatch.delenv("ANALYSIS_PARALLEL", raising=False)
+    monkeypatch.delenv("ANALYSIS_STATEMENT_TIMEOUT_MS", raising=False)
+    assert query_data.parallel_enabled() is False
+    assert query_data.statement_timeout_ms() is None
+
+    monkeypatch.setenv("ANALYSIS_PARALLEL", "yes")
+    monkeypatch.setenv("ANALYSIS_STATEMENT_TIMEOUT_MS", "250")
+    assert query_data.parallel_enabled() is True
+    assert query_data.statement_timeout_ms() == 250
+
+
+def test_scans_on_one_connection_share_the_longest_timeout(monkeypatch):
+    monkeypatch.setenv("ANALYSIS_STATEMENT_TIMEOUT_MS", "250")
+    monkeypatch.setitem(query_data.QUESTIONS[9], "timeout_ms", 900)
+    cur = _RecordingCursor()
+    results, milliseconds = query_data.run_scans(object(), cur, query_data.POSTGRES_SCANS)
+
+    assert results == [(1,), (1,)] and len(milliseconds) == 2
+    assert cur.executed[0] == (query_data.STATEMENT_TIMEOUT_QUERY, ("900",))
+    assert [sql for sql, _params in cur.executed[1:]] == [sql for sql, _indexes in query_data.POSTGRES_SCANS]
+
+
+def test_parallel_scans_take_about_as_long_as_the_slowest(monkeypatch):
+    def slow_scan(sql, timeout_ms):
+        time.sleep(0.2)
+        return (sql,), 200.0
+
+    monkeypatch.setattr(query_data, "_run_pooled_scan", slow_scan)
+    scans = [("first", [0]), ("second", [1]), ("third", [2])]
+    started = time.perf_counter()
+    results, milliseconds = query_data.run_scans(object(), None, scans, parallel=True)
+    assert time.perf_counter() - started < 0.5
+    assert results == [("first",), ("second",), ("third",)]
+    assert milliseconds == [200.0] * 3
+
+
+def test_parallel_scans_match_sequential_on_pooled_connections(sqlite_applicants):
+    scans = [
+        ("SELECT COUNT(*) FROM applicants;", [0]),
+        ("SELECT COUNT(*) FILTER (WHERE term = 'Fall 2026') FROM applicants;", [0]),
+    ]
+    with query_data.connect() as conn, conn.cursor() as cur:
+        sequential, _ms = query_data.run_scans(conn, cur, scans)
+        parallel, _ms = query_data.run_scans(conn, cur, scans, parallel=True)
+    assert sequential == parallel == [(3,), (2,)]
+
+
+def test_questions_record_per_question_timings(sqlite_applicants, capsys):
+    with query_data.connect() as conn:
+        answers = query_data.questions(conn, parallel=True)
+    assert answers[0] == [query_data.QUESTIONS[0]["question"], "2"]
+    timings = query_data.last_timings()
+    assert list(timings) == [question["id"] for question in query_data.QUESTIONS]
+    assert all(ms >= 0 for ms in timings.values())
+
+
+@pytest.mark.db
+def test_parallel_scan_past_its_timeout_is_cancelled(
+    monkeypatch, postgres_connect_kwargs, reset_real_applicants_table
+):
+    monkeypatch.setattr(query_data, "get_db_read_connect_kwargs", lambda: postgres_connect_kwargs)
+    monkeypatch.setenv("ANALYSIS_STATEMENT_TIMEOUT_MS", "50")
+    scans = [("SELECT COUNT(*) FROM applicants;", [0]), ("SELECT pg_sleep(2);", [1])]
+    with psycopg.connect(**postgres_connect_kwargs) as conn, conn.cursor() as cur:
+        with pytest.raises(psycopg.errors.QueryCanceled):
+            query_data.run_scans(conn, cur, scans, parallel=True)
+        with pytest.raises(psycopg.errors.QueryCanceled):
+            query_data.run_scans(conn, cur, scans)
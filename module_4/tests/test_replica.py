@@ -0,0 +1,128 @@
+"""Read/write routing between a primary and a read replica.
+
+Two databases on the test PostgreSQL instance stand in for the primary and
+the replica; nothing replicates between them, which makes it easy to tell
+which one a query went to.
+"""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+from psycopg.sql import SQL, Identifier
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import db_config
+import load_data
+import pages
+import query_data
+
+
+def _seed(conninfo, *queries):
+    with psycopg.connect(conninfo) as conn:
+        with conn.cursor() as cur:
+            for query in queries:
+                cur.execute(query)
+        conn.commit()
+
+
+# Removes the stored answers and the answers_table view, converting an
+# answers_table left as a table by older code first.
+DROP_ANSWERS = (
+    *query_data.ANSWERS_SCHEMA_QUERIES,
+    "DROP VIEW answers_table;",
+    "DROP TABLE analysis_answers, analysis_versions;",
+)
+
+
+def _answers(conninfo):
+    with psycopg.connect(conninfo) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('answers_table') IS NOT NULL;")
+            if not cur.fetchone()[0]:
+                return None
+            cur.execute("SELECT question, answer FROM answers_table;")
+            return dict(cur.fetchall())
+
+
+@pytest.fixture()
+def primary_and_replica(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Return ``(primary, replica)`` conninfo strings with routing env set."""
+    kwargs = dict(postgres_connect_kwargs)
+    primary = make_conninfo(kwargs.pop("conninfo", ""), **kwargs)
+    params = conninfo_to_dict(primary)
+    params["dbname"] = "{}_replica".format(params.get("dbname") or "postgres")
+    replica = make_conninfo(**params)
+
+    with psycopg.connect(primary, autocommit=True) as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM pg_database WHERE datname = %s;", (params["dbname"],)
+        ).fetchone()
+        if not exists:
+            conn.execute(SQL("CREATE DATABASE {};").format(Identifier(params["dbname"])))
+    _seed(replica, "DROP TABLE IF EXISTS applicants CASCADE;", *load_data.SCHEMA_QUERIES, *DROP_ANSWERS)
+    _seed(primary, *DROP_ANSWERS)
+
+    monkeypatch.setenv("DATABASE_URL", primary)
+    monkeypatch.setenv("DATABASE_READ_URL", replica)
+    monkeypatch.setattr(db_config, "_last_write", None)
+    yield primary, replica
+    _seed(primary, *DROP_ANSWERS)
+
+
+@pytest.mark.db
+def test_read_kwargs_follow_replica_and_read_your_writes(primary_and_replica, monkeypatch):
+    primary, replica = primary_and_replica
+
+    assert db_config.get_db_read_connect_kwargs() == {"conninfo": replica}
+    db_config.note_write()
+    assert db_config.get_db_read_connect_kwargs() == {"conninfo": primary}
+
+    monkeypatch.setenv("DATABASE_READ_AFTER_WRITE_SECONDS", "0")
+    assert db_config.get_db_read_connect_kwargs() == {"conninfo": replica}
+    monkeypatch.delenv("DATABASE_READ_URL")
+    assert db_config.get_db_read_connect_kwargs() == {"conninfo": primary}
+
+
+@pytest.mark.db
+def test_analysis_reads_replica_writes_primary_then_reads_own_answers(
+    primary_and_replica, client, monkeypatch
+):
+    primary, replica = primary_and_replica
+    _seed(replica, "INSERT INTO applicants (p_id, term) VALUES (1, 'Fall 2026'), (2, 'Fall 2026');")
+    _seed(primary, "INSERT INTO applicants (p_id, term) VALUES (1, 'Fall 2026');")
+    first_question = query_data.QUESTIONS[0]["question"]
+    pages.db_process = None
+
+    response = client.post("/update_analysis", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+
+    # Counted on the replica, stored on the primary only.
+    assert _answers(primary)[first_question] == "2"
+    assert _answers(replica) is None
+
+    # Right after the write the page reads the primary's fresh answers...
+    assert "Answer: </strong>2" in client.get("/analysis").data.decode("utf-8")
+
+    # ...and once the window has passed it reads the replica again.
+    with psycopg.connect(replica) as conn:
+        query_data.store_answers(conn, [("Replica question", "replica answer")])
+    monkeypatch.setenv("DATABASE_READ_AFTER_WRITE_SECONDS", "0")
+    assert "replica answer" in client.get("/analysis").data.decode("utf-8")
+
+
+@pytest.mark.web
+def test_finished_refresh_routes_reads_to_primary(monkeypatch):
+    class _DoneProc:
+        def poll(self):
+            return 0
+
+    monkeypatch.setattr(db_config, "_last_write", None)
+    pages.db_process = _DoneProc()
+    pages.check_db_completion()
+    assert db_config._last_write is not None
@@ -0,0 +1,217 @@
+"""Tests for the data-version-keyed analysis result cache."""
+
+import json
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+import query_data
+import result_cache
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.85",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+@pytest.fixture()
+def cached_analysis(monkeypatch):
+    """Turn the cache back on with a fresh process-wide instance."""
+    monkeypatch.setenv("ANALYSIS_CACHE", "1")
+    monkeypatch.delenv("ANALYSIS_CACHE_DIR", raising=False)
+    monkeypatch.delenv("ANALYSIS_CACHE_SIZE", raising=False)
+    result_cache.reset_cache()
+    yield result_cache.get_cache()
+    result_cache.reset_cache()
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch([_entry(1), _entry(2, term="Fall 2025")])
+
+
+def _no_scans(*_args, **_kwargs):
+    raise AssertionError("applicants was scanned")
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = result_cache.ResultCache(max_entries=2)
+    cache.put("a", (), 1, (1,))
+    cache.put("b", (), 1, (2,))
+    assert cache.get("a", (), 1) == (1,)
+    cache.put("c", (), 1, (3,))
+
+    assert cache.get("b", (), 1) is None
+    assert cache.get("a", (), 1) == (1,) and cache.get("c", (), 1) == (3,)
+    # Another data version or parameter set is another entry.
+    assert cache.get("a", (), 2) is None and cache.get("a", (("term", "Fall 2027"),), 1) is None
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 3}
+
+
+def test_directory_store_is_shared_and_keeps_one_version(tmp_path):
+    writer = result_cache.ResultCache(directory=str(tmp_path))
+    value = (Decimal("3.85"), date(2026, 3, 3), datetime(2026, 3, 3, 12, 30), None, 7, ("nested",))
+    writer.put("old", (), (1, 4), (1,))
+    writer.put("q", (("term", "Fall 2026"),), (1, 5), value)
+
+    reader = result_cache.ResultCache(directory=str(tmp_path))
+    assert reader.get("old", (), (1, 4)) is None
+    assert reader.get("q", (("term", "Fall 2026"),), (1, 5)) == value
+    # Now in memory: a hit even without the file.
+    writer.clear()
+    assert list(tmp_path.iterdir()) == []
+    assert reader.get("q", (("term", "Fall 2026"),), (1, 5)) == value
+    assert reader.stats() == {"entries": 1, "hits": 2, "misses": 1}
+
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    reader.put("dict", (), (1, 6), {"rows": [[1, 2]]})
+    assert not (tmp_path / "broken.json").exists()
+    assert result_cache.ResultCache(directory=str(tmp_path)).get("dict", (), (1, 6)) == {"rows": ((1, 2),)}
+    with pytest.raises(TypeError, match="Cannot cache"):
+        writer.put("bad", (), (1, 6), object())
+
+
+def test_clear_tolerates_files_removed_by_another_process(tmp_path, monkeypatch):
+    cache = result_cache.ResultCache(directory=str(tmp_path))
+    cache.put("q", (), (1, 5), (1,))
+    listed = os.listdir(str(tmp_path))
+    monkeypatch.setattr(result_cache.os, "listdir", lambda _path: listed + ["gone.json"])
+    cache.clear()
+    monkeypatch.undo()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_settings_come_from_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("ANALYSIS_CACHE", "off")
+    assert result_cache.cache_enabled() is False
+    monkeypatch.setenv("ANALYSIS_CACHE_SIZE", "3")
+    monkeypatch.setenv("ANALYSIS_CACHE_DIR", str(tmp_path))
+    result_cache.reset_cache()
+    cache = result_cache.get_cache()
+    assert result_cache.get_cache() is cache
+    assert (cache.max_entries, cache.directory) == (3, str(tmp_path))
+    result_cache.reset_cache()
+
+
+def test_repeated_analysis_is_served_from_the_cache(cached_analysis, sqlite_applicants, monkeypatch):
+    run_scans = query_data.run_scans
+    with query_data.connect() as conn:
+        # The first run creates the answer tables, which changes SQLite's
+        # schema version and so the data version.
+        query_data.questions(conn)
+        first = query_data.questions(conn)
+        monkeypatch.setattr(query_data, "run_scans", _no_scans)
+        assert query_data.questions(conn) == first
+    assert set(query_data.last_timings().values()) == {0.0}
+    assert first[0][1] == "1"
+
+    # A refresh records a new ingest batch, which changes the data version.
+    monkeypatch.setattr(query_data, "run_scans", run_scans)
+    update_data.insert_applicants_from_json_batch([_entry(3)])
+    with query_data.connect() as conn:
+        assert query_data.questions(conn)[0][1] == "2"
+
+
+def test_only_uncached_questions_are_planned(cached_analysis, sqlite_applicants):
+    with query_data.connect() as conn, conn.cursor() as cur:
+        version = result_cache.data_version(cur)
+        for question in query_data.QUESTIONS[1:]:
+            cached_analysis.put(question["id"], (), version, ("cached",) * len(question["select"]))
+        [(sql, indexes)] = query_data._scans(conn, cur, [0])
+        assert indexes == [0] and sql == "SELECT COUNT(*) FILTER (WHERE term = 'Fall 2026') FROM applicants;"
+
+        answers = query_data.questions(conn)
+    assert answers[0][1] == "1" and answers[1][1] == "cached"
+    assert query_data.last_timings()["percent_international"] == 0.0
+
+
+def test_bump_version_changes_the_sqlite_version(sqlite_applicants):
+    with query_data.connect() as conn, conn.cursor() as cur:
+        before = result_cache.data_version(cur)
+        cur.execute("DELETE FROM applicants WHERE p_id = 2;")
+        result_cache.bump_version(cur)
+        assert result_cache.data_version(cur) != before
+        conn.rollback()
+        assert result_cache.data_version(cur) == before
+
+
+def test_every_chunk_of_a_sqlite_load_changes_the_version(sqlite_applicants, monkeypatch, tmp_path):
+    # Read from another connection before each chunk, so every version seen
+    # is the one the previous commit left behind.
+    versions = []
+    upsert_rows = load_data.upsert_rows
+
+    def observed(cur, rows, batch_id=None):
+        with query_data.connect() as reader, reader.cursor() as other:
+            versions.append(result_cache.data_version(other))
+        return upsert_rows(cur, rows, batch_id)
+
+    monkeypatch.setattr(load_data, "upsert_rows", observed)
+    path = tmp_path / "entries.jsonl"
+    entries = [_entry(1, GPA="3.10"), _entry(3), _entry(4)]
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries), encoding="utf-8")
+
+    assert load_data.upsert_json(str(path), batch_size=1) == {"inserted": 2, "updated": 1, "unchanged": 0}
+    with query_data.connect() as conn, conn.cursor() as cur:
+        versions.append(result_cache.data_version(cur))
+    # Before each of the three chunks and after each commit: the versions
+    # differ, and the last (empty) call and finish_batch changed no rows.
+    assert len(set(versions[:4])) == 4 and versions[4] == versions[3]
+
+
+@pytest.mark.db
+def test_postgres_version_follows_every_change(postgres_connect_kwargs, reset_real_applicants_table, monkeypatch):
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    with psycopg.connect(**postgres_connect_kwargs, autocommit=True) as conn, conn.cursor() as cur:
+        versions = [result_cache.data_version(cur)]
+
+        update_data.insert_applicants_from_json_batch([_entry(1), _entry(2)])
+        versions.append(result_cache.data_version(cur))
+        # Statements that change no rows keep the version.
+        update_data.insert_applicants_from_json_batch([_entry(1)])
+        cur.execute("UPDATE applicants SET gpa = 1 WHERE p_id = 99;")
+        versions.append(result_cache.data_version(cur))
+        cur.execute("DELETE FROM applicants WHERE p_id = 2;")
+        versions.append(result_cache.data_version(cur))
+        cur.execute("TRUNCATE TABLE applicants;")
+        versions.append(result_cache.data_version(cur))
+        result_cache.bump_version(cur)
+        versions.append(result_cache.data_version(cur))
+
+        table_oid = versions[0][0]
+        assert [version for _oid, version in versions] == [
+            versions[0][1] + step for step in (0, 1, 1, 2, 3, 4)
+        ]
+        assert {oid for oid, _version in versions} == {table_oid}
+
+        cur.execute("DROP TABLE applicants_data_version;")
+        assert result_cache.data_version(cur) is None
+        result_cache.bump_version(cur)
+        for query in result_cache.DATA_VERSION_QUERIES:
+            cur.execute(query)
@@ -0,0 +1,252 @@
+"""Tests for the daily trend rollups and the trends API."""
+
+import importlib.util
+import sys
+from datetime import date
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import applicant_stats
+import load_data
+import query_data
+import rollups
+import update_data
+
+
+def _entry(p_id, date_added, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": date_added,
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.80",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+# March 2, 2026 is a Monday.
+ENTRIES = [
+    _entry(1, "March 2, 2026"),
+    _entry(2, "March 4, 2026", status="Rejected", GPA="3.40"),
+    _entry(3, "March 8, 2026", GPA=""),
+    _entry(4, "March 9, 2026", program="Physics, MIT", GPA="3.90"),
+    _entry(5, "April 1, 2026", term="Fall 2025", Degree="Masters", status="Rejected"),
+    _entry(6, "April 2, 2026", term=None),
+]
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch(ENTRIES)
+
+
+@pytest.fixture()
+def rollups_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Point the writers and the rollups module at the real database."""
+    for module in (load_data, rollups, update_data):
+        monkeypatch.setattr(module, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+
+
+def _query(**args):
+    return rollups.normalize_query({name: list(values) for name, values in args.items()})
+
+
+def _trends(query):
+    with query_data.connect() as conn:
+        return rollups.trends(conn, query)
+
+
+def _points(result):
+    return [
+        (point["period"], point["entries"], point["acceptance_rate"], point["avg_gpa"])
+        for series in result["series"]
+        for point in series["points"]
+    ]
+
+
+def test_query_is_validated():
+    assert _query(start=["2026-03-01"], program=["Physics", " Physics", ""], by=["term"]) == {
+        "granularity": "week",
+        "start": date(2026, 3, 1),
+        "program": ["Physics"],
+        "by": "term",
+    }
+    with pytest.raises(ValueError, match="Unknown parameter\\(s\\): status"):
+        _query(status=["Accepted"])
+    with pytest.raises(ValueError, match="'granularity' must be one of: day, week, month"):
+        _query(granularity=["year"])
+    with pytest.raises(ValueError, match="'by' must be one of: term, degree, program"):
+        _query(by=["university"])
+    with pytest.raises(ValueError, match="'end' must be a date"):
+        _query(end=["March"])
+    with pytest.raises(ValueError, match="'start' must not be after 'end'"):
+        _query(start=["2026-04-01"], end=["2026-03-01"])
+    with pytest.raises(ValueError, match="At most 50 values for 'term'"):
+        _query(term=[str(n) for n in range(51)])
+
+
+def test_periods_roll_up_on_read(sqlite_applicants):
+    assert _points(_trends(_query(granularity=["week"]))) == [
+        ("2026-03-02", 3, 66.67, 3.6),
+        ("2026-03-09", 1, 100.0, 3.9),
+        ("2026-03-30", 2, 50.0, 3.8),
+    ]
+    assert _points(_trends(_query(granularity=["month"], start=["2026-03-04"], end=["2026-03-31"]))) == [
+        ("2026-03-01", 3, 66.67, 3.65),
+    ]
+    result = _trends(_query(granularity=["day"], program=["Physics"]))
+    assert result["source"] == "sqlite" and result["cached"] is False
+    assert _points(result) == [("2026-03-09", 1, 100.0, 3.9)]
+
+
+def test_series_per_dimension(sqlite_applicants):
+    result = _trends(_query(granularity=["month"], by=["term"], degree=["PhD"]))
+    assert [series["value"] for series in result["series"]] == ["Fall 2026", None]
+    assert result["series"][1]["points"] == [
+        {"period": "2026-04-01", "entries": 1, "accepted": 1, "acceptance_rate": 100.0, "avg_gpa": 3.8}
+    ]
+    assert [point["entries"] for point in result["series"][0]["points"]] == [4]
+    assert _trends(_query(term=["Spring 2030"]))["series"] == []
+
+
+def test_rates_round_like_the_stats_api(sqlite_applicants):
+    # 3.675 rounds half up to 3.68; Python's round() gives 3.67.
+    chemistry = {"program": "Chemistry, MIT", "llm-generated-program": "Chemistry"}
+    update_data.insert_applicants_from_json_batch(
+        [_entry(20, "May 4, 2026", GPA="3.60", **chemistry), _entry(21, "May 4, 2026", GPA="3.75", **chemistry)]
+    )
+    [(_period, _entries, _rate, avg_gpa)] = _points(_trends(_query(granularity=["day"], program=["Chemistry"])))
+    with query_data.connect() as conn:
+        stats = applicant_stats.applicant_stats(conn, applicant_stats.normalize_filters({"program": ["Chemistry"]}))
+    assert avg_gpa == stats["stats"]["avg_gpa"] == 3.68
+
+
+def test_trends_are_cached_per_data_version(sqlite_applicants, monkeypatch):
+    monkeypatch.setenv("ANALYSIS_CACHE", "1")
+    query = _query(granularity=["month"])
+    first = _trends(query)
+    assert first["cached"] is False
+    assert _trends(query) == dict(first, cached=True)
+
+    update_data.insert_applicants_from_json_batch([_entry(7, "March 20, 2026")])
+    assert _points(_trends(query))[0][1] == 5
+
+
+@pytest.mark.web
+def test_trends_endpoint(client, sqlite_applicants):
+    response = client.get("/api/trends?granularity=month&program=Computer+Science&term=Fall+2026")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ok"] is True and body["granularity"] == "month"
+    assert body["series"][0]["points"][0]["entries"] == 3
+
+    response = client.get("/api/trends?granularity=year")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "'granularity' must be one of: day, week, month."
+
+
+@pytest.mark.web
+def test_trends_endpoint_db_down(client, monkeypatch):
+    def boom(**_kwargs):
+        raise OperationalError("db down")
+
+    monkeypatch.setattr(query_data, "get_db_read_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+    monkeypatch.setattr(psycopg, "connect", boom)
+    response = client.get("/api/trends")
+    assert response.status_code == 503
+    assert response.get_json() == {"ok": False, "message": "Database unavailable."}
+
+
+@pytest.mark.db
+def test_rollups_follow_every_write_and_match_a_scan(rollups_db, postgres_connect_kwargs, monkeypatch):
+    query = _query(granularity=["week"], by=["program"])
+    assert update_data.insert_applicants_from_json_batch(ENTRIES) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        from_rollups = rollups.trends(conn, query)
+        assert from_rollups["source"] == "rollups"
+        with monkeypatch.context() as patch:
+            patch.setattr(rollups, "has_rollups", lambda _cur: False)
+            from_scan = rollups.trends(conn, query)
+        assert from_scan["source"] == "postgres"
+        assert from_rollups["series"] == from_scan["series"]
+
+        conn.execute("UPDATE applicants SET status = 'Accepted', date_added = '2026-03-10' WHERE p_id = 2;")
+        conn.execute("DELETE FROM applicants WHERE p_id = 4;")
+        conn.commit()
+        # The emptied day is dropped, not left at zero.
+        assert conn.execute(
+            "SELECT COUNT(*) FROM applicant_daily_rollups WHERE day IN ('2026-03-04', '2026-03-09');"
+        ).fetchone() == (0,)
+    assert rollups.verify() == 0
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("TRUNCATE TABLE applicants;")
+        assert conn.execute("SELECT COUNT(*) FROM applicant_daily_rollups;").fetchone() == (0,)
+
+
+@pytest.mark.db
+def test_verify_reports_drift_and_rebuild_repairs_it(rollups_db, postgres_connect_kwargs, capsys):
+    assert update_data.insert_applicants_from_json_batch(ENTRIES) == 0
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        for event in ("insert", "update", "delete", "truncate"):
+            conn.execute(f"DROP TRIGGER applicants_rollups_{event} ON applicants;")
+        conn.execute("UPDATE applicant_daily_rollups SET entries = entries + 1 WHERE day = '2026-03-02';")
+        with conn.cursor() as cur:
+            assert rollups.has_rollups(cur) is False
+            # Nothing to fix up without the triggers.
+            rollups.subtract_table(cur, "applicants")
+            # Without triggers the trends are aggregated from applicants.
+            assert rollups.trends(conn, _query())["source"] == "postgres"
+
+    assert rollups.verify() == 1
+    assert "1 daily rollup rows differ from a full scan." in capsys.readouterr().out
+    assert rollups.rebuild() == len(ENTRIES)
+    assert rollups.verify() == 0
+    assert "match a full scan" in capsys.readouterr().out
+
+
+def test_main_dispatches_commands(monkeypatch, capsys):
+    called = []
+    monkeypatch.setattr(rollups, "verify", lambda: called.append("verify"))
+    monkeypatch.setattr(rollups, "rebuild", lambda: called.append("rebuild"))
+    rollups.main([])
+    rollups.main(["rebuild"])
+    rollups.main(["rebuild", "--offline"])
+    rollups.main(["bogus"])
+    assert called == ["verify", "rebuild"]
+    out = capsys.readouterr().out
+    assert "run `rollups.py rebuild --offline`" in out
+    assert "Usage: rollups.py verify|rebuild" in out
+
+    monkeypatch.setattr(sys, "argv", ["rollups.py", "bogus"])
+    spec = importlib.util.spec_from_file_location("__main__", SRC_DIR / "rollups.py")
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    assert "Usage" in capsys.readouterr().out
+
+
+def test_rebuild_and_verify_operational_error(monkeypatch, capsys):
+    monkeypatch.setattr(rollups, "get_db_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+
+    def boom(**_kwargs):
+        raise OperationalError("rollups unavailable")
+
+    monkeypatch.setattr(psycopg, "connect", boom)
+    assert rollups.rebuild() is None
+    assert rollups.verify() is None
+    assert capsys.readouterr().out.count("rollups unavailable") == 2
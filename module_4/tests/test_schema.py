@@ -0,0 +1,159 @@
+"""Schema tests for applicants generated columns and analysis indexes."""
+
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+
+
+def _index_names(cur):
+    cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'applicants';")
+    return {row[0] for row in cur.fetchall()}
+
+
+@pytest.mark.db
+def test_generated_columns_split_program_string(
+    postgres_connect_kwargs, reset_real_applicants_table
+):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO applicants (p_id, program) VALUES (%s, %s), (%s, %s);",
+                (1, " Computer Science ,  MIT ", 2, "History"),
+            )
+            cur.execute(
+                "SELECT program_name, university_name FROM applicants ORDER BY p_id;"
+            )
+            rows = cur.fetchall()
+            index_names = _index_names(cur)
+        conn.rollback()
+
+    assert rows == [("Computer Science", "MIT"), ("History", "")]
+    assert {
+        "applicants_term_status_idx",
+        "applicants_term_origin_idx",
+        "applicants_degree_program_idx",
+        "applicants_accepted_program_idx",
+        "applicants_accepted_llm_program_idx",
+    } <= index_names
+
+
+@pytest.mark.db
+def test_dimension_ids_are_shared_and_follow_updates(
+    postgres_connect_kwargs, reset_real_applicants_table
+):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO applicants (p_id, program, llm_generated_program, llm_generated_university)
+                VALUES (1, 'Computer Science, MIT', 'Computer Science', 'MIT'),
+                       (2, 'Computer Science, Stanford University', 'Computer Science', ''),
+                       (3, 'History', NULL, NULL);
+                """
+            )
+            cur.execute(
+                """
+                SELECT p_id, program_id, university_id, llm_program_id, llm_university_id
+                FROM applicants ORDER BY p_id;
+                """
+            )
+            rows = {row[0]: row[1:] for row in cur.fetchall()}
+
+            # Same name, same id, whichever column it came from.
+            assert rows[1][0] == rows[2][0] == rows[1][2] == rows[2][2]
+            assert rows[1][1] == rows[1][3]
+            assert rows[1][1] != rows[2][1]
+            # '' is a real (distinct) name, exactly like COUNT(DISTINCT text).
+            cur.execute("SELECT name FROM universities WHERE id = %s;", (rows[2][3],))
+            assert cur.fetchone() == ("",)
+            assert rows[3][2:] == (None, None)
+
+            cur.execute("UPDATE applicants SET llm_generated_university = 'MIT' WHERE p_id = 2;")
+            cur.execute("SELECT llm_university_id FROM applicants WHERE p_id = 2;")
+            assert cur.fetchone()[0] == rows[1][1]
+
+            cur.execute(
+                """
+                SELECT program, llm_generated_program, llm_generated_university,
+                       program_name, university_name
+                FROM applicants_normalized WHERE p_id = 1;
+                """
+            )
+            assert cur.fetchone() == (
+                "Computer Science, MIT", "Computer Science", "MIT", "Computer Science", "MIT"
+            )
+
+            # Integer distinct counts match the text ones they replace.
+            cur.execute(
+                """
+                SELECT COUNT(DISTINCT program_id) = COUNT(DISTINCT program_name),
+                       COUNT(DISTINCT university_id) = COUNT(DISTINCT university_name),
+                       COUNT(DISTINCT llm_program_id) = COUNT(DISTINCT llm_generated_program),
+                       COUNT(DISTINCT llm_university_id) = COUNT(DISTINCT llm_generated_university)
+                FROM applicants;
+                """
+            )
+            assert cur.fetchone() == (True, True, True, True)
+        conn.rollback()
+
+
+@pytest.mark.db
+def test_dimension_id_functions_handle_null_and_existing_names(
+    postgres_connect_kwargs, reset_real_applicants_table
+):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT program_dimension_id(NULL), university_dimension_id(NULL);")
+            assert cur.fetchone() == (None, None)
+            cur.execute("SELECT program_dimension_id('Art'), program_dimension_id('Art');")
+            first, second = cur.fetchone()
+            assert first == second
+        conn.rollback()
+
+
+def _row(p_id, program, llm_program, llm_university):
+    return (p_id, program) + (None,) * 11 + (llm_program, llm_university)
+
+
+@pytest.mark.db
+def test_loaders_resolve_dimension_ids_without_the_row_trigger(
+    postgres_connect_kwargs, reset_real_applicants_table
+):
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT program_dimension_id('Physics');")
+            physics = cur.fetchone()[0]
+            cur.execute("ALTER TABLE applicants DISABLE TRIGGER applicants_resolve_dimensions;")
+            rows = [
+                _row(1, "Physics, MIT", "Physics", "MIT"),
+                _row(2, "Computer Science, MIT", "Computer Science", None),
+            ]
+            assert load_data.insert_rows(cur, [row + (None,) for row in rows]) == 2
+            assert load_data.upsert_rows(cur, [_row(3, "History, Yale", "History", "Yale")])["inserted"] == 1
+            cur.execute(
+                """
+                SELECT a.p_id, a.program_id, p.name, u.name, lp.name, lu.name
+                FROM applicants a
+                LEFT JOIN programs p ON p.id = a.program_id
+                LEFT JOIN universities u ON u.id = a.university_id
+                LEFT JOIN programs lp ON lp.id = a.llm_program_id
+                LEFT JOIN universities lu ON lu.id = a.llm_university_id
+                ORDER BY a.p_id;
+                """
+            )
+            rows = cur.fetchall()
+        conn.rollback()
+
+    assert rows == [
+        (1, physics, "Physics", "MIT", "Physics", "MIT"),
+        (2, rows[1][1], "Computer Science", "MIT", "Computer Science", None),
+        (3, rows[2][1], "History", "Yale", "History", "Yale"),
+    ]
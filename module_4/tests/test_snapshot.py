@@ -0,0 +1,177 @@
+"""Tests for Parquet snapshots: save, restore through COPY and NumPy loading."""
+
+import runpy
+import sys
+from pathlib import Path
+
+import numpy
+import psycopg
+import pyarrow.parquet
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import export_data
+import load_data
+import snapshot
+import update_data
+
+# Every stored column, derived ones included, so a restore must reproduce
+# what the triggers computed on the original insert. The restore stamps its
+# own ingest batch, so ingest_batch_id is left out.
+ALL_COLUMNS_QUERY = """
+SELECT to_jsonb(a) - 'ingest_batch_id', p.name, u.name
+FROM applicants a
+LEFT JOIN programs p ON p.id = a.program_id
+LEFT JOIN universities u ON u.id = a.university_id
+ORDER BY p_id;
+"""
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "comments": 'Line one,\n"quoted"',
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.333333333333333",
+        "GRE AW Score": "4.5",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "Massachusetts Institute of Technology",
+    }
+    entry.update(overrides)
+    return entry
+
+
+ENTRIES = [
+    _entry(1),
+    _entry(2, program="", comments="", date_added="", GPA=""),
+    _entry(3, program="History, Snapshot University", comments=None),
+    _entry(4, **{"llm-generated-program": None, "llm-generated-university": None}),
+]
+
+
+def _all_rows(connect_kwargs):
+    with psycopg.connect(**connect_kwargs) as conn:
+        return conn.execute(ALL_COLUMNS_QUERY).fetchall()
+
+
+@pytest.fixture()
+def snapshot_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Point every module at the real database and load ``ENTRIES``."""
+    for module in (load_data, snapshot, update_data):
+        monkeypatch.setattr(module, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    monkeypatch.setattr(export_data, "get_db_read_connect_kwargs", lambda: postgres_connect_kwargs)
+    assert update_data.insert_applicants_from_json_batch(ENTRIES) == 0
+
+
+@pytest.mark.db
+def test_restore_reproduces_every_column(snapshot_db, postgres_connect_kwargs, tmp_path, capsys):
+    path = str(tmp_path / "applicants.parquet")
+    original = _all_rows(postgres_connect_kwargs)
+    assert snapshot.save_snapshot(path, chunk_size=3) == 4
+    assert pyarrow.parquet.ParquetFile(path).num_row_groups == 2
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("DELETE FROM applicants WHERE p_id = 1;")
+        conn.execute("UPDATE applicants SET status = 'Rejected';")
+        conn.execute("INSERT INTO applicants (p_id, program) VALUES (99, 'Extra, Row');")
+
+    assert snapshot.restore_snapshot(path, batch_size=3) == 4
+    assert "Restored 4 rows" in capsys.readouterr().out
+    assert _all_rows(postgres_connect_kwargs) == original
+
+    # Triggers are back on for ordinary writes after the restore.
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("UPDATE applicants SET program = 'Physics, New U' WHERE p_id = 3;")
+        hashed, program_id = conn.execute(
+            "SELECT content_hash, program_id FROM applicants WHERE p_id = 3;"
+        ).fetchone()
+    assert hashed != original[2][0]["content_hash"]
+    assert program_id is not None
+
+
+@pytest.mark.db
+def test_plain_parquet_export_restores_with_computed_hashes(
+    snapshot_db, postgres_connect_kwargs, tmp_path
+):
+    path = str(tmp_path / "applicants.parquet")
+    original = _all_rows(postgres_connect_kwargs)
+    assert export_data.export_to_file(path)["rows"] == 4
+    assert "content_hash" not in pyarrow.parquet.ParquetFile(path).schema_arrow.names
+
+    assert snapshot.restore_snapshot(path) == 4
+    assert _all_rows(postgres_connect_kwargs) == original
+
+
+@pytest.mark.db
+def test_restore_into_partitioned_table_creates_year_partitions(
+    snapshot_db, postgres_connect_kwargs, tmp_path
+):
+    path = str(tmp_path / "applicants.parquet")
+    snapshot.save_snapshot(path)
+    load_data.create_table(partitioned=True)
+
+    assert snapshot.restore_snapshot(path) == 4
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        assert conn.execute(
+            "SELECT count(*) FROM applicants_y2026;"
+        ).fetchone()[0] == 3
+        assert conn.execute("SELECT count(*) FROM applicants_undated;").fetchone()[0] == 1
+
+
+@pytest.mark.db
+def test_load_arrays_gives_typed_numpy_columns(snapshot_db, tmp_path):
+    path = str(tmp_path / "applicants.parquet")
+    snapshot.save_snapshot(path)
+
+    arrays = snapshot.load_arrays(path)
+    assert list(arrays) == snapshot.COLUMN_NAMES
+    assert arrays["content_hash"].dtype == object
+    assert arrays["p_id"].dtype == numpy.int64
+    assert arrays["p_id"].tolist() == [1, 2, 3, 4]
+    assert numpy.isnan(arrays["gpa"][1])
+    assert numpy.nanmean(arrays["gpa"]) == pytest.approx(3.333333333333333)
+    assert arrays["date_added"].dtype == numpy.dtype("datetime64[D]")
+    assert numpy.isnat(arrays["date_added"][1])
+    assert arrays["program"][1] == ""
+
+    subset = snapshot.load_arrays(path, columns=["gre_aw"])
+    assert list(subset) == ["gre_aw"]
+
+
+@pytest.mark.db
+def test_cli_saves_and_restores(snapshot_db, postgres_connect_kwargs, tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "cli.parquet")
+    monkeypatch.setattr(sys, "argv", ["snapshot.py", "save", path])
+    runpy.run_path(str(SRC_DIR / "snapshot.py"), run_name="__main__")
+
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.execute("TRUNCATE applicants;")
+    snapshot.main(["restore", path])
+    assert len(_all_rows(postgres_connect_kwargs)) == 4
+
+    snapshot.main(["drop"])
+    assert "Usage: snapshot.py save|restore [path]" in capsys.readouterr().out
+
+
+@pytest.mark.db
+def test_save_and_restore_operational_error(snapshot_db, tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "applicants.parquet")
+    snapshot.save_snapshot(path)
+
+    def boom(**_kwargs):
+        raise OperationalError("database down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(psycopg, "connect", boom)
+        assert snapshot.save_snapshot(str(tmp_path / "other.parquet")) is None
+        assert snapshot.restore_snapshot(path) is None
+    assert capsys.readouterr().out.count("database down") == 2
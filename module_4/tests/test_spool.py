@@ -0,0 +1,138 @@
+"""Tests for the on-disk spool that keeps refresh batches through DB outages."""
+
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import app as app_module
+import refresh_data
+import spool
+import update_data
+
+
+def _entry(p_id, status="Accepted"):
+    return {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": status,
+        "term": "Fall 2026",
+        "GPA": "3.90",
+    }
+
+
+def _boom(**_kwargs):
+    raise OperationalError("db down")
+
+
+def _stored(connect_kwargs):
+    with psycopg.connect(**connect_kwargs) as conn:
+        return conn.execute("SELECT p_id, status FROM applicants ORDER BY p_id;").fetchall()
+
+
+@pytest.fixture()
+def spool_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Point update_data and refresh_data at the real database."""
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    monkeypatch.setattr(refresh_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+
+
+@pytest.mark.db
+def test_refused_batch_is_spooled_then_replayed_once(spool_db, postgres_connect_kwargs, monkeypatch, capsys):
+    monkeypatch.setattr(spool, "SEGMENT_MAX_ENTRIES", 2)
+    with monkeypatch.context() as patch:
+        patch.setattr(psycopg, "connect", _boom)
+        assert update_data.insert_applicants_from_json_batch([_entry(1), _entry(2), _entry(3)]) == -1
+        assert update_data.upsert_applicants_from_json_batch([_entry(2, status="Rejected")]) is None
+        # Still down: nothing is lost.
+        assert update_data.replay_spool() is None
+    out = capsys.readouterr().out
+    assert "Spooled 3 entries for replay." in out and "Spooled 1 entries for replay." in out
+    segments = spool.pending_segments()
+    assert len(segments) == 3
+    assert [entry["url"][-1] for entry in spool.read_segment(segments[0])] == ["1", "2"]
+
+    # Killed between the first commit and deleting its segment.
+    def killed(_paths):
+        raise RuntimeError("killed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(spool, "remove_segments", killed)
+        with pytest.raises(RuntimeError):
+            update_data.replay_spool(batch_entries=1)
+    assert spool.pending_segments() == segments
+
+    # The committed segment replays as unchanged; later entries win, so p_id 2
+    # ends up with the status from the second batch.
+    totals = update_data.replay_spool(batch_entries=1)
+    assert totals == {"segments": 3, "inserted": 1, "updated": 1, "unchanged": 2}
+    assert "Replayed 3 spool segments" in capsys.readouterr().out
+    assert spool.pending_segments() == []
+    assert _stored(postgres_connect_kwargs) == [(1, "Accepted"), (2, "Rejected"), (3, "Accepted")]
+
+    assert update_data.replay_spool() == {"segments": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    assert "Replayed" not in capsys.readouterr().out
+
+
+@pytest.mark.db
+def test_refresh_drains_spool_before_counting_missing_rows(spool_db, postgres_connect_kwargs, monkeypatch):
+    spool.append_batch([_entry(11), _entry(12)])
+    scraped = []
+    monkeypatch.setattr(refresh_data, "scrape_data", lambda n: scraped.append(n) or n)
+    monkeypatch.setattr(refresh_data, "clean_data", lambda _raw: [_entry(12)])
+
+    # The spooled rows make the database current, so nothing is re-scraped.
+    assert refresh_data.update_db() == 1
+    assert scraped == [1]
+    assert [p_id for p_id, _status in _stored(postgres_connect_kwargs)] == [11, 12]
+
+
+@pytest.mark.db
+def test_background_replayer_drains_spool(spool_db, postgres_connect_kwargs, monkeypatch):
+    monkeypatch.setattr(update_data, "_replayer", None)
+    spool.append_batch([_entry(21)])
+
+    thread, stop = update_data.start_spool_replayer(0.05)
+    try:
+        assert update_data.start_spool_replayer(0.05) == (thread, stop)
+        deadline = time.monotonic() + 10
+        while spool.pending_segments() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _stored(postgres_connect_kwargs) == [(21, "Accepted")]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_replay_skips_while_another_replayer_holds_the_lock():
+    spool.append_batch([_entry(31)])
+    with spool.replay_lock() as locked:
+        assert locked is True
+        assert update_data.replay_spool() is None
+    assert len(spool.pending_segments()) == 1
+
+
+def test_empty_spool_helpers_are_noops(tmp_path, monkeypatch):
+    monkeypatch.setenv("INGEST_SPOOL_DIR", str(tmp_path / "missing"))
+    assert spool.pending_segments() == []
+    assert spool.append_batch([]) == []
+    spool.remove_segments([str(tmp_path / "gone.jsonl")])
+    update_data._spool_entries([])
+    assert spool.pending_segments() == []
+
+
+@pytest.mark.web
+def test_create_app_starts_replayer_when_interval_set(monkeypatch):
+    started = []
+    monkeypatch.setattr(update_data, "start_spool_replayer", started.append)
+    monkeypatch.setenv("SPOOL_REPLAY_INTERVAL", "5")
+    app_module.create_app()
+    assert started == [5.0]
@@ -0,0 +1,219 @@
+"""Tests for the embedded SQLite backend selected by a sqlite:/// DATABASE_URL."""
+
+import json
+import sqlite3
+import sys
+from datetime import date
+from pathlib import Path
+
+import psycopg
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import db_config
+import export_data
+import ingest_ledger
+import load_data
+import query_data
+import refresh_data
+import spool
+import sqlite_backend
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "comments": "",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.85",
+        "GRE Score": "325",
+        "GRE V Score": "160",
+        "GRE AW Score": "4.5",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+    entry.update(overrides)
+    return entry
+
+
+# Covers every question's filters, plus the program strings the name split
+# has to agree on: no comma, two commas, empty and missing.
+ENTRIES = [
+    _entry(1),
+    _entry(2, status="Rejected", **{"US/International": "International"}),
+    _entry(3, program="Computer Science, Stanford University, Palo Alto", GPA="3.335"),
+    _entry(4, program="Computer Science, Johns Hopkins University", Degree="Masters", GPA=""),
+    _entry(5, program="Physics", term="Fall 2025", date_added="December 30, 2025"),
+    _entry(6, program="", date_added="January 2, 2027", **{"US/International": "Other"}),
+    _entry(7, program=None, GPA="2.9", **{"llm-generated-program": None}),
+    _entry(8, program="History , Georgetown University ", **{"llm-generated-university": "Georgetown University"}),
+    _entry(9, date_added="", status="Wait listed", Degree="Masters"),
+]
+
+
+def _write_lines(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries), encoding="utf-8")
+
+
+def _refuse(*_args, **_kwargs):
+    raise psycopg.OperationalError("database is locked")
+
+
+@pytest.fixture()
+def sqlite_url(monkeypatch, tmp_path):
+    """Point every module at a fresh SQLite database file."""
+    url = "sqlite:///" + str(tmp_path / "applicants.db")
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    return url
+
+
+@pytest.mark.db
+def test_analysis_answers_match_postgres(
+    postgres_connect_kwargs, reset_real_applicants_table, sqlite_url, monkeypatch, tmp_path
+):
+    path = tmp_path / "applicants.jsonl"
+    _write_lines(path, ENTRIES)
+    load_data.bulk_insert_json(str(path))
+    with query_data.connect() as conn:
+        assert db_config.is_sqlite(conn)
+        # Pipeline mode is accepted and changes nothing on SQLite.
+        sqlite_answers = query_data.questions(conn, pipeline=True)
+
+    monkeypatch.setattr(load_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    load_data.bulk_insert_json(str(path))
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        assert not db_config.is_sqlite(conn)
+        postgres_answers = query_data.questions(conn, pipeline=False)
+
+    assert sqlite_answers == postgres_answers
+    with query_data.connect() as conn:
+        stored = conn.execute("SELECT question, answer FROM answers_table;").fetchall()
+    assert [list(row) for row in stored] == sqlite_answers
+
+
+def test_refresh_writes_and_ledger(sqlite_url):
+    assert update_data.insert_applicants_from_json_batch([_entry(1), _entry(2)]) == 0
+    assert update_data.insert_applicants_from_json_batch([_entry(2), _entry(3)]) == 1
+    assert update_data.insert_applicants_from_json_batch([{"url": "not-a-result"}]) == -1
+    assert refresh_data.get_newest_p() == 3
+
+    counts = update_data.upsert_applicants_from_json_batch(
+        [_entry(3), _entry(2, status="Rejected"), _entry(4), _entry(4, GPA="3.10")]
+    )
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+
+    spool.append_batch([_entry(4, GPA="3.20"), _entry(5)])
+    assert update_data.replay_spool() == {"segments": 1, "inserted": 1, "updated": 1, "unchanged": 0}
+
+    batches = ingest_ledger.list_batches()
+    assert [batch["source"] for batch in reversed(batches)] == [
+        "refresh", "refresh", "refresh_upsert", "spool_replay",
+    ]
+    assert all(batch["finished_at"] >= batch["started_at"] for batch in batches)
+    with query_data.connect() as conn:
+        with conn.cursor() as cur:
+            assert ingest_ledger.latest_batch_id(cur) == 4
+            assert ingest_ledger.changed_since(cur, 2) == [(2,), (4,), (5,)]
+            cur.execute("SELECT status, gpa, date_added FROM applicants WHERE p_id = %s;", (4,))
+            assert cur.fetchone() == ("Accepted", 3.2, date(2026, 3, 3))
+
+
+def test_spooled_inserts_replay_without_overwriting(sqlite_url, monkeypatch):
+    assert update_data.insert_applicants_from_json_batch([_entry(1)]) == 0
+    with monkeypatch.context() as patch:
+        patch.setattr(sqlite_backend, "connect", _refuse)
+        assert update_data.insert_applicants_from_json_batch([_entry(1, GPA="2.00"), _entry(2)]) == -1
+        assert update_data.upsert_applicants_from_json_batch([_entry(2, status="Rejected")]) is None
+    assert [spool.segment_mode(path) for path in spool.pending_segments()] == ["insert", "upsert"]
+
+    # Like the live insert, the spooled one leaves p_id 1 alone; the
+    # upsert spooled after it still wins for p_id 2.
+    assert update_data.replay_spool() == {"segments": 2, "inserted": 1, "updated": 1, "unchanged": 1}
+    with query_data.connect() as conn:
+        rows = conn.execute("SELECT p_id, gpa, status FROM applicants ORDER BY p_id;").fetchall()
+    assert rows == [(1, 3.85, "Accepted"), (2, 3.85, "Rejected")]
+
+
+def test_loaders_and_export(sqlite_url, tmp_path):
+    path = tmp_path / "applicants.jsonl"
+    _write_lines(path, ENTRIES[:3])
+    load_data.bulk_insert_json(str(path))
+    _write_lines(path, ENTRIES[:4])
+    load_data.incremental_load_json(str(path), state_path=str(tmp_path / "state.json"))
+    assert load_data.upsert_json(str(path)) == {"inserted": 0, "updated": 0, "unchanged": 4}
+
+    chunks = list(export_data.iter_row_chunks(chunk_size=3))
+    assert [len(rows) for rows in chunks] == [3, 1]
+    assert chunks[0][0][:4] == (1, "Computer Science, MIT", "", date(2026, 3, 3))
+
+    # Recreating the table starts over; the ledger is kept.
+    load_data.create_table(partitioned=True)
+    assert refresh_data.get_newest_p() is None
+    assert len(ingest_ledger.list_batches()) == 3
+
+
+@pytest.mark.web
+def test_pages_update_and_render_analysis(sqlite_url, client):
+    assert update_data.insert_applicants_from_json_batch(ENTRIES) == 0
+    response = client.post("/update_analysis", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    html = client.get("/analysis").data.decode("utf-8")
+    assert "Answer: </strong>8" in html
+
+
+def test_connection_wrapper(sqlite_url, tmp_path):
+    with db_config.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode;").fetchone() == ("wal",)
+        assert conn.autocommit is False
+        conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT NOT NULL);")
+        conn.execute(
+            "INSERT INTO notes VALUES (%(id)s, '100%% ' || %(body)s);", {"id": 1, "body": "done"}
+        )
+        assert conn.execute("SELECT body FROM notes WHERE body LIKE '%done';").fetchone() == ("100% done",)
+        with conn.cursor(name="ignored") as cur:
+            cur.execute("SELECT id FROM notes;")
+            assert cur.fetchmany(5) == [(1,)]
+
+    # Errors roll the transaction back and surface as psycopg exceptions.
+    with pytest.raises(psycopg.IntegrityError):
+        with db_config.connection() as conn:
+            conn.execute("INSERT INTO notes (id, body) VALUES (%s, %s);", (2, "kept?"))
+            conn.execute("INSERT INTO notes (id) VALUES (%s);", (3,))
+    with pytest.raises(psycopg.DatabaseError):
+        with db_config.connection(autocommit=True) as conn:
+            assert conn.autocommit is True
+            conn.execute("SELECT %s, %s;", (1,))
+    with db_config.connection() as conn:
+        assert conn.execute("SELECT count(*) FROM notes;").fetchone() == (1,)
+
+    missing = {"conninfo": "sqlite:///" + str(tmp_path / "missing" / "x.db")}
+    with pytest.raises(psycopg.OperationalError):
+        with db_config.connection(missing):
+            pass
+    # A busy database is an OperationalError too, so callers spool as usual.
+    with pytest.raises(psycopg.OperationalError):
+        with db_config.connection() as conn:
+            with sqlite_backend._psycopg_errors():
+                raise sqlite3.OperationalError("database is locked")
+
+    assert sqlite_backend.database_path("sqlite:///:memory:") == ":memory:"
+
+
+def test_pooling_reuses_one_connection_per_thread(sqlite_url, monkeypatch):
+    monkeypatch.setenv("DATABASE_POOL", "1")
+    # TEMP tables live as long as their connection.
+    with db_config.connection() as conn:
+        conn.execute("CREATE TEMP TABLE seen (id INTEGER);")
+    with db_config.connection(autocommit=True) as conn:
+        assert conn.execute("SELECT count(*) FROM seen;").fetchone() == (0,)
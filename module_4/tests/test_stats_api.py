@@ -0,0 +1,186 @@
+"""Tests for the parameterized applicant statistics API."""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import applicant_stats
+import load_data
+import query_data
+import result_cache
+import update_data
+
+
+def _entry(p_id, **overrides):
+    entry = {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "date_added": "March 3, 2026",
+        "status": "Accepted",
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": "3.80",
+        "GRE Score": "330",
+        "Degree": "PhD",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "Massachusetts Institute of Technology",
+    }
+    entry.update(overrides)
+    return entry
+
+
+ENTRIES = [
+    _entry(1),
+    _entry(2, status="Rejected", GPA="3.60", **{"US/International": "International"}),
+    _entry(3, program="Computer Science, Stanford University", GPA="4.00", **{"GRE Score": ""}),
+    _entry(4, program="Physics, MIT", Degree="Masters", term="Fall 2025", date_added="May 1, 2025"),
+]
+
+
+@pytest.fixture()
+def sqlite_applicants(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "applicants.db"))
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    load_data.create_table()
+    update_data.insert_applicants_from_json_batch(ENTRIES)
+
+
+def _filters(**args):
+    return applicant_stats.normalize_filters({name: list(values) for name, values in args.items()})
+
+
+def test_filters_are_validated_and_canonical():
+    filters = _filters(university=[" Stanford University", "MIT", "MIT", ""], degree=["PhD"], year=["2026"])
+    assert filters == {
+        "university": ["MIT", "Stanford University"],
+        "degree": ["PhD"],
+        "year": 2026,
+        "fields": "scraped",
+    }
+    assert _filters(university=["MIT", "Stanford University"], degree=["PhD"], year=["2026"]) == filters
+
+    with pytest.raises(ValueError, match="Unknown parameter\\(s\\): school"):
+        _filters(school=["MIT"])
+    with pytest.raises(ValueError, match="'year' must be a whole number"):
+        _filters(year=["recent"])
+    with pytest.raises(ValueError, match="'year' is out of range"):
+        _filters(year=["20260"])
+    with pytest.raises(ValueError, match="'fields' must be one of"):
+        _filters(fields=["both"])
+    with pytest.raises(ValueError, match="At most 50 values for 'term'"):
+        _filters(term=[str(n) for n in range(51)])
+
+
+def test_statement_depends_only_on_the_filter_shape():
+    mit, _ = applicant_stats.build_query(_filters(university=["MIT"], term=["Fall 2026"]))
+    both, params = applicant_stats.build_query(_filters(university=["MIT", "Yale"], term=["Fall 2025"]))
+    assert mit == both
+    assert "term = ANY(%s) AND university_name = ANY(%s)" in both
+    assert params == [["Fall 2025"], ["MIT", "Yale"]]
+
+    sql, params = applicant_stats.build_query(_filters(program=["Physics"], year=["2025"], fields=["llm"]), sqlite=True)
+    assert "WHERE llm_generated_program IN (%s) AND date_added >= %s AND date_added < %s;" in sql
+    assert params == ["Physics", date(2025, 1, 1), date(2026, 1, 1)]
+    assert applicant_stats.build_query(_filters())[0].endswith("FROM applicants;")
+
+
+def test_stats_for_filtered_rows(sqlite_applicants):
+    with query_data.connect() as conn:
+        result = applicant_stats.applicant_stats(conn, _filters(university=["MIT"], degree=["PhD"]))
+        everyone = applicant_stats.applicant_stats(conn, _filters())
+        nobody = applicant_stats.applicant_stats(conn, _filters(term=["Spring 1999"]))
+
+    assert result == {
+        "stats": {
+            "entries": 2,
+            "accepted": 1,
+            "acceptance_rate": 50.0,
+            "international_rate": 50.0,
+            "avg_gpa": 3.7,
+            "avg_gre": 330.0,
+            "avg_gre_v": None,
+            "avg_gre_aw": None,
+        },
+        "cached": False,
+    }
+    assert everyone["stats"]["entries"] == 4 and everyone["stats"]["avg_gpa"] == 3.8
+    assert nobody["stats"]["entries"] == 0 and nobody["stats"]["acceptance_rate"] is None
+
+
+def test_repeated_filters_are_served_from_the_cache(sqlite_applicants, monkeypatch):
+    monkeypatch.setenv("ANALYSIS_CACHE", "1")
+    result_cache.reset_cache()
+    filters = _filters(year=["2026"])
+    with query_data.connect() as conn:
+        first = applicant_stats.applicant_stats(conn, filters)
+        second = applicant_stats.applicant_stats(conn, _filters(year=["2026"]))
+    assert first["cached"] is False and second == dict(first, cached=True)
+    assert first["stats"]["entries"] == 3
+
+    update_data.insert_applicants_from_json_batch([_entry(5)])
+    with query_data.connect() as conn:
+        third = applicant_stats.applicant_stats(conn, filters)
+    assert third["cached"] is False and third["stats"]["entries"] == 4
+    result_cache.reset_cache()
+
+
+@pytest.mark.web
+def test_stats_endpoint(client, sqlite_applicants):
+    response = client.get("/api/stats?university=Stanford+University&university=MIT&term=Fall+2026")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ok"] is True and body["cached"] is False
+    assert body["filters"] == {"university": ["MIT", "Stanford University"], "term": ["Fall 2026"], "fields": "scraped"}
+    assert body["stats"]["entries"] == 3 and body["stats"]["avg_gpa"] == 3.8
+
+    response = client.get("/api/stats?year=soon")
+    assert response.status_code == 400
+    assert response.get_json() == {"ok": False, "message": "'year' must be a whole number."}
+
+
+@pytest.mark.web
+def test_stats_endpoint_db_down(client, monkeypatch, capsys):
+    def boom(**_kwargs):
+        raise OperationalError("db down")
+
+    monkeypatch.setattr(query_data, "get_db_read_connect_kwargs", lambda: {"conninfo": "postgresql://stub"})
+    monkeypatch.setattr(psycopg, "connect", boom)
+    response = client.get("/api/stats?term=Fall+2026")
+    assert response.status_code == 503
+    assert response.get_json() == {"ok": False, "message": "Database unavailable."}
+    assert "db down" in capsys.readouterr().out
+
+
+@pytest.mark.db
+def test_postgres_stats_use_prepared_statements(postgres_connect_kwargs, reset_real_applicants_table, monkeypatch):
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+    update_data.insert_applicants_from_json_batch(ENTRIES)
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        conn.prepare_threshold = 0
+        filters = _filters(university=["MIT"], degree=["PhD"])
+        result = applicant_stats.applicant_stats(conn, filters)
+        applicant_stats.applicant_stats(conn, _filters(university=["Stanford University"], degree=["PhD"]))
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM pg_prepared_statements;")
+            assert cur.fetchone()[0] == 1
+            cur.execute("SELECT indexname FROM pg_indexes WHERE indexname = 'applicants_stats_idx';")
+            assert cur.fetchone() is not None
+
+    assert result["stats"] == {
+        "entries": 2,
+        "accepted": 1,
+        "acceptance_rate": 50.0,
+        "international_rate": 50.0,
+        "avg_gpa": 3.7,
+        "avg_gre": 330.0,
+        "avg_gre_v": None,
+        "avg_gre_aw": None,
+    }
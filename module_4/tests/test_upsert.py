@@ -0,0 +1,168 @@
+"""Tests for the change-detecting upsert write path."""
+
+import json
+import sys
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg import OperationalError
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import load_data
+import refresh_data
+import update_data
+
+
+def _entry(p_id, status="Accepted", gpa="3.90", date_added="March 3, 2026"):
+    return {
+        "url": f"https://www.thegradcafe.com/result/{p_id}",
+        "program": "Computer Science, MIT",
+        "comments": "",
+        "date_added": date_added,
+        "status": status,
+        "term": "Fall 2026",
+        "US/International": "American",
+        "GPA": gpa,
+        "Degree": "Masters",
+        "llm-generated-program": "Computer Science",
+        "llm-generated-university": "MIT",
+    }
+
+
+@pytest.fixture()
+def real_upsert_db(monkeypatch, postgres_connect_kwargs, reset_real_applicants_table):
+    """Point the loaders at the real database."""
+    for module in (load_data, update_data):
+        monkeypatch.setattr(module, "get_db_connect_kwargs", lambda: postgres_connect_kwargs)
+
+
+def _row_versions(postgres_connect_kwargs):
+    """Return ``p_id -> (xmin, status, gpa, content_hash)`` for every row."""
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT p_id, xmin::text, status, gpa, content_hash FROM applicants ORDER BY p_id;"
+            )
+            return {row[0]: row[1:] for row in cur.fetchall()}
+
+
+@pytest.mark.db
+def test_upsert_rewrites_only_changed_rows(real_upsert_db, postgres_connect_kwargs):
+    assert update_data.upsert_applicants_from_json_batch([_entry(1), _entry(2)]) == {
+        "inserted": 2, "updated": 0, "unchanged": 0,
+    }
+    before = _row_versions(postgres_connect_kwargs)
+    assert before[1][3] is not None
+
+    counts = update_data.upsert_applicants_from_json_batch(
+        [_entry(1), _entry(2, status="Rejected", gpa="3.50"), _entry(3)]
+    )
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+
+    after = _row_versions(postgres_connect_kwargs)
+    # Same xmin means the unchanged row was not rewritten at all.
+    assert after[1] == before[1]
+    assert after[2][1:3] == ("Rejected", 3.5)
+    assert after[2][0] != before[2][0]
+    assert after[2][3] != before[2][3]
+    assert sorted(after) == [1, 2, 3]
+
+
+@pytest.mark.db
+def test_upsert_keeps_last_duplicate_and_matches_trigger_hash(real_upsert_db, postgres_connect_kwargs):
+    rows = update_data._entries_to_rows([_entry(5), _entry(5, status="Wait listed")])
+    with psycopg.connect(**postgres_connect_kwargs) as conn:
+        with conn.cursor() as cur:
+            assert load_data.upsert_rows(cur, rows) == {"inserted": 1, "updated": 0, "unchanged": 0}
+            assert load_data.upsert_rows(cur, []) == {"inserted": 0, "updated": 0, "unchanged": 0}
+            # Plain loader inserts get the same hash the upsert compares against.
+            cur.execute(load_data.INSERT_QUERY, (6,) + rows[1][1:] + (None,))
+            cur.execute(
+                """
+                SELECT p_id, status, content_hash = applicant_content_hash(
+                    program, comments, date_added, url, status, term, us_or_international,
+                    gpa, gre, gre_v, gre_aw, degree, llm_generated_program, llm_generated_university
+                )
+                FROM applicants ORDER BY p_id;
+                """
+            )
+            assert cur.fetchall() == [(5, "Wait listed", True), (6, "Wait listed", True)]
+        conn.rollback()
+
+
+@pytest.mark.db
+def test_upsert_on_partitioned_table(real_upsert_db, postgres_connect_kwargs):
+    load_data.create_table(partitioned=True)
+    first = [_entry(1), _entry(2, date_added="")]
+    assert update_data.upsert_applicants_from_json_batch(first)["inserted"] == 2
+
+    counts = update_data.upsert_applicants_from_json_batch(
+        [_entry(1, status="Rejected"), _entry(2, date_added=""), _entry(3, date_added="May 1, 2027")]
+    )
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert _row_versions(postgres_connect_kwargs)[1][1] == "Rejected"
+
+
+@pytest.mark.db
+def test_upsert_json_batches_and_reports_counts(tmp_path, real_upsert_db, capsys):
+    path = tmp_path / "baseline.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in [_entry(1), _entry(2), {"url": "no-id"}]:
+            f.write(json.dumps(entry) + "\n")
+        f.write("\n")
+
+    assert load_data.upsert_json(str(path), batch_size=1)["inserted"] == 2
+    assert load_data.upsert_json(str(path)) == {"inserted": 0, "updated": 0, "unchanged": 2}
+    assert "'0' inserted, '0' updated, '2' unchanged." in capsys.readouterr().out
+
+
+@pytest.mark.db
+def test_upsert_operational_error(monkeypatch, tmp_path, capsys):
+    stub = {"conninfo": "postgresql://stub"}
+    monkeypatch.setattr(load_data, "get_db_connect_kwargs", lambda: stub)
+    monkeypatch.setattr(update_data, "get_db_connect_kwargs", lambda: stub)
+
+    def boom(**_kwargs):
+        raise OperationalError("upsert failed")
+
+    monkeypatch.setattr(psycopg, "connect", boom)
+    assert update_data.upsert_applicants_from_json_batch([_entry(1)]) is None
+    assert load_data.upsert_json(str(tmp_path / "missing.jsonl")) is None
+    assert capsys.readouterr().out.count("upsert failed") == 2
+
+
+@pytest.mark.integration
+def test_load_data_main_upsert_flag(monkeypatch):
+    calls = []
+    monkeypatch.setattr(load_data, "upsert_json", lambda path: calls.append(path))
+    monkeypatch.setattr(load_data, "create_table", lambda **_kwargs: calls.append("create"))
+
+    load_data.main(upsert=True)
+    assert calls == [load_data.filename]
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    ("counts", "expected"),
+    [
+        ({"inserted": 0, "updated": 1, "unchanged": 4}, 0),
+        ({"inserted": 0, "updated": 0, "unchanged": 5}, 1),
+        (None, 1),
+    ],
+)
+def test_refresh_update_db_rescrape_upserts_recent_rows(monkeypatch, counts, expected):
+    scrape_calls = []
+    monkeypatch.setenv("REFRESH_RESCRAPE", "3")
+    monkeypatch.setattr(refresh_data, "scrape_data", lambda n: scrape_calls.append(n) or n)
+    monkeypatch.setattr(
+        refresh_data, "clean_data", lambda _raw: [{"url": "https://www.thegradcafe.com/result/12"}]
+    )
+    monkeypatch.setattr(refresh_data, "get_newest_p", lambda: 10)
+    monkeypatch.setattr(refresh_data, "upsert_applicants_from_json_batch", lambda _rows: counts)
+
+    assert refresh_data.update_db() == expected
+    assert scrape_calls == [1, 5]